@@ -0,0 +1,94 @@
+"""Client for api_server.py with the same methods as services.InventoryService.
+
+    client = ApiClient("http://127.0.0.1:8765")
+    sale_id = client.record_sale({'product_id': 7, 'customer_id': 1, 'user_id': 1, 'quantity': 2})
+    product, stock = client.batch([('find_product', "8901234567890"), ('stock', 7)])
+
+Errors raised by the service are raised again here with the same type
+where the client knows it (ValidationError, LineValidationError), so
+code written against InventoryService works unchanged against a server.
+Each thread keeps its own keep-alive connection.
+"""
+import http.client
+import json
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+
+from database import LineValidationError
+from services import ValidationError, READ_METHODS, WRITE_METHODS
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+def _raise(error):
+    if error.get('type') == 'LineValidationError':
+        raise LineValidationError([tuple(item) for item in error.get('errors', [])])
+    if error.get('type') == 'ValidationError':
+        raise ValidationError(error.get('message'))
+    raise Exception(error.get('message') or "Unknown API error")
+
+
+class ApiClient:
+    def __init__(self, url=DEFAULT_URL, timeout=10.0):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        if name in READ_METHODS or name in WRITE_METHODS:
+            return partial(self.call, name)
+        raise AttributeError(name)
+
+    def _post(self, path, payload):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        body = json.dumps(payload).encode()
+        try:
+            conn.request("POST", path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Reconnect on the next call rather than reuse a broken connection
+            conn.close()
+            self._local.conn = None
+            raise Exception(f"Error calling API at {self.url}: {str(e)}")
+        result = json.loads(data)
+        if response.status != 200:
+            _raise(result.get('error', {}))
+        return result
+
+    def call(self, method, *args):
+        """Call one service method on the server and return its result."""
+        result = self._post("/call", {'method': method, 'params': list(args)})
+        if 'error' in result:
+            _raise(result['error'])
+        return result['result']
+
+    def batch(self, calls):
+        """Run (method, *args) calls in one round trip; returns their results in order.
+
+        A call that failed has its exception in place of the result.
+        """
+        results = self._post("/batch", [{'method': method, 'params': list(args)} for method, *args in calls])
+        answers = []
+        for result in results:
+            if 'error' in result:
+                try:
+                    _raise(result['error'])
+                except Exception as e:
+                    answers.append(e)
+            else:
+                answers.append(result['result'])
+        return answers
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
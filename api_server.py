@@ -0,0 +1,241 @@
+"""Local HTTP/JSON API over InventoryService, so POS terminals share one writer process.
+
+    python api_server.py [--db inventory.db] [--host 127.0.0.1] [--port 8765]
+
+Every call is a POST naming a services.InventoryService method and its
+arguments, given as a list or as an object of keyword arguments:
+
+    POST /call   {"method": "record_sale", "params": [{"product_id": 7, ...}]}
+              -> {"result": 42}
+              or {"error": {"type": "ValidationError", "message": "...", "errors": [[1, "..."]]}}
+
+    POST /batch  [{"method": "stock", "params": [7]}, {"method": "customers"}]
+              -> [{"result": 12.0}, {"result": [...]}]
+
+A batch answers several calls in one round trip, in order, and runs them
+as one job: a scanning terminal can fetch a product, its stock and the
+customer list at once. Writes go through a write_queue.WriteQueue, whose
+single thread is the only writer of inventory.db however many terminals
+use the server, and which commits the sales arriving together from
+several terminals in one transaction; reads run on a small pool beside
+it. With --no-group-commit each write commits on its own, still from a
+single thread. A failed call is reported in
+its own result, so HTTP errors only mean the request itself was unusable.
+GET /health answers {"status": "ok"}, and GET /stats the server's
+per-statement database timings (see query_stats.py).
+api_client.ApiClient speaks this protocol.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Database, LineValidationError
+from services import InventoryService, READ_METHODS, WRITE_METHODS
+from write_queue import WriteQueue
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_SIZE = 8 * 1024 * 1024
+MAX_HEADERS = 100
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        super().__init__(message)
+
+
+def error_payload(error):
+    payload = {'type': type(error).__name__, 'message': str(error)}
+    if isinstance(error, LineValidationError):
+        payload['errors'] = error.errors
+    return payload
+
+
+class ApiServer:
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT, read_threads=4, write_threads=None):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._readers = ThreadPoolExecutor(read_threads, thread_name_prefix="api-read")
+        # Without a write queue one thread, so one connection, does every
+        # write. With one, these threads only wait for their commit, and
+        # the more of them wait together the larger the group commits
+        if write_threads is None:
+            write_threads = 32 if service.write_queue is not None else 1
+        self._writer = ThreadPoolExecutor(write_threads, thread_name_prefix="api-write")
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        # The real port when port 0 asked for any free one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._readers.shutdown()
+        self._writer.shutdown()
+
+    def run_calls(self, calls):
+        """Run a list of call objects in order and return their result objects."""
+        return [self._run_call(call) for call in calls]
+
+    def _run_call(self, call):
+        if not isinstance(call, dict) or not isinstance(call.get('method'), str):
+            return {'error': {'type': 'BadRequest', 'message': "A call needs a method name"}}
+        method, params = call['method'], call.get('params') or []
+        if method not in READ_METHODS and method not in WRITE_METHODS:
+            return {'error': {'type': 'UnknownMethod', 'message': f"Unknown method {method}"}}
+        if not isinstance(params, (list, dict)):
+            return {'error': {'type': 'BadRequest', 'message': "params must be a list or an object"}}
+        func = getattr(self.service, method)
+        try:
+            return {'result': func(**params) if isinstance(params, dict) else func(*params)}
+        except Exception as e:
+            return {'error': error_payload(e)}
+
+    def _executor_for(self, calls):
+        writes = any(isinstance(call, dict) and call.get('method') in WRITE_METHODS for call in calls)
+        return self._writer if writes else self._readers
+
+    async def dispatch(self, verb, path, body):
+        """Return (status, payload) for one HTTP request."""
+        if path == "/health":
+            if verb != "GET":
+                raise HttpError(405, "Use GET")
+            return 200, {'status': 'ok'}
+        if path == "/stats":
+            if verb != "GET":
+                raise HttpError(405, "Use GET")
+            stats = self.service.db.query_stats
+            if stats is None:
+                raise HttpError(404, "Query stats are turned off (IMS_DB_QUERY_STATS=0)")
+            return 200, stats.to_dict()
+        if path not in ("/call", "/batch"):
+            raise HttpError(404, f"No such endpoint {path}")
+        if verb != "POST":
+            raise HttpError(405, "Use POST")
+        try:
+            request = json.loads(body or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {str(e)}")
+        calls = request if path == "/batch" else [request]
+        if path == "/batch" and not isinstance(request, list):
+            raise HttpError(400, "A batch is a list of calls")
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._executor_for(calls), self.run_calls, calls)
+        return 200, results if path == "/batch" else results[0]
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    verb, path, keep_alive, body = request
+                    status, payload = await self.dispatch(verb, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': {'type': 'BadRequest', 'message': str(e)}}
+                    keep_alive = False
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {'error': error_payload(e)}
+                    keep_alive = False
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            verb, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(400, "Too many headers")
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get('connection', "").lower()
+        keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+        return verb, target.split("?", 1)[0], keep_alive, body
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+
+async def serve(service, host, port, read_threads=4, write_threads=None):
+    server = await ApiServer(service, host, port, read_threads, write_threads).start()
+    print(f"Serving on http://{server.host}:{server.port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the inventory over a local HTTP/JSON API")
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"port, 0 for any free one (default: {DEFAULT_PORT})")
+    parser.add_argument('--read-threads', type=int, default=4, help="threads serving reads (default: 4)")
+    parser.add_argument('--no-group-commit', action='store_true', help="commit every write on its own")
+    parser.add_argument('--group-commit-rows', type=int, default=100,
+                        help="most writes committed together (default: 100)")
+    parser.add_argument('--group-commit-ms', type=float, default=0,
+                        help="how long a write waits for others to commit with (default: 0)")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        write_queue = None
+        if not args.no_group_commit:
+            write_queue = WriteQueue(db, args.group_commit_rows, args.group_commit_ms / 1000)
+        try:
+            asyncio.run(serve(InventoryService(db, write_queue), args.host, args.port, args.read_threads))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if write_queue is not None:
+                write_queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class _JobSignals(QObject):
+    finished = Signal(int, object)
+    failed = Signal(int, object)
+
+
+class _Job(QRunnable):
+    def __init__(self, ticket, func, args, signals):
+        super().__init__()
+        self.ticket = ticket
+        self.func = func
+        self.args = args
+        self.signals = signals
+        # AsyncDatabase keeps the reference until the result is delivered
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.func(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, e)
+        else:
+            self.signals.finished.emit(self.ticket, result)
+
+
+class AsyncDatabase(QObject):
+    """Runs Database calls on a thread pool and hands results back on the GUI thread.
+
+    submit() takes a Database method name (or any callable) and callbacks
+    for the result and for the exception raised. Both callbacks run on the thread
+    that owns this object. Calls that share a key supersede each other:
+    a queued call is withdrawn and an older result that arrives late is
+    dropped, so a combo only ever shows the data for its latest selection.
+    Forms sharing one AsyncDatabase use (form, name) keys, so the same
+    combo in another form does not supersede theirs.
+    """
+
+    def __init__(self, db, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._signals = _JobSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._next_ticket = 0
+        self._jobs = {}
+        self._latest = {}
+
+    def submit(self, method, *args, on_result=None, on_error=None, key=None):
+        func = getattr(self.db, method) if isinstance(method, str) else method
+        self._next_ticket += 1
+        ticket = self._next_ticket
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = ticket
+        job = _Job(ticket, func, args, self._signals)
+        self._jobs[ticket] = (job, key, on_result, on_error)
+        self.pool.start(job)
+        return ticket
+
+    def cancel(self, key):
+        """Withdraw the pending call for key, or drop its result if it is already running."""
+        ticket = self._latest.pop(key, None)
+        if ticket is None or ticket not in self._jobs:
+            return
+        job = self._jobs[ticket][0]
+        if self.pool.tryTake(job):
+            del self._jobs[ticket]
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _take(self, ticket):
+        entry = self._jobs.pop(ticket, None)
+        if entry is None:
+            return None
+        _, key, on_result, on_error = entry
+        if key is not None:
+            if self._latest.get(key) != ticket:
+                return None
+            del self._latest[key]
+        return on_result, on_error
+
+    def _on_finished(self, ticket, result):
+        callbacks = self._take(ticket)
+        if callbacks and callbacks[0] is not None:
+            callbacks[0](result)
+
+    def _on_failed(self, ticket, error):
+        callbacks = self._take(ticket)
+        if callbacks and callbacks[1] is not None:
+            callbacks[1](error)
@@ -0,0 +1,64 @@
+"""Per-call latency of pooled connections versus connect/commit/close per call.
+
+Run from the repository root:
+    python -m benchmarks.bench_connection_pool --iterations 2000
+"""
+import argparse
+import sqlite3
+
+from database import Database
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+
+def legacy_query(db_name, query, params=()):
+    # Mirrors the old Database.execute_query: a fresh connection for every call
+    conn = sqlite3.connect(db_name)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        result = cursor.fetchall()
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def legacy_insert(db_name, query, params):
+    conn = sqlite3.connect(db_name)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        db = Database(path)
+        category_id = db.add_category('Bench')
+        db.add_subcategory(category_id, 'Bench Sub')
+        select = "SELECT * FROM subcategories WHERE category_id = ? ORDER BY name"
+        insert = "INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)"
+        row = ('Bench Customer', '000', 'bench@example.com')
+
+        print_summary('select: connect per call',
+                      time_calls(lambda: legacy_query(path, select, (category_id,)), args.iterations))
+        print_summary('select: pooled connection',
+                      time_calls(lambda: db.execute_query(select, (category_id,)), args.iterations))
+        print_summary('insert: connect per call',
+                      time_calls(lambda: legacy_insert(path, insert, row), args.iterations))
+        print_summary('insert: pooled connection',
+                      time_calls(lambda: db.execute_insert(insert, row), args.iterations))
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Peak resident memory and throughput of the streaming ledger export.
+
+Fills a scratch database with sales rows, then runs `python -m exporters`
+in a child process for CSV and JSON Lines and reports the child's peak RSS.
+For comparison a child exports a slice of the same rows the old way,
+through execute_query (fetchall). To fill the scratch database quickly its
+rollup triggers and secondary sales indexes are dropped first; neither is
+used by the export. Peak RSS needs os.wait4 (Linux/macOS).
+
+    python -m benchmarks.bench_export --rows 10000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from migrations import migrate
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FETCHALL_EXPORT = '''
+import csv, sys
+from database import Database
+from exporters import export_config, export_query
+columns, query, params = export_query('sales')
+with Database(sys.argv[1], export_config()) as db, open(sys.argv[2], 'w', newline='') as out:
+    rows = db.execute_query(query + " LIMIT ?", params + [int(sys.argv[3])])
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    writer.writerows(rows)
+'''
+
+
+def fill(path, rows, products, seed):
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    populate(conn, products, 50, 10, 0, seed)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%rollup%'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'sales' AND sql IS NOT NULL").fetchall():
+        conn.execute(f"DROP INDEX {name}")
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 8)
+    step = timedelta(days=730) / rows
+
+    def sales():
+        for i in range(rows):
+            quantity = rng.randint(1, 5)
+            yield (rng.randint(1, products), 1, 1, quantity, 100.0, 18.0, 18.0 * quantity, 118.0 * quantity,
+                   (start + step * i).strftime('%Y-%m-%d %H:%M:%S'))
+
+    conn.executemany('''
+        INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate,
+                           tax_amount, total_amount, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', sales())
+    conn.commit()
+    conn.close()
+
+
+def run_child(args):
+    """Run a child process and return (seconds, peak RSS in MB or None)."""
+    start = time.perf_counter()
+    process = subprocess.Popen(args, cwd=ROOT, stderr=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        peak = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    else:
+        process.wait()
+        peak = None
+    if process.returncode:
+        raise Exception(f"{args} exited with {process.returncode}")
+    return time.perf_counter() - start, peak
+
+
+def report(label, rows, elapsed, peak, output):
+    size = os.path.getsize(output) / 1e6
+    memory = f"{peak:7.1f} MB" if peak is not None else "    n/a"
+    print(f"{label:<28} {rows:>10} rows {elapsed:7.1f}s {rows / elapsed:10.0f} rows/s  "
+          f"peak RSS {memory}  output {size:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--baseline-rows', type=int, default=1_000_000, help="rows exported with fetchall")
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        start = time.perf_counter()
+        fill(path, args.rows, args.products, args.seed)
+        print(f"filled {args.rows} sales rows in {time.perf_counter() - start:.1f}s")
+        directory = os.path.dirname(path)
+        for fmt in ('csv', 'jsonl'):
+            output = os.path.join(directory, f"sales.{fmt}")
+            elapsed, peak = run_child([sys.executable, '-m', 'exporters', 'sales', output, '--db', path])
+            report(f"stream_query -> {fmt}", args.rows, elapsed, peak, output)
+            os.remove(output)
+        output = os.path.join(directory, "fetchall.csv")
+        elapsed, peak = run_child([sys.executable, '-c', FETCHALL_EXPORT, path, output, str(args.baseline_rows)])
+        report("execute_query -> csv", args.baseline_rows, elapsed, peak, output)
+
+
+if __name__ == '__main__':
+    main()
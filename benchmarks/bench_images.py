@@ -0,0 +1,110 @@
+"""Product image thumbnails: render throughput and per-cell draw cost.
+
+Writes synthetic camera-sized JPEGs, ingests them into an ImageStore and
+renders their thumbnails once in this process and once on the store's
+process pool. It then times what drawing one Image cell costs: decoding
+the original into a QPixmap and scaling it (what showing image_path
+directly would take), loading the thumbnail file, and a ThumbnailCache hit.
+
+    python -m benchmarks.bench_images --images 40 --size 4000x3000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PIL import Image
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QGuiApplication, QPixmap, QPixmapCache
+
+from image_store import ImageStore, make_thumbnail
+from thumbnail_cache import ThumbnailCache
+from benchmarks.common import time_calls, print_summary
+
+
+def write_photos(directory, count, size):
+    paths = []
+    for i in range(count):
+        # Noise compresses like a real photo rather than a flat colour
+        image = Image.effect_noise(size, 40 + i % 40).convert('RGB')
+        path = os.path.join(directory, f"photo{i}.jpg")
+        image.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=40)
+    parser.add_argument('--size', default="4000x3000", help="photo size, WxH (default: 4000x3000)")
+    parser.add_argument('--workers', type=int, default=None, help="thumbnail processes (default: up to 4)")
+    args = parser.parse_args()
+    size = tuple(int(part) for part in args.size.split('x'))
+
+    app = QGuiApplication([])
+    with tempfile.TemporaryDirectory(prefix="ims-bench-") as directory:
+        print(f"writing {args.images} {args.size} JPEGs ...")
+        photos = write_photos(directory, args.images, size)
+        store = ImageStore(os.path.join(directory, "images"), max_workers=args.workers)
+        start = time.perf_counter()
+        digests = [store.ingest(path) for path in photos]
+        elapsed = time.perf_counter() - start
+        print(f"ingest (hash + copy)                     {args.images / elapsed:8.1f} images/s")
+        # Ingesting the same files again only hashes them
+        start = time.perf_counter()
+        for path in photos:
+            store.ingest(path)
+        elapsed = time.perf_counter() - start
+        print(f"ingest again (deduplicated)              {args.images / elapsed:8.1f} images/s")
+
+        serial_dir = os.path.join(directory, "serial")
+        start = time.perf_counter()
+        for digest in digests:
+            make_thumbnail(store.original_path(digest), os.path.join(serial_dir, digest + ".png"),
+                           store.thumbnail_size)
+        elapsed = time.perf_counter() - start
+        print(f"thumbnails in this process               {args.images / elapsed:8.1f} images/s")
+
+        # Start the workers first so process spawn is not counted
+        store.submit_thumbnail(digests[0]).result()
+        start = time.perf_counter()
+        for future in [store.submit_thumbnail(digest) for digest in digests]:
+            future.result()
+        elapsed = time.perf_counter() - start
+        print(f"thumbnails on {store.max_workers} worker processes          "
+              f"{args.images / elapsed:8.1f} images/s")
+        store.close()
+
+        width, height = store.thumbnail_size
+        originals = iter(photos * 2)
+        thumbnails = iter(digests * 50)
+
+        def draw_original():
+            # QPixmap(path) is served from QPixmapCache after the first load
+            QPixmapCache.clear()
+            QPixmap(next(originals)).scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        def draw_thumbnail():
+            QPixmapCache.clear()
+            QPixmap(store.thumbnail_path(next(thumbnails)))
+
+        print_summary("draw: decode original + scale", time_calls(draw_original, min(args.images, 20)))
+        print_summary("draw: load thumbnail file", time_calls(draw_thumbnail, args.images * 25))
+        cache = ThumbnailCache(store)
+        for digest in digests:
+            cache.pixmap(digest)
+        # The loader threads read the files; their results arrive as queued signals
+        while any(cache.pixmap(digest) is None for digest in digests):
+            app.processEvents()
+            time.sleep(0.001)
+        cached = iter(digests * 1000)
+        print_summary("draw: ThumbnailCache hit",
+                      time_calls(lambda: cache.pixmap(next(cached)), args.images * 500))
+        cache.close()
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
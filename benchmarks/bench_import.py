@@ -0,0 +1,104 @@
+"""Bulk CSV product import throughput versus looping add_product.
+
+Writes a synthetic supplier catalog to a temporary CSV, imports it with
+ProductImporter, then inserts a slice of the same rows one add_product call
+at a time, as the Product Master form does. The peak Python heap of the
+import is measured separately for the full file and a fifth of it, so the
+two can be compared for growth with file size.
+
+    python -m benchmarks.bench_import --rows 50000
+"""
+import argparse
+import csv
+import os
+import time
+import tracemalloc
+
+from database import Database
+from product_import import ProductImporter
+from benchmarks.common import temp_db_path
+
+HEADER = ['name', 'category', 'subcategory', 'price', 'tax_rate', 'sku_id', 'barcode', 'default_unit', 'description']
+
+
+def write_catalog(path, rows, categories=20, subcategories=10):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            category = i % categories
+            writer.writerow([f"Product {i:07d}", f"Category {category}",
+                             f"Subcategory {category}.{i // categories % subcategories}",
+                             f"{10 + i % 500}.50", "18", f"IMP-{i:07d}", f"77{i:011d}", "pcs",
+                             "Imported from supplier catalog"])
+
+
+def import_file(path, csv_path, chunk_size):
+    with Database(path) as db:
+        start = time.perf_counter()
+        result = ProductImporter(db, chunk_size=chunk_size).import_file(csv_path)
+        return result, time.perf_counter() - start
+
+
+def peak_import_memory(csv_path, chunk_size):
+    with temp_db_path() as path:
+        tracemalloc.start()
+        import_file(path, csv_path, chunk_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+
+def loop_add_product(path, csv_path, rows):
+    with Database(path) as db:
+        categories = {}
+        subcategories = {}
+        with open(csv_path, newline='', encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            start = time.perf_counter()
+            for count, row in enumerate(reader):
+                if count == rows:
+                    break
+                if row['category'] not in categories:
+                    categories[row['category']] = db.add_category(row['category'])
+                category_id = categories[row['category']]
+                key = (category_id, row['subcategory'])
+                if key not in subcategories:
+                    subcategories[key] = db.add_subcategory(category_id, row['subcategory'])
+                db.add_product({
+                    'barcode': row['barcode'], 'sku_id': row['sku_id'], 'name': row['name'],
+                    'category_id': category_id, 'subcategory_id': subcategories[key],
+                    'description': row['description'], 'price': float(row['price']),
+                    'tax_rate': float(row['tax_rate']), 'default_unit': row['default_unit'],
+                })
+            return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--baseline-rows', type=int, default=5000, help="rows inserted with add_product")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with temp_db_path("catalog.csv") as csv_path:
+        write_catalog(csv_path, args.rows)
+        print(f"catalog: {args.rows} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB")
+
+        with temp_db_path() as path:
+            result, elapsed = import_file(path, csv_path, args.chunk_size)
+            print(f"ProductImporter:   {result.imported} rows in {elapsed:.2f}s = {result.imported / elapsed:10.0f} rows/s")
+        with temp_db_path() as path:
+            elapsed = loop_add_product(path, csv_path, args.baseline_rows)
+            print(f"add_product loop:  {args.baseline_rows} rows in {elapsed:.2f}s = {args.baseline_rows / elapsed:10.0f} rows/s")
+
+        small_rows = max(args.rows // 5, 1)
+        with temp_db_path("small.csv") as small_path:
+            write_catalog(small_path, small_rows)
+            small_peak = peak_import_memory(small_path, args.chunk_size)
+        peak = peak_import_memory(csv_path, args.chunk_size)
+        print(f"peak Python heap:  {small_peak / 1e6:.1f} MB for {small_rows} rows, {peak / 1e6:.1f} MB for {args.rows} rows")
+
+
+if __name__ == '__main__':
+    main()
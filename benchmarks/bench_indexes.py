@@ -0,0 +1,140 @@
+"""Query plans and latency of the hot lookups before and after the index migration.
+
+Builds a synthetic catalog at schema version 1 (no secondary indexes), runs
+each lookup, applies the remaining migrations and runs them again.
+
+    python -m benchmarks.bench_indexes --products 1000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from migrations import SCHEMA_VERSION, migrate
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+LOOKUPS = {
+    'products by category/subcategory': '''
+        SELECT p.*, c.name as category_name, s.name as subcategory_name
+        FROM products p
+        JOIN categories c ON p.category_id = c.id
+        JOIN subcategories s ON p.subcategory_id = s.id
+        WHERE p.category_id = ? AND p.subcategory_id = ?
+        ORDER BY p.name
+    ''',
+    'product by barcode': "SELECT * FROM products WHERE barcode = ?",
+    'product by sku': "SELECT * FROM products WHERE sku_id = ?",
+    'sales history of product': '''
+        SELECT * FROM sales WHERE product_id = ? ORDER BY created_at DESC LIMIT 50
+    ''',
+    'receipts history of product': '''
+        SELECT * FROM goods_receiving WHERE product_id = ? ORDER BY created_at DESC LIMIT 50
+    ''',
+}
+
+
+def populate(conn, products, categories, subcategories_per_category, ledger_rows, seed):
+    rng = random.Random(seed)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO categories (id, name) VALUES (?, ?)",
+                     ((c, f"Category {c}") for c in range(1, categories + 1)))
+    conn.executemany("INSERT INTO subcategories (id, category_id, name) VALUES (?, ?, ?)",
+                     (((c - 1) * subcategories_per_category + s, c, f"Subcategory {c}.{s}")
+                      for c in range(1, categories + 1)
+                      for s in range(1, subcategories_per_category + 1)))
+
+    def product_rows():
+        for i in range(1, products + 1):
+            category_id = rng.randint(1, categories)
+            subcategory_id = (category_id - 1) * subcategories_per_category + rng.randint(1, subcategories_per_category)
+            yield (f"890{i:010d}", f"SKU-{i:07d}", f"Product {rng.getrandbits(32):08x}",
+                   category_id, subcategory_id, "Synthetic product", 100.0, 18.0, "pcs")
+
+    conn.executemany('''
+        INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id,
+                              description, price, tax_rate, default_unit)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', product_rows())
+    conn.execute("INSERT INTO customers (name) VALUES ('Walk-in')")
+    conn.execute("INSERT INTO suppliers (name) VALUES ('Wholesale')")
+
+    def ledger(party):
+        for _ in range(ledger_rows):
+            yield (rng.randint(1, products), party, 1, 1, 100.0, 18.0, 18.0, 118.0,
+                   f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00")
+
+    conn.executemany('''
+        INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate,
+                           tax_amount, total_amount, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ledger(1))
+    conn.executemany('''
+        INSERT INTO goods_receiving (product_id, supplier_id, user_id, quantity, rate, tax_rate,
+                                     tax_amount, total_amount, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ledger(1))
+    conn.commit()
+
+
+def lookup_params(rng, products, categories, subcategories_per_category):
+    product_id = rng.randint(1, products)
+    category_id = rng.randint(1, categories)
+    return {
+        'products by category/subcategory': (category_id, (category_id - 1) * subcategories_per_category + rng.randint(1, subcategories_per_category)),
+        'product by barcode': (f"890{product_id:010d}",),
+        'product by sku': (f"SKU-{product_id:07d}",),
+        'sales history of product': (product_id,),
+        'receipts history of product': (product_id,),
+    }
+
+
+def run_lookups(conn, label, args):
+    rng = random.Random(args.seed + 1)
+    results = {}
+    for name, query in LOOKUPS.items():
+        plan = conn.execute("EXPLAIN QUERY PLAN " + query,
+                            lookup_params(rng, args.products, args.categories, args.subcategories)[name]).fetchall()
+        print(f"\n[{label}] {name}")
+        for row in plan:
+            print(f"    {row[3]}")
+
+        def call():
+            params = lookup_params(rng, args.products, args.categories, args.subcategories)[name]
+            conn.execute(query, params).fetchall()
+
+        results[name] = print_summary("    latency", time_calls(call, args.iterations))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--subcategories', type=int, default=10, help="subcategories per category")
+    parser.add_argument('--ledger-rows', type=int, default=200_000, help="rows in each of sales and goods_receiving")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        conn = sqlite3.connect(path)
+        migrate(conn, target=1)
+        start = time.perf_counter()
+        populate(conn, args.products, args.categories, args.subcategories, args.ledger_rows, args.seed)
+        print(f"populated {args.products} products in {time.perf_counter() - start:.1f}s")
+
+        before = run_lookups(conn, "schema v1", args)
+        start = time.perf_counter()
+        migrate(conn)
+        print(f"\nmigrated to v{SCHEMA_VERSION} in {time.perf_counter() - start:.1f}s")
+        after = run_lookups(conn, f"schema v{SCHEMA_VERSION}", args)
+
+        print("\nmean latency speed-up")
+        for name in LOOKUPS:
+            speedup = before[name]['mean_us'] / max(after[name]['mean_us'], 1e-9)
+            print(f"    {name:<36} {speedup:8.1f}x")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Checkout throughput: one add_invoice per cart versus one add_sale per line.
+
+    python -m benchmarks.bench_invoices --carts 200 --lines 30
+"""
+import argparse
+import random
+import time
+
+from database import Database
+from benchmarks.common import temp_db_path
+
+
+def seed(db, products, stock):
+    category_id = db.add_category('Bench')
+    subcategory_id = db.add_subcategory(category_id, 'Bench')
+    supplier_id = db.add_supplier({'name': 'Supplier', 'phone': '', 'email': ''})
+    customer_id = db.add_customer({'name': 'Walk-in', 'phone': '', 'email': ''})
+    product_ids = []
+    for i in range(products):
+        product_id = db.add_product({
+            'barcode': f"{i:012d}", 'sku_id': f"B{i}", 'name': f"Product {i}",
+            'category_id': category_id, 'subcategory_id': subcategory_id,
+            'description': 'bench', 'price': 25.0, 'tax_rate': 12.0,
+        })
+        db.add_goods_receiving({
+            'product_id': product_id, 'supplier_id': supplier_id, 'user_id': 1,
+            'quantity': stock, 'rate': 20.0, 'tax_rate': 12.0,
+            'tax_amount': 0.0, 'total_amount': 0.0,
+        })
+        product_ids.append(product_id)
+    return product_ids, customer_id
+
+
+def make_carts(rng, product_ids, carts, lines):
+    return [[{
+        'product_id': rng.choice(product_ids), 'quantity': 1, 'rate': 25.0,
+        'tax_rate': 12.0, 'tax_amount': 3.0, 'total_amount': 28.0,
+    } for _ in range(lines)] for _ in range(carts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--carts', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=30)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with temp_db_path() as path:
+        db = Database(path)
+        product_ids, customer_id = seed(db, args.products, args.carts * args.lines * 2)
+        carts = make_carts(rng, product_ids, args.carts, args.lines)
+        total_lines = args.carts * args.lines
+
+        start = time.perf_counter()
+        for cart in carts:
+            for line in cart:
+                db.add_sale(dict(line, customer_id=customer_id, user_id=1))
+        per_line = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for cart in carts:
+            db.add_invoice({'customer_id': customer_id, 'user_id': 1}, cart)
+        per_cart = time.perf_counter() - start
+
+        assert not db.verify_stock_levels()
+        db.close()
+
+    print(f"{args.carts} carts x {args.lines} lines")
+    print(f"    add_sale per line     {total_lines / per_line:10.0f} lines/s  ({per_line:.2f}s)")
+    print(f"    add_invoice per cart  {total_lines / per_cart:10.0f} lines/s  ({per_cart:.2f}s)")
+    print(f"    speed-up              {per_line / per_cart:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
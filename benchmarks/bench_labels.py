@@ -0,0 +1,54 @@
+"""Shelf label throughput for a freshly imported catalog.
+
+Fills a temporary database with --products products and renders one QR
+label and one barcode label per product to a PDF, first in this process
+and then on the worker pool. A run with --copies labels per product shows
+what the per-worker label cache saves when the same label repeats.
+
+    python -m benchmarks.bench_labels --products 10000 --workers 4
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from database import Database
+from label_generator import LabelGenerator
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path
+
+
+def run(db, directory, style, workers, copies):
+    generator = LabelGenerator(db, style=style, workers=workers)
+    path = os.path.join(directory, f"labels-{style}-{workers}-{copies}.pdf")
+    start = time.perf_counter()
+    labels, sheets = generator.render(generator.products(), path, copies)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path) / 1e6
+    print(f"{style:<8} workers={workers:<2} copies={copies}  {labels:7d} labels  {sheets:5d} sheets  "
+          f"{elapsed:7.2f}s  {labels / elapsed:8.1f} labels/s  {size:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--copies', type=int, default=3)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        Database(path).close()
+        conn = sqlite3.connect(path)
+        populate(conn, args.products, 20, 10, 0, seed=7)
+        conn.close()
+        directory = os.path.dirname(path)
+        print(f"{args.products} products, {os.cpu_count()} CPUs")
+        with Database(path) as db:
+            for style in ('qr', 'barcode'):
+                run(db, directory, style, 0, 1)
+                run(db, directory, style, args.workers, 1)
+            run(db, directory, 'qr', args.workers, args.copies)
+
+
+if __name__ == "__main__":
+    main()
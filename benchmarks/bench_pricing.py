@@ -0,0 +1,108 @@
+"""Rows/sec of bulk tax and total recomputation with pricing.py.
+
+Generates --rows ledger lines and prices them in memory four ways:
+
+    float loop        the old line_totals: round(quantity * rate * tax / 100, 2)
+    price_line loop   pricing.price_line called per row
+    batch, arrays     pricing.batch_totals without NumPy
+    batch, NumPy      pricing.batch_totals with NumPy (skipped if it is not installed)
+
+then writes them to the sales table of a temporary database and times
+pricing.audit() over it, fetch included, with each batch path.
+
+    python -m benchmarks.bench_pricing --rows 1000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+import pricing
+from database import Database
+from pricing import batch_totals, price_line
+from benchmarks.common import temp_db_path
+
+TAX_SLABS = (0.0, 5.0, 12.0, 18.0, 28.0)
+
+
+def make_rows(rows, seed):
+    rng = random.Random(seed)
+    quantities = [rng.choice((1, 1, 1, 2, 2, 3, 5, 0.5, 1.25)) for _ in range(rows)]
+    rates = [round(rng.lognormvariate(4.5, 1.0), 2) for _ in range(rows)]
+    tax_rates = [rng.choice(TAX_SLABS) for _ in range(rows)]
+    return quantities, rates, tax_rates
+
+
+def float_loop(quantities, rates, tax_rates):
+    totals = []
+    for quantity, rate, tax_rate in zip(quantities, rates, tax_rates):
+        subtotal = quantity * rate
+        tax_amount = round(subtotal * tax_rate / 100, 2)
+        totals.append(round(subtotal + tax_amount, 2))
+    return totals
+
+
+def price_line_loop(quantities, rates, tax_rates):
+    return [price_line(quantity, rate, tax_rate)['total_amount']
+            for quantity, rate, tax_rate in zip(quantities, rates, tax_rates)]
+
+
+def rate(label, rows, func):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f"{label:<24} {seconds:>8.2f} s {rows / seconds:>14,.0f} rows/s")
+
+
+def write_ledger(path, quantities, rates, tax_rates):
+    Database(path).close()
+    _, taxes, totals = batch_totals(quantities, rates, tax_rates, use_numpy=False)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    # The rollup triggers are not what is measured here
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'sales'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("INSERT INTO categories (id, name) VALUES (1, 'Bench')")
+    conn.execute("INSERT INTO subcategories (id, category_id, name) VALUES (1, 1, 'Bench')")
+    conn.execute("INSERT INTO products (id, barcode, sku_id, name, category_id, subcategory_id, price, tax_rate) "
+                 "VALUES (1, '1', 'B1', 'Bench', 1, 1, 1.0, 0.0)")
+    conn.execute("INSERT INTO customers (id, name) VALUES (1, 'Walk-in')")
+    conn.executemany(
+        "INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate, tax_amount, total_amount) "
+        "VALUES (1, 1, 1, ?, ?, ?, ?, ?)",
+        zip(quantities, rates, tax_rates, (tax / 100 for tax in taxes), (total / 100 for total in totals)))
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"generating {args.rows} rows ...")
+    columns = make_rows(args.rows, args.seed)
+    print(f"{'':<24} {'time':>10} {'throughput':>19}")
+    rate("float loop", args.rows, lambda: float_loop(*columns))
+    rate("price_line loop", args.rows, lambda: price_line_loop(*columns))
+    rate("batch, arrays", args.rows, lambda: batch_totals(*columns, use_numpy=False))
+    if pricing.have_numpy():
+        rate("batch, NumPy", args.rows, lambda: batch_totals(*columns, use_numpy=True))
+    else:
+        print("batch, NumPy             skipped: NumPy is not installed")
+
+    with temp_db_path() as path:
+        print(f"writing {args.rows} sales ...")
+        conn = write_ledger(path, *columns)
+        paths = [False, True] if pricing.have_numpy() else [False]
+        for use_numpy in paths:
+            result = pricing.audit(conn, 'sales', use_numpy=use_numpy)
+            label = "audit, NumPy" if use_numpy else "audit, arrays"
+            print(f"{label:<24} {result['seconds']:>8.2f} s {result['rows'] / result['seconds']:>14,.0f} rows/s"
+                  f"  ({result['mismatched']} differ)")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Memory and speed of product_index.ProductIndex vs. lists of sqlite3.Row.
+
+Loads --products products three ways and reports the memory each holds
+(traced with tracemalloc, in a separate pass from the timing) and how long
+it takes to load:
+
+    rows, hot fields    fetchall() of the nine fields the index keeps
+    rows, full product  fetchall() of PRODUCT_QUERY, what CatalogCache held before
+    ProductIndex        one streaming scan into typed columns
+
+then times the index's lookups, a subcategory scan and an incremental
+refresh after --added new products.
+
+    python -m benchmarks.bench_product_index --products 1000000
+"""
+import argparse
+import gc
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from catalog_cache import PRODUCT_QUERY
+from database import Database
+from product_index import ProductIndex, INDEX_QUERY
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+
+def rows_hot(conn):
+    return conn.execute(INDEX_QUERY, (0,)).fetchall()
+
+
+def rows_full(conn):
+    return conn.execute(PRODUCT_QUERY + " ORDER BY p.id").fetchall()
+
+
+def index(conn):
+    product_index = ProductIndex()
+    product_index.load(conn)
+    return product_index
+
+
+def measure(conn, build):
+    """(seconds to build, bytes held afterwards) of build(conn)."""
+    gc.collect()
+    start = time.perf_counter()
+    result = build(conn)
+    seconds = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(conn)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--added', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        Database(path).close()
+        conn = sqlite3.connect(path)
+        print(f"seeding {args.products} products ...")
+        populate(conn, args.products, 50, 10, 0, args.seed)
+
+        print(f"{'':<22} {'load s':>8} {'MB held':>9} {'bytes/product':>14}")
+        for label, build in (("rows, hot fields", rows_hot), ("rows, full product", rows_full),
+                             ("ProductIndex", index)):
+            seconds, held = measure(conn, build)
+            print(f"{label:<22} {seconds:>8.2f} {held / 1e6:>9.1f} {held / args.products:>14.0f}")
+
+        product_index = index(conn)
+        print(f"ProductIndex.nbytes: {product_index.nbytes / 1e6:.1f} MB "
+              f"({product_index.nbytes / len(product_index):.0f} bytes/product)")
+
+        rng = random.Random(args.seed)
+        ids = [rng.randint(1, args.products) for _ in range(args.iterations)]
+        barcodes = [f"890{product_id:010d}" for product_id in ids]
+        skus = [f"SKU-{product_id:07d}" for product_id in ids]
+        groups = conn.execute("SELECT category_id, id FROM subcategories").fetchall()
+        calls = iter(range(10 ** 9))
+
+        def nth(values):
+            return values[next(calls) % len(values)]
+
+        print_summary("get by id", time_calls(lambda: product_index.get(nth(ids)), args.iterations))
+        print_summary("find by barcode", time_calls(lambda: product_index.find_by_barcode(nth(barcodes)),
+                                                    args.iterations))
+        print_summary("find by SKU", time_calls(lambda: product_index.find_by_sku(nth(skus)), args.iterations))
+        print_summary("scan subcategory (records)", time_calls(lambda: product_index.scan(*nth(groups)), 500))
+        print_summary("count category", time_calls(lambda: product_index.count_in(nth(groups)[0]), 2000))
+
+        category_id, subcategory_id = groups[0]
+        conn.executemany(
+            "INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id, price, tax_rate) "
+            "VALUES (?, ?, ?, ?, ?, 10.0, 5.0)",
+            [(f"891{i:010d}", f"NEW-{i:07d}", f"New Product {i}", category_id, subcategory_id)
+             for i in range(args.added)])
+        conn.commit()
+        start = time.perf_counter()
+        added = product_index.load(conn)
+        print(f"refresh: {added} new products in {(time.perf_counter() - start) * 1000:.1f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Memory and time to show the product list: eager full load versus keyset pages.
+
+The eager path is what ProductMasterForm.load_products used to do: fetch every
+product and build ten cell items per row. The paged path is what
+ProductTableModel does: fetch the first page, then one more page per scroll.
+With PySide6 installed the real QTableWidgetItem and model are measured too.
+
+    python -m benchmarks.bench_product_table --sizes 100000,1000000
+"""
+import argparse
+import gc
+import sqlite3
+import time
+import tracemalloc
+
+from database import Database
+from migrations import migrate
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path
+
+try:
+    from PySide6.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+    from product_table_model import ProductTableModel
+except ImportError:
+    QApplication = None
+
+
+def cells(product):
+    return [product['barcode'] or "", product['sku_id'] or "", product['name'],
+            product['category_name'], product['subcategory_name'], product['default_unit'] or "",
+            product['description'], f"₹{product['price']:.2f}", f"{product['tax_rate']}%",
+            product['image_path'] or ""]
+
+
+def eager_rows(db):
+    return [cells(product) for product in db.get_all_products()]
+
+
+def eager_widget(db):
+    products = db.get_all_products()
+    table = QTableWidget(len(products), 10)
+    for row, product in enumerate(products):
+        for column, text in enumerate(cells(product)):
+            table.setItem(row, column, QTableWidgetItem(text))
+    return table
+
+
+def paged_rows(db, pages, page_size):
+    rows, after = [], None
+    for _ in range(pages):
+        page = db.get_products_page(after, page_size)
+        if not page:
+            break
+        rows.extend(page)
+        after = (page[-1]['name'], page[-1]['id'])
+    return rows
+
+
+def paged_model(db, pages, page_size):
+    model = ProductTableModel(db, page_size)
+    for _ in range(pages):
+        if model.canFetchMore():
+            model.fetchMore()
+    return model
+
+
+def measure(label, func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"    {label:<34} {elapsed * 1000:10.1f} ms  peak {peak / 2**20:8.1f} MiB  held {current / 2**20:8.1f} MiB")
+    del result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default="100000,1000000")
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=5, help="pages fetched for the paged path (initial view plus scrolling)")
+    args = parser.parse_args()
+
+    app = None
+    if QApplication is not None:
+        app = QApplication.instance() or QApplication([])
+    for size in (int(value) for value in args.sizes.split(',')):
+        with temp_db_path() as path:
+            conn = sqlite3.connect(path)
+            migrate(conn)
+            populate(conn, size, 50, 10, 0, seed=42)
+            conn.close()
+            db = Database(path)
+            print(f"\n{size} products")
+            measure("eager: fetch all + 10 cells/row", lambda: eager_rows(db))
+            measure(f"paged: {args.pages} x {args.page_size} rows", lambda: paged_rows(db, args.pages, args.page_size))
+            if app is not None:
+                measure("QTableWidget fully populated", lambda: eager_widget(db))
+                measure("ProductTableModel, same pages", lambda: paged_model(db, args.pages, args.page_size))
+            db.close()
+    if app is None:
+        print("\nPySide6 not installed: measured the data layer only.")
+
+
+if __name__ == '__main__':
+    main()
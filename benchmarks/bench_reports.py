@@ -0,0 +1,143 @@
+"""Report latency from the rollup tables versus aggregating the sales ledger.
+
+Fills the ledgers before the rollup migration, times the backfill, then runs
+each report over a calendar month, a 45-day range with partial months at both
+ends, a quarter and a year. The per-row cost of the rollup triggers is
+measured by inserting a batch of sales before and after the migration.
+
+    python -m benchmarks.bench_reports --sales 10000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from database import Database
+from migrations import MIGRATIONS, _rollups, migrate
+from reports import Reports
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+FIRST_DAY = date(2024, 1, 1)
+
+RANGES = {
+    'month': ('2025-03-01', '2025-03-31'),
+    '45 days': ('2025-03-10', '2025-04-23'),
+    'quarter': ('2025-04-01', '2025-06-30'),
+    'year': ('2024-07-01', '2025-06-30'),
+}
+
+# The month reports answered straight from the ledger, for comparison
+LEDGER_QUERIES = {
+    'sales_by_day': '''
+        SELECT date(created_at) AS day, SUM(quantity), SUM(tax_amount), SUM(total_amount)
+        FROM sales WHERE created_at >= ? AND created_at < ?
+        GROUP BY day
+    ''',
+    'sales_by_category': '''
+        SELECT p.category_id, SUM(s.quantity), SUM(s.tax_amount), SUM(s.total_amount)
+        FROM sales s JOIN products p ON p.id = s.product_id
+        WHERE s.created_at >= ? AND s.created_at < ?
+        GROUP BY p.category_id
+    ''',
+    'top_products': '''
+        SELECT product_id, SUM(total_amount) AS total FROM sales
+        WHERE created_at >= ? AND created_at < ?
+        GROUP BY product_id ORDER BY total DESC LIMIT 10
+    ''',
+}
+
+
+def ledger_rows(rng, count, party_count, products, days):
+    for _ in range(count):
+        at = FIRST_DAY + timedelta(days=rng.randrange(days))
+        quantity = rng.randint(1, 5)
+        yield (rng.randint(1, products), rng.randint(1, party_count), 1, quantity, 100.0, 18.0,
+               18.0 * quantity, 118.0 * quantity,
+               f"{at.isoformat()} {rng.randint(8, 20):02d}:{rng.randint(0, 59):02d}:00")
+
+
+def insert_sales(conn, rows):
+    conn.executemany('''
+        INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate,
+                           tax_amount, total_amount, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def timed_insert(conn, rows):
+    rows = list(rows)
+    start = time.perf_counter()
+    insert_sales(conn, rows)
+    return (time.perf_counter() - start) / len(rows) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=10_000_000)
+    parser.add_argument('--purchases', type=int, default=1_000_000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=730, help="days of history from 2024-01-01")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with temp_db_path() as path:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Stop just before the rollups, so the backfill below is timed on its own
+        migrate(conn, target=next(version for version, _, step in MIGRATIONS if step is _rollups) - 1)
+        populate(conn, args.products, 50, 10, 0, args.seed)
+        conn.executemany("INSERT INTO suppliers (name) VALUES (?)",
+                         ((f"Supplier {i}",) for i in range(2, args.suppliers + 1)))
+        start = time.perf_counter()
+        insert_sales(conn, ledger_rows(rng, args.sales, 1, args.products, args.days))
+        conn.executemany('''
+            INSERT INTO goods_receiving (product_id, supplier_id, user_id, quantity, rate, tax_rate,
+                                         tax_amount, total_amount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ledger_rows(rng, args.purchases, args.suppliers, args.products, args.days))
+        conn.commit()
+        print(f"inserted {args.sales} sales and {args.purchases} receipts in {time.perf_counter() - start:.1f}s")
+
+        batch = 20000
+        before = timed_insert(conn, ledger_rows(rng, batch, 1, args.products, args.days))
+        start = time.perf_counter()
+        migrate(conn)
+        print(f"rollup migration (backfill) took {time.perf_counter() - start:.1f}s")
+        after = timed_insert(conn, ledger_rows(rng, batch, 1, args.products, args.days))
+        print(f"sales insert cost: {before:.1f}us/row without rollup triggers, {after:.1f}us/row with them")
+        for table in ('sales_daily', 'sales_monthly', 'purchases_daily', 'purchases_monthly'):
+            print(f"    {table:<20} {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:>10} rows")
+
+        print("\nledger aggregation over the month")
+        start_day, end_day = RANGES['month']
+        end_exclusive = (date.fromisoformat(end_day) + timedelta(days=1)).isoformat()
+        for name, query in LEDGER_QUERIES.items():
+            print_summary(f"    {name}", time_calls(
+                lambda: conn.execute(query, (start_day, end_exclusive)).fetchall(), 3))
+        conn.close()
+
+        db = Database(path)
+        reports = Reports(db)
+        calls = {
+            'sales_by_day': lambda a, b: reports.sales_by_day(a, b),
+            'sales_by_month': lambda a, b: reports.sales_by_month(a, b),
+            'sales_by_category': lambda a, b: reports.sales_by_category(a, b),
+            'top_products': lambda a, b: reports.top_products(a, b),
+            'purchases_by_supplier': lambda a, b: reports.purchases_by_supplier(a, b),
+            'tax_by_period (month)': lambda a, b: reports.tax_by_period(a, b),
+        }
+        for label, (first, last) in RANGES.items():
+            print(f"\nrollup reports over {label} ({first} .. {last})")
+            for name, call in calls.items():
+                print_summary(f"    {name}", time_calls(lambda: call(first, last), args.iterations))
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Scan-to-filled latency for barcode/SKU lookups on a large catalog.
+
+Measures the work a scan does before the form is filled: the code lookup
+plus reading product, unit, rate and tax from the row. Reports the cached
+path used by the forms and the indexed database path behind it.
+
+    python -m benchmarks.bench_scan --products 1000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from database import Database
+from migrations import migrate
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+
+def fill(product):
+    # What the form reads from the product once the lookup returns
+    return (product['id'], product['name'], product['default_unit'], product['price'], product['tax_rate'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        conn = sqlite3.connect(path)
+        migrate(conn)
+        populate(conn, args.products, 50, 10, 0, args.seed)
+        conn.close()
+
+        db = Database(path)
+        start = time.perf_counter()
+        db.catalog.preload()
+        print(f"catalog cache loaded {args.products} products in {time.perf_counter() - start:.1f}s")
+
+        rng = random.Random(args.seed)
+
+        def barcode():
+            return f"890{rng.randint(1, args.products):010d}"
+
+        def sku():
+            return f"SKU-{rng.randint(1, args.products):07d}"
+
+        print_summary('cache: barcode scan', time_calls(lambda: fill(db.catalog.find_product_by_code(barcode())), args.iterations))
+        print_summary('cache: SKU scan', time_calls(lambda: fill(db.catalog.find_product_by_code(sku())), args.iterations))
+        print_summary('db index: barcode', time_calls(lambda: fill(db.get_product_by_barcode(barcode())), args.iterations))
+        print_summary('db index: SKU', time_calls(lambda: fill(db.get_product_by_sku(sku())), args.iterations))
+        samples = time_calls(lambda: db.catalog.find_product_by_code('no-such-code'), 1000)
+        print_summary('unknown code (cache miss + 2 queries)', samples)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
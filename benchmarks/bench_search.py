@@ -0,0 +1,62 @@
+"""Search-as-you-type latency of Database.search_products on a large catalog.
+
+Types each query one character at a time, as the debounced search box
+would send it, and times every prefix. The common-word case matches the
+whole catalog and shows the cost of ranking a very broad prefix.
+
+    python -m benchmarks.bench_search --products 1000000
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from database import Database
+from migrations import migrate
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, time_calls, print_summary
+
+
+def prefixes(text, shortest=2):
+    return [text[:n] for n in range(shortest, len(text) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        conn = sqlite3.connect(path)
+        migrate(conn)
+        start = time.perf_counter()
+        populate(conn, args.products, 50, 10, 0, args.seed)
+        print(f"inserted {args.products} products (FTS triggers included) in {time.perf_counter() - start:.1f}s")
+        names = [row[0].split()[1] for row in conn.execute(
+            "SELECT name FROM products ORDER BY random() LIMIT ?", (args.queries,))]
+        conn.close()
+
+        db = Database(path)
+        rng = random.Random(args.seed)
+        cases = {
+            'name prefix (typed)': [p for name in names for p in prefixes(name)],
+            'SKU prefix (typed)': [p for _ in range(args.queries)
+                                   for p in prefixes(f"SKU-{rng.randint(1, args.products):07d}", 5)],
+            'barcode prefix (typed)': [p for _ in range(args.queries)
+                                       for p in prefixes(f"890{rng.randint(1, args.products):010d}", 6)],
+            'two terms': [f"prod {name[:4]}" for name in names],
+        }
+        for label, queries in cases.items():
+            batch = iter(queries)
+            print_summary(label, time_calls(lambda: db.search_products(next(batch), args.limit), len(queries)))
+        broad = ['pr', 'prod', 'synth']
+        batch = iter(broad * 5)
+        print_summary('common word (whole catalog)', time_calls(lambda: db.search_products(next(batch), args.limit), len(broad) * 5))
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Startup time: time to the login window and to the first interactive form.
+
+Each run starts a fresh interpreter on the offscreen Qt platform that
+starts the app the way main.py does, logs in as admin and switches to
+Sales, reporting when each step is done:
+
+    login window   process start -> login window shown and painted
+    first form     Login clicked -> main window up, Product Master filled
+    sales form     Sales clicked -> Sales form built and its combos filled
+
+A form counts as interactive once its combos are filled and no database
+work is left running. The database is seeded with --products products so
+the catalog load is realistic.
+
+    python -m benchmarks.bench_startup --runs 10 --products 100000
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from database import Database
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, percentile
+
+STEPS = ("login window", "first form", "sales form")
+
+
+def seed(path, products):
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    populate(conn, products, 20, 5, 0, seed=1)
+    conn.close()
+
+
+def child(path):
+    """Run in the measured process; prints one "step seconds" line per step."""
+    started = float(os.environ["IMS_BENCH_STARTED"])
+
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    from main import APP_STYLESHEET
+    from login_window import LoginWindow
+
+    app = QApplication([])
+    app.setStyleSheet(APP_STYLESHEET)
+    db = Database(path)
+    login = LoginWindow(db)
+    login.show()
+    marks = {}
+
+    def ready(form):
+        return (form.isVisible() and form.async_db.pool.activeThreadCount() == 0
+                and form.category_combo.count() > 0)
+
+    def step():
+        if "login window" not in marks:
+            marks["login window"] = time.time() - started
+            login.username_input.setText("admin")
+            login.password_input.setText("admin")
+            marks["clicked"] = time.perf_counter()
+            login.login_button.click()
+        elif "first form" not in marks:
+            window = login.main_window
+            form = window.stacked_widget.currentWidget()
+            if ready(form) and form.product_model.rowCount() > 0:
+                marks["first form"] = time.perf_counter() - marks["clicked"]
+                marks["clicked"] = time.perf_counter()
+                window.sales_btn.click()
+        elif ready(login.main_window.stacked_widget.currentWidget()):
+            marks["sales form"] = time.perf_counter() - marks["clicked"]
+            for name in STEPS:
+                print(name, marks[name], flush=True)
+            app.quit()
+            return
+        QTimer.singleShot(1, step)
+
+    # Queued behind the login window's first paint
+    QTimer.singleShot(0, step)
+    app.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    with temp_db_path() as path:
+        print(f"seeding {args.products} products ...")
+        seed(path, args.products)
+        samples = {name: [] for name in STEPS}
+        for _ in range(args.runs):
+            env = dict(os.environ, IMS_BENCH_STARTED=repr(time.time()))
+            output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", path],
+                                    env=env, capture_output=True, text=True, timeout=120).stdout
+            for line in output.splitlines():
+                name, _, seconds = line.rpartition(" ")
+                if name in samples:
+                    samples[name].append(float(seconds))
+        for name in STEPS:
+            values = samples[name]
+            if not values:
+                print(f"{name:<14} no samples")
+                continue
+            print(f"{name:<14} n={len(values):<3} min={min(values) * 1000:7.1f}ms "
+                  f"p50={percentile(values, 50) * 1000:7.1f}ms max={max(values) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
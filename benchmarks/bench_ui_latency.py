@@ -0,0 +1,104 @@
+"""UI frame latency while every database call takes an extra 500 ms.
+
+Runs the real SalesForm on the offscreen Qt platform with
+DatabaseConfig.debug_query_delay set. A 16 ms heartbeat timer measures how
+late each tick fires while the category combo is switched over and over.
+In the "sync" mode the same lookups are made directly on the GUI thread,
+the way the forms used to, for comparison.
+
+    python -m benchmarks.bench_ui_latency --delay 0.5 --seconds 10
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+from database import Database, DatabaseConfig
+from async_database import AsyncDatabase
+from sales_form import SalesForm
+from benchmarks.common import temp_db_path, print_summary
+
+TICK_MS = 16
+
+
+def seed(db, categories):
+    for c in range(categories):
+        category_id = db.add_category(f"Category {c}")
+        subcategory_id = db.add_subcategory(category_id, f"Subcategory {c}")
+        db.add_product({
+            'barcode': f"{c:012d}", 'sku_id': f"S{c}", 'name': f"Product {c}",
+            'category_id': category_id, 'subcategory_id': subcategory_id,
+            'description': 'latency', 'price': 10.0, 'tax_rate': 5.0,
+        })
+    db.add_customer({'name': 'Walk-in', 'phone': '', 'email': ''})
+
+
+def run(app, path, mode, args):
+    config = DatabaseConfig(debug_query_delay=args.delay)
+    db = Database(path, config)
+    async_db = AsyncDatabase(db)
+    form = SalesForm(1, db, async_db)
+    form.show()
+
+    lateness = []
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - last[0] - TICK_MS / 1000))
+        last[0] = now
+
+    step = [0]
+
+    def interact():
+        step[0] += 1
+        index = 1 + step[0] % (form.category_combo.count() - 1) if form.category_combo.count() > 1 else 0
+        if mode == 'async':
+            form.category_combo.setCurrentIndex(index)
+        else:
+            # What the slots did before: block the GUI thread on the database
+            category_id = form.category_combo.itemData(index)
+            db.get_subcategories_by_category(category_id)
+            db.get_all_customers()
+
+    ticker = QTimer()
+    ticker.timeout.connect(heartbeat)
+    ticker.start(TICK_MS)
+    driver = QTimer()
+    driver.timeout.connect(interact)
+    driver.start(args.interval_ms)
+    QTimer.singleShot(int(args.seconds * 1000), app.quit)
+    app.exec()
+
+    ticker.stop()
+    driver.stop()
+    async_db.wait()
+    form.close()
+    db.close()
+    print_summary(f"{mode}: heartbeat lateness", lateness)
+    print(f"    worst stall {max(lateness) * 1000:.0f} ms, ticks over 16 ms late: "
+          f"{sum(1 for value in lateness if value > TICK_MS / 1000)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--delay', type=float, default=0.5, help="seconds added to every database call")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--interval-ms', type=int, default=300, help="time between combo changes")
+    parser.add_argument('--categories', type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    with temp_db_path() as path:
+        with Database(path) as db:
+            seed(db, args.categories)
+        for mode in ('sync', 'async'):
+            run(app, path, mode, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Sales/sec, commits/sec and latency of WriteQueue group commit vs. Database.add_sale.
+
+Each of --threads threads records sales for --seconds, standing in for a
+terminal (or an api_server.py request thread). "direct" is today's path,
+where each add_sale is a transaction on the thread's own connection;
+"queue" hands the same sales to one WriteQueue and waits for the Future.
+
+    python -m benchmarks.bench_write_queue --threads 1,16 --seconds 5
+    python -m benchmarks.bench_write_queue --synchronous FULL --max-delay-ms 0,2,5
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from database import Database, DatabaseConfig
+from write_queue import WriteQueue
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, summarize
+
+PRODUCTS = 1000
+
+
+def seed(path):
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    populate(conn, PRODUCTS, 10, 5, 0, seed=1)
+    conn.execute("INSERT INTO stock_levels (product_id, quantity) SELECT id, 1000000000 FROM products")
+    conn.commit()
+    conn.close()
+
+
+def sale(i):
+    return {'product_id': 1 + i % PRODUCTS, 'customer_id': 1, 'user_id': 1, 'quantity': 1,
+            'rate': 100.0, 'tax_rate': 18.0, 'tax_amount': 18.0, 'total_amount': 118.0}
+
+
+def run(record, threads, seconds):
+    """Call record(sale) from threads threads for seconds; returns (sales, errors, latencies, elapsed)."""
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    def terminal(offset):
+        samples, failures, i = [], 0, offset
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                record(sale(i))
+            except Exception:
+                failures += 1
+            samples.append(time.perf_counter() - began)
+            i += threads
+        latencies.extend(samples)
+        errors.append(failures)
+
+    workers = [threading.Thread(target=terminal, args=(offset,)) for offset in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(latencies), sum(errors), latencies, time.perf_counter() - start
+
+
+def report(label, sales, commits, errors, latencies, elapsed):
+    stats = summarize(latencies)
+    print(f"{label:<28} {sales / elapsed:9.0f} sales/s {commits / elapsed:9.0f} commits/s  "
+          f"p50={stats['p50_us'] / 1000:7.2f}ms p99={stats['p99_us'] / 1000:7.2f}ms errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', default="1,16", help="comma separated thread counts (default: 1,16)")
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--synchronous', default="NORMAL", help="PRAGMA synchronous, e.g. NORMAL or FULL")
+    parser.add_argument('--max-batch', type=int, default=100)
+    parser.add_argument('--max-delay-ms', default="0,2",
+                        help="comma separated WriteQueue max_delay values in ms (default: 0,2)")
+    args = parser.parse_args()
+    config = DatabaseConfig(synchronous=args.synchronous)
+
+    for threads in (int(count) for count in args.threads.split(",")):
+        print(f"{threads} threads, synchronous={args.synchronous}, {args.seconds:g}s per run")
+        with temp_db_path() as path:
+            seed(path)
+            db = Database(path, config)
+            sales, errors, latencies, elapsed = run(db.add_sale, threads, args.seconds)
+            report("  direct add_sale", sales, sales - errors, errors, latencies, elapsed)
+            db.close()
+
+        for delay in (float(ms) for ms in args.max_delay_ms.split(",")):
+            with temp_db_path() as path:
+                seed(path)
+                db = Database(path, config)
+                queue = WriteQueue(db, args.max_batch, delay / 1000)
+                sales, errors, latencies, elapsed = run(lambda data: queue.add_sale(data).result(),
+                                                        threads, args.seconds)
+                queue.close()
+                report(f"  queue, max delay {delay:g}ms", sales, queue.commits, errors, latencies, elapsed)
+                db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def temp_db_path(name="bench.db"):
+    directory = tempfile.mkdtemp(prefix="ims-bench-")
+    try:
+        yield os.path.join(directory, name)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def time_calls(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'count': len(samples),
+        'mean_us': statistics.fmean(samples) * 1e6 if samples else 0.0,
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p95_us': percentile(samples, 95) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+    }
+
+
+def print_summary(label, samples):
+    stats = summarize(samples)
+    print(f"{label:<40} n={stats['count']:<7} mean={stats['mean_us']:9.1f}us "
+          f"p50={stats['p50_us']:9.1f}us p95={stats['p95_us']:9.1f}us p99={stats['p99_us']:9.1f}us")
+    return stats
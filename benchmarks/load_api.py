@@ -0,0 +1,122 @@
+"""Load test for api_server.py: requests/sec and latency percentiles.
+
+Starts a local api_server.py process on a seeded temporary database and
+keeps --connections keep-alive connections busy for --seconds, each
+sending a mix of scans (find_product), stock lookups and sales. With
+--batch above 1 every request is a /batch of that many calls, which
+shows what batching saves per call.
+
+    python -m benchmarks.load_api --connections 16 --seconds 10 --batch 1,10
+    python -m benchmarks.load_api --write-ratio 0.5 --no-group-commit
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+
+from database import Database
+from benchmarks.bench_indexes import populate
+from benchmarks.common import temp_db_path, summarize
+
+
+def seed(path, products):
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    populate(conn, products, 20, 5, 0, seed=1)
+    # Plenty of stock, so sales never fail for want of it
+    conn.execute("INSERT INTO stock_levels (product_id, quantity) SELECT id, 1000000 FROM products")
+    conn.commit()
+    conn.close()
+
+
+def make_call(rng, args):
+    product_id = rng.randint(1, args.products)
+    roll = rng.random()
+    if roll < args.write_ratio:
+        return {'method': 'record_sale', 'params': [{'product_id': product_id, 'customer_id': 1,
+                                                     'user_id': 1, 'quantity': 1}]}
+    if roll < args.write_ratio + (1 - args.write_ratio) / 2:
+        return {'method': 'find_product', 'params': [f"890{product_id:010d}"]}
+    return {'method': 'stock', 'params': [product_id]}
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, args, batch, deadline, seed_value, stats):
+    rng = random.Random(seed_value)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            calls = [make_call(rng, args) for _ in range(batch)]
+            path, payload = ("/call", calls[0]) if batch == 1 else ("/batch", calls)
+            body = json.dumps(payload).encode()
+            start = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            status, result = await read_response(reader)
+            stats['latencies'].append(time.perf_counter() - start)
+            results = result if isinstance(result, list) else [result]
+            stats['calls'] += len(results)
+            stats['errors'] += (status != 200) + sum('error' in item for item in results)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, args, batch):
+    stats = {'latencies': [], 'calls': 0, 'errors': 0}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(client(host, port, args, batch, deadline, i, stats)
+                           for i in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    summary = summarize(stats['latencies'])
+    print(f"batch={batch:<3} connections={args.connections:<3} requests={summary['count']:<7} "
+          f"{summary['count'] / elapsed:8.0f} req/s {stats['calls'] / elapsed:8.0f} calls/s  "
+          f"p50={summary['p50_us'] / 1000:7.2f}ms p99={summary['p99_us'] / 1000:7.2f}ms errors={stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch', default="1,10", help="calls per request, comma separated runs (default: 1,10)")
+    parser.add_argument('--write-ratio', type=float, default=0.2, help="share of calls that are sales (default: 0.2)")
+    parser.add_argument('--no-group-commit', action='store_true', help="start the server with --no-group-commit")
+    args = parser.parse_args()
+
+    with temp_db_path() as path:
+        print(f"seeding {args.products} products ...")
+        seed(path, args.products)
+        command = [sys.executable, "api_server.py", "--db", path, "--port", "0"]
+        if args.no_group_commit:
+            command.append("--no-group-commit")
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        try:
+            url = server.stdout.readline().split()[-1]
+            host, port = url.rsplit("/", 1)[-1].split(":")
+            print(f"server at {url}, {args.write_ratio:.0%} sales, {args.seconds:g}s per run")
+            for batch in (int(size) for size in args.batch.split(",")):
+                asyncio.run(run_load(host, int(port), args, batch))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Latency of every public Database method on generated data, saved as JSON.
+
+Builds a temporary database with sample_data.py at --scale (the same
+seed and end date every time, so runs are comparable), then calls each
+method repeatedly for up to --budget seconds and reports p50/p95/p99.
+Reads run first, then writes, then the maintenance methods. A method
+with no case here is reported as not covered, so the suite keeps up as
+Database grows.
+
+    python -m benchmarks.run_benchmarks --scale medium --output before.json
+    python -m benchmarks.run_benchmarks --scale medium --output after.json --compare before.json
+
+With --compare, any method whose p50 got more than --threshold percent
+slower than in the baseline is listed and the exit status is 1.
+"""
+import argparse
+import inspect
+import json
+import platform
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+
+from database import Database
+from pricing import price_line
+from sample_data import SampleDataGenerator, SCALES, ean13
+from benchmarks.common import temp_db_path, summarize
+
+END_DATE = date(2026, 1, 1)
+
+# Not benchmarked, and why
+SKIPPED = {
+    'close': "drops the thread's connection; its cost shows up in connect",
+}
+
+
+class Context:
+    """What the cases draw their arguments from: the database and counters for unique names."""
+
+    def __init__(self, db, seed):
+        self.db = db
+        self.rng = random.Random(seed)
+        self.counter = 0
+        count = lambda table: db.execute_query(f"SELECT COUNT(*) FROM {table}")[0][0]
+        self.products = count("products")
+        self.categories = [row['id'] for row in db.get_all_categories()]
+        self.subcategories = [(row['category_id'], row['id'])
+                              for row in db.execute_query("SELECT id, category_id FROM subcategories")]
+        self.suppliers = count("suppliers")
+        self.customers = count("customers")
+        self.names = [row[0] for row in db.execute_query("SELECT name FROM products ORDER BY random() LIMIT 200")]
+        self.last_key = db.execute_query("SELECT name, id FROM products ORDER BY name, id")[self.products // 2]
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def product_id(self):
+        return self.rng.randint(1, self.products)
+
+    def product(self):
+        return self.db.get_product_by_id(self.product_id())
+
+    def line(self, quantity=1):
+        product = self.product()
+        line = {'product_id': product['id'], 'quantity': quantity, 'rate': product['price'],
+                'tax_rate': product['tax_rate']}
+        line.update(price_line(quantity, product['price'], product['tax_rate']))
+        return line
+
+
+def _new_product(ctx):
+    n = ctx.unique()
+    category_id, subcategory_id = ctx.rng.choice(ctx.subcategories)
+    return {'barcode': ean13(f"891{n:09d}"), 'sku_id': f"BENCH-{n:07d}", 'name': f"Bench Product {n}",
+            'category_id': category_id, 'subcategory_id': subcategory_id, 'description': "",
+            'price': 99.5, 'tax_rate': 18.0, 'default_unit': "pcs"}
+
+
+def _search(ctx):
+    words = ctx.rng.choice(ctx.names).split()
+    return ctx.db.search_products(" ".join(words[:2]))
+
+
+# (method, group, case): case(ctx) is called once per iteration
+CASES = [
+    ('connect', 'read', lambda ctx: ctx.db.connect()),
+    ('create_tables', 'read', lambda ctx: ctx.db.create_tables()),
+    ('validate_user', 'read', lambda ctx: ctx.db.validate_user("admin", "admin")),
+    ('execute_query', 'read', lambda ctx: ctx.db.execute_query(
+        "SELECT * FROM products WHERE id = ?", (ctx.product_id(),))),
+    ('stream_query', 'read', lambda ctx: sum(1 for _ in ctx.db.stream_query(
+        "SELECT id, name, price FROM products LIMIT 10000"))),
+    ('run_in_transaction', 'read', lambda ctx: ctx.db.run_in_transaction(
+        lambda cursor: cursor.execute("SELECT price FROM products WHERE id = ?", (ctx.product_id(),)).fetchone())),
+    ('catalog', 'read', lambda ctx: ctx.db.catalog.find_product_by_code(ean13(f"890{ctx.product_id():09d}"))),
+    ('get_all_categories', 'read', lambda ctx: ctx.db.get_all_categories()),
+    ('get_subcategories_by_category', 'read', lambda ctx: ctx.db.get_subcategories_by_category(
+        ctx.rng.choice(ctx.categories))),
+    ('get_all_products', 'read', lambda ctx: ctx.db.get_all_products()),
+    ('get_products_page', 'read', lambda ctx: ctx.db.get_products_page(
+        ctx.last_key if ctx.rng.random() < 0.5 else None)),
+    ('get_products_by_category_subcategory', 'read', lambda ctx: ctx.db.get_products_by_category_subcategory(
+        *ctx.rng.choice(ctx.subcategories))),
+    ('get_product_by_id', 'read', lambda ctx: ctx.db.get_product_by_id(ctx.product_id())),
+    ('get_product_by_barcode', 'read', lambda ctx: ctx.db.get_product_by_barcode(
+        ean13(f"890{ctx.product_id():09d}"))),
+    ('get_product_by_sku', 'read', lambda ctx: ctx.db.get_product_by_sku(
+        ctx.db.get_product_by_id(ctx.product_id())['sku_id'])),
+    ('search_products', 'read', _search),
+    ('get_all_suppliers', 'read', lambda ctx: ctx.db.get_all_suppliers()),
+    ('get_supplier_by_id', 'read', lambda ctx: ctx.db.get_supplier_by_id(ctx.rng.randint(1, ctx.suppliers))),
+    ('get_all_customers', 'read', lambda ctx: ctx.db.get_all_customers()),
+    ('get_customer_by_id', 'read', lambda ctx: ctx.db.get_customer_by_id(ctx.rng.randint(1, ctx.customers))),
+    ('get_stock', 'read', lambda ctx: ctx.db.get_stock(ctx.product_id())),
+
+    ('add_category', 'write', lambda ctx: ctx.db.add_category(f"Bench Category {ctx.unique()}")),
+    ('add_subcategory', 'write', lambda ctx: ctx.db.add_subcategory(
+        ctx.rng.choice(ctx.categories), f"Bench Subcategory {ctx.unique()}")),
+    ('add_product', 'write', lambda ctx: ctx.db.add_product(_new_product(ctx))),
+    ('set_product_image', 'write', lambda ctx: ctx.db.set_product_image(ctx.product_id(), None)),
+    ('add_supplier', 'write', lambda ctx: ctx.db.add_supplier(
+        {'name': f"Bench Supplier {ctx.unique()}", 'phone': "", 'email': ""})),
+    ('add_customer', 'write', lambda ctx: ctx.db.add_customer(
+        {'name': f"Bench Customer {ctx.unique()}", 'phone': "", 'email': ""})),
+    ('execute_insert', 'write', lambda ctx: ctx.db.execute_insert(
+        "INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)", (f"Bench Customer {ctx.unique()}", "", ""))),
+    # Receipts first, so the sales after them never run out of stock
+    ('add_goods_receiving', 'write', lambda ctx: ctx.db.add_goods_receiving(
+        dict(ctx.line(100), supplier_id=1, user_id=1))),
+    ('add_goods_receiving_bulk', 'write', lambda ctx: ctx.db.add_goods_receiving_bulk(
+        {'supplier_id': 1, 'user_id': 1, 'reference': f"BENCH-{ctx.unique()}"},
+        [ctx.line(100) for _ in range(10)])),
+    ('add_sale', 'write', lambda ctx: ctx.db.add_sale(dict(ctx.line(), customer_id=1, user_id=1))),
+    ('add_invoice', 'write', lambda ctx: ctx.db.add_invoice(
+        {'customer_id': 1, 'user_id': 1}, [ctx.line() for _ in range(5)])),
+
+    ('verify_stock_levels', 'maintenance', lambda ctx: ctx.db.verify_stock_levels()),
+    ('rebuild_stock_levels', 'maintenance', lambda ctx: ctx.db.rebuild_stock_levels()),
+]
+
+
+def public_methods():
+    return sorted(name for name, _ in inspect.getmembers(Database)
+                  if not name.startswith("_") and name not in ("from_env",))
+
+
+def measure(func, budget, max_iterations, min_iterations=3):
+    """Time func() until budget seconds have passed or max_iterations calls, after one warm-up call."""
+    func()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_iterations and (len(samples) < min_iterations or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def compare(results, baseline_path, threshold):
+    """Print p50/p99 changes against a saved run; returns the methods whose p50 regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f"\nagainst {baseline_path} (regression: p50 more than {threshold:g}% slower)")
+    print(f"{'method':<38} {'p50 before':>12} {'p50 after':>12} {'change':>8} {'p99 change':>11}")
+    regressed = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before or not before['p50_us']:
+            print(f"{name:<38} {'-':>12} {stats['p50_us']:10.1f}us {'new':>8}")
+            continue
+        change = (stats['p50_us'] / before['p50_us'] - 1) * 100
+        p99_change = (stats['p99_us'] / before['p99_us'] - 1) * 100 if before['p99_us'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<38} {before['p50_us']:10.1f}us {stats['p50_us']:10.1f}us "
+              f"{change:+7.1f}% {p99_change:+10.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help="sample_data.py preset (default: small)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=1.0, help="seconds per method (default: 1)")
+    parser.add_argument('--max-iterations', type=int, default=2000)
+    parser.add_argument('--only', help="comma separated methods to run")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="a JSON file from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help="percent p50 slowdown that counts as a regression (default: 20)")
+    args = parser.parse_args()
+
+    covered = {name for name, _, _ in CASES}
+    missing = [name for name in public_methods() if name not in covered and name not in SKIPPED]
+    if missing:
+        print(f"warning: no benchmark for {', '.join(missing)}")
+    cases = CASES
+    if args.only:
+        wanted = set(args.only.split(","))
+        cases = [case for case in CASES if case[0] in wanted]
+
+    with temp_db_path() as path:
+        print(f"generating the {args.scale} sample database ...")
+        start = time.perf_counter()
+        counts = SampleDataGenerator.for_scale(path, args.scale, seed=args.seed, end_date=END_DATE).generate()
+        print(f"  {sum(counts.values())} rows in {time.perf_counter() - start:.1f}s")
+        db = Database(path)
+        ctx = Context(db, args.seed)
+        results = {}
+        for name, group, case in cases:
+            stats = summarize(measure(lambda: case(ctx), args.budget, args.max_iterations))
+            stats['group'] = group
+            results[name] = stats
+            print(f"{name:<38} {group:<11} n={stats['count']:<5} p50={stats['p50_us']:10.1f}us "
+                  f"p95={stats['p95_us']:10.1f}us p99={stats['p99_us']:10.1f}us")
+        db.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                'meta': {
+                    'scale': args.scale,
+                    'seed': args.seed,
+                    'rows': counts,
+                    'budget_seconds': args.budget,
+                    'python': platform.python_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(),
+                    'timestamp': datetime.now().isoformat(timespec="seconds"),
+                },
+                'results': results,
+                'skipped': SKIPPED,
+            }, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        if regressed:
+            print(f"{len(regressed)} regressed: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
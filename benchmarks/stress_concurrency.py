@@ -0,0 +1,105 @@
+"""Concurrency stress test: N writer and M reader processes against one database.
+
+Writers record sales through Database.add_sale while readers reload the product
+lists, mirroring several terminals sharing inventory.db. Every worker counts
+completed operations and "database is locked" failures.
+
+    python -m benchmarks.stress_concurrency --writers 4 --readers 4 --seconds 10
+    python -m benchmarks.stress_concurrency --journal-modes DELETE,WAL
+"""
+import argparse
+import multiprocessing
+import time
+
+from database import Database, DatabaseConfig
+from benchmarks.common import temp_db_path
+
+
+def make_config(args, journal_mode):
+    return DatabaseConfig(journal_mode=journal_mode, busy_timeout=args.busy_timeout,
+                          max_retries=args.max_retries)
+
+
+def seed(path, config, products):
+    db = Database(path, config)
+    category_id = db.add_category('Stress')
+    subcategory_id = db.add_subcategory(category_id, 'Stress')
+    for i in range(products):
+        db.add_product({
+            'barcode': f"{i:012d}", 'sku_id': f"S{i}", 'name': f"Product {i}",
+            'category_id': category_id, 'subcategory_id': subcategory_id,
+            'description': 'stress', 'price': 10.0, 'tax_rate': 5.0,
+        })
+    customer_id = db.add_customer({'name': 'Walk-in', 'phone': '', 'email': ''})
+    db.close()
+    return category_id, subcategory_id, customer_id
+
+
+def worker(role, path, config, ids, deadline, results):
+    db = Database(path, config)
+    category_id, subcategory_id, customer_id = ids
+    ops = errors = lock_errors = 0
+    while time.time() < deadline:
+        try:
+            if role == 'writer':
+                db.add_sale({
+                    'product_id': 1 + ops % 50, 'customer_id': customer_id, 'user_id': 1,
+                    'quantity': 1, 'rate': 10.0, 'tax_rate': 5.0,
+                    'tax_amount': 0.5, 'total_amount': 10.5,
+                })
+            else:
+                db.get_all_products()
+                db.get_products_by_category_subcategory(category_id, subcategory_id)
+            ops += 1
+        except Exception as e:
+            errors += 1
+            if 'locked' in str(e) or 'busy' in str(e):
+                lock_errors += 1
+    db.close()
+    results.put((role, ops, errors, lock_errors))
+
+
+def run(args, journal_mode):
+    with temp_db_path() as path:
+        config = make_config(args, journal_mode)
+        ids = seed(path, config, args.products)
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        roles = ['writer'] * args.writers + ['reader'] * args.readers
+        processes = [multiprocessing.Process(target=worker, args=(role, path, config, ids, deadline, results))
+                     for role in roles]
+        for process in processes:
+            process.start()
+        totals = {'writer': [0, 0, 0], 'reader': [0, 0, 0]}
+        for _ in processes:
+            role, ops, errors, lock_errors = results.get()
+            totals[role][0] += ops
+            totals[role][1] += errors
+            totals[role][2] += lock_errors
+        for process in processes:
+            process.join()
+
+    print(f"\njournal_mode={journal_mode} writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    for role, (ops, errors, lock_errors) in totals.items():
+        attempts = ops + errors
+        rate = 100.0 * lock_errors / attempts if attempts else 0.0
+        print(f"    {role + 's':<8} {ops / args.seconds:10.1f} ops/s  errors={errors:<6} "
+              f"lock errors={lock_errors:<6} ({rate:.2f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--journal-modes', default='WAL', help="comma separated, e.g. DELETE,WAL")
+    parser.add_argument('--busy-timeout', type=float, default=5.0)
+    parser.add_argument('--max-retries', type=int, default=5)
+    args = parser.parse_args()
+    for journal_mode in args.journal_modes.split(','):
+        run(args, journal_mode.strip().upper())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""In-memory copy of categories, subcategories and products for the combo cascades.
+
+The cache loads the catalog once and then answers the Category -> Subcategory
+-> Product lookups from memory: categories from dicts, products from a
+compact product_index.ProductIndex of their hot fields, so a catalog of a
+million products takes about a hundred megabytes rather than a gigabyte of
+sqlite3.Row objects. Writes made through Database invalidate it
+directly. Writes from other terminals are noticed through PRAGMA data_version,
+which is checked at most once every check_interval seconds. Products are
+only ever inserted by the app, so a refresh reloads the (small) category
+tables and fetches just the products added since the last load.
+
+Products are only loaded by the first get_products (or preload), which is
+the cascade that switches between them over and over. Categories are
+served without them, so a form can show its first combo straight away;
+until then single products are looked up through their indexes instead.
+"""
+import sqlite3
+import threading
+import time
+
+from label_payload import product_id_from_payload
+from product_index import ProductIndex
+
+PRODUCT_QUERY = '''
+    SELECT p.*, c.name as category_name, s.name as subcategory_name
+    FROM products p
+    JOIN categories c ON p.category_id = c.id
+    JOIN subcategories s ON p.subcategory_id = s.id
+'''
+
+
+class CatalogCache:
+    def __init__(self, db, check_interval=1.0):
+        self.db = db
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._conn = None
+        self._data_version = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._reset()
+
+    def _reset(self):
+        self.categories = []
+        self.categories_by_id = {}
+        self.subcategories_by_category = {}
+        self.products = ProductIndex()
+        self._products_loaded = False
+
+    def _connect(self):
+        # A connection of its own: data_version only moves for commits made
+        # by other connections, which includes this process's own pool
+        if self._conn is None:
+            self._conn = self.db._open()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._reset()
+            self._stale = True
+
+    def invalidate(self, full=False):
+        """Mark the cache stale; full=True also drops the products so they are reloaded."""
+        with self._lock:
+            if full:
+                self._reset()
+            self._stale = True
+
+    def _ensure_fresh(self, products=False):
+        now = time.monotonic()
+        load_products = products and not self._products_loaded
+        if not self._stale and not load_products and now - self._checked_at < self.check_interval:
+            return
+        try:
+            conn = self._connect()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            self._checked_at = now
+            if self._stale or load_products or version != self._data_version:
+                if self.db.config.debug_query_delay:
+                    time.sleep(self.db.config.debug_query_delay)
+                self._refresh(conn, products or self._products_loaded)
+                self._data_version = version
+                self._stale = False
+        except sqlite3.Error as e:
+            raise Exception(f"Error refreshing catalog cache: {str(e)}")
+
+    def _refresh(self, conn, products):
+        self.categories = conn.execute("SELECT * FROM categories ORDER BY name").fetchall()
+        self.categories_by_id = {row['id']: row for row in self.categories}
+        subcategories = {}
+        for row in conn.execute("SELECT * FROM subcategories ORDER BY name"):
+            subcategories.setdefault(row['category_id'], []).append(row)
+        self.subcategories_by_category = subcategories
+        if not products:
+            return
+
+        self._products_loaded = True
+        self.products.load(conn)
+
+    def get_categories(self):
+        with self._lock:
+            self._ensure_fresh()
+            return self.categories
+
+    def get_subcategories(self, category_id):
+        with self._lock:
+            self._ensure_fresh()
+            return self.subcategories_by_category.get(category_id, [])
+
+    def get_products(self, category_id, subcategory_id):
+        """The products of a subcategory by name, as dicts of product_index.FIELDS."""
+        with self._lock:
+            self._ensure_fresh(products=True)
+            return self.products.scan(category_id, subcategory_id)
+
+    def preload(self):
+        """Load the products now instead of on the first get_products."""
+        with self._lock:
+            self._ensure_fresh(products=True)
+
+    def get_product(self, product_id):
+        """The product's hot fields from the index; the whole row when it is not loaded yet."""
+        with self._lock:
+            self._ensure_fresh()
+            product = self.products.get(product_id)
+        return product if product is not None else self.get_product_row(product_id)
+
+    def get_product_row(self, product_id):
+        """The whole product row with its category and subcategory names, always from the database."""
+        result = self.db.execute_query(PRODUCT_QUERY + " WHERE p.id = ?", (product_id,))
+        return result[0] if result else None
+
+    def find_product_by_code(self, code):
+        """Look a scanned code up as a barcode first, then as a SKU.
+
+        The QR code of a shelf label carries the product id instead.
+        """
+        product_id = product_id_from_payload(code)
+        if product_id is not None:
+            return self.get_product(product_id)
+        with self._lock:
+            self._ensure_fresh()
+            product = self.products.find_by_barcode(code) or self.products.find_by_sku(code)
+        if product is not None:
+            return product
+        # Not loaded yet, or added elsewhere since the last data_version check
+        return self.db.get_product_by_barcode(code) or self.db.get_product_by_sku(code)
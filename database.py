@@ -1,379 +1,863 @@
-import sqlite3
-import os
-from datetime import datetime
-
-class Database:
-    def __init__(self):
-        self.db_name = "inventory.db"
-        self.create_tables()
-
-    def connect(self):
-        try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            return conn
-        except sqlite3.Error as e:
-            raise Exception(f"Database connection error: {str(e)}")
-
-    def create_tables(self):
-        try:
-            conn = self.connect()
-            cursor = conn.cursor()
-
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Categories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Subcategories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS subcategories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (category_id) REFERENCES categories (id),
-                    UNIQUE (category_id, name)
-                )
-            ''')
-
-            # Products table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS products (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    barcode TEXT,
-                    sku_id TEXT,
-                    name TEXT NOT NULL,
-                    category_id INTEGER NOT NULL,
-                    subcategory_id INTEGER NOT NULL,
-                    description TEXT,
-                    price REAL NOT NULL,
-                    tax_rate REAL NOT NULL,
-                    default_unit TEXT,
-                    image_path TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (category_id) REFERENCES categories (id),
-                    FOREIGN KEY (subcategory_id) REFERENCES subcategories (id)
-                )
-            ''')
-
-            # Suppliers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS suppliers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT,
-                    email TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Customers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS customers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT,
-                    email TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Goods Receiving table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS goods_receiving (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER NOT NULL,
-                    supplier_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    rate REAL NOT NULL,
-                    tax_rate REAL NOT NULL,
-                    tax_amount REAL NOT NULL,
-                    total_amount REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (product_id) REFERENCES products (id),
-                    FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-
-            # Sales table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER NOT NULL,
-                    customer_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    rate REAL NOT NULL,
-                    tax_rate REAL NOT NULL,
-                    tax_amount REAL NOT NULL,
-                    total_amount REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (product_id) REFERENCES products (id),
-                    FOREIGN KEY (customer_id) REFERENCES customers (id),
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-
-            # Create default admin user if not exists
-            cursor.execute('''
-                INSERT OR IGNORE INTO users (username, password)
-                VALUES (?, ?)
-            ''', ('admin', 'admin'))
-
-            conn.commit()
-        except sqlite3.Error as e:
-            raise Exception(f"Error creating tables: {str(e)}")
-        finally:
-            conn.close()
-
-    def execute_query(self, query, params=None):
-        try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            result = cursor.fetchall()
-            conn.commit()
-            return result
-        except sqlite3.Error as e:
-            raise Exception(f"Query execution error: {str(e)}")
-        finally:
-            conn.close()
-
-    def execute_insert(self, query, params):
-        try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            last_id = cursor.lastrowid
-            conn.commit()
-            return last_id
-        except sqlite3.Error as e:
-            raise Exception(f"Insert execution error: {str(e)}")
-        finally:
-            conn.close()
-
-    # User methods
-    def validate_user(self, username, password):
-        try:
-            result = self.execute_query(
-                "SELECT id FROM users WHERE username = ? AND password = ?",
-                (username, password)
-            )
-            return result[0][0] if result else None
-        except Exception as e:
-            raise Exception(f"User validation error: {str(e)}")
-
-    # Category methods
-    def get_all_categories(self):
-        try:
-            return self.execute_query("SELECT * FROM categories ORDER BY name")
-        except Exception as e:
-            raise Exception(f"Error getting categories: {str(e)}")
-
-    def add_category(self, name):
-        try:
-            return self.execute_insert(
-                "INSERT INTO categories (name) VALUES (?)",
-                (name,)
-            )
-        except Exception as e:
-            raise Exception(f"Error adding category: {str(e)}")
-
-    # Subcategory methods
-    def get_subcategories_by_category(self, category_id):
-        try:
-            return self.execute_query(
-                "SELECT * FROM subcategories WHERE category_id = ? ORDER BY name",
-                (category_id,)
-            )
-        except Exception as e:
-            raise Exception(f"Error getting subcategories: {str(e)}")
-
-    def add_subcategory(self, category_id, name):
-        try:
-            return self.execute_insert(
-                "INSERT INTO subcategories (category_id, name) VALUES (?, ?)",
-                (category_id, name)
-            )
-        except Exception as e:
-            raise Exception(f"Error adding subcategory: {str(e)}")
-
-    # Product methods
-    def get_all_products(self):
-        try:
-            return self.execute_query('''
-                SELECT p.*, c.name as category_name, s.name as subcategory_name
-                FROM products p
-                JOIN categories c ON p.category_id = c.id
-                JOIN subcategories s ON p.subcategory_id = s.id
-                ORDER BY p.name
-            ''')
-        except Exception as e:
-            raise Exception(f"Error getting products: {str(e)}")
-
-    def get_products_by_category_subcategory(self, category_id, subcategory_id):
-        try:
-            return self.execute_query('''
-                SELECT p.*, c.name as category_name, s.name as subcategory_name
-                FROM products p
-                JOIN categories c ON p.category_id = c.id
-                JOIN subcategories s ON p.subcategory_id = s.id
-                WHERE p.category_id = ? AND p.subcategory_id = ?
-                ORDER BY p.name
-            ''', (category_id, subcategory_id))
-        except Exception as e:
-            raise Exception(f"Error getting products: {str(e)}")
-
-    def get_product_by_id(self, product_id):
-        try:
-            result = self.execute_query(
-                "SELECT * FROM products WHERE id = ?",
-                (product_id,)
-            )
-            return result[0] if result else None
-        except Exception as e:
-            raise Exception(f"Error getting product: {str(e)}")
-
-    def add_product(self, product_data):
-        try:
-            return self.execute_insert('''
-                INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id, description, price, tax_rate, default_unit, image_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product_data.get('barcode'),
-                product_data.get('sku_id'),
-                product_data['name'],
-                product_data['category_id'],
-                product_data['subcategory_id'],
-                product_data['description'],
-                product_data['price'],
-                product_data['tax_rate'],
-                product_data.get('default_unit'),
-                product_data.get('image_path')
-            ))
-        except Exception as e:
-            raise Exception(f"Error adding product: {str(e)}")
-
-    # Supplier methods
-    def get_all_suppliers(self):
-        try:
-            return self.execute_query("SELECT * FROM suppliers ORDER BY name")
-        except Exception as e:
-            raise Exception(f"Error getting suppliers: {str(e)}")
-
-    def get_supplier_by_id(self, supplier_id):
-        try:
-            result = self.execute_query(
-                "SELECT * FROM suppliers WHERE id = ?",
-                (supplier_id,)
-            )
-            return result[0] if result else None
-        except Exception as e:
-            raise Exception(f"Error getting supplier: {str(e)}")
-
-    def add_supplier(self, supplier_data):
-        try:
-            return self.execute_insert('''
-                INSERT INTO suppliers (name, phone, email)
-                VALUES (?, ?, ?)
-            ''', (
-                supplier_data['name'],
-                supplier_data['phone'],
-                supplier_data['email']
-            ))
-        except Exception as e:
-            raise Exception(f"Error adding supplier: {str(e)}")
-
-    # Customer methods
-    def get_all_customers(self):
-        try:
-            return self.execute_query("SELECT * FROM customers ORDER BY name")
-        except Exception as e:
-            raise Exception(f"Error getting customers: {str(e)}")
-
-    def get_customer_by_id(self, customer_id):
-        try:
-            result = self.execute_query(
-                "SELECT * FROM customers WHERE id = ?",
-                (customer_id,)
-            )
-            return result[0] if result else None
-        except Exception as e:
-            raise Exception(f"Error getting customer: {str(e)}")
-
-    def add_customer(self, customer_data):
-        try:
-            return self.execute_insert('''
-                INSERT INTO customers (name, phone, email)
-                VALUES (?, ?, ?)
-            ''', (
-                customer_data['name'],
-                customer_data['phone'],
-                customer_data['email']
-            ))
-        except Exception as e:
-            raise Exception(f"Error adding customer: {str(e)}")
-
-    # Goods Receiving methods
-    def add_goods_receiving(self, goods_data):
-        try:
-            return self.execute_insert('''
-                INSERT INTO goods_receiving (
-                    product_id, supplier_id, user_id, quantity, rate,
-                    tax_rate, tax_amount, total_amount
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                goods_data['product_id'],
-                goods_data['supplier_id'],
-                goods_data['user_id'],
-                goods_data['quantity'],
-                goods_data['rate'],
-                goods_data['tax_rate'],
-                goods_data['tax_amount'],
-                goods_data['total_amount']
-            ))
-        except Exception as e:
-            raise Exception(f"Error adding goods receiving: {str(e)}")
-
-    # Sales methods
-    def add_sale(self, sale_data):
-        try:
-            return self.execute_insert('''
-                INSERT INTO sales (
-                    product_id, customer_id, user_id, quantity, rate,
-                    tax_rate, tax_amount, total_amount
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                sale_data['product_id'],
-                sale_data['customer_id'],
-                sale_data['user_id'],
-                sale_data['quantity'],
-                sale_data['rate'],
-                sale_data['tax_rate'],
-                sale_data['tax_amount'],
-                sale_data['total_amount']
-            ))
-        except Exception as e:
-            raise Exception(f"Error adding sale: {str(e)}") 
\ No newline at end of file
+import sqlite3
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from migrations import SCHEMA_VERSION, migrate
+from catalog_cache import CatalogCache, PRODUCT_QUERY
+from query_stats import QueryStats, InstrumentedConnection
+from pricing import default_rounding, price_invoice, price_line
+
+# Full-text matches ranked per search; see Database.search_products
+SEARCH_RANK_CANDIDATES = 2000
+
+_shared_database = None
+_shared_lock = threading.Lock()
+
+
+def get_database(db_name="inventory.db", config=None):
+    """Return the process-wide Database, creating it on first use."""
+    global _shared_database
+    with _shared_lock:
+        if _shared_database is None:
+            _shared_database = Database(db_name, config)
+        return _shared_database
+
+
+def _flag(value):
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+class DatabaseConfig:
+    """Connection pragmas and lock handling for Database.
+
+    The defaults suit several terminals on one machine or on a local disk.
+    WAL needs shared memory between the processes, so set journal_mode to
+    DELETE when inventory.db sits on a network share.
+
+    With query_stats on, every statement is timed (see query_stats.py) and
+    those slower than slow_query_ms are logged to slow_query_log, by
+    default slow_queries.log beside the database file. The log shows only
+    the types of a statement's parameters, which may be passwords, unless
+    slow_query_log_params is set.
+    """
+
+    def __init__(self, journal_mode="WAL", synchronous="NORMAL",
+                 mmap_size=256 * 1024 * 1024, cache_size=-32000,
+                 busy_timeout=5.0, max_retries=5, retry_backoff=0.05,
+                 debug_query_delay=0.0, query_stats=True, slow_query_ms=100.0,
+                 slow_query_log=None, slow_query_log_params=False):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size  # negative values are KiB, positive are pages
+        self.busy_timeout = busy_timeout  # seconds SQLite waits on a lock itself
+        self.max_retries = max_retries  # further attempts once the timeout expires
+        self.retry_backoff = retry_backoff  # first retry delay, doubled each time
+        self.debug_query_delay = debug_query_delay  # seconds added to every call, to test UI responsiveness
+        self.query_stats = query_stats
+        self.slow_query_ms = slow_query_ms  # 0 turns the slow query log off
+        self.slow_query_log = slow_query_log
+        self.slow_query_log_params = slow_query_log_params
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Build a config from IMS_DB_* environment variables, falling back to defaults."""
+        environ = os.environ if environ is None else environ
+        config = cls()
+        for name, convert in (('journal_mode', str), ('synchronous', str),
+                              ('mmap_size', int), ('cache_size', int),
+                              ('busy_timeout', float), ('max_retries', int),
+                              ('retry_backoff', float), ('debug_query_delay', float),
+                              ('query_stats', _flag), ('slow_query_ms', float),
+                              ('slow_query_log', str), ('slow_query_log_params', _flag)):
+            value = environ.get(f"IMS_DB_{name.upper()}")
+            if value:
+                setattr(config, name, convert(value))
+        return config
+
+    def apply(self, conn):
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+
+
+class LineValidationError(Exception):
+    """Raised by bulk writes when some lines are invalid; nothing is written.
+
+    errors is a list of (line_no, message) with line numbers starting at 1.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"line {line_no}: {message}" for line_no, message in errors))
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+class Database:
+    # Database files whose schema has already been checked in this process
+    _schema_ready = set()
+    _schema_lock = threading.Lock()
+
+    def __init__(self, db_name="inventory.db", config=None):
+        self.db_name = db_name
+        self.config = config if config is not None else DatabaseConfig.from_env()
+        # One long-lived connection per thread, reused by every call
+        self._local = threading.local()
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._has_search_index = None
+        # How the tax of an invoice or GRN is rounded, see pricing.py
+        self.rounding = default_rounding()
+        # Per-statement timings of every connection, or None when turned off
+        self.query_stats = None
+        if self.config.query_stats:
+            log = self.config.slow_query_log or os.path.join(
+                os.path.dirname(os.path.abspath(db_name)), "slow_queries.log")
+            self.query_stats = QueryStats(self.config.slow_query_ms, log, self.config.slow_query_log_params)
+        self.create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        try:
+            conn = self._open()
+            self.config.apply(conn)
+        except sqlite3.Error as e:
+            raise Exception(f"Database connection error: {str(e)}")
+        thread = threading.current_thread()
+        with self._lock:
+            # Drop connections left behind by threads that have exited
+            for owner in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(owner).close()
+            self._connections[thread] = conn
+        self._local.conn = conn
+        return conn
+
+    def _open(self):
+        """A new connection returning sqlite3.Row, timed into query_stats when that is on."""
+        if self.query_stats is None:
+            conn = sqlite3.connect(self.db_name, timeout=self.config.busy_timeout, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_name, timeout=self.config.busy_timeout, check_same_thread=False,
+                                   factory=InstrumentedConnection)
+            conn.stats = self.query_stats
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def close(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+            self._local = threading.local()
+            catalog, self._catalog = self._catalog, None
+        for conn in connections:
+            conn.close()
+        if catalog is not None:
+            catalog.close()
+
+    @property
+    def catalog(self):
+        """Shared CatalogCache of categories, subcategories and products."""
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = CatalogCache(self)
+            return self._catalog
+
+    def _catalog_changed(self):
+        if self._catalog is not None:
+            self._catalog.invalidate()
+
+    def _retry(self, operation):
+        """Run operation, retrying with jittered exponential backoff while the database is locked."""
+        if self.config.debug_query_delay:
+            time.sleep(self.config.debug_query_delay)
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if not is_lock_error(e) or attempt >= self.config.max_retries:
+                    raise
+                delay = self.config.retry_backoff * (2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                attempt += 1
+
+    def create_tables(self):
+        path = os.path.abspath(self.db_name)
+        with Database._schema_lock:
+            if path in Database._schema_ready:
+                return
+            conn = self.connect()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                migrate(conn)
+            Database._schema_ready.add(path)
+
+    def execute_query(self, query, params=None):
+        conn = self.connect()
+
+        def run():
+            try:
+                cursor = conn.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                result = cursor.fetchall()
+                if conn.in_transaction:
+                    conn.commit()
+                return result
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        try:
+            return self._retry(run)
+        except sqlite3.Error as e:
+            raise Exception(f"Query execution error: {str(e)}")
+
+    def stream_query(self, query, params=None, batch_size=1000):
+        """Yield the rows of query, fetching batch_size at a time instead of all at once.
+
+        The statement (and its read snapshot) stays open until the generator
+        is exhausted or closed, so consume it promptly.
+        """
+        cursor = self.connect().cursor()
+        try:
+            self._retry(lambda: cursor.execute(query, params or ()))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except sqlite3.Error as e:
+            raise Exception(f"Query execution error: {str(e)}")
+        finally:
+            cursor.close()
+
+    def execute_insert(self, query, params):
+        conn = self.connect()
+
+        def run():
+            try:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                last_id = cursor.lastrowid
+                conn.commit()
+                return last_id
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        try:
+            return self._retry(run)
+        except sqlite3.Error as e:
+            raise Exception(f"Insert execution error: {str(e)}")
+
+    def run_in_transaction(self, work):
+        """Call work(cursor) inside one write transaction and return its result.
+
+        The whole unit is rolled back on any error and retried if the
+        database was locked, so work must not have side effects outside SQL.
+        """
+        conn = self.connect()
+
+        def run():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn.cursor())
+                conn.commit()
+                return result
+            except BaseException:
+                conn.rollback()
+                raise
+
+        try:
+            return self._retry(run)
+        except sqlite3.Error as e:
+            raise Exception(f"Transaction error: {str(e)}")
+
+    # User methods
+    def validate_user(self, username, password):
+        try:
+            result = self.execute_query(
+                "SELECT id FROM users WHERE username = ? AND password = ?",
+                (username, password)
+            )
+            return result[0][0] if result else None
+        except Exception as e:
+            raise Exception(f"User validation error: {str(e)}")
+
+    # Category methods
+    def get_all_categories(self):
+        try:
+            return self.execute_query("SELECT * FROM categories ORDER BY name")
+        except Exception as e:
+            raise Exception(f"Error getting categories: {str(e)}")
+
+    def add_category(self, name):
+        try:
+            category_id = self.execute_insert(
+                "INSERT INTO categories (name) VALUES (?)",
+                (name,)
+            )
+            self._catalog_changed()
+            return category_id
+        except Exception as e:
+            raise Exception(f"Error adding category: {str(e)}")
+
+    # Subcategory methods
+    def get_subcategories_by_category(self, category_id):
+        try:
+            return self.execute_query(
+                "SELECT * FROM subcategories WHERE category_id = ? ORDER BY name",
+                (category_id,)
+            )
+        except Exception as e:
+            raise Exception(f"Error getting subcategories: {str(e)}")
+
+    def add_subcategory(self, category_id, name):
+        try:
+            subcategory_id = self.execute_insert(
+                "INSERT INTO subcategories (category_id, name) VALUES (?, ?)",
+                (category_id, name)
+            )
+            self._catalog_changed()
+            return subcategory_id
+        except Exception as e:
+            raise Exception(f"Error adding subcategory: {str(e)}")
+
+    # Product methods
+    def get_all_products(self):
+        try:
+            return self.execute_query('''
+                SELECT p.*, c.name as category_name, s.name as subcategory_name
+                FROM products p
+                JOIN categories c ON p.category_id = c.id
+                JOIN subcategories s ON p.subcategory_id = s.id
+                ORDER BY p.name
+            ''')
+        except Exception as e:
+            raise Exception(f"Error getting products: {str(e)}")
+
+    def get_products_page(self, after=None, limit=200):
+        """Return up to limit products ordered by (name, id), starting after the (name, id) key given."""
+        try:
+            if after is None:
+                return self.execute_query(
+                    PRODUCT_QUERY + " ORDER BY p.name, p.id LIMIT ?",
+                    (limit,)
+                )
+            return self.execute_query(
+                PRODUCT_QUERY + " WHERE (p.name, p.id) > (?, ?) ORDER BY p.name, p.id LIMIT ?",
+                (after[0], after[1], limit)
+            )
+        except Exception as e:
+            raise Exception(f"Error getting products: {str(e)}")
+
+    def get_products_by_category_subcategory(self, category_id, subcategory_id):
+        try:
+            return self.execute_query('''
+                SELECT p.*, c.name as category_name, s.name as subcategory_name
+                FROM products p
+                JOIN categories c ON p.category_id = c.id
+                JOIN subcategories s ON p.subcategory_id = s.id
+                WHERE p.category_id = ? AND p.subcategory_id = ?
+                ORDER BY p.name
+            ''', (category_id, subcategory_id))
+        except Exception as e:
+            raise Exception(f"Error getting products: {str(e)}")
+
+    def get_product_by_id(self, product_id):
+        try:
+            result = self.execute_query(
+                "SELECT * FROM products WHERE id = ?",
+                (product_id,)
+            )
+            return result[0] if result else None
+        except Exception as e:
+            raise Exception(f"Error getting product: {str(e)}")
+
+    def get_product_by_barcode(self, barcode):
+        try:
+            result = self.execute_query(
+                PRODUCT_QUERY + " WHERE p.barcode = ? LIMIT 1",
+                (barcode,)
+            )
+            return result[0] if result else None
+        except Exception as e:
+            raise Exception(f"Error getting product by barcode: {str(e)}")
+
+    def get_product_by_sku(self, sku_id):
+        try:
+            result = self.execute_query(
+                PRODUCT_QUERY + " WHERE p.sku_id = ? LIMIT 1",
+                (sku_id,)
+            )
+            return result[0] if result else None
+        except Exception as e:
+            raise Exception(f"Error getting product by SKU: {str(e)}")
+
+    def search_products(self, query, limit=20):
+        """Return up to limit products matching every term of query as a prefix, best match first."""
+        try:
+            terms = query.split()
+            if not terms:
+                return []
+            if len(terms) == 1 and any(ch.isdigit() for ch in terms[0]):
+                hits = self._search_codes(terms[0], limit)
+                if hits:
+                    return hits
+            if self._has_search_index is None:
+                self._has_search_index = bool(self.execute_query(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                ))
+            if not self._has_search_index:
+                pattern = "%" + query.strip() + "%"
+                return self.execute_query(
+                    PRODUCT_QUERY + " WHERE p.name LIKE ? OR p.barcode LIKE ? OR p.sku_id LIKE ?"
+                    " ORDER BY p.name, p.id LIMIT ?",
+                    (pattern, pattern, pattern, limit)
+                )
+            # Quote each term so punctuation in codes like SKU-0042 is
+            # matched as a phrase instead of parsed as FTS5 syntax
+            match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+            # Rank the first SEARCH_RANK_CANDIDATES matches: names starting
+            # with the first term, then names with a word starting with it,
+            # then matches on description or codes; shorter names first.
+            # bm25 would have to count every row holding each term, which
+            # for a common word in a large catalog costs more than the search
+            first = terms[0].lower()
+            return self.execute_query('''
+                SELECT p.*, c.name as category_name, s.name as subcategory_name
+                FROM (
+                    SELECT rowid FROM products_fts
+                    WHERE products_fts MATCH ?
+                    LIMIT ?
+                ) hits
+                JOIN products p ON p.id = hits.rowid
+                JOIN categories c ON p.category_id = c.id
+                JOIN subcategories s ON p.subcategory_id = s.id
+                ORDER BY instr(lower(p.name), ?) != 1,
+                         instr(' ' || lower(p.name), ' ' || ?) = 0,
+                         length(p.name), p.name, p.id
+                LIMIT ?
+            ''', (match, SEARCH_RANK_CANDIDATES, first, first, limit))
+        except Exception as e:
+            raise Exception(f"Error searching products: {str(e)}")
+
+    def _search_codes(self, code, limit):
+        # A partly typed barcode or SKU is a prefix range on their B-tree
+        # indexes; FTS5 would have to expand every code sharing the prefix
+        hits = {}
+        for column in ('barcode', 'sku_id'):
+            for prefix in dict.fromkeys((code, code.upper())):
+                rows = self.execute_query(
+                    PRODUCT_QUERY + f" WHERE p.{column} >= ? AND p.{column} < ? ORDER BY p.{column} LIMIT ?",
+                    (prefix, prefix + "\U0010ffff", limit)
+                )
+                for row in rows:
+                    hits.setdefault(row['id'], row)
+        return list(hits.values())[:limit]
+
+    def add_product(self, product_data):
+        try:
+            product_id = self.run_in_transaction(
+                lambda cursor: self._insert_product(cursor, product_data)
+            )
+            self._catalog_changed()
+            return product_id
+        except Exception as e:
+            raise Exception(f"Error adding product: {str(e)}")
+
+    def _insert_product(self, cursor, product_data):
+        cursor.execute('''
+            INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id, description, price, tax_rate, default_unit, image_path, image_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            product_data.get('barcode'),
+            product_data.get('sku_id'),
+            product_data['name'],
+            product_data['category_id'],
+            product_data['subcategory_id'],
+            product_data['description'],
+            product_data['price'],
+            product_data['tax_rate'],
+            product_data.get('default_unit'),
+            product_data.get('image_path'),
+            product_data.get('image_hash')
+        ))
+        return cursor.lastrowid
+
+    def set_product_image(self, product_id, image_hash):
+        try:
+            self.run_in_transaction(lambda cursor: cursor.execute(
+                "UPDATE products SET image_hash = ? WHERE id = ?", (image_hash, product_id)
+            ))
+            self._catalog_changed()
+        except Exception as e:
+            raise Exception(f"Error setting product image: {str(e)}")
+
+    # Supplier methods
+    def get_all_suppliers(self):
+        try:
+            return self.execute_query("SELECT * FROM suppliers ORDER BY name")
+        except Exception as e:
+            raise Exception(f"Error getting suppliers: {str(e)}")
+
+    def get_supplier_by_id(self, supplier_id):
+        try:
+            result = self.execute_query(
+                "SELECT * FROM suppliers WHERE id = ?",
+                (supplier_id,)
+            )
+            return result[0] if result else None
+        except Exception as e:
+            raise Exception(f"Error getting supplier: {str(e)}")
+
+    def add_supplier(self, supplier_data):
+        try:
+            return self.execute_insert('''
+                INSERT INTO suppliers (name, phone, email)
+                VALUES (?, ?, ?)
+            ''', (
+                supplier_data['name'],
+                supplier_data['phone'],
+                supplier_data['email']
+            ))
+        except Exception as e:
+            raise Exception(f"Error adding supplier: {str(e)}")
+
+    # Customer methods
+    def get_all_customers(self):
+        try:
+            return self.execute_query("SELECT * FROM customers ORDER BY name")
+        except Exception as e:
+            raise Exception(f"Error getting customers: {str(e)}")
+
+    def get_customer_by_id(self, customer_id):
+        try:
+            result = self.execute_query(
+                "SELECT * FROM customers WHERE id = ?",
+                (customer_id,)
+            )
+            return result[0] if result else None
+        except Exception as e:
+            raise Exception(f"Error getting customer: {str(e)}")
+
+    def add_customer(self, customer_data):
+        try:
+            return self.execute_insert('''
+                INSERT INTO customers (name, phone, email)
+                VALUES (?, ?, ?)
+            ''', (
+                customer_data['name'],
+                customer_data['phone'],
+                customer_data['email']
+            ))
+        except Exception as e:
+            raise Exception(f"Error adding customer: {str(e)}")
+
+    # Goods Receiving methods
+    def add_goods_receiving(self, goods_data):
+        try:
+            return self.run_in_transaction(
+                lambda cursor: self._insert_goods_receiving(cursor, goods_data)
+            )
+        except Exception as e:
+            raise Exception(f"Error adding goods receiving: {str(e)}")
+
+    def _insert_goods_receiving(self, cursor, goods_data):
+        amounts = price_line(goods_data['quantity'], goods_data['rate'], goods_data['tax_rate'])
+        cursor.execute('''
+            INSERT INTO goods_receiving (
+                product_id, supplier_id, user_id, quantity, rate,
+                tax_rate, tax_amount, total_amount
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            goods_data['product_id'],
+            goods_data['supplier_id'],
+            goods_data['user_id'],
+            goods_data['quantity'],
+            goods_data['rate'],
+            goods_data['tax_rate'],
+            amounts['tax_amount'],
+            amounts['total_amount']
+        ))
+        receipt_id = cursor.lastrowid
+        self._adjust_stock(cursor, goods_data['product_id'], goods_data['quantity'])
+        return receipt_id
+
+    def add_goods_receiving_bulk(self, grn_data, lines):
+        """Post a goods received note: header, every line and the stock updates in one transaction.
+
+        Lines are priced here as in add_invoice. Returns the new GRN id.
+        Raises LineValidationError listing every bad line if any of them is
+        invalid.
+        """
+        self._check_grn_lines(lines)
+        try:
+            return self.run_in_transaction(
+                lambda cursor: self._insert_goods_receipt_note(cursor, grn_data, lines)
+            )
+        except LineValidationError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error posting goods received note: {str(e)}")
+
+    def _check_grn_lines(self, lines):
+        errors = []
+        if not lines:
+            errors.append((0, "The note has no lines"))
+        for line_no, line in enumerate(lines, 1):
+            if not line.get('product_id'):
+                errors.append((line_no, "No product selected"))
+            if not line.get('quantity') or line['quantity'] <= 0:
+                errors.append((line_no, "Quantity must be greater than zero"))
+            if not line.get('rate') or line['rate'] <= 0:
+                errors.append((line_no, "Rate must be greater than zero"))
+        # Unknown products are reported with the other errors, so one round trip shows them all
+        product_ids = list({line['product_id'] for line in lines if line.get('product_id')})
+        known = set()
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            known.update(row[0] for row in self.execute_query(
+                f"SELECT id FROM products WHERE id IN ({placeholders})", chunk
+            ))
+        errors.extend((line_no, f"Product {line['product_id']} does not exist")
+                      for line_no, line in enumerate(lines, 1)
+                      if line.get('product_id') and line['product_id'] not in known)
+        if errors:
+            raise LineValidationError(sorted(errors, key=lambda error: error[0]))
+
+    def _insert_goods_receipt_note(self, cursor, grn_data, lines):
+        lines, totals = price_invoice(lines, self.rounding)
+        cursor.execute('''
+            INSERT INTO goods_receipt_notes (
+                supplier_id, user_id, reference, line_count, subtotal, tax_amount, total_amount, rounding
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            grn_data['supplier_id'],
+            grn_data['user_id'],
+            grn_data.get('reference'),
+            len(lines),
+            totals['subtotal'],
+            totals['tax_amount'],
+            totals['total_amount'],
+            self.rounding
+        ))
+        grn_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT INTO goods_receiving (
+                grn_id, product_id, supplier_id, user_id, quantity, rate,
+                tax_rate, tax_amount, total_amount
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (grn_id, line['product_id'], grn_data['supplier_id'], grn_data['user_id'],
+             line['quantity'], line['rate'], line['tax_rate'], line['tax_amount'], line['total_amount'])
+            for line in lines
+        ])
+        received = {}
+        for line in lines:
+            received[line['product_id']] = received.get(line['product_id'], 0) + line['quantity']
+        self._adjust_stock_many(cursor, list(received.items()))
+        return grn_id
+
+    # Sales methods
+    def add_sale(self, sale_data):
+        try:
+            return self.run_in_transaction(
+                lambda cursor: self._insert_sale(cursor, sale_data)
+            )
+        except Exception as e:
+            raise Exception(f"Error adding sale: {str(e)}")
+
+    def _insert_sale(self, cursor, sale_data):
+        self._reserve_stock(cursor, sale_data['product_id'], sale_data['quantity'])
+        # Priced here too, so a sale's amounts always follow pricing.py whoever records it
+        amounts = price_line(sale_data['quantity'], sale_data['rate'], sale_data['tax_rate'])
+        cursor.execute('''
+            INSERT INTO sales (
+                product_id, customer_id, user_id, quantity, rate,
+                tax_rate, tax_amount, total_amount
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            sale_data['product_id'],
+            sale_data['customer_id'],
+            sale_data['user_id'],
+            sale_data['quantity'],
+            sale_data['rate'],
+            sale_data['tax_rate'],
+            amounts['tax_amount'],
+            amounts['total_amount']
+        ))
+        return cursor.lastrowid
+
+    # Invoice methods
+    def add_invoice(self, invoice_data, lines):
+        """Record a whole cart as one invoice, its lines and the stock decrements in one transaction.
+
+        Lines need product_id, quantity, rate and tax_rate; their tax and
+        total are worked out here, by pricing.py under self.rounding, which
+        is stored with the invoice.
+        """
+        try:
+            return self.run_in_transaction(
+                lambda cursor: self._insert_invoice(cursor, invoice_data, lines)
+            )
+        except Exception as e:
+            raise Exception(f"Error adding invoice: {str(e)}")
+
+    def _insert_invoice(self, cursor, invoice_data, lines):
+        if not lines:
+            raise Exception("Invoice has no lines")
+
+        # The same product may appear on several lines
+        needed = {}
+        for line in lines:
+            needed[line['product_id']] = needed.get(line['product_id'], 0) + line['quantity']
+        on_hand = self._stock_for(cursor, list(needed))
+        for product_id, quantity in needed.items():
+            available = on_hand.get(product_id, 0)
+            if quantity > available:
+                raise Exception(f"Insufficient stock for product {product_id}: "
+                                f"{available:g} available, {quantity:g} requested")
+
+        lines, totals = price_invoice(lines, self.rounding)
+        cursor.execute('''
+            INSERT INTO invoices (
+                customer_id, user_id, line_count, subtotal, tax_amount, total_amount, rounding
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            invoice_data['customer_id'],
+            invoice_data['user_id'],
+            len(lines),
+            totals['subtotal'],
+            totals['tax_amount'],
+            totals['total_amount'],
+            self.rounding
+        ))
+        invoice_id = cursor.lastrowid
+        cursor.executemany('''
+            INSERT INTO invoice_lines (
+                invoice_id, line_no, product_id, quantity, rate,
+                tax_rate, tax_amount, total_amount
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (invoice_id, line_no, line['product_id'], line['quantity'], line['rate'],
+             line['tax_rate'], line['tax_amount'], line['total_amount'])
+            for line_no, line in enumerate(lines, 1)
+        ])
+        self._adjust_stock_many(cursor, [(product_id, -quantity) for product_id, quantity in needed.items()])
+        return invoice_id
+
+    # Stock methods
+    def get_stock(self, product_id):
+        try:
+            result = self.execute_query(
+                "SELECT quantity FROM stock_levels WHERE product_id = ?",
+                (product_id,)
+            )
+            return result[0][0] if result else 0
+        except Exception as e:
+            raise Exception(f"Error getting stock: {str(e)}")
+
+    def _adjust_stock(self, cursor, product_id, delta):
+        self._adjust_stock_many(cursor, [(product_id, delta)])
+
+    def _adjust_stock_many(self, cursor, deltas):
+        cursor.executemany('''
+            INSERT INTO stock_levels (product_id, quantity) VALUES (?, ?)
+            ON CONFLICT (product_id) DO UPDATE
+            SET quantity = quantity + excluded.quantity, updated_at = CURRENT_TIMESTAMP
+        ''', deltas)
+
+    def _stock_for(self, cursor, product_ids):
+        on_hand = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in cursor.execute(
+                f"SELECT product_id, quantity FROM stock_levels WHERE product_id IN ({placeholders})",
+                chunk
+            ):
+                on_hand[row[0]] = row[1]
+        return on_hand
+
+    def _reserve_stock(self, cursor, product_id, quantity):
+        # Runs inside the sale's write transaction, so no other terminal can
+        # sell the same units between this check and the decrement
+        row = cursor.execute(
+            "SELECT quantity FROM stock_levels WHERE product_id = ?",
+            (product_id,)
+        ).fetchone()
+        on_hand = row[0] if row else 0
+        if quantity > on_hand:
+            raise Exception(f"Insufficient stock: {on_hand:g} available, {quantity:g} requested")
+        self._adjust_stock(cursor, product_id, -quantity)
+
+    def rebuild_stock_levels(self):
+        """Recompute stock_levels from the receiving, sales and invoice ledgers in one pass."""
+        def rebuild(cursor):
+            cursor.execute("DELETE FROM stock_levels")
+            cursor.execute('''
+                INSERT INTO stock_levels (product_id, quantity)
+                SELECT product_id, SUM(quantity) FROM (
+                    SELECT product_id, quantity FROM goods_receiving
+                    UNION ALL
+                    SELECT product_id, -quantity FROM sales
+                    UNION ALL
+                    SELECT product_id, -quantity FROM invoice_lines
+                )
+                GROUP BY product_id
+            ''')
+            return cursor.rowcount
+
+        try:
+            return self.run_in_transaction(rebuild)
+        except Exception as e:
+            raise Exception(f"Error rebuilding stock levels: {str(e)}")
+
+    def verify_stock_levels(self):
+        """Return (product_id, recorded, expected) for every product whose stock_levels row is wrong."""
+        try:
+            return self.execute_query('''
+                SELECT product_id, SUM(recorded) AS recorded, SUM(expected) AS expected
+                FROM (
+                    SELECT product_id, quantity AS recorded, 0 AS expected FROM stock_levels
+                    UNION ALL
+                    SELECT product_id, 0, quantity FROM goods_receiving
+                    UNION ALL
+                    SELECT product_id, 0, -quantity FROM sales
+                    UNION ALL
+                    SELECT product_id, 0, -quantity FROM invoice_lines
+                )
+                GROUP BY product_id
+                HAVING SUM(recorded) != SUM(expected)
+            ''')
+        except Exception as e:
+            raise Exception(f"Error verifying stock levels: {str(e)}")
\ No newline at end of file
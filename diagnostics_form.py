@@ -0,0 +1,103 @@
+import json
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel,
+                             QPushButton, QMessageBox, QFileDialog, QTableWidget,
+                             QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import Qt, QDateTime
+from database import get_database
+
+
+class DiagnosticsForm(QWidget):
+    """Per-statement database timings (query_stats.py); opened with Ctrl+Shift+D."""
+
+    COLUMNS = [
+        ("Calls", 'calls'), ("Total ms", 'total_ms'), ("Mean ms", 'mean_ms'), ("p50 ms", 'p50_ms'),
+        ("p95 ms", 'p95_ms'), ("p99 ms", 'p99_ms'), ("Max ms", 'max_ms'), ("Rows", 'rows'),
+        ("Slow", 'slow'), ("Statement", 'statement'),
+    ]
+
+    def __init__(self, db=None):
+        super().__init__()
+        self.db = db if db is not None else get_database()
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        self.summary_label = QLabel()
+        self.summary_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(QLabel("Sort by:"))
+        self.sort_combo = QComboBox()
+        for label, key in self.COLUMNS[:-1]:
+            self.sort_combo.addItem(label, key)
+        self.sort_combo.currentIndexChanged.connect(self.refresh)
+        button_layout.addWidget(self.sort_combo)
+        button_layout.addStretch()
+
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.refresh)
+        button_layout.addWidget(self.refresh_button)
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(self.reset_button)
+        self.save_button = QPushButton("Save...")
+        self.save_button.clicked.connect(self.save)
+        button_layout.addWidget(self.save_button)
+        layout.addLayout(button_layout)
+
+        self.stats_table = QTableWidget(0, len(self.COLUMNS))
+        self.stats_table.setHorizontalHeaderLabels([label for label, _ in self.COLUMNS])
+        self.stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stats_table.setSelectionBehavior(QTableWidget.SelectRows)
+        header = self.stats_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(len(self.COLUMNS) - 1, QHeaderView.Stretch)
+        layout.addWidget(self.stats_table)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        stats = self.db.query_stats
+        enabled = stats is not None
+        for button in (self.refresh_button, self.reset_button, self.save_button):
+            button.setEnabled(enabled)
+        if not enabled:
+            self.summary_label.setText("Query stats are turned off (IMS_DB_QUERY_STATS=0).")
+            self.stats_table.setRowCount(0)
+            return
+        rows = stats.snapshot(self.sort_combo.currentData())
+        since = QDateTime.fromSecsSinceEpoch(int(stats.since)).toString("yyyy-MM-dd hh:mm:ss")
+        self.summary_label.setText(
+            f"{len(rows)} statements, {sum(row['calls'] for row in rows)} calls since {since}. "
+            f"Statements slower than {stats.slow_query_ms:g} ms are logged to {stats.slow_query_log}")
+        self.stats_table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            for column_index, (_, key) in enumerate(self.COLUMNS):
+                value = row[key]
+                item = QTableWidgetItem(f"{value:.2f}" if isinstance(value, float) else str(value))
+                if key == 'statement':
+                    item.setToolTip(value)
+                else:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.stats_table.setItem(row_index, column_index, item)
+
+    def reset(self):
+        self.db.query_stats.reset()
+        self.refresh()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Query Stats", "query_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.db.query_stats.to_dict(), f, indent=2)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to save query stats: {str(e)}")
@@ -0,0 +1,139 @@
+"""Export the ledgers and the product catalog to CSV or JSON Lines.
+
+    python exporters.py sales sales.csv [--from 2025-01-01] [--to 2025-01-31] [--db inventory.db]
+    python exporters.py products products.jsonl
+
+Rows are streamed from the database and written as they arrive, so memory
+use stays flat however large the table is. The format follows the file
+extension (.jsonl or .csv) unless --format is given; "-" writes to stdout.
+--from and --to are inclusive dates on created_at (UTC); rows come in
+table order, or in created_at order when a range is given.
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date, timedelta
+
+from database import Database, DatabaseConfig
+
+# name -> (FROM clause, [(column, expression)], date column)
+EXPORTS = {
+    'sales': (
+        "sales s LEFT JOIN products p ON p.id = s.product_id",
+        [('id', 's.id'), ('created_at', 's.created_at'), ('product_id', 's.product_id'),
+         ('sku_id', 'p.sku_id'), ('product_name', 'p.name'), ('customer_id', 's.customer_id'),
+         ('user_id', 's.user_id'), ('quantity', 's.quantity'), ('rate', 's.rate'),
+         ('tax_rate', 's.tax_rate'), ('tax_amount', 's.tax_amount'), ('total_amount', 's.total_amount')],
+        's.created_at',
+    ),
+    'invoice_lines': (
+        "invoice_lines l JOIN invoices i ON i.id = l.invoice_id LEFT JOIN products p ON p.id = l.product_id",
+        [('id', 'l.id'), ('invoice_id', 'l.invoice_id'), ('line_no', 'l.line_no'),
+         ('created_at', 'i.created_at'), ('customer_id', 'i.customer_id'), ('user_id', 'i.user_id'),
+         ('product_id', 'l.product_id'), ('sku_id', 'p.sku_id'), ('product_name', 'p.name'),
+         ('quantity', 'l.quantity'), ('rate', 'l.rate'), ('tax_rate', 'l.tax_rate'),
+         ('tax_amount', 'l.tax_amount'), ('total_amount', 'l.total_amount')],
+        'i.created_at',
+    ),
+    'goods_receiving': (
+        "goods_receiving g LEFT JOIN products p ON p.id = g.product_id",
+        [('id', 'g.id'), ('created_at', 'g.created_at'), ('grn_id', 'g.grn_id'),
+         ('product_id', 'g.product_id'), ('sku_id', 'p.sku_id'), ('product_name', 'p.name'),
+         ('supplier_id', 'g.supplier_id'), ('user_id', 'g.user_id'), ('quantity', 'g.quantity'),
+         ('rate', 'g.rate'), ('tax_rate', 'g.tax_rate'), ('tax_amount', 'g.tax_amount'),
+         ('total_amount', 'g.total_amount')],
+        'g.created_at',
+    ),
+    'products': (
+        "products p JOIN categories c ON c.id = p.category_id JOIN subcategories s ON s.id = p.subcategory_id",
+        [('id', 'p.id'), ('barcode', 'p.barcode'), ('sku_id', 'p.sku_id'), ('name', 'p.name'),
+         ('category', 'c.name'), ('subcategory', 's.name'), ('description', 'p.description'),
+         ('price', 'p.price'), ('tax_rate', 'p.tax_rate'), ('default_unit', 'p.default_unit'),
+         ('created_at', 'p.created_at')],
+        'p.created_at',
+    ),
+}
+
+
+def export_config():
+    """Connection settings for one long sequential scan.
+
+    Without the memory map and with a small page cache the scanned pages
+    do not pile up in resident memory.
+    """
+    config = DatabaseConfig.from_env()
+    config.mmap_size = 0
+    config.cache_size = -2000
+    return config
+
+
+def export_query(name, start=None, end=None):
+    """Return (columns, query, params) for one of EXPORTS, limited to created_at in start..end."""
+    source, columns, date_column = EXPORTS[name]
+    select = ", ".join(f"{expression} AS {column}" for column, expression in columns)
+    conditions, params = [], []
+    if start:
+        conditions.append(f"{date_column} >= ?")
+        params.append(date.fromisoformat(str(start)).isoformat())
+    if end:
+        conditions.append(f"{date_column} < ?")
+        params.append((date.fromisoformat(str(end)) + timedelta(days=1)).isoformat())
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    # No ORDER BY: rows come in table order, or created_at order through its
+    # index when a range is given; a sort would have to buffer the result
+    return [column for column, _ in columns], f"SELECT {select} FROM {source}{where}", params
+
+
+def export(db, name, out, fmt='csv', start=None, end=None, batch_size=1000):
+    """Write the export to the text stream out and return the number of rows written."""
+    if name not in EXPORTS:
+        raise Exception(f"Error exporting {name}: unknown export")
+    if fmt not in ('csv', 'jsonl'):
+        raise Exception(f"Error exporting {name}: unknown format {fmt}")
+    columns, query, params = export_query(name, start, end)
+    count = 0
+    try:
+        rows = db.stream_query(query, params, batch_size)
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")))
+                out.write("\n")
+                count += 1
+        return count
+    except Exception as e:
+        raise Exception(f"Error exporting {name}: {str(e)}")
+
+
+def export_to_path(db, name, path, fmt=None, start=None, end=None):
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+    if path == '-':
+        return export(db, name, sys.stdout, fmt, start, end)
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        return export(db, name, out, fmt, start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ledgers and products to CSV or JSON Lines")
+    parser.add_argument('export', choices=list(EXPORTS))
+    parser.add_argument('output', help="output file, or - for stdout")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    parser.add_argument('--from', dest='start', help="first created_at date to include")
+    parser.add_argument('--to', dest='end', help="last created_at date to include")
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    args = parser.parse_args()
+
+    with Database(args.db, export_config()) as db:
+        count = export_to_path(db, args.export, args.output, args.format, args.start, args.end)
+    print(f"Exported {count} {args.export} rows.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
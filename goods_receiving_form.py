@@ -2,15 +2,32 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QLineEdit, QComboBox, QDoubleSpinBox, QTextEdit,
                              QPushButton, QMessageBox, QGroupBox, QTableWidget,
                              QTableWidgetItem, QHeaderView)
-from PySide6.QtCore import Qt
-from database import Database
-
-class GoodsReceivingForm(QWidget):
-    def __init__(self, user_id):
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QColor
+from database import get_database, LineValidationError
+from async_database import AsyncDatabase
+from product_picker import ProductPicker
+from services import get_service
+from pricing import price_line
+
+class GoodsReceivingForm(QWidget, ProductPicker):
+    GRN_COLUMNS = ["Product", "Quantity", "Unit", "Rate", "Tax Rate", "Status"]
+
+    def __init__(self, user_id, db=None, async_db=None, service=None):
         super().__init__()
-        self.db = Database()
+        self.db = db if db is not None else get_database()
+        self.async_db = async_db if async_db is not None else AsyncDatabase(self.db, parent=self)
+        # Receipts are priced and recorded by the service, locally or on the API server
+        self.service = service if service is not None else get_service(self.db)
         self.user_id = user_id
+        self.pending_product = None
+        # The selected product's, kept rather than read back from the Tax Rate field
+        self.product_tax_rate = 0
         self.setup_ui()
+        # Loaded once the form is on screen, so its first paint does not wait
+        QTimer.singleShot(0, self.load_data)
+
+    def load_data(self):
         self.load_categories_subcategories()
         self.load_suppliers()
 
@@ -19,25 +36,7 @@ class GoodsReceivingForm(QWidget):
         layout.setSpacing(20)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        # Product Selection Group
-        product_group = QGroupBox("Product Selection")
-        product_layout = QFormLayout()
-        product_layout.setSpacing(15)
-
-        self.category_combo = QComboBox()
-        self.category_combo.currentIndexChanged.connect(self.filter_subcategories)
-        product_layout.addRow("Category:", self.category_combo)
-
-        self.subcategory_combo = QComboBox()
-        self.subcategory_combo.currentIndexChanged.connect(self.filter_products)
-        product_layout.addRow("Subcategory:", self.subcategory_combo)
-
-        self.product_combo = QComboBox()
-        self.product_combo.currentIndexChanged.connect(self.load_product_details)
-        product_layout.addRow("Product:", self.product_combo)
-
-        product_group.setLayout(product_layout)
-        layout.addWidget(product_group)
+        layout.addWidget(self.product_selection_group())
 
         # Supplier Details Group
         supplier_group = QGroupBox("Supplier Details")
@@ -60,6 +59,10 @@ class GoodsReceivingForm(QWidget):
         self.supplier_email.setReadOnly(True)
         supplier_layout.addRow("Email:", self.supplier_email)
 
+        self.reference_input = QLineEdit()
+        self.reference_input.setPlaceholderText("Supplier invoice / delivery note number")
+        supplier_layout.addRow("Reference:", self.reference_input)
+
         supplier_group.setLayout(supplier_layout)
         layout.addWidget(supplier_group)
 
@@ -104,105 +107,77 @@ class GoodsReceivingForm(QWidget):
         button_layout = QHBoxLayout()
         self.receive_button = QPushButton("Receive Goods")
         self.receive_button.clicked.connect(self.receive_goods)
+        self.add_line_button = QPushButton("Add to GRN")
+        self.add_line_button.clicked.connect(self.add_grn_line)
         self.clear_button = QPushButton("Clear")
         self.clear_button.clicked.connect(self.clear_form)
         button_layout.addWidget(self.receive_button)
+        button_layout.addWidget(self.add_line_button)
         button_layout.addWidget(self.clear_button)
         layout.addLayout(button_layout)
 
-    def load_categories_subcategories(self):
-        try:
-            # Load categories
-            categories = self.db.get_all_categories()
-            self.category_combo.clear()
-            self.category_combo.addItem("Select Category", None)
-            for category in categories:
-                self.category_combo.addItem(category[1], category[0])
-
-            # Load subcategories
-            self.filter_subcategories()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
-
-    def filter_subcategories(self):
-        try:
-            category_id = self.category_combo.currentData()
-            self.subcategory_combo.clear()
-            self.subcategory_combo.addItem("Select Subcategory", None)
-            
-            if category_id:
-                subcategories = self.db.get_subcategories_by_category(category_id)
-                for subcategory in subcategories:
-                    self.subcategory_combo.addItem(subcategory[1], subcategory[0])
-            
-            self.filter_products()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load subcategories: {str(e)}")
-
-    def filter_products(self):
-        try:
-            category_id = self.category_combo.currentData()
-            subcategory_id = self.subcategory_combo.currentData()
-            
-            self.product_combo.clear()
-            self.product_combo.addItem("Select Product", None)
-            
-            if category_id and subcategory_id:
-                products = self.db.get_products_by_category_subcategory(category_id, subcategory_id)
-                for product in products:
-                    self.product_combo.addItem(product[1], product[0])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
+        # Goods Received Note Group: pending lines, quantity and rate stay editable
+        grn_group = QGroupBox("Goods Received Note")
+        grn_layout = QVBoxLayout()
+
+        self.grn_table = QTableWidget()
+        self.grn_table.setColumnCount(len(self.GRN_COLUMNS))
+        self.grn_table.setHorizontalHeaderLabels(self.GRN_COLUMNS)
+        self.grn_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.grn_table.setSelectionBehavior(QTableWidget.SelectRows)
+        grn_layout.addWidget(self.grn_table)
+
+        grn_buttons = QHBoxLayout()
+        self.remove_grn_line_button = QPushButton("Remove Line")
+        self.remove_grn_line_button.clicked.connect(self.remove_grn_line)
+        self.post_grn_button = QPushButton("Post GRN")
+        self.post_grn_button.clicked.connect(self.post_grn)
+        grn_buttons.addStretch()
+        grn_buttons.addWidget(self.remove_grn_line_button)
+        grn_buttons.addWidget(self.post_grn_button)
+        grn_layout.addLayout(grn_buttons)
+
+        grn_group.setLayout(grn_layout)
+        layout.addWidget(grn_group)
 
     def load_suppliers(self):
-        try:
-            suppliers = self.db.get_all_suppliers()
-            self.supplier_combo.clear()
-            self.supplier_combo.addItem("Select Supplier", None)
-            for supplier in suppliers:
-                self.supplier_combo.addItem(supplier[1], supplier[0])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load suppliers: {str(e)}")
+        self.async_db.submit('get_all_suppliers', key=(self, 'suppliers'),
+                             on_result=self.populate_suppliers,
+                             on_error=self.show_error("load suppliers"))
+
+    def populate_suppliers(self, suppliers):
+        self.supplier_combo.clear()
+        self.supplier_combo.addItem("Select Supplier", None)
+        for supplier in suppliers:
+            self.supplier_combo.addItem(supplier[1], supplier[0])
 
     def load_product_details(self):
-        try:
-            product_id = self.product_combo.currentData()
-            if product_id:
-                product = self.db.get_product_by_id(product_id)
-                if product:
-                    self.rate_input.setValue(product[7])  # Price
-                    self.tax_rate.setText(f"{product[8]}%")  # Tax Rate
-                    self.unit_input.setText(product[9] or "")  # Default Unit
-                    self.calculate_total()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load product details: {str(e)}")
+        product_id = self.product_combo.currentData()
+        if product_id:
+            self.async_db.submit(self.db.catalog.get_product, product_id, key=(self, 'product_details'),
+                                 on_result=self.show_product_details,
+                                 on_error=self.show_error("load product details"))
+        else:
+            self.async_db.cancel((self, 'product_details'))
+
+    def show_product_details(self, product):
+        if product:
+            self.show_product_fields(product)
 
     def load_supplier_details(self):
-        try:
-            supplier_id = self.supplier_combo.currentData()
-            if supplier_id:
-                supplier = self.db.get_supplier_by_id(supplier_id)
-                if supplier:
-                    self.supplier_name.setText(supplier[1])
-                    self.supplier_phone.setText(supplier[2])
-                    self.supplier_email.setText(supplier[3])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load supplier details: {str(e)}")
-
-    def calculate_total(self):
-        try:
-            quantity = self.quantity_input.value()
-            rate = self.rate_input.value()
-            tax_rate = float(self.tax_rate.text().strip('%'))
-            
-            subtotal = quantity * rate
-            tax_amount = (subtotal * tax_rate) / 100
-            total = subtotal + tax_amount
-            
-            self.tax_amount.setText(f"₹{tax_amount:.2f}")
-            self.total_amount.setText(f"₹{total:.2f}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to calculate total: {str(e)}")
+        supplier_id = self.supplier_combo.currentData()
+        if supplier_id:
+            self.async_db.submit('get_supplier_by_id', supplier_id, key=(self, 'supplier_details'),
+                                 on_result=self.show_supplier_details,
+                                 on_error=self.show_error("load supplier details"))
+        else:
+            self.async_db.cancel((self, 'supplier_details'))
+
+    def show_supplier_details(self, supplier):
+        if supplier:
+            self.supplier_name.setText(supplier[1])
+            self.supplier_phone.setText(supplier[2])
+            self.supplier_email.setText(supplier[3])
 
     def validate_form(self):
         if self.product_combo.currentData() is None:
@@ -227,27 +202,141 @@ class GoodsReceivingForm(QWidget):
         if not self.validate_form():
             return
             
-        try:
-            goods_data = {
-                'product_id': self.product_combo.currentData(),
-                'supplier_id': self.supplier_combo.currentData(),
-                'user_id': self.user_id,
-                'quantity': self.quantity_input.value(),
-                'rate': self.rate_input.value(),
-                'tax_rate': float(self.tax_rate.text().strip('%')),
-                'tax_amount': float(self.tax_amount.text().strip('₹')),
-                'total_amount': float(self.total_amount.text().strip('₹'))
+        goods_data = {
+            'product_id': self.product_combo.currentData(),
+            'supplier_id': self.supplier_combo.currentData(),
+            'user_id': self.user_id,
+            'quantity': self.quantity_input.value(),
+            'rate': self.rate_input.value()
+        }
+
+        self.receive_button.setEnabled(False)
+        self.async_db.submit(self.service.receive_goods, goods_data,
+                             on_result=self.goods_received,
+                             on_error=self.receive_failed)
+
+    def goods_received(self, receipt_id):
+        self.receive_button.setEnabled(True)
+        QMessageBox.information(self, "Success", "Goods received successfully!")
+        self.clear_form()
+
+    def receive_failed(self, error):
+        self.receive_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to receive goods: {str(error)}")
+
+    def add_grn_line(self):
+        product_id = self.product_combo.currentData()
+        if product_id is None:
+            QMessageBox.warning(self, "Validation Error", "Please select a product")
+            return
+
+        row = self.grn_table.rowCount()
+        self.grn_table.insertRow(row)
+        cells = [
+            self.product_combo.currentText(),
+            f"{self.quantity_input.value():g}",
+            self.unit_input.text(),
+            f"{self.rate_input.value():.2f}",
+            self.tax_rate.text(),
+            "Pending",
+        ]
+        for column, text in enumerate(cells):
+            item = QTableWidgetItem(text)
+            if self.GRN_COLUMNS[column] not in ("Quantity", "Rate"):
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+            self.grn_table.setItem(row, column, item)
+        self.grn_table.item(row, 0).setData(Qt.UserRole, product_id)
+        self.grn_table.item(row, 4).setData(Qt.UserRole, self.product_tax_rate)
+
+        self.category_combo.setCurrentIndex(0)
+        self.quantity_input.setValue(1)
+
+    def remove_grn_line(self):
+        row = self.grn_table.currentRow()
+        if row >= 0:
+            self.grn_table.removeRow(row)
+
+    def grn_lines(self):
+        """Read the grid back into line dicts, collecting (line_no, message) for unparseable cells."""
+        lines, errors = [], []
+        for row in range(self.grn_table.rowCount()):
+            line_no = row + 1
+            try:
+                quantity = float(self.grn_table.item(row, 1).text())
+            except ValueError:
+                errors.append((line_no, "Quantity is not a number"))
+                quantity = 0
+            try:
+                rate = float(self.grn_table.item(row, 3).text().strip('₹'))
+            except ValueError:
+                errors.append((line_no, "Rate is not a number"))
+                rate = 0
+            tax_rate = self.grn_table.item(row, 4).data(Qt.UserRole) or 0
+            line = {
+                'product_id': self.grn_table.item(row, 0).data(Qt.UserRole),
+                'quantity': quantity,
+                'rate': rate,
+                'tax_rate': tax_rate
             }
-            
-            self.db.add_goods_receiving(goods_data)
-            QMessageBox.information(self, "Success", "Goods received successfully!")
-            self.clear_form()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to receive goods: {str(e)}")
+            line.update(price_line(quantity, rate, tax_rate))
+            lines.append(line)
+        return lines, errors
+
+    def mark_grn_lines(self, errors):
+        messages = {}
+        for line_no, message in errors:
+            messages.setdefault(line_no, []).append(message)
+        for row in range(self.grn_table.rowCount()):
+            problems = messages.get(row + 1)
+            status = self.grn_table.item(row, 5)
+            status.setText("; ".join(problems) if problems else "OK")
+            colour = QColor("#FFEBEE") if problems else QColor("#FFFFFF")
+            for column in range(self.grn_table.columnCount()):
+                self.grn_table.item(row, column).setBackground(colour)
+
+    def post_grn(self):
+        if self.grn_table.rowCount() == 0:
+            QMessageBox.warning(self, "Validation Error", "Add at least one line to the note")
+            return
+
+        if self.supplier_combo.currentData() is None:
+            QMessageBox.warning(self, "Validation Error", "Please select a supplier")
+            return
+
+        lines, errors = self.grn_lines()
+        if errors:
+            self.post_grn_failed(LineValidationError(errors))
+            return
+
+        self.post_grn_button.setEnabled(False)
+        self.async_db.submit(self.service.post_grn, {
+            'supplier_id': self.supplier_combo.currentData(),
+            'user_id': self.user_id,
+            'reference': self.reference_input.text().strip() or None
+        }, lines, on_result=lambda grn_id: self.grn_posted(grn_id, len(lines)),
+            on_error=self.post_grn_failed)
+
+    def grn_posted(self, grn_id, line_count):
+        self.post_grn_button.setEnabled(True)
+        QMessageBox.information(self, "Success", f"GRN #{grn_id} posted with {line_count} lines!")
+        self.grn_table.setRowCount(0)
+        self.reference_input.clear()
+        self.clear_form()
+
+    def post_grn_failed(self, error):
+        self.post_grn_button.setEnabled(True)
+        if isinstance(error, LineValidationError):
+            self.mark_grn_lines(error.errors)
+            QMessageBox.warning(self, "Validation Error",
+                                f"{len({line_no for line_no, _ in error.errors})} lines need attention; "
+                                "see the Status column.")
+        else:
+            QMessageBox.critical(self, "Error", f"Failed to post GRN: {str(error)}")
 
     def clear_form(self):
         self.category_combo.setCurrentIndex(0)
         self.supplier_combo.setCurrentIndex(0)
+        self.product_tax_rate = 0
         self.quantity_input.setValue(1)
         self.rate_input.setValue(0)
         self.tax_rate.clear()
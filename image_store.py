@@ -0,0 +1,168 @@
+"""Content-addressed store for product images.
+
+    python image_store.py backfill [--db inventory.db] [--root images]
+
+Images are copied into the store under the sha256 of their bytes, so the
+same photo picked for several products is kept once, and a product row
+only needs the hash. Thumbnails of a fixed size are rendered next to the
+originals by a pool of worker processes: decoding a large JPEG takes long
+enough to stall the form, and the GIL would serialize it in a thread.
+
+    <root>/originals/ab/ab12...        the file as ingested
+    <root>/thumbs/48x48/ab/ab12....png the thumbnail, padded to 48x48
+
+backfill ingests the image_path of products added before the store
+existed, sets their image_hash and renders the missing thumbnails.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from database import Database
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+THUMBNAIL_SIZE = (48, 48)
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _write_atomically(target, write):
+    # Readers either see the whole file or none; a crash leaves only a
+    # stray temp file, never a truncated image under a valid hash
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    os.close(handle)
+    try:
+        write(temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def make_thumbnail(source, target, size=THUMBNAIL_SIZE):
+    """Render source as a PNG of exactly size, scaled to fit and centred.
+
+    Runs in the worker processes, so it only takes paths and imports
+    Pillow itself.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # JPEG can decode straight at 1/2 to 1/8 scale, far cheaper than
+        # decoding every pixel and scaling down afterwards
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        canvas = Image.new('RGBA', size, (255, 255, 255, 0))
+        canvas.paste(image.convert('RGBA'), ((size[0] - image.width) // 2, (size[1] - image.height) // 2))
+    _write_atomically(target, lambda path: canvas.save(path, 'PNG'))
+    return target
+
+
+class ImageStore:
+    def __init__(self, root="images", thumbnail_size=THUMBNAIL_SIZE, max_workers=None):
+        self.root = root
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._pool = None
+        # submit_thumbnail is called from ThumbnailCache's loader threads
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def for_database(cls, db, **kwargs):
+        """The store kept in an images directory next to the database file."""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "images"), **kwargs)
+
+    def original_path(self, digest):
+        return os.path.join(self.root, "originals", digest[:2], digest)
+
+    def thumbnail_path(self, digest):
+        width, height = self.thumbnail_size
+        return os.path.join(self.root, "thumbs", f"{width}x{height}", digest[:2], digest + ".png")
+
+    def has_thumbnail(self, digest):
+        return os.path.exists(self.thumbnail_path(digest))
+
+    def ingest(self, path):
+        """Copy the image at path into the store and return its hash."""
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            raise Exception(f"Error storing image {path}: not a PNG, JPEG or BMP file")
+        try:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            digest = digest.hexdigest()
+            target = self.original_path(digest)
+            if not os.path.exists(target):
+                _write_atomically(target, lambda temp_path: shutil.copyfile(path, temp_path))
+            return digest
+        except OSError as e:
+            raise Exception(f"Error storing image {path}: {str(e)}")
+
+    def submit_thumbnail(self, digest):
+        """Render the thumbnail for digest in the worker pool; returns a Future of its path."""
+        with self._pool_lock:
+            if self._pool is None:
+                # Imported on first use, to keep them out of the app's startup
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn, not fork: forking a process that runs Qt and SQLite
+                # threads can leave the child holding their locks
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool.submit(make_thumbnail, self.original_path(digest),
+                                     self.thumbnail_path(digest), self.thumbnail_size)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def backfill(db, store):
+    """Ingest the image_path of products without an image_hash; returns (stored, missing) counts."""
+    rows = db.execute_query(
+        "SELECT id, image_path FROM products WHERE image_hash IS NULL AND image_path IS NOT NULL AND image_path != ''"
+    )
+    stored, missing, futures = 0, 0, {}
+    for row in rows:
+        if not os.path.isfile(row['image_path']):
+            missing += 1
+            continue
+        digest = store.ingest(row['image_path'])
+        db.set_product_image(row['id'], digest)
+        stored += 1
+        if digest not in futures and not store.has_thumbnail(digest):
+            futures[digest] = store.submit_thumbnail(digest)
+    for digest, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            print(f"thumbnail {digest}: {str(e)}", file=sys.stderr)
+    return stored, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the product image store")
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    parser.add_argument('--root', help="image store directory (default: images next to the database)")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        store = ImageStore(args.root) if args.root else ImageStore.for_database(db)
+        try:
+            stored, missing = backfill(db, store)
+        finally:
+            store.close()
+    print(f"Stored {stored} product images; {missing} image files not found.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""Shelf labels with a QR code or a Code128 barcode, laid out on printable sheets.
+
+    python label_generator.py labels.pdf --ids 12 13 14
+    python label_generator.py labels.pdf --category Beverages [--subcategory Tea]
+    python label_generator.py sheet.png --created-since 2025-03-01 --style barcode --copies 2
+
+Each label shows the product name, SKU and price beside a QR code of
+label_payload(product), which the Scan field of the forms reads back as the
+product, or above a Code128 barcode of its barcode (or SKU). Sheets are
+rendered in black and white at the layout's resolution by a pool of worker
+processes. A PDF is written page by page as the sheets come back; PNG output
+writes one file per sheet (sheet-001.png, sheet-002.png, ...).
+"""
+import argparse
+import os
+import sys
+import zlib
+from collections import deque
+from functools import lru_cache
+from itertools import chain
+
+from label_payload import label_payload
+
+PRICE_FORMAT = "₹{:.2f}"
+# Tried in order; Pillow looks them up in the system font directories
+FONT_FILES = ("segoeui.ttf", "arial.ttf", "DejaVuSans.ttf")
+BOLD_FONT_FILES = ("segoeuib.ttf", "arialbd.ttf", "DejaVuSans-Bold.ttf")
+# Choosing the mask by scoring all eight encodes every code eight more
+# times, most of the cost of a label; any mask scans
+QR_MASK_PATTERN = 2
+# Sheets queued per worker process ahead of the one being written out
+SHEETS_IN_FLIGHT = 2
+
+# Code128 bar/space widths for symbol values 0-105, then the stop pattern
+CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+CODE128_START_B = 104
+CODE128_START_C = 105
+CODE128_CODE_C = 99
+CODE128_STOP = 106
+CODE128_QUIET_ZONE = 10  # modules of white either side
+
+
+def code128_symbols(data):
+    """Symbol values for data, including the start and check symbols but not the stop."""
+    if any(not 32 <= ord(ch) <= 126 for ch in data):
+        raise ValueError(f"cannot encode {data!r} in Code128")
+    if data.isdigit() and len(data) >= 4:
+        # Code set C packs two digits per symbol; an odd leading digit goes in set B
+        if len(data) % 2:
+            symbols = [CODE128_START_B, ord(data[0]) - 32, CODE128_CODE_C]
+            data = data[1:]
+        else:
+            symbols = [CODE128_START_C]
+        symbols += [int(data[i:i + 2]) for i in range(0, len(data), 2)]
+    else:
+        symbols = [CODE128_START_B] + [ord(ch) - 32 for ch in data]
+    check = (symbols[0] + sum(position * value for position, value in enumerate(symbols[1:], 1))) % 103
+    return symbols + [check]
+
+
+def code128_widths(data):
+    """Alternating bar and space widths, in modules, for the whole barcode."""
+    return "".join(CODE128_PATTERNS[value] for value in code128_symbols(data) + [CODE128_STOP])
+
+
+class SheetLayout:
+    """A sheet of equal labels in a grid, measured in millimetres."""
+
+    def __init__(self, page_mm, label_mm, columns, rows, margin_mm, gap_mm=(0, 0), dpi=300):
+        self.page_mm = page_mm
+        self.label_mm = label_mm
+        self.columns = columns
+        self.rows = rows
+        self.margin_mm = margin_mm
+        self.gap_mm = gap_mm
+        self.dpi = dpi
+
+    def px(self, mm):
+        return round(mm * self.dpi / 25.4)
+
+    @property
+    def labels_per_sheet(self):
+        return self.columns * self.rows
+
+    @property
+    def page_size(self):
+        return self.px(self.page_mm[0]), self.px(self.page_mm[1])
+
+    @property
+    def label_size(self):
+        return self.px(self.label_mm[0]), self.px(self.label_mm[1])
+
+    def position(self, index):
+        column, row = index % self.columns, index // self.columns
+        return (self.px(self.margin_mm[0] + column * (self.label_mm[0] + self.gap_mm[0])),
+                self.px(self.margin_mm[1] + row * (self.label_mm[1] + self.gap_mm[1])))
+
+
+LAYOUTS = {
+    # 21 labels of 63.5 x 38.1 mm (Avery L7160 and compatibles)
+    'a4-21': SheetLayout((210, 297), (63.5, 38.1), 3, 7, (7.25, 15.15), (2.5, 0)),
+    # 40 labels of 45.7 x 25.4 mm (Avery L7654 and compatibles)
+    'a4-40': SheetLayout((210, 297), (45.7, 25.4), 4, 10, (9.7, 21.5), (2.6, 0)),
+}
+
+
+@lru_cache(maxsize=None)
+def _font(size, bold=False):
+    from PIL import ImageFont
+
+    for name in BOLD_FONT_FILES if bold else FONT_FILES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def _sized_to_fit(draw, text, size, width, bold=False):
+    while size > 8 and draw.textlength(text, font=_font(size, bold)) > width:
+        size -= 1
+    return _font(size, bold)
+
+
+def _fit(draw, text, font, width):
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _wrap(draw, text, font, width, lines):
+    words = text.split()
+    result = []
+    while words and len(result) < lines:
+        line = words.pop(0)
+        while words and draw.textlength(line + " " + words[0], font=font) <= width:
+            line += " " + words.pop(0)
+        result.append(line)
+    if words:
+        result[-1] = _fit(draw, result[-1] + " " + " ".join(words), font, width)
+    return [_fit(draw, line, font, width) for line in result]
+
+
+def _qr_matrix(payload):
+    import qrcode
+
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0,
+                         mask_pattern=QR_MASK_PATTERN)
+    code.add_data(payload)
+    code.make(fit=True)
+    return code.get_matrix()
+
+
+def _draw_qr(image, payload, left, top, side):
+    from PIL import Image
+
+    matrix = _qr_matrix(payload)
+    count = len(matrix)
+    # Whole pixels per module keep every module the same size; 2 modules of quiet zone
+    module = side // (count + 4)
+    small = Image.new('1', (count, count), 1)
+    small.putdata([0 if dark else 1 for row in matrix for dark in row])
+    offset = (side - module * count) // 2
+    image.paste(small.resize((module * count, module * count), Image.Resampling.NEAREST),
+                (left + offset, top + offset))
+
+
+def _draw_code128(draw, data, left, top, width, height):
+    widths = code128_widths(data)
+    modules = sum(int(bar) for bar in widths)
+    module = max(1, width // (modules + 2 * CODE128_QUIET_ZONE))
+    x = left + (width - module * modules) // 2
+    for index, bar in enumerate(widths):
+        bar_width = int(bar) * module
+        if index % 2 == 0:
+            draw.rectangle((x, top, x + bar_width - 1, top + height - 1), fill=0)
+        x += bar_width
+
+
+@lru_cache(maxsize=512)
+def render_label(size, label):
+    """Render one label, given as (style, code, name, sku, price), as a 1-bit image.
+
+    Cached, so the copies of a label and repeated products render once per worker.
+    """
+    from PIL import Image, ImageDraw
+
+    style, code, name, sku, price = label
+    width, height = size
+    image = Image.new('1', size, 1)
+    draw = ImageDraw.Draw(image)
+    pad = max(4, height // 16)
+    text_font = _font(max(10, height // 9))
+    small_font = _font(max(8, height // 12))
+
+    if style == 'qr':
+        side = min(height - 2 * pad, width * 2 // 5)
+        _draw_qr(image, code, pad, (height - side) // 2, side)
+        left = side + 2 * pad
+        text_width = width - left - pad
+        price_font = _sized_to_fit(draw, price, max(12, height // 6), text_width, bold=True)
+        y = pad
+        for line in _wrap(draw, name, text_font, text_width, 2):
+            draw.text((left, y), line, font=text_font, fill=0)
+            y += text_font.size + text_font.size // 4
+        if sku:
+            draw.text((left, y), _fit(draw, sku, small_font, text_width), font=small_font, fill=0)
+        draw.text((left, height - pad - price_font.size), price, font=price_font, fill=0)
+    else:
+        text_width = width - 2 * pad
+        price_font = _sized_to_fit(draw, price, max(12, height // 6), text_width // 2, bold=True)
+        draw.text((pad, pad), _fit(draw, name, text_font, text_width), font=text_font, fill=0)
+        bottom = height - pad - price_font.size
+        bars_top = pad + text_font.size + pad // 2
+        _draw_code128(draw, code, pad, bars_top, text_width, bottom - pad // 2 - small_font.size - bars_top)
+        draw.text((pad, bottom - small_font.size), code, font=small_font, fill=0)
+        draw.text((width - pad - draw.textlength(price, font=price_font), bottom), price, font=price_font, fill=0)
+    return image
+
+
+def render_sheet(layout, labels, png_path=None):
+    """Render up to layout.labels_per_sheet labels on one page.
+
+    Runs in the worker processes. Writes the page to png_path if given,
+    otherwise returns (size, zlib-compressed 1-bit rows) for PdfWriter.
+    """
+    from PIL import Image
+
+    page = Image.new('1', layout.page_size, 1)
+    for index, label in enumerate(labels):
+        page.paste(render_label(layout.label_size, label), layout.position(index))
+    if png_path is not None:
+        page.save(png_path, 'PNG', dpi=(layout.dpi, layout.dpi))
+        return None
+    return page.size, zlib.compress(page.tobytes(), 6)
+
+
+class PdfWriter:
+    """A PDF of black and white page images, written one page at a time.
+
+    Only the offsets of the objects written so far are kept in memory, so
+    a run of thousands of sheets never holds more than one page.
+    """
+
+    def __init__(self, handle, dpi):
+        self.handle = handle
+        self.dpi = dpi
+        self.offsets = {}
+        self.pages = []
+        self.next_object = 3  # 1 is the catalog, 2 the page tree; both written last
+        handle.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_object(self, number, body, stream=None):
+        self.offsets[number] = self.handle.tell()
+        self.handle.write(f"{number} 0 obj\n".encode() + body)
+        if stream is not None:
+            self.handle.write(b"\nstream\n" + stream + b"\nendstream")
+        self.handle.write(b"\nendobj\n")
+
+    def add_page(self, size, data):
+        width, height = size
+        image, content, page = self.next_object, self.next_object + 1, self.next_object + 2
+        self.next_object += 3
+        points_wide, points_high = width * 72 / self.dpi, height * 72 / self.dpi
+        # In 1-bit DeviceGray a set bit is white, as in Pillow's mode '1'
+        self._write_object(image, (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceGray "
+            f"/BitsPerComponent 1 /Filter /FlateDecode /Length {len(data)} >>"
+        ).encode(), data)
+        drawing = f"q {points_wide:.2f} 0 0 {points_high:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._write_object(content, f"<< /Length {len(drawing)} >>".encode(), drawing)
+        self._write_object(page, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {points_wide:.2f} {points_high:.2f}] "
+            f"/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R >>"
+        ).encode())
+        self.pages.append(page)
+
+    def close(self):
+        kids = " ".join(f"{page} 0 R" for page in self.pages)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.handle.tell()
+        self.handle.write(f"xref\n0 {self.next_object}\n0000000000 65535 f \n".encode())
+        for number in range(1, self.next_object):
+            self.handle.write(f"{self.offsets[number]:010d} 00000 n \n".encode())
+        self.handle.write(f"trailer\n<< /Size {self.next_object} /Root 1 0 R >>\n"
+                          f"startxref\n{xref}\n%%EOF\n".encode())
+
+
+class LabelGenerator:
+    """Selects products and renders their labels to a PDF or PNG sheets.
+
+    Sheets go to a pool of worker processes once a job needs more than
+    one; workers=0 renders everything in this process.
+    """
+
+    def __init__(self, db, layout='a4-21', style='qr', workers=None):
+        if layout not in LAYOUTS:
+            raise Exception(f"Error generating labels: unknown layout {layout}")
+        if style not in ('qr', 'barcode'):
+            raise Exception(f"Error generating labels: unknown style {style}")
+        self.db = db
+        self.layout = LAYOUTS[layout]
+        self.style = style
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+
+    def products(self, ids=None, category_id=None, subcategory_id=None, created_since=None):
+        """Stream the products to label: the given ids in that order, or those matching the filters by name."""
+        columns = "SELECT p.id, p.name, p.sku_id, p.barcode, p.price FROM products p"
+        if ids is not None:
+            wanted = [int(product_id) for product_id in ids]
+            found = {}
+            for start in range(0, len(wanted), 500):
+                batch = wanted[start:start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                for row in self.db.execute_query(f"{columns} WHERE p.id IN ({placeholders})", batch):
+                    found[row['id']] = row
+            return (found[product_id] for product_id in wanted if product_id in found)
+        conditions, params = [], []
+        if category_id is not None:
+            conditions.append("p.category_id = ?")
+            params.append(category_id)
+        if subcategory_id is not None:
+            conditions.append("p.subcategory_id = ?")
+            params.append(subcategory_id)
+        if created_since is not None:
+            conditions.append("p.created_at >= ?")
+            params.append(str(created_since))
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return self.db.stream_query(f"{columns}{where} ORDER BY p.name, p.id", params)
+
+    def label(self, product):
+        price = PRICE_FORMAT.format(product['price'])
+        code = product['barcode'] or product['sku_id']
+        if self.style == 'barcode' and code and all(32 <= ord(ch) <= 126 for ch in code):
+            return ('barcode', code, product['name'], product['sku_id'] or "", price)
+        # Products without a code Code128 can carry get the QR label
+        return ('qr', label_payload(product), product['name'], product['sku_id'] or "", price)
+
+    def _sheets(self, products, copies):
+        sheet = []
+        for product in products:
+            label = self.label(product)
+            for _ in range(copies):
+                sheet.append(label)
+                if len(sheet) == self.layout.labels_per_sheet:
+                    yield sheet
+                    sheet = []
+        if sheet:
+            yield sheet
+
+    def render(self, products, path, copies=1, progress=None):
+        """Render the labels of products to path (.pdf or .png) and return (labels, sheets).
+
+        progress, if given, is called with (labels, sheets) after each sheet.
+        """
+        png = path.lower().endswith('.png')
+        stem = os.path.splitext(path)[0]
+        jobs = ((sheet, f"{stem}-{number:03d}.png" if png else None)
+                for number, sheet in enumerate(self._sheets(products, copies), 1))
+        done = [0, 0]
+        handle = None
+        try:
+            writer = None
+            if not png:
+                handle = open(path, 'wb')
+                writer = PdfWriter(handle, self.layout.dpi)
+
+            def finish(result, count):
+                if writer is not None:
+                    writer.add_page(*result)
+                done[0] += count
+                done[1] += 1
+                if progress is not None:
+                    progress(done[0], done[1])
+
+            self._render_sheets(jobs, finish)
+            if writer is not None:
+                writer.close()
+            return done[0], done[1]
+        except Exception as e:
+            raise Exception(f"Error generating labels: {str(e)}")
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def _render_sheets(self, jobs, finish):
+        first = next(jobs, None)
+        second = next(jobs, None) if first is not None else None
+        if second is None or self.workers == 0:
+            # A one-sheet job never pays for starting the workers
+            for sheet, png_path in chain(filter(None, (first, second)), jobs):
+                finish(render_sheet(self.layout, sheet, png_path), len(sheet))
+            return
+        # Imported here: the pool machinery is slow to import and only
+        # needed once a render is big enough to spread over processes
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            pending = deque()
+            for sheet, png_path in chain((second,), jobs):
+                pending.append((pool.submit(render_sheet, self.layout, sheet, png_path), len(sheet)))
+                if first is not None:
+                    # The first sheet renders here while the workers start
+                    finish(render_sheet(self.layout, *first), len(first[0]))
+                    first = None
+                # Bounded read-ahead: sheets are written in order and memory
+                # stays flat however many products are labelled
+                if len(pending) >= SHEETS_IN_FLIGHT * self.workers:
+                    future, count = pending.popleft()
+                    finish(future.result(), count)
+            while pending:
+                future, count = pending.popleft()
+                finish(future.result(), count)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+
+def main():
+    from database import Database
+
+    parser = argparse.ArgumentParser(description="Print product shelf labels to a PDF or PNG sheets")
+    parser.add_argument('output', help="labels.pdf, or sheet.png for sheet-001.png, sheet-002.png, ...")
+    parser.add_argument('--ids', type=int, nargs='+', help="product ids, labelled in this order")
+    parser.add_argument('--category', help="category name")
+    parser.add_argument('--subcategory', help="subcategory name within --category")
+    parser.add_argument('--created-since', help="only products added on or after this date/time")
+    parser.add_argument('--style', choices=['qr', 'barcode'], default='qr')
+    parser.add_argument('--layout', choices=list(LAYOUTS), default='a4-21')
+    parser.add_argument('--copies', type=int, default=1, help="labels per product (default: 1)")
+    parser.add_argument('--workers', type=int, help="render processes, 0 for none (default: up to 4)")
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        category_id = subcategory_id = None
+        if args.category:
+            rows = db.execute_query("SELECT id FROM categories WHERE name = ? COLLATE NOCASE", (args.category,))
+            if not rows:
+                parser.error(f"no category named {args.category}")
+            category_id = rows[0]['id']
+        if args.subcategory:
+            if category_id is None:
+                parser.error("--subcategory needs --category")
+            rows = db.execute_query("SELECT id FROM subcategories WHERE category_id = ? AND name = ? COLLATE NOCASE",
+                                    (category_id, args.subcategory))
+            if not rows:
+                parser.error(f"no subcategory named {args.subcategory} in {args.category}")
+            subcategory_id = rows[0]['id']
+        generator = LabelGenerator(db, args.layout, args.style, args.workers)
+        products = generator.products(args.ids, category_id, subcategory_id, args.created_since)
+        labels, sheets = generator.render(products, args.output, args.copies)
+    print(f"Rendered {labels} labels on {sheets} sheets.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""The text of the QR code on a shelf label, and reading a product id back from it.
+
+Kept apart from label_generator.py so the catalog can recognise a scanned
+label without loading the label printing code.
+"""
+
+LABEL_PAYLOAD_PREFIX = "IMS;"
+
+
+def label_payload(product):
+    """Text of the QR code on a product's label."""
+    return f"{LABEL_PAYLOAD_PREFIX}id={product['id']};sku={product['sku_id'] or ''};price={product['price']:.2f}"
+
+
+def product_id_from_payload(code):
+    """The product id in a scanned label_payload(), or None for any other code."""
+    if not code.startswith(LABEL_PAYLOAD_PREFIX):
+        return None
+    for field in code[len(LABEL_PAYLOAD_PREFIX):].split(";"):
+        name, _, value = field.partition("=")
+        if name == "id" and value.isdigit():
+            return int(value)
+    return None
@@ -1,12 +1,11 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QGridLayout, QLineEdit, QPushButton, QMessageBox, QLabel, QCheckBox, QFrame, QHBoxLayout)
 from PySide6.QtCore import Qt
-from main_window import MainWindow
-from database import Database
+from database import get_database
 
 class LoginWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
-        self.db = Database()
+        self.db = db if db is not None else get_database()
         self.setup_ui()
 
     def setup_ui(self):
@@ -146,7 +145,9 @@ class LoginWindow(QMainWindow):
         try:
             user_id = self.db.validate_user(username, password)
             if user_id:
-                self.main_window = MainWindow(user_id)
+                # Imported on login so the login window appears without waiting for the forms
+                from main_window import MainWindow
+                self.main_window = MainWindow(user_id, self.db)
                 self.main_window.show()
                 self.close()
             else:
@@ -1,14 +1,20 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QStackedWidget, QMessageBox)
 from PySide6.QtCore import Qt
-from product_master_form import ProductMasterForm
-from goods_receiving_form import GoodsReceivingForm
-from sales_form import SalesForm
+from PySide6.QtGui import QKeySequence, QShortcut
+from database import get_database
+from async_database import AsyncDatabase
+from services import get_service
 
 class MainWindow(QMainWindow):
-    def __init__(self, user_id):
+    def __init__(self, user_id, db=None):
         super().__init__()
         self.user_id = user_id
+        self.db = db if db is not None else get_database()
+        # One worker pool shared by every form
+        self.async_db = AsyncDatabase(self.db, parent=self)
+        # Where sales and receipts are recorded: this database, or IMS_API_URL
+        self.service = get_service(self.db)
         self.setup_ui()
 
     def setup_ui(self):
@@ -38,31 +44,70 @@ class MainWindow(QMainWindow):
         self.sales_btn.clicked.connect(lambda: self.show_form(2))
         nav_layout.addWidget(self.sales_btn)
 
+        self.reports_btn = QPushButton("Reports")
+        self.reports_btn.clicked.connect(lambda: self.show_form(3))
+        nav_layout.addWidget(self.reports_btn)
+
         nav_layout.addStretch()
         main_layout.addWidget(nav_widget)
 
-        # Create stacked widget for forms
+        # Create stacked widget for forms; each form is built the first
+        # time it is shown, so startup only pays for the first one
         self.stacked_widget = QStackedWidget()
-        
-        # Add forms to stacked widget
-        self.product_master_form = ProductMasterForm()
-        self.goods_receiving_form = GoodsReceivingForm(self.user_id)
-        self.sales_form = SalesForm(self.user_id)
-        
-        self.stacked_widget.addWidget(self.product_master_form)
-        self.stacked_widget.addWidget(self.goods_receiving_form)
-        self.stacked_widget.addWidget(self.sales_form)
-        
+        self.forms = {}
         main_layout.addWidget(self.stacked_widget)
 
+        # A hidden page of query timings for support, see query_stats.py
+        self.diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.diagnostics_shortcut.activated.connect(lambda: self.show_form(4))
+
         # Set initial form
         self.show_form(0)
 
+    def create_form(self, index):
+        # A form's module is only imported when the form is first needed
+        if index == 0:
+            from product_master_form import ProductMasterForm
+            return ProductMasterForm(self.db, self.async_db)
+        if index == 1:
+            from goods_receiving_form import GoodsReceivingForm
+            return GoodsReceivingForm(self.user_id, self.db, self.async_db, self.service)
+        if index == 2:
+            from sales_form import SalesForm
+            return SalesForm(self.user_id, self.db, self.async_db, self.service)
+        if index == 3:
+            from reports_form import ReportsForm
+            return ReportsForm(self.db, self.async_db)
+        from diagnostics_form import DiagnosticsForm
+        return DiagnosticsForm(self.db)
+
+    def form(self, index):
+        if index not in self.forms:
+            self.forms[index] = self.create_form(index)
+            self.stacked_widget.addWidget(self.forms[index])
+        return self.forms[index]
+
+    @property
+    def product_master_form(self):
+        return self.form(0)
+
+    @property
+    def goods_receiving_form(self):
+        return self.form(1)
+
+    @property
+    def sales_form(self):
+        return self.form(2)
+
+    @property
+    def reports_form(self):
+        return self.form(3)
+
     def show_form(self, index):
-        self.stacked_widget.setCurrentIndex(index)
+        self.stacked_widget.setCurrentWidget(self.form(index))
         
         # Update button styles
-        buttons = [self.product_master_btn, self.goods_receiving_btn, self.sales_btn]
+        buttons = [self.product_master_btn, self.goods_receiving_btn, self.sales_btn, self.reports_btn]
         for i, btn in enumerate(buttons):
             if i == index:
                 btn.setStyleSheet("""
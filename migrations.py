@@ -0,0 +1,453 @@
+"""Ordered schema migrations for inventory.db.
+
+Each migration is applied at most once, inside its own transaction, and the
+highest applied number is recorded in PRAGMA user_version. Steps only use
+IF NOT EXISTS / OR IGNORE statements so re-running one is harmless.
+
+    python migrations.py [path/to/inventory.db]
+"""
+import sqlite3
+import sys
+
+
+def _add_column(cursor, table, column, definition):
+    # ALTER TABLE ... ADD COLUMN has no IF NOT EXISTS form
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _initial_schema(cursor):
+    # Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Categories table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Subcategories table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS subcategories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            UNIQUE (category_id, name)
+        )
+    ''')
+
+    # Products table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            barcode TEXT,
+            sku_id TEXT,
+            name TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            subcategory_id INTEGER NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            tax_rate REAL NOT NULL,
+            default_unit TEXT,
+            image_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories (id),
+            FOREIGN KEY (subcategory_id) REFERENCES subcategories (id)
+        )
+    ''')
+
+    # Suppliers table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Customers table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Goods Receiving table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS goods_receiving (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            rate REAL NOT NULL,
+            tax_rate REAL NOT NULL,
+            tax_amount REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Sales table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            rate REAL NOT NULL,
+            tax_rate REAL NOT NULL,
+            tax_amount REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            FOREIGN KEY (customer_id) REFERENCES customers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Create default admin user if not exists
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (username, password)
+        VALUES (?, ?)
+    ''', ('admin', 'admin'))
+
+
+def _lookup_indexes(cursor):
+    # Category -> subcategory -> product combos filter on both ids and sort by name
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_products_category_subcategory_name
+        ON products (category_id, subcategory_id, name)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_barcode ON products (barcode)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_sku_id ON products (sku_id)")
+
+    # Ledger history per product, and per period for reporting
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_sales_product_created
+        ON sales (product_id, created_at)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_created ON sales (created_at)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_goods_receiving_product_created
+        ON goods_receiving (product_id, created_at)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_goods_receiving_created ON goods_receiving (created_at)")
+
+
+def _stock_levels(cursor):
+    # On-hand quantity per product, kept in step with every receipt and sale
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_levels (
+            product_id INTEGER PRIMARY KEY,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products (id)
+        )
+    ''')
+    # Seed it from whatever history already exists
+    cursor.execute('''
+        INSERT OR REPLACE INTO stock_levels (product_id, quantity)
+        SELECT product_id, SUM(quantity) FROM (
+            SELECT product_id, quantity FROM goods_receiving
+            UNION ALL
+            SELECT product_id, -quantity FROM sales
+        )
+        GROUP BY product_id
+    ''')
+
+
+def _invoices(cursor):
+    # Multi-line sales: one header per checkout and one row per cart line
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS invoices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            line_count INTEGER NOT NULL,
+            subtotal REAL NOT NULL,
+            tax_amount REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER NOT NULL,
+            line_no INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            rate REAL NOT NULL,
+            tax_rate REAL NOT NULL,
+            tax_amount REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            FOREIGN KEY (invoice_id) REFERENCES invoices (id),
+            FOREIGN KEY (product_id) REFERENCES products (id),
+            UNIQUE (invoice_id, line_no)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_created ON invoices (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoice_lines_product ON invoice_lines (product_id)")
+
+
+def _goods_receipt_notes(cursor):
+    # A GRN groups the goods_receiving lines of one delivery under its supplier
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS goods_receipt_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            reference TEXT,
+            line_count INTEGER NOT NULL,
+            subtotal REAL NOT NULL,
+            tax_amount REAL NOT NULL,
+            total_amount REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    _add_column(cursor, "goods_receiving", "grn_id", "INTEGER REFERENCES goods_receipt_notes (id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_goods_receiving_grn ON goods_receiving (grn_id)")
+
+
+def _product_name_index(cursor):
+    # Keyset pagination of the product list walks (name, id); the rowid is
+    # part of every index entry, so name alone covers both
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)")
+
+
+def _product_search(cursor):
+    # External-content FTS5 index: the text lives only in products and the
+    # triggers keep the index in step with every insert, update and delete.
+    # prefix='2 3 4 5' indexes the prefixes search-as-you-type sends while
+    # a word is being typed; without it a prefix shared by a large part of
+    # the catalog makes FTS5 merge all of its doclists per key stroke.
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+                name, description, barcode, sku_id,
+                content='products', content_rowid='id', prefix='2 3 4 5'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5; search_products falls back to LIKE
+        if "no such module" in str(e):
+            return
+        raise
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, description, barcode, sku_id)
+            VALUES (new.id, new.name, new.description, new.barcode, new.sku_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, barcode, sku_id)
+            VALUES ('delete', old.id, old.name, old.description, old.barcode, old.sku_id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, barcode, sku_id)
+            VALUES ('delete', old.id, old.name, old.description, old.barcode, old.sku_id);
+            INSERT INTO products_fts (rowid, name, description, barcode, sku_id)
+            VALUES (new.id, new.name, new.description, new.barcode, new.sku_id);
+        END
+    ''')
+    cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+# Rollup tables: rollup -> (key columns, ((table, period expression), ...)).
+# The *_daily tables use 'YYYY-MM-DD' periods, the *_monthly ones 'YYYY-MM'.
+ROLLUPS = {
+    'sales': (("product_id",),
+              (("sales_daily", "date({at})"), ("sales_monthly", "strftime('%Y-%m', {at})"))),
+    'purchases': (("supplier_id", "product_id"),
+                  (("purchases_daily", "date({at})"), ("purchases_monthly", "strftime('%Y-%m', {at})"))),
+}
+# Ledger -> (rollup it feeds, timestamp of a ledger row)
+ROLLUP_SOURCES = {
+    'sales': ('sales', "{row}.created_at"),
+    'invoice_lines': ('sales', "(SELECT created_at FROM invoices WHERE id = {row}.invoice_id)"),
+    'goods_receiving': ('purchases', "{row}.created_at"),
+}
+
+
+def _rollup_upsert(table, keys, values):
+    return f'''
+        INSERT INTO {table} (period, {", ".join(keys)}, quantity, tax_amount, total_amount, line_count)
+        {values}
+        ON CONFLICT (period, {", ".join(keys)}) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            tax_amount = tax_amount + excluded.tax_amount,
+            total_amount = total_amount + excluded.total_amount,
+            line_count = line_count + excluded.line_count'''
+
+
+def _rollup_trigger_body(ledger, row, sign):
+    # Add (sign "") or remove (sign "-") the ledger row NEW/OLD in every grain
+    rollup, at = ROLLUP_SOURCES[ledger]
+    keys, grains = ROLLUPS[rollup]
+    statements = []
+    for table, period in grains:
+        values = (f"VALUES ({period.format(at=at.format(row=row))}, "
+                  + "".join(f"{row}.{key}, " for key in keys)
+                  + f"{sign}{row}.quantity, {sign}{row}.tax_amount, {sign}{row}.total_amount, {sign}1)")
+        statements.append(_rollup_upsert(table, keys, values) + ";")
+    return "".join(statements)
+
+
+def rebuild_rollups(cursor):
+    """Recompute every rollup table from the ledgers."""
+    for keys, grains in ROLLUPS.values():
+        for table, _ in grains:
+            cursor.execute(f"DELETE FROM {table}")
+    for ledger, (rollup, at) in ROLLUP_SOURCES.items():
+        keys, grains = ROLLUPS[rollup]
+        for table, period in grains:
+            # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+            cursor.execute(_rollup_upsert(table, keys, f'''
+                SELECT {period.format(at=at.format(row="l"))}, {", ".join(keys)},
+                       SUM(quantity), SUM(tax_amount), SUM(total_amount), COUNT(*)
+                FROM {ledger} l
+                WHERE true
+                GROUP BY 1, {", ".join(keys)}'''))
+
+
+def _rollups(cursor):
+    # Reports read these instead of scanning the ledgers; triggers keep
+    # them current in the same transaction as every ledger write
+    for keys, grains in ROLLUPS.values():
+        for table, _ in grains:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    period TEXT NOT NULL,
+                    {"".join(f"{key} INTEGER NOT NULL, " for key in keys)}
+                    quantity REAL NOT NULL,
+                    tax_amount REAL NOT NULL,
+                    total_amount REAL NOT NULL,
+                    line_count INTEGER NOT NULL,
+                    PRIMARY KEY (period, {", ".join(keys)})
+                ) WITHOUT ROWID
+            ''')
+    for ledger in ROLLUP_SOURCES:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {ledger}_rollup_ai AFTER INSERT ON {ledger} BEGIN
+                {_rollup_trigger_body(ledger, "new", "")}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {ledger}_rollup_ad AFTER DELETE ON {ledger} BEGIN
+                {_rollup_trigger_body(ledger, "old", "-")}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {ledger}_rollup_au AFTER UPDATE ON {ledger} BEGIN
+                {_rollup_trigger_body(ledger, "old", "-")}
+                {_rollup_trigger_body(ledger, "new", "")}
+            END
+        ''')
+    rebuild_rollups(cursor)
+
+
+def _product_image_hash(cursor):
+    # sha256 of the product image in the ImageStore; image_path keeps the
+    # file the image was taken from
+    _add_column(cursor, "products", "image_hash", "TEXT")
+
+
+def _document_rounding(cursor):
+    # The pricing.py rule each invoice and GRN was priced with, so an audit
+    # re-prices it the same way whatever IMS_TAX_ROUNDING says now. Earlier
+    # documents rounded every line on its own
+    _add_column(cursor, "invoices", "rounding", "TEXT NOT NULL DEFAULT 'line'")
+    _add_column(cursor, "goods_receipt_notes", "rounding", "TEXT NOT NULL DEFAULT 'line'")
+
+
+# (version, description, step) in the order they must be applied
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "indexes for product and ledger lookups", _lookup_indexes),
+    (3, "materialized stock levels", _stock_levels),
+    (4, "multi-line sales invoices", _invoices),
+    (5, "goods receipt notes", _goods_receipt_notes),
+    (6, "product list pagination index", _product_name_index),
+    (7, "full-text product search", _product_search),
+    (8, "sales and purchase rollups for reports", _rollups),
+    (9, "content-addressed product images", _product_image_hash),
+    (10, "tax rounding rule of invoices and GRNs", _document_rounding),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    """Apply every pending migration up to target and return their versions."""
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version > target:
+            break
+        try:
+            # Take the write lock before re-reading the version so two
+            # processes starting together never apply the same step twice
+            conn.execute("BEGIN IMMEDIATE")
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            applied.append(version)
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise Exception(f"Error applying migration {version} ({description}): {str(e)}")
+    return applied
+
+
+def main():
+    db_name = sys.argv[1] if len(sys.argv) > 1 else "inventory.db"
+    conn = sqlite3.connect(db_name)
+    try:
+        before = current_version(conn)
+        applied = migrate(conn)
+        print(f"{db_name}: schema version {before} -> {current_version(conn)}")
+        for version, description, _ in MIGRATIONS:
+            if version in applied:
+                print(f"  applied {version}: {description}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
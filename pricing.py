@@ -0,0 +1,339 @@
+"""Prices, taxes and totals in whole paise, worked out the same way everywhere.
+
+Every amount is computed in integers. A rate becomes paise, a tax rate
+hundredths of a percent and a quantity thousandths of a unit, each
+rounded half away from zero. Then:
+
+    subtotal = quantity x rate, rounded to the paisa
+    tax      = subtotal x tax rate, rounded to the paisa
+    total    = subtotal + tax
+
+so a line's total is always its subtotal plus its tax, and an invoice's
+amounts are always the sums of its lines'. How an invoice's tax is
+rounded is chosen with IMS_TAX_ROUNDING:
+
+    line     (the default) each line's tax is rounded, the invoice's is their sum
+    invoice  the tax is rounded once per tax rate on the invoice's taxable
+             value, and those paise are shared out over the lines, largest
+             remainder first, so the lines still add up to the invoice
+
+Amounts leave this module as rupees, for the REAL columns and the forms.
+
+Invoices and GRNs store the rule they were priced with.
+
+batch_totals() prices whole columns at once, with NumPy when it is
+installed (imported on first use) and a loop over arrays otherwise.
+audit() recomputes a ledger table, each invoice or note under its own
+rule, and reports the rows whose stored amounts differ:
+
+    python pricing.py inventory.db --table invoice_lines
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+
+PER_LINE = 'line'
+PER_INVOICE = 'invoice'
+ROUNDING_RULES = (PER_LINE, PER_INVOICE)
+
+QUANTITY_SCALE = 1000  # thousandths of a unit
+RATE_SCALE = 100  # paise
+TAX_RATE_SCALE = 100  # hundredths of a percent
+# A tax rate in hundredths of a percent, as a fraction of the subtotal
+TAX_DIVISOR = 100 * TAX_RATE_SCALE
+
+# Ledger tables audit() can recompute: table -> the column grouping its
+# lines into invoices or notes, the table of those (holding the rounding
+# rule) and the order the lines were priced in
+AUDITED_TABLES = {
+    'sales': None,
+    'invoice_lines': ('invoice_id', 'invoices', 'l.invoice_id, l.line_no'),
+    'goods_receiving': ('grn_id', 'goods_receipt_notes', 'l.grn_id, l.id'),
+}
+
+
+def default_rounding(environ=None):
+    """The rounding rule from IMS_TAX_ROUNDING, PER_LINE when it is unset."""
+    environ = os.environ if environ is None else environ
+    rule = (environ.get("IMS_TAX_ROUNDING") or PER_LINE).strip().lower()
+    if rule not in ROUNDING_RULES:
+        raise ValueError(f"IMS_TAX_ROUNDING must be one of {', '.join(ROUNDING_RULES)}, not {rule!r}")
+    return rule
+
+
+def units(value, scale):
+    """value in whole 1/scale units, rounded half away from zero; None and "" are 0.
+
+    Floats are first rounded to a millionth of a unit, so that 1.005 rupees
+    is 101 paise as written, not the 100.4999... paise of the binary float.
+    batch_totals() converts columns the same way.
+    """
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value * scale
+    if isinstance(value, float):
+        scaled = round(value * scale, 6)
+        return int(scaled + 0.5) if scaled >= 0 else -int(-scaled + 0.5)
+    return int((Decimal(str(value)) * scale).to_integral_value(ROUND_HALF_UP))
+
+
+def paise(rupees):
+    return units(rupees, RATE_SCALE)
+
+
+def rupees(paise):
+    return paise / RATE_SCALE
+
+
+def _divide(numerator, denominator):
+    """numerator / denominator rounded half away from zero, in integers."""
+    if numerator >= 0:
+        return (numerator * 2 + denominator) // (denominator * 2)
+    return -((-numerator * 2 + denominator) // (denominator * 2))
+
+
+def _subtotal(quantity, rate):
+    return _divide(units(quantity, QUANTITY_SCALE) * units(rate, RATE_SCALE), QUANTITY_SCALE)
+
+
+def _amounts(subtotal, tax_amount):
+    return {'subtotal': rupees(subtotal), 'tax_amount': rupees(tax_amount),
+            'total_amount': rupees(subtotal + tax_amount)}
+
+
+def price_line(quantity, rate, tax_rate):
+    """Subtotal, tax and total of quantity units at rate plus tax_rate percent, in rupees."""
+    subtotal = _subtotal(quantity, rate)
+    return _amounts(subtotal, _divide(subtotal * units(tax_rate, TAX_RATE_SCALE), TAX_DIVISOR))
+
+
+def price_invoice(lines, rounding=PER_LINE):
+    """(lines with subtotal, tax_amount and total_amount set, the invoice's totals).
+
+    lines are dicts with quantity, rate and tax_rate; they are copied, not changed.
+    """
+    if rounding not in ROUNDING_RULES:
+        raise ValueError(f"Unknown rounding rule {rounding!r}")
+    subtotals = [_subtotal(line['quantity'], line['rate']) for line in lines]
+    tax_rates = [units(line.get('tax_rate'), TAX_RATE_SCALE) for line in lines]
+    if rounding == PER_LINE:
+        taxes = [_divide(subtotal * tax_rate, TAX_DIVISOR) for subtotal, tax_rate in zip(subtotals, tax_rates)]
+    else:
+        taxes = _share_invoice_tax(subtotals, tax_rates)
+    priced = [dict(line, **_amounts(subtotal, tax)) for line, subtotal, tax in zip(lines, subtotals, taxes)]
+    return priced, _amounts(sum(subtotals), sum(taxes))
+
+
+def _share_invoice_tax(subtotals, tax_rates):
+    # Each line first gets its exact tax rounded down; the paise left over
+    # from each rate's rounded total go to the largest remainders, earlier
+    # lines first on a tie
+    taxes = [subtotal * tax_rate // TAX_DIVISOR for subtotal, tax_rate in zip(subtotals, tax_rates)]
+    by_rate = {}
+    for i, tax_rate in enumerate(tax_rates):
+        by_rate.setdefault(tax_rate, []).append(i)
+    for tax_rate, members in by_rate.items():
+        rounded = _divide(sum(subtotals[i] for i in members) * tax_rate, TAX_DIVISOR)
+        left_over = rounded - sum(taxes[i] for i in members)
+        members.sort(key=lambda i: -(subtotals[i] * tax_rate % TAX_DIVISOR))
+        for i in members[:left_over]:
+            taxes[i] += 1
+    return taxes
+
+
+def invoice_totals(lines):
+    """Subtotal, tax and total of lines already priced, summed in paise."""
+    subtotal = sum(paise(line['total_amount']) - paise(line['tax_amount']) for line in lines)
+    return _amounts(subtotal, sum(paise(line['tax_amount']) for line in lines))
+
+
+# Whole columns
+def have_numpy():
+    return _numpy() is not None
+
+
+def _numpy():
+    # Imported here, so the app does not load NumPy just to price a sale
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def batch_totals(quantities, rates, tax_rates, use_numpy=None):
+    """Per-line (subtotal, tax_amount, total_amount) in paise for equal-length columns, rounded PER_LINE.
+
+    The columns may be lists, arrays or NumPy arrays of numbers. The result
+    columns are int64 NumPy arrays when NumPy is used (by default whenever
+    it is installed), and array('q') otherwise; both agree with price_line.
+    """
+    numpy = _numpy() if use_numpy is not False else None
+    if use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed")
+    if numpy is not None:
+        quantity = _units_array(numpy, quantities, QUANTITY_SCALE)
+        subtotal = _divide_array(numpy, quantity * _units_array(numpy, rates, RATE_SCALE), QUANTITY_SCALE)
+        tax = _divide_array(numpy, subtotal * _units_array(numpy, tax_rates, TAX_RATE_SCALE), TAX_DIVISOR)
+        return subtotal, tax, subtotal + tax
+
+    subtotals, taxes, totals = array('q'), array('q'), array('q')
+    for quantity, rate, tax_rate in zip(quantities, rates, tax_rates):
+        subtotal = _divide(units(quantity, QUANTITY_SCALE) * units(rate, RATE_SCALE), QUANTITY_SCALE)
+        tax = _divide(subtotal * units(tax_rate, TAX_RATE_SCALE), TAX_DIVISOR)
+        subtotals.append(subtotal)
+        taxes.append(tax)
+        totals.append(subtotal + tax)
+    return subtotals, taxes, totals
+
+
+def _units_array(numpy, values, scale):
+    scaled = numpy.round(numpy.asarray(values, dtype=numpy.float64) * scale, 6)
+    return (numpy.sign(scaled) * numpy.floor(numpy.abs(scaled) + 0.5)).astype(numpy.int64)
+
+
+def _divide_array(numpy, numerators, denominator):
+    return numpy.sign(numerators) * ((numpy.abs(numerators) * 2 + denominator) // (denominator * 2))
+
+
+def audit(conn, table='sales', rounding=None, batch_size=100000, use_numpy=None, examples=20):
+    """Recompute every row of a ledger table and compare it with the stored tax and total.
+
+    Invoice lines and GRN lines are priced together with the other lines of
+    their invoice or note, under the rule stored with it; a rounding given
+    here is used for all of them instead. Sales and receipts not on a note
+    are priced per line. Returns a dict of the rows checked, how many differ
+    by a paisa or more, the ids of the first few of those, both grand totals
+    and the seconds taken.
+    """
+    if table not in AUDITED_TABLES:
+        raise ValueError(f"table must be one of {', '.join(AUDITED_TABLES)}")
+    if rounding is not None and rounding not in ROUNDING_RULES:
+        raise ValueError(f"Unknown rounding rule {rounding!r}")
+    start = time.perf_counter()
+    result = {'table': table, 'rows': 0, 'mismatched': 0, 'examples': [],
+              'stored_total': 0, 'recomputed_total': 0}
+    columns = "l.quantity, l.rate, l.tax_rate, l.tax_amount, l.total_amount"
+    if AUDITED_TABLES[table] is None:
+        checked = _audit_lines(conn, f"SELECT l.id, {columns} FROM {table} l ORDER BY l.id", (),
+                               batch_size, use_numpy)
+    else:
+        group, documents, order = AUDITED_TABLES[table]
+        source = f"{table} l LEFT JOIN {documents} d ON d.id = l.{group}"
+        # A receipt not on a note has no rule of its own and was priced per line
+        rule = f"COALESCE(d.rounding, '{PER_LINE}')" if rounding is None else "?"
+        params = () if rounding is None else (rounding,)
+        # Lines of documents rounded per line need no grouping, so take the batched path
+        checked = itertools.chain(
+            _audit_lines(conn, f"SELECT l.id, {columns} FROM {source} WHERE {rule} = ? ORDER BY l.id",
+                         params + (PER_LINE,), batch_size, use_numpy),
+            _audit_invoices(conn, f"SELECT l.id, l.{group}, {columns} FROM {source} WHERE {rule} = ? "
+                                  f"ORDER BY {order}", params + (PER_INVOICE,), batch_size))
+    # Each batch: (rows, ids of the rows that differ, stored and recomputed totals in paise)
+    for rows, wrong, stored_total, recomputed_total in checked:
+        result['rows'] += rows
+        result['mismatched'] += len(wrong)
+        result['stored_total'] += stored_total
+        result['recomputed_total'] += recomputed_total
+        result['examples'].extend(wrong[:max(examples - len(result['examples']), 0)])
+    result['stored_total'] = rupees(result['stored_total'])
+    result['recomputed_total'] = rupees(result['recomputed_total'])
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _audit_lines(conn, query, params, batch_size, use_numpy):
+    # Each row on its own, PER_LINE, a batch at a time
+    numpy = _numpy() if use_numpy is not False else None
+    cursor = conn.execute(query, params)
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        ids, quantities, rates, tax_rates, stored_taxes, stored_totals = zip(*batch)
+        _, taxes, totals = batch_totals(quantities, rates, tax_rates, numpy is not None)
+        if numpy is not None:
+            stored_taxes = _units_array(numpy, stored_taxes, RATE_SCALE)
+            stored_totals = _units_array(numpy, stored_totals, RATE_SCALE)
+            wrong = numpy.flatnonzero((stored_taxes != taxes) | (stored_totals != totals))
+            yield len(ids), [ids[i] for i in wrong], int(stored_totals.sum()), int(totals.sum())
+        else:
+            stored_taxes = [paise(amount) for amount in stored_taxes]
+            stored_totals = [paise(amount) for amount in stored_totals]
+            wrong = [ids[i] for i in range(len(ids)) if stored_taxes[i] != taxes[i] or stored_totals[i] != totals[i]]
+            yield len(ids), wrong, sum(stored_totals), sum(totals)
+
+
+def _audit_invoices(conn, query, params, batch_size):
+    # Whole invoices or notes at a time, PER_INVOICE; a receipt not on a
+    # note (grn_id NULL) is a group of its own
+    cursor = conn.execute(query, params)
+    pending = []
+
+    def check(lines):
+        groups = {}
+        for row in lines:
+            groups.setdefault(row[1] if row[1] is not None else ('row', row[0]), []).append(row)
+        wrong, stored_total, recomputed_total = [], 0, 0
+        for rows in groups.values():
+            priced, _ = price_invoice([{'quantity': row[2], 'rate': row[3], 'tax_rate': row[4]} for row in rows],
+                                      PER_INVOICE)
+            for row, line in zip(rows, priced):
+                if paise(row[5]) != paise(line['tax_amount']) or paise(row[6]) != paise(line['total_amount']):
+                    wrong.append(row[0])
+                stored_total += paise(row[6])
+                recomputed_total += paise(line['total_amount'])
+        return len(lines), wrong, stored_total, recomputed_total
+
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        # The last group may go on in the next batch
+        rows = pending + batch
+        last = rows[-1][1]
+        split = len(rows)
+        while last is not None and split > 0 and rows[split - 1][1] == last:
+            split -= 1
+        if split:
+            yield check(rows[:split])
+        pending = rows[split:]
+    if pending:
+        yield check(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute ledger taxes and totals and report the rows that differ")
+    parser.add_argument('database')
+    parser.add_argument('--table', choices=list(AUDITED_TABLES), action='append',
+                        help="table to audit; may be repeated (default: all)")
+    parser.add_argument('--rounding', choices=ROUNDING_RULES, default=None,
+                        help="price every invoice and note under this rule (default: the one it was recorded with)")
+    parser.add_argument('--no-numpy', action='store_true', help="use the pure Python path even if NumPy is installed")
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        print(f"Error opening {args.database}: {str(e)}", file=sys.stderr)
+        return 1
+    mismatched = 0
+    for table in args.table or AUDITED_TABLES:
+        result = audit(conn, table, args.rounding, use_numpy=False if args.no_numpy else None)
+        mismatched += result['mismatched']
+        print(f"{table}: {result['rows']} rows in {result['seconds']:.2f}s, {result['mismatched']} differ; "
+              f"stored total {result['stored_total']:.2f}, recomputed {result['recomputed_total']:.2f}")
+        if result['examples']:
+            print(f"  first ids: {', '.join(str(row_id) for row_id in result['examples'])}")
+    conn.close()
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Bulk import of products from a CSV file.
+
+    python product_import.py products.csv [--db inventory.db] [--chunk-size 1000] [--no-create]
+
+The file needs a header row with at least name, category, subcategory and
+price columns; barcode, sku_id, description, tax_rate and default_unit are
+optional. Rows are streamed from disk and written chunk_size at a time, one
+transaction per chunk, so memory use does not grow with the file.
+Categories and subcategories are matched by name (ignoring case) and
+created when missing. Rows that fail validation, or whose SKU or barcode is
+already in the catalog, are skipped and reported with their line number.
+"""
+import argparse
+import csv
+import os
+import sys
+
+from database import Database
+
+REQUIRED_COLUMNS = ('name', 'category', 'subcategory', 'price')
+COLUMN_ALIASES = {'sku': 'sku_id', 'unit': 'default_unit', 'tax': 'tax_rate'}
+# Only the first skipped rows are kept with their reason; all are counted
+MAX_REPORTED_ERRORS = 1000
+# SQLite builds before 3.32 allow at most 999 parameters per statement
+LOOKUP_BATCH = 500
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.cancelled = False
+
+    def skip(self, line_no, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, message))
+
+
+class ProductImporter:
+    """Streams product rows from CSV into the database in chunked transactions.
+
+    progress, if given, is called after every chunk with
+    (bytes_read, total_bytes, result); cancel() stops the import after the
+    chunk being written, keeping the chunks already committed.
+    """
+
+    def __init__(self, db, chunk_size=1000, create_missing=True, progress=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.progress = progress
+        self.bytes_read = 0
+        self._cancelled = False
+        self._categories = {}
+        self._subcategories = {}
+
+    def cancel(self):
+        self._cancelled = True
+
+    def import_file(self, path):
+        try:
+            total_bytes = os.path.getsize(path)
+            with open(path, 'rb') as handle:
+                return self.import_lines(self._decoded_lines(handle), total_bytes)
+        except UnicodeDecodeError:
+            raise Exception(f"Error importing products: {path} is not UTF-8 encoded")
+        except OSError as e:
+            raise Exception(f"Error importing products: {str(e)}")
+
+    def _decoded_lines(self, handle):
+        # Iterating the binary file keeps an exact byte count for progress,
+        # which a text-mode file cannot report while it is being iterated
+        self.bytes_read = 0
+        for index, raw in enumerate(handle):
+            self.bytes_read += len(raw)
+            yield raw.decode('utf-8-sig' if index == 0 else 'utf-8')
+
+    def import_lines(self, lines, total_bytes=0):
+        """Import CSV text given as an iterable of lines; returns an ImportResult."""
+        result = ImportResult()
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            raise Exception("Error importing products: the file is empty")
+        columns = [COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in header]
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise Exception(f"Error importing products: missing column(s) {', '.join(missing)}")
+
+        self._load_names()
+        chunk = []
+        for fields in reader:
+            if not any(field.strip() for field in fields):
+                continue
+            result.rows_read += 1
+            try:
+                chunk.append((reader.line_num, self._validate(dict(zip(columns, fields)))))
+            except ValueError as e:
+                result.skip(reader.line_num, str(e))
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk, result)
+                chunk = []
+                self._report(total_bytes, result)
+                if self._cancelled:
+                    result.cancelled = True
+                    break
+        if chunk and not result.cancelled:
+            self._write_chunk(chunk, result)
+        self._report(total_bytes, result)
+        return result
+
+    def _report(self, total_bytes, result):
+        if self.progress is not None:
+            self.progress(self.bytes_read, total_bytes, result)
+
+    def _load_names(self):
+        self._categories = {
+            row['name'].lower(): row['id']
+            for row in self.db.execute_query("SELECT id, name FROM categories")
+        }
+        self._subcategories = {
+            (row['category_id'], row['name'].lower()): row['id']
+            for row in self.db.execute_query("SELECT id, category_id, name FROM subcategories")
+        }
+
+    def _validate(self, row):
+        values = {name: (row.get(name) or '').strip() for name in (
+            'barcode', 'sku_id', 'name', 'category', 'subcategory',
+            'description', 'price', 'tax_rate', 'default_unit')}
+        for name in REQUIRED_COLUMNS:
+            if not values[name]:
+                raise ValueError(f"{name} is empty")
+        try:
+            price = float(values['price'])
+        except ValueError:
+            raise ValueError(f"price '{values['price']}' is not a number")
+        if price <= 0:
+            raise ValueError("price must be greater than zero")
+        try:
+            tax_rate = float(values['tax_rate'] or 0)
+        except ValueError:
+            raise ValueError(f"tax_rate '{values['tax_rate']}' is not a number")
+        if not 0 <= tax_rate <= 100:
+            raise ValueError("tax_rate must be between 0 and 100")
+        values['price'] = price
+        values['tax_rate'] = tax_rate
+        return values
+
+    def _write_chunk(self, chunk, result):
+        def work(cursor):
+            # Names created here only join the shared maps once the chunk
+            # commits, so a retried or failed transaction leaves no stale ids
+            created_categories = {}
+            created_subcategories = {}
+            existing_skus = self._existing(cursor, 'sku_id', [v['sku_id'] for _, v in chunk if v['sku_id']])
+            existing_barcodes = self._existing(cursor, 'barcode', [v['barcode'] for _, v in chunk if v['barcode']])
+            rows = []
+            skipped = []
+            for line_no, values in chunk:
+                if values['sku_id'] and values['sku_id'] in existing_skus:
+                    skipped.append((line_no, f"SKU {values['sku_id']} already exists"))
+                    continue
+                if values['barcode'] and values['barcode'] in existing_barcodes:
+                    skipped.append((line_no, f"barcode {values['barcode']} already exists"))
+                    continue
+                category_id = self._category_id(cursor, values['category'], created_categories)
+                if category_id is None:
+                    skipped.append((line_no, f"unknown category '{values['category']}'"))
+                    continue
+                subcategory_id = self._subcategory_id(cursor, category_id, values['subcategory'],
+                                                      created_subcategories)
+                if subcategory_id is None:
+                    skipped.append((line_no, f"unknown subcategory '{values['subcategory']}'"))
+                    continue
+                # Later rows of the same chunk count as duplicates too
+                existing_skus.add(values['sku_id'])
+                existing_barcodes.add(values['barcode'])
+                rows.append((values['barcode'] or None, values['sku_id'] or None, values['name'],
+                             category_id, subcategory_id, values['description'],
+                             values['price'], values['tax_rate'], values['default_unit'] or None))
+            cursor.executemany('''
+                INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id,
+                                      description, price, tax_rate, default_unit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            return len(rows), skipped, created_categories, created_subcategories
+
+        try:
+            imported, skipped, categories, subcategories = self.db.run_in_transaction(work)
+        except Exception as e:
+            raise Exception(f"Error importing products at line {chunk[0][0]}: {str(e)}")
+        self._categories.update(categories)
+        self._subcategories.update(subcategories)
+        if imported or categories or subcategories:
+            # Scans and the product combos must see the new products straight away
+            self.db._catalog_changed()
+        result.imported += imported
+        for line_no, message in skipped:
+            result.skip(line_no, message)
+
+    def _existing(self, cursor, column, values):
+        found = set()
+        for start in range(0, len(values), LOOKUP_BATCH):
+            batch = values[start:start + LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            cursor.execute(f"SELECT {column} FROM products WHERE {column} IN ({placeholders})", batch)
+            found.update(row[0] for row in cursor.fetchall())
+        return found
+
+    def _category_id(self, cursor, name, created):
+        key = name.lower()
+        category_id = self._categories.get(key) or created.get(key)
+        if category_id is None and self.create_missing:
+            # OR IGNORE: another terminal may have just added the same name
+            cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+            category_id = created[key] = cursor.fetchone()[0]
+        return category_id
+
+    def _subcategory_id(self, cursor, category_id, name, created):
+        key = (category_id, name.lower())
+        subcategory_id = self._subcategories.get(key) or created.get(key)
+        if subcategory_id is None and self.create_missing:
+            cursor.execute("INSERT OR IGNORE INTO subcategories (category_id, name) VALUES (?, ?)",
+                           (category_id, name))
+            cursor.execute("SELECT id FROM subcategories WHERE category_id = ? AND name = ?",
+                           (category_id, name))
+            subcategory_id = created[key] = cursor.fetchone()[0]
+        return subcategory_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import products from a CSV file")
+    parser.add_argument('csv_file')
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="rows per transaction (default: 1000)")
+    parser.add_argument('--no-create', action='store_true',
+                        help="skip rows whose category or subcategory does not exist yet")
+    args = parser.parse_args()
+
+    def progress(bytes_read, total_bytes, result):
+        percent = 100 * bytes_read // total_bytes if total_bytes else 100
+        print(f"\r{percent:3d}%  {result.rows_read} rows read, {result.imported} imported, "
+              f"{result.skipped} skipped", end="", file=sys.stderr, flush=True)
+
+    with Database(args.db) as db:
+        importer = ProductImporter(db, chunk_size=args.chunk_size,
+                                   create_missing=not args.no_create, progress=progress)
+        result = importer.import_file(args.csv_file)
+    print(file=sys.stderr)
+    for line_no, message in sorted(result.errors):
+        print(f"line {line_no}: {message}")
+    if result.skipped > len(result.errors):
+        print(f"... and {result.skipped - len(result.errors)} more skipped rows")
+    print(f"Imported {result.imported} of {result.rows_read} products.")
+    return 1 if result.skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
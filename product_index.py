@@ -0,0 +1,261 @@
+"""Compact read-only index of the products' hot fields, for catalogs of a million or more.
+
+A list of sqlite3.Row keeps one Python object per value of every product,
+around a kilobyte a product. ProductIndex keeps each field in a column:
+numbers in typed arrays and text as UTF-8, end to end, in one StringTable.
+It holds 9 fields and 3 sort orders in about 115 bytes a product (see
+benchmarks/bench_product_index.py):
+
+    id, barcode, sku_id, name, price, tax_rate, default_unit, category_id, subcategory_id
+
+Products are found by id (the ids are sorted), by barcode or SKU (arrays
+of positions sorted by code, searched with bisect), and listed a whole
+category or subcategory at a time in name order. Each result is a plain
+dict of those fields, built when asked for.
+
+The index is filled from one streaming scan in id order, and refreshed
+by scanning only the ids above the last one loaded. Products are never
+updated or deleted by the app, so that is all that can change.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+FIELDS = ('id', 'barcode', 'sku_id', 'name', 'price', 'tax_rate', 'default_unit',
+          'category_id', 'subcategory_id')
+INDEX_QUERY = '''
+    SELECT id, barcode, sku_id, name, price, tax_rate, default_unit, category_id, subcategory_id
+    FROM products WHERE id > ? ORDER BY id
+'''
+
+
+class StringTable:
+    """Strings stored end to end as UTF-8 in one bytearray, each known by its number.
+
+    intern() reuses the number of an identical string added through it, for
+    columns with few distinct values; add() always appends.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('I', [0])
+        self._interned = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def add(self, text):
+        """Number of text, or -1 for None."""
+        if text is None:
+            return -1
+        self.data += text.encode("utf-8")
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def intern(self, text):
+        number = self._interned.get(text)
+        if number is None:
+            number = self._interned[text] = self.add(text)
+        return number
+
+    def raw(self, number):
+        """The UTF-8 bytes of a string, which sort in the same order as the text."""
+        return self.data[self.offsets[number]:self.offsets[number + 1]]
+
+    def get(self, number):
+        if number < 0:
+            return None
+        return self.data[self.offsets[number]:self.offsets[number + 1]].decode("utf-8")
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ProductIndex:
+    def __init__(self):
+        self.ids = array('q')
+        self.prices = array('d')
+        self.tax_rates = array('d')
+        self.category_ids = array('i')
+        self.subcategory_ids = array('i')
+        # Numbers in self.strings, -1 where the value is NULL
+        self.names = array('i')
+        self.barcodes = array('i')
+        self.skus = array('i')
+        self.units = array('i')
+        self.strings = StringTable()
+        # Positions sorted by barcode, by SKU and by (category, subcategory, name)
+        self._by_barcode = array('i')
+        self._by_sku = array('i')
+        self._by_group = array('i')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, product_id):
+        return self.position(product_id) is not None
+
+    @property
+    def max_id(self):
+        return self.ids[-1] if self.ids else 0
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns, sort orders and string table."""
+        columns = (self.ids, self.prices, self.tax_rates, self.category_ids, self.subcategory_ids,
+                   self.names, self.barcodes, self.skus, self.units,
+                   self._by_barcode, self._by_sku, self._by_group)
+        return sum(column.itemsize * len(column) for column in columns) + self.strings.nbytes
+
+    # Loading
+    @classmethod
+    def build(cls, rows):
+        """An index of rows: (id, barcode, sku_id, name, price, tax_rate, unit, category_id, subcategory_id) in id order."""
+        index = cls()
+        index.extend(rows)
+        return index
+
+    def load(self, conn, batch_size=5000):
+        """Add the products with ids above the last one loaded, streaming them from conn."""
+        cursor = conn.execute(INDEX_QUERY, (self.max_id,))
+        added = 0
+
+        def rows():
+            nonlocal added
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                added += len(batch)
+                yield from batch
+        self.extend(rows())
+        return added
+
+    def extend(self, rows):
+        """Append rows, whose ids must all be above max_id, and bring the sort orders up to date."""
+        start = len(self.ids)
+        strings = self.strings
+        data, offsets = strings.data, strings.offsets
+        last_id = self.max_id
+
+        def add(text):
+            # StringTable.add, inlined for the million-row load
+            if text is None:
+                return -1
+            data.extend(text.encode("utf-8"))
+            offsets.append(len(data))
+            return len(offsets) - 2
+
+        append_id, append_price, append_tax_rate = self.ids.append, self.prices.append, self.tax_rates.append
+        append_name, append_barcode, append_sku = self.names.append, self.barcodes.append, self.skus.append
+        append_unit, append_category, append_subcategory = (self.units.append, self.category_ids.append,
+                                                            self.subcategory_ids.append)
+        for product_id, barcode, sku_id, name, price, tax_rate, unit, category_id, subcategory_id in rows:
+            if product_id <= last_id:
+                raise ValueError(f"Product ids must be added in increasing order, got {product_id} after {last_id}")
+            last_id = product_id
+            append_id(product_id)
+            append_barcode(add(barcode))
+            append_sku(add(sku_id))
+            append_name(add(name or ""))
+            append_price(price or 0.0)
+            append_tax_rate(tax_rate or 0.0)
+            append_unit(strings.intern(unit) if unit else -1)
+            append_category(category_id)
+            append_subcategory(subcategory_id)
+        if len(self.ids) > start:
+            self._index(start)
+
+    def _barcode_key(self, position):
+        return self.strings.raw(self.barcodes[position])
+
+    def _sku_key(self, position):
+        return self.strings.raw(self.skus[position])
+
+    def _group_key(self, position):
+        return (self.category_ids[position], self.subcategory_ids[position],
+                self.strings.raw(self.names[position]))
+
+    def _index(self, start):
+        new = range(start, len(self.ids))
+        orders = ((self._by_barcode, self._barcode_key, self.barcodes),
+                  (self._by_sku, self._sku_key, self.skus),
+                  (self._by_group, self._group_key, None))
+        for order, key, column in orders:
+            # Stable, so products with equal keys stay in id order and the
+            # first one wins, like the LIMIT 1 lookups in Database
+            positions = sorted((p for p in new if column is None or column[p] >= 0), key=key)
+            if not order:
+                order.extend(positions)
+                continue
+            # Merge them in, copying the existing order once
+            merged = array('i')
+            previous = 0
+            for position in positions:
+                i = bisect_right(order, key(position), lo=previous, key=key)
+                merged.extend(order[previous:i])
+                merged.append(position)
+                previous = i
+            merged.extend(order[previous:])
+            order[:] = merged
+
+    # Lookups
+    def position(self, product_id):
+        i = bisect_left(self.ids, product_id)
+        return i if i < len(self.ids) and self.ids[i] == product_id else None
+
+    def record(self, position):
+        strings = self.strings
+        return {
+            'id': self.ids[position],
+            'barcode': strings.get(self.barcodes[position]),
+            'sku_id': strings.get(self.skus[position]),
+            'name': strings.get(self.names[position]),
+            'price': self.prices[position],
+            'tax_rate': self.tax_rates[position],
+            'default_unit': strings.get(self.units[position]),
+            'category_id': self.category_ids[position],
+            'subcategory_id': self.subcategory_ids[position],
+        }
+
+    def get(self, product_id):
+        position = self.position(product_id)
+        return self.record(position) if position is not None else None
+
+    def _find(self, order, key, code):
+        target = code.encode("utf-8")
+        i = bisect_left(order, target, key=key)
+        return order[i] if i < len(order) and key(order[i]) == target else None
+
+    def id_by_barcode(self, barcode):
+        position = self._find(self._by_barcode, self._barcode_key, barcode)
+        return self.ids[position] if position is not None else None
+
+    def id_by_sku(self, sku_id):
+        position = self._find(self._by_sku, self._sku_key, sku_id)
+        return self.ids[position] if position is not None else None
+
+    def find_by_barcode(self, barcode):
+        position = self._find(self._by_barcode, self._barcode_key, barcode)
+        return self.record(position) if position is not None else None
+
+    def find_by_sku(self, sku_id):
+        position = self._find(self._by_sku, self._sku_key, sku_id)
+        return self.record(position) if position is not None else None
+
+    def _group_range(self, category_id, subcategory_id=None):
+        if subcategory_id is None:
+            low, high = (category_id,), (category_id + 1,)
+        else:
+            low, high = (category_id, subcategory_id), (category_id, subcategory_id + 1)
+        order = self._by_group
+        return bisect_left(order, low, key=self._group_key), bisect_right(order, high, key=self._group_key)
+
+    def count_in(self, category_id, subcategory_id=None):
+        low, high = self._group_range(category_id, subcategory_id)
+        return high - low
+
+    def scan(self, category_id, subcategory_id=None):
+        """Records of a category, or one of its subcategories, by subcategory and then name."""
+        low, high = self._group_range(category_id, subcategory_id)
+        return [self.record(position) for position in self._by_group[low:high]]
@@ -1,9 +1,12 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QLineEdit, QComboBox, QDoubleSpinBox, QTextEdit,
-                             QPushButton, QMessageBox, QGroupBox, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QInputDialog, QLabel)
-from PySide6.QtCore import Qt
-from database import Database
+                             QPushButton, QMessageBox, QGroupBox, QHeaderView,
+                             QInputDialog, QLabel, QTableView, QFileDialog,
+                             QProgressDialog, QApplication)
+from PySide6.QtCore import Qt, QTimer, QSize, Signal
+from database import get_database
+from product_table_model import ProductTableModel
+from async_database import AsyncDatabase
 
 class ImageDropLabel(QLabel):
     def __init__(self, parent=None):
@@ -38,13 +41,39 @@ class ImageDropLabel(QLabel):
             self.image_path = file_path
 
 class ProductMasterForm(QWidget):
-    def __init__(self):
+    # percent done, rows imported, rows skipped; emitted from the import worker
+    import_progress = Signal(int, int, int)
+
+    def __init__(self, db=None, async_db=None, image_store=None):
         super().__init__()
-        self.db = Database()
+        # Imported where they are used, here and in import_products and
+        # render_labels, so importing the form module stays cheap
+        from image_store import ImageStore
+        from thumbnail_cache import ThumbnailCache
+        self.db = db if db is not None else get_database()
+        self.async_db = async_db if async_db is not None else AsyncDatabase(self.db, parent=self)
+        # A store made here is closed with the thumbnails; a caller's is the caller's to close
+        self.owns_image_store = image_store is None
+        self.image_store = image_store if image_store is not None else ImageStore.for_database(self.db)
+        self.thumbnails = ThumbnailCache(self.image_store, parent=self)
+        # Stop the thumbnail threads and worker processes before the interpreter shuts down
+        QApplication.instance().aboutToQuit.connect(self.close_images)
+        self.importer = None
+        self.import_dialog = None
+        self.import_progress.connect(self.show_import_progress)
         self.setup_ui()
+        # Loaded once the form is on screen, so its first paint does not wait
+        QTimer.singleShot(0, self.load_data)
+
+    def load_data(self):
         self.load_categories_subcategories()
         self.load_products()
 
+    def close_images(self):
+        self.thumbnails.close()
+        if self.owns_image_store:
+            self.image_store.close()
+
     def setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setSpacing(20)
@@ -131,63 +160,83 @@ class ProductMasterForm(QWidget):
         # Products Table
         table_group = QGroupBox("Product List")
         table_layout = QVBoxLayout()
-        
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(10)
-        self.products_table.setHorizontalHeaderLabels([
-            "Barcode", "SKU ID", "Name", "Category", "Subcategory", "Default Unit", "Description", "Price", "Tax Rate", "Image"
-        ])
+
+        filter_row = QHBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by name, description, barcode or SKU")
+        self.filter_input.setClearButtonEnabled(True)
+        filter_row.addWidget(self.filter_input)
+        self.import_button = QPushButton("Import CSV...")
+        self.import_button.clicked.connect(self.import_products)
+        filter_row.addWidget(self.import_button)
+        self.labels_button = QPushButton("Print Labels...")
+        self.labels_button.clicked.connect(self.print_labels)
+        filter_row.addWidget(self.labels_button)
+        table_layout.addLayout(filter_row)
+        # Query once typing pauses rather than on every key stroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_input.textChanged.connect(self.filter_timer.start)
+
+        self.product_model = ProductTableModel(self.db, parent=self, async_db=self.async_db,
+                                               thumbnails=self.thumbnails)
+        self.product_model.load_failed.connect(self.show_error("load products"))
+        self.products_table = QTableView()
+        self.products_table.setModel(self.product_model)
+        self.products_table.setSelectionBehavior(QTableView.SelectRows)
         self.products_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Uniform rows let the view skip measuring every row it has not drawn
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        width, height = self.image_store.thumbnail_size
+        self.products_table.setIconSize(QSize(width, height))
+        self.products_table.verticalHeader().setDefaultSectionSize(height + 8)
         table_layout.addWidget(self.products_table)
         
         table_group.setLayout(table_layout)
         layout.addWidget(table_group)
 
+    def show_error(self, action):
+        return lambda error: QMessageBox.critical(self, "Error", f"Failed to {action}: {str(error)}")
+
     def load_categories_subcategories(self):
-        try:
-            categories = self.db.get_all_categories()
-            self.category_combo.clear()
-            self.category_combo.addItem("Select Category", None)
-            for category in categories:
-                self.category_combo.addItem(category[1], category[0])
-            if len(categories) == 0:
-                QMessageBox.information(self, "No Categories", "No categories found. Please add a category.")
-            self.filter_subcategories()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
+        self.async_db.submit(self.db.catalog.get_categories, key=(self, 'categories'),
+                             on_result=self.populate_categories,
+                             on_error=self.show_error("load categories"))
+
+    def populate_categories(self, categories):
+        self.category_combo.clear()
+        self.category_combo.addItem("Select Category", None)
+        for category in categories:
+            self.category_combo.addItem(category[1], category[0])
+        if len(categories) == 0:
+            QMessageBox.information(self, "No Categories", "No categories found. Please add a category.")
+        self.filter_subcategories()
 
     def filter_subcategories(self):
-        try:
-            category_id = self.category_combo.currentData()
-            self.subcategory_combo.clear()
-            self.subcategory_combo.addItem("Select Subcategory", None)
-            if category_id:
-                subcategories = self.db.get_subcategories_by_category(category_id)
-                for subcategory in subcategories:
-                    self.subcategory_combo.addItem(subcategory[1], subcategory[0])
-                if len(subcategories) == 0:
-                    QMessageBox.information(self, "No Subcategories", "No subcategories found for this category. Please add a subcategory.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load subcategories: {str(e)}")
+        category_id = self.category_combo.currentData()
+        self.subcategory_combo.clear()
+        self.subcategory_combo.addItem("Select Subcategory", None)
+        if category_id:
+            self.async_db.submit(self.db.catalog.get_subcategories, category_id, key=(self, 'subcategories'),
+                                 on_result=self.populate_subcategories,
+                                 on_error=self.show_error("load subcategories"))
+        else:
+            self.async_db.cancel((self, 'subcategories'))
+
+    def populate_subcategories(self, subcategories):
+        for subcategory in subcategories:
+            self.subcategory_combo.addItem(subcategory['name'], subcategory['id'])
+        if len(subcategories) == 0:
+            QMessageBox.information(self, "No Subcategories", "No subcategories found for this category. Please add a subcategory.")
 
     def load_products(self):
-        try:
-            products = self.db.get_all_products()
-            self.products_table.setRowCount(len(products))
-            
-            for row, product in enumerate(products):
-                self.products_table.setItem(row, 0, QTableWidgetItem(product[1] or ""))  # Barcode
-                self.products_table.setItem(row, 1, QTableWidgetItem(product[2] or ""))  # SKU ID
-                self.products_table.setItem(row, 2, QTableWidgetItem(product[3]))  # Name
-                self.products_table.setItem(row, 3, QTableWidgetItem(product[10]))  # Category
-                self.products_table.setItem(row, 4, QTableWidgetItem(product[11]))  # Subcategory
-                self.products_table.setItem(row, 5, QTableWidgetItem(product[8] or ""))  # Default Unit
-                self.products_table.setItem(row, 6, QTableWidgetItem(product[6]))  # Description
-                self.products_table.setItem(row, 7, QTableWidgetItem(f"₹{product[7]:.2f}"))  # Price
-                self.products_table.setItem(row, 8, QTableWidgetItem(f"{product[8]}%"))  # Tax Rate
-                self.products_table.setItem(row, 9, QTableWidgetItem(product[9] or ""))  # Image Path
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
+        # Pages are fetched lazily as the view scrolls
+        self.product_model.reload()
+
+    def apply_filter(self):
+        self.product_model.set_search(self.filter_input.text())
 
     def validate_form(self):
         if not self.barcode_input.text().strip():
@@ -219,25 +268,41 @@ class ProductMasterForm(QWidget):
     def add_product(self):
         if not self.validate_form():
             return
-        try:
-            product_data = {
-                'barcode': self.barcode_input.text().strip(),
-                'sku_id': self.sku_input.text().strip(),
-                'name': self.name_input.text().strip(),
-                'category_id': self.category_combo.currentData(),
-                'subcategory_id': self.subcategory_combo.currentData(),
-                'default_unit': self.default_unit_input.text().strip(),
-                'description': self.description_input.toPlainText().strip(),
-                'price': self.price_input.value(),
-                'tax_rate': self.tax_input.value(),
-                'image_path': self.image_drop.image_path
-            }
-            self.db.add_product(product_data)
-            QMessageBox.information(self, "Success", "Product added successfully!")
-            self.clear_form()
-            self.load_products()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add product: {str(e)}")
+        product_data = {
+            'barcode': self.barcode_input.text().strip(),
+            'sku_id': self.sku_input.text().strip(),
+            'name': self.name_input.text().strip(),
+            'category_id': self.category_combo.currentData(),
+            'subcategory_id': self.subcategory_combo.currentData(),
+            'default_unit': self.default_unit_input.text().strip(),
+            'description': self.description_input.toPlainText().strip(),
+            'price': self.price_input.value(),
+            'tax_rate': self.tax_input.value(),
+            'image_path': self.image_drop.image_path
+        }
+
+        self.add_button.setEnabled(False)
+        self.async_db.submit(self.create_product, product_data,
+                             on_result=self.product_added,
+                             on_error=self.add_product_failed)
+
+    def create_product(self, product_data):
+        # Runs on a worker thread; returns the row the product table shows
+        if product_data['image_path']:
+            product_data['image_hash'] = self.image_store.ingest(product_data['image_path'])
+        product_id = self.db.add_product(product_data)
+        return self.db.catalog.get_product_row(product_id)
+
+    def product_added(self, product):
+        self.add_button.setEnabled(True)
+        QMessageBox.information(self, "Success", "Product added successfully!")
+        self.clear_form()
+        if product is not None:
+            self.product_model.add_product(product)
+
+    def add_product_failed(self, error):
+        self.add_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to add product: {str(error)}")
 
     def clear_form(self):
         self.barcode_input.clear()
@@ -252,15 +317,95 @@ class ProductMasterForm(QWidget):
         self.image_drop.setText("Drag & Drop Image Here\nor Click to Browse")
         self.image_drop.image_path = None
 
+    def import_products(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Products", "", "CSV files (*.csv)")
+        if not path:
+            return
+        from product_import import ProductImporter
+        self.importer = ProductImporter(self.db, progress=self.report_import_progress)
+        self.import_dialog = QProgressDialog("Importing products...", "Cancel", 0, 100, self)
+        self.import_dialog.setWindowModality(Qt.WindowModal)
+        self.import_dialog.setMinimumDuration(0)
+        self.import_dialog.canceled.connect(self.importer.cancel)
+        self.import_button.setEnabled(False)
+        self.async_db.submit(self.importer.import_file, path,
+                             on_result=self.products_imported,
+                             on_error=self.import_failed)
+
+    def report_import_progress(self, bytes_read, total_bytes, result):
+        # Runs on the worker thread; the signal hands it to the GUI thread
+        percent = 100 * bytes_read // total_bytes if total_bytes else 100
+        self.import_progress.emit(percent, result.imported, result.skipped)
+
+    def show_import_progress(self, percent, imported, skipped):
+        if self.import_dialog is not None and not self.import_dialog.wasCanceled():
+            self.import_dialog.setLabelText(f"Imported {imported} products, skipped {skipped}")
+            self.import_dialog.setValue(min(percent, 99))
+
+    def finish_import(self):
+        self.import_button.setEnabled(True)
+        if self.import_dialog is not None:
+            self.import_dialog.close()
+            self.import_dialog = None
+        self.importer = None
+        self.load_categories_subcategories()
+        self.load_products()
+
+    def products_imported(self, result):
+        self.finish_import()
+        message = f"Imported {result.imported} of {result.rows_read} products."
+        if result.cancelled:
+            message = "Import cancelled. " + message
+        if result.skipped:
+            lines = [f"Line {line_no}: {text}" for line_no, text in sorted(result.errors)[:10]]
+            message += f"\n\n{result.skipped} rows skipped:\n" + "\n".join(lines)
+            if result.skipped > len(lines):
+                message += "\n..."
+        QMessageBox.information(self, "Import Products", message)
+
+    def import_failed(self, error):
+        self.finish_import()
+        QMessageBox.critical(self, "Error", f"Failed to import products: {str(error)}")
+
+    def print_labels(self):
+        rows = sorted(index.row() for index in self.products_table.selectionModel().selectedRows())
+        if not rows:
+            QMessageBox.warning(self, "Print Labels", "Please select the products to print labels for")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Print Labels", "labels.pdf", "PDF files (*.pdf)")
+        if not path:
+            return
+        product_ids = [self.product_model.product_at(row)['id'] for row in rows]
+        self.labels_button.setEnabled(False)
+        self.async_db.submit(self.render_labels, product_ids, path,
+                             on_result=lambda result: self.labels_printed(result, path),
+                             on_error=self.labels_failed)
+
+    def render_labels(self, product_ids, path):
+        # Runs on a worker thread
+        from label_generator import LabelGenerator
+        generator = LabelGenerator(self.db)
+        return generator.render(generator.products(product_ids), path)
+
+    def labels_printed(self, result, path):
+        self.labels_button.setEnabled(True)
+        labels, sheets = result
+        QMessageBox.information(self, "Print Labels", f"Saved {labels} labels on {sheets} sheet(s) to {path}")
+
+    def labels_failed(self, error):
+        self.labels_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to print labels: {str(error)}")
+
     def add_category(self):
         name, ok = QInputDialog.getText(self, "Add Category", "Category Name:")
         if ok and name.strip():
-            try:
-                self.db.add_category(name.strip())
-                self.load_categories_subcategories()
-                QMessageBox.information(self, "Success", "Category added.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to add category: {str(e)}")
+            self.async_db.submit('add_category', name.strip(),
+                                 on_result=self.category_added,
+                                 on_error=self.show_error("add category"))
+
+    def category_added(self, category_id):
+        self.load_categories_subcategories()
+        QMessageBox.information(self, "Success", "Category added.")
 
     def add_subcategory(self):
         category_id = self.category_combo.currentData()
@@ -269,9 +414,10 @@ class ProductMasterForm(QWidget):
             return
         name, ok = QInputDialog.getText(self, "Add Subcategory", "Subcategory Name:")
         if ok and name.strip():
-            try:
-                self.db.add_subcategory(category_id, name.strip())
-                self.filter_subcategories()
-                QMessageBox.information(self, "Success", "Subcategory added.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to add subcategory: {str(e)}") 
\ No newline at end of file
+            self.async_db.submit('add_subcategory', category_id, name.strip(),
+                                 on_result=self.subcategory_added,
+                                 on_error=self.show_error("add subcategory"))
+
+    def subcategory_added(self, subcategory_id):
+        self.filter_subcategories()
+        QMessageBox.information(self, "Success", "Subcategory added.") 
\ No newline at end of file
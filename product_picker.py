@@ -0,0 +1,176 @@
+from PySide6.QtWidgets import QComboBox, QFormLayout, QGroupBox, QLineEdit, QMessageBox
+
+from pricing import price_line
+from product_search import ProductSearchBox
+
+
+class ProductPicker:
+    """Product selection shared by the Sales and Goods Receiving forms.
+
+    Mixed into a QWidget with db, async_db, pending_product and
+    product_tax_rate attributes, the quantity_input, rate_input, tax_rate,
+    tax_amount, total_amount and unit_input fields, and a
+    load_product_details() slot for the form's own details. It provides the
+    scan field, the search box and the Category -> Subcategory -> Product
+    combos; a scanned or searched product is selected by walking the
+    combos as each one is filled.
+    """
+
+    def product_selection_group(self):
+        product_group = QGroupBox("Product Selection")
+        product_layout = QFormLayout()
+        product_layout.setSpacing(15)
+
+        self.scan_input = QLineEdit()
+        self.scan_input.setPlaceholderText("Scan or type a barcode / SKU and press Enter")
+        self.scan_input.returnPressed.connect(self.scan_product)
+        product_layout.addRow("Scan:", self.scan_input)
+
+        self.search_box = ProductSearchBox(self.async_db)
+        self.search_box.product_selected.connect(self.searched)
+        self.search_box.search_failed.connect(self.show_error("search products"))
+        product_layout.addRow("Search:", self.search_box)
+
+        self.category_combo = QComboBox()
+        self.category_combo.currentIndexChanged.connect(self.filter_subcategories)
+        self.category_combo.activated.connect(self.cancel_pending_selection)
+        product_layout.addRow("Category:", self.category_combo)
+
+        self.subcategory_combo = QComboBox()
+        self.subcategory_combo.currentIndexChanged.connect(self.filter_products)
+        self.subcategory_combo.activated.connect(self.cancel_pending_selection)
+        product_layout.addRow("Subcategory:", self.subcategory_combo)
+
+        self.product_combo = QComboBox()
+        self.product_combo.currentIndexChanged.connect(self.load_product_details)
+        self.product_combo.activated.connect(self.cancel_pending_selection)
+        product_layout.addRow("Product:", self.product_combo)
+
+        product_group.setLayout(product_layout)
+        return product_group
+
+    def show_error(self, action):
+        return lambda error: QMessageBox.critical(self, "Error", f"Failed to {action}: {str(error)}")
+
+    def load_categories_subcategories(self):
+        self.async_db.submit(self.db.catalog.get_categories, key=(self, 'categories'),
+                             on_result=self.populate_categories,
+                             on_error=self.show_error("load categories"))
+
+    def populate_categories(self, categories):
+        self.category_combo.clear()
+        self.category_combo.addItem("Select Category", None)
+        for category in categories:
+            self.category_combo.addItem(category[1], category[0])
+
+        # Load subcategories
+        self.filter_subcategories()
+        self.apply_pending_selection()
+
+    def filter_subcategories(self):
+        category_id = self.category_combo.currentData()
+        self.subcategory_combo.clear()
+        self.subcategory_combo.addItem("Select Subcategory", None)
+
+        if category_id:
+            self.async_db.submit(self.db.catalog.get_subcategories, category_id, key=(self, 'subcategories'),
+                                 on_result=self.populate_subcategories,
+                                 on_error=self.show_error("load subcategories"))
+        else:
+            self.async_db.cancel((self, 'subcategories'))
+
+        self.filter_products()
+
+    def populate_subcategories(self, subcategories):
+        for subcategory in subcategories:
+            self.subcategory_combo.addItem(subcategory['name'], subcategory['id'])
+        self.apply_pending_selection()
+
+    def filter_products(self):
+        category_id = self.category_combo.currentData()
+        subcategory_id = self.subcategory_combo.currentData()
+
+        self.product_combo.clear()
+        self.product_combo.addItem("Select Product", None)
+
+        if category_id and subcategory_id:
+            self.async_db.submit(self.db.catalog.get_products, category_id, subcategory_id, key=(self, 'products'),
+                                 on_result=self.populate_products,
+                                 on_error=self.show_error("load products"))
+        else:
+            self.async_db.cancel((self, 'products'))
+
+    def populate_products(self, products):
+        for product in products:
+            self.product_combo.addItem(product['name'], product['id'])
+        self.apply_pending_selection()
+
+    def scan_product(self):
+        code = self.scan_input.text().strip()
+        if not code:
+            return
+        self.async_db.submit(self.db.catalog.find_product_by_code, code, key=(self, 'scan'),
+                             on_result=lambda product: self.scanned(code, product),
+                             on_error=self.show_error("look up product"))
+
+    def scanned(self, code, product):
+        if product is None:
+            # No dialog here: the scanner keeps firing and the operator rescans
+            self.scan_input.setStyleSheet("border: 1.5px solid #D32F2F;")
+            self.scan_input.setToolTip(f"No product with barcode or SKU '{code}'")
+            self.scan_input.selectAll()
+            return
+        self.scan_input.setStyleSheet("")
+        self.scan_input.setToolTip("")
+        self.select_product(product)
+        self.scan_input.clear()
+        self.quantity_input.setFocus()
+        self.quantity_input.selectAll()
+
+    def searched(self, product):
+        self.select_product(product)
+        self.quantity_input.setFocus()
+        self.quantity_input.selectAll()
+
+    def select_product(self, product):
+        self.pending_product = product
+        if self.category_combo.findData(product['category_id']) < 0:
+            # Category added since the combo was filled; populate_categories resumes the selection
+            self.load_categories_subcategories()
+        else:
+            self.apply_pending_selection()
+
+    def apply_pending_selection(self):
+        # Walk Category -> Subcategory -> Product as far as the loaded combos
+        # allow; each populate_* callback calls back in to continue
+        product = self.pending_product
+        if product is None:
+            return
+        steps = ((self.category_combo, product['category_id']),
+                 (self.subcategory_combo, product['subcategory_id']),
+                 (self.product_combo, product['id']))
+        for combo, value in steps:
+            if combo.currentData() == value:
+                continue
+            index = combo.findData(value)
+            if index >= 0:
+                if combo is self.product_combo:
+                    self.pending_product = None
+                combo.setCurrentIndex(index)
+            return
+        self.pending_product = None
+
+    def cancel_pending_selection(self):
+        self.pending_product = None
+
+    def show_product_fields(self, product):
+        self.product_tax_rate = product['tax_rate'] or 0
+        self.tax_rate.setText(f"{self.product_tax_rate}%")
+        self.rate_input.setValue(product['price'])
+        self.unit_input.setText(product['default_unit'] or "")
+        self.calculate_total()
+
+    def calculate_total(self):
+        totals = price_line(self.quantity_input.value(), self.rate_input.value(), self.product_tax_rate)
+        self.tax_amount.setText(f"₹{totals['tax_amount']:.2f}")
+        self.total_amount.setText(f"₹{totals['total_amount']:.2f}")
@@ -0,0 +1,102 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QListWidget
+from PySide6.QtCore import Qt, QTimer, QEvent, Signal
+
+
+class ProductSearchBox(QWidget):
+    """Search-as-you-type product picker.
+
+    Each key stroke restarts a short timer and only when typing pauses is
+    the text sent to Database.search_products on the AsyncDatabase pool.
+    A newer search supersedes one still queued, so the list never shows
+    hits for text the operator has already changed. Choosing a hit emits
+    product_selected with the product row.
+    """
+
+    product_selected = Signal(object)
+    search_failed = Signal(str)
+
+    def __init__(self, async_db, limit=20, delay_ms=150, parent=None):
+        super().__init__(parent)
+        self.async_db = async_db
+        self.limit = limit
+        self.results = []
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(4)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search by name, description, barcode or SKU")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self.schedule_search)
+        self.search_input.returnPressed.connect(self.choose_current)
+        self.search_input.installEventFilter(self)
+        layout.addWidget(self.search_input)
+
+        self.results_list = QListWidget()
+        self.results_list.setMaximumHeight(160)
+        self.results_list.itemActivated.connect(self.choose_item)
+        self.results_list.hide()
+        layout.addWidget(self.results_list)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.search)
+
+    def eventFilter(self, watched, event):
+        if watched is self.search_input and event.type() == QEvent.KeyPress:
+            if event.key() == Qt.Key_Down and self.results:
+                self.results_list.setFocus()
+                self.results_list.setCurrentRow(0)
+                return True
+            if event.key() == Qt.Key_Escape:
+                self.clear()
+                return True
+        return super().eventFilter(watched, event)
+
+    def schedule_search(self):
+        self.timer.start()
+
+    def search(self):
+        text = self.search_input.text().strip()
+        if not text:
+            self.async_db.cancel(self)
+            self.show_results([])
+            return
+        self.async_db.submit('search_products', text, self.limit, key=self,
+                             on_result=self.show_results,
+                             on_error=lambda error: self.search_failed.emit(str(error)))
+
+    def show_results(self, products):
+        self.results = list(products)
+        self.results_list.clear()
+        for product in self.results:
+            code = product['sku_id'] or product['barcode'] or ""
+            self.results_list.addItem(
+                f"{product['name']}  ·  {code}  ·  {product['category_name']} / {product['subcategory_name']}"
+            )
+        self.results_list.setVisible(bool(self.results))
+
+    def choose_item(self, item):
+        self.choose_row(self.results_list.row(item))
+
+    def choose_current(self):
+        # Enter before the pending search has run would pick a stale hit
+        if self.timer.isActive() or not self.results:
+            return
+        self.choose_row(max(self.results_list.currentRow(), 0))
+
+    def choose_row(self, row):
+        if 0 <= row < len(self.results):
+            product = self.results[row]
+            self.clear()
+            self.product_selected.emit(product)
+
+    def clear(self):
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self.timer.stop()
+        self.async_db.cancel(self)
+        self.show_results([])
@@ -0,0 +1,181 @@
+from bisect import bisect_left
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+
+
+class ProductTableModel(QAbstractTableModel):
+    """Product list that loads pages on demand instead of the whole catalog.
+
+    Rows are kept in (name, id) order. The view asks for the next page via
+    canFetchMore/fetchMore as the user scrolls, and each page continues
+    from the last loaded key (keyset pagination), so deep pages cost the
+    same as the first. Given an AsyncDatabase, pages are fetched on its
+    thread pool and appended when they arrive; load_failed reports errors,
+    after which nothing more is fetched until reload().
+    While a search text is set the model instead holds the top
+    search_limit full-text matches, best match first. Given a
+    ThumbnailCache, the Image column shows the product's thumbnail.
+    """
+
+    load_failed = Signal(str)
+
+    COLUMNS = [
+        ("Barcode", 'barcode'),
+        ("SKU ID", 'sku_id'),
+        ("Name", 'name'),
+        ("Category", 'category_name'),
+        ("Subcategory", 'subcategory_name'),
+        ("Default Unit", 'default_unit'),
+        ("Description", 'description'),
+        ("Price", 'price'),
+        ("Tax Rate", 'tax_rate'),
+        ("Image", 'image_hash'),
+    ]
+
+    def __init__(self, db, page_size=200, parent=None, async_db=None, search_limit=500, thumbnails=None):
+        super().__init__(parent)
+        self.db = db
+        self.async_db = async_db
+        self.thumbnails = thumbnails
+        if thumbnails is not None:
+            thumbnails.ready.connect(self._thumbnail_ready)
+        self.page_size = page_size
+        self.search_limit = search_limit
+        self._search = ""
+        self._rows = []
+        self._keys = []
+        # image hash -> rows showing it, so a finished thumbnail repaints only those
+        self._image_rows = {}
+        self._exhausted = False
+        self._fetching = False
+        self._failed = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self._rows[index.row()]
+        field = self.COLUMNS[index.column()][1]
+        if field == 'image_hash':
+            if role == Qt.DecorationRole and self.thumbnails is not None:
+                return self.thumbnails.pixmap(product['image_hash'])
+            if role == Qt.ToolTipRole:
+                return product['image_path']
+            return None
+        if role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        value = product[field]
+        if field == 'price':
+            return f"₹{value:.2f}"
+        if field == 'tax_rate':
+            return f"{value}%"
+        return value or ""
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._failed
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._fetching or self._failed:
+            return
+        if self._search:
+            method, args = 'search_products', (self._search, self.search_limit)
+        else:
+            after = self._keys[-1] if self._keys else None
+            method, args = 'get_products_page', (after, self.page_size)
+        if self.async_db is None:
+            try:
+                page = getattr(self.db, method)(*args)
+            except Exception as e:
+                self._fetch_failed(e)
+                return
+            self._append_page(page)
+            return
+        self._fetching = True
+        self.async_db.submit(method, *args, key=self,
+                             on_result=self._append_page, on_error=self._fetch_failed)
+
+    def _append_page(self, page):
+        self._fetching = False
+        # Search results arrive in one go; they are not paged
+        if self._search or len(page) < self.page_size:
+            self._exhausted = True
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self._keys.extend((row['name'], row['id']) for row in page)
+        self._index_images(first)
+        self.endInsertRows()
+
+    def _index_images(self, first=0):
+        if first == 0:
+            self._image_rows = {}
+        for row in range(first, len(self._rows)):
+            digest = self._rows[row]['image_hash']
+            if digest:
+                self._image_rows.setdefault(digest, []).append(row)
+
+    def _thumbnail_ready(self, digest):
+        column = self.COLUMNS.index(("Image", 'image_hash'))
+        for row in self._image_rows.get(digest, ()):
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def _fetch_failed(self, error):
+        self._fetching = False
+        # Otherwise the view asks again on its next layout, and a lasting
+        # error (a locked or damaged file) repeats the query and the dialog
+        self._failed = True
+        self.load_failed.emit(str(error))
+
+    def reload(self):
+        if self.async_db is not None:
+            self.async_db.cancel(self)
+        self._fetching = False
+        self._failed = False
+        self.beginResetModel()
+        self._rows = []
+        self._keys = []
+        self._image_rows = {}
+        self._exhausted = False
+        self.endResetModel()
+
+    def set_search(self, text):
+        """Filter to products matching text; an empty text restores the full list."""
+        text = text.strip()
+        if text == self._search:
+            return
+        self._search = text
+        self.reload()
+
+    def product_at(self, row):
+        return self._rows[row]
+
+    def add_product(self, product):
+        """Insert a newly added product at its sorted position without reloading."""
+        if self._search:
+            # Rows are in rank order; let the search decide whether it matches
+            self.reload()
+            return
+        key = (product['name'], product['id'])
+        position = bisect_left(self._keys, key)
+        if position == len(self._rows) and not self._exhausted:
+            # Past the loaded pages: the next fetchMore will bring it in
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, product)
+        self._keys.insert(position, key)
+        # Every row after the new one moved down
+        self._index_images()
+        self.endInsertRows()
@@ -0,0 +1,353 @@
+"""Per-statement timing for Database, and a log of slow statements.
+
+Database connections are made with InstrumentedConnection, whose cursors
+time every statement from execute to its last row fetched and record it
+in the database's QueryStats: calls, total and percentile latency, and
+rows returned (or changed, for writes). Statements differing only in the
+length of an IN (?, ?, ...) list are counted together.
+
+A statement slower than DatabaseConfig.slow_query_ms is written with its
+EXPLAIN QUERY PLAN to slow_queries.log beside the database file, rotated
+at 1 MB. Its parameters are logged only as their types, since they can
+be passwords, unless slow_query_log_params is set
+(IMS_DB_SLOW_QUERY_LOG_PARAMS=1).
+
+See the numbers in the app with Ctrl+Shift+D, from api_server.py at
+GET /stats, or here:
+
+    python query_stats.py --url http://127.0.0.1:8765 [--sort p99] [--limit 20]
+    python query_stats.py saved_stats.json
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+
+# Latest calls per statement the percentiles are taken from
+SAMPLES_PER_STATEMENT = 1000
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+SORT_KEYS = ('total_ms', 'calls', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'rows')
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def normalize(sql):
+    """The statement's text with whitespace collapsed and parameter lists shortened."""
+    sql = " ".join(sql.split())
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+
+
+def slow_query_logger(path):
+    """A logger writing to path through a RotatingFileHandler, shared by every Database using it."""
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None:
+            logger = logging.getLogger(f"ims.slow_queries.{len(_loggers)}")
+            logger.propagate = False
+            logger.setLevel(logging.WARNING)
+            handler = RotatingFileHandler(path, maxBytes=SLOW_LOG_MAX_BYTES,
+                                          backupCount=SLOW_LOG_BACKUPS, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            _loggers[path] = logger
+        return logger
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class _Statement:
+    __slots__ = ('calls', 'total', 'max', 'rows', 'slow', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.samples = deque(maxlen=SAMPLES_PER_STATEMENT)
+
+
+class QueryStats:
+    def __init__(self, slow_query_ms=100.0, slow_query_log="slow_queries.log", log_params=False):
+        self.slow_query_ms = slow_query_ms  # 0 turns the slow query log off
+        self.slow_query_log = slow_query_log
+        self.log_params = log_params  # the values themselves, not just their types
+        self._slow_seconds = slow_query_ms / 1000 if slow_query_ms else float("inf")
+        self.since = time.time()
+        self._statements = {}
+        # The same entries by the statement's exact text, which is cheaper than normalizing it every call
+        self._by_sql = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql, params, seconds, rows, conn=None):
+        """Add one call; conn, if given, is used to EXPLAIN the statement when it was slow."""
+        statement = self._by_sql.get(sql)
+        if statement is None:
+            statement = self._statement(sql)
+        with self._lock:
+            statement.calls += 1
+            statement.total += seconds
+            statement.rows += rows
+            statement.samples.append(seconds)
+            if seconds > statement.max:
+                statement.max = seconds
+        if seconds >= self._slow_seconds:
+            with self._lock:
+                statement.slow += 1
+            self._log_slow(normalize(sql), sql, params, seconds, rows, conn)
+
+    def _statement(self, sql):
+        key = normalize(sql)
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                statement = self._statements[key] = _Statement()
+            # Statements built with f-strings could grow this without bound
+            if len(self._by_sql) < 10000:
+                self._by_sql[sql] = statement
+        return statement
+
+    def _log_slow(self, key, sql, params, seconds, rows, conn):
+        plan = ""
+        if conn is not None and key.split(" ", 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+            try:
+                # A plain cursor, so the EXPLAIN is not itself recorded
+                cursor = sqlite3.Cursor(conn)
+                steps = cursor.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+                plan = "".join(f"\n    {detail}" for _, _, _, detail in steps)
+            except sqlite3.Error as e:
+                plan = f"\n    (no plan: {str(e)})"
+        slow_query_logger(self.slow_query_log).warning(
+            "%.1f ms, %d rows: %s\n  params: %s%s", seconds * 1000, rows, key, self._describe(params), plan)
+
+    def _describe(self, params):
+        if params is None:
+            return "(executemany)"
+        if self.log_params:
+            return repr(params)
+        if isinstance(params, dict):
+            return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in params.items()) + "}"
+        return f"{len(params)} ({', '.join(type(value).__name__ for value in params)})"
+
+    def snapshot(self, sort='total_ms'):
+        """One dict per statement, slowest in total first unless sort names another column."""
+        with self._lock:
+            items = [(key, s.calls, s.total, s.max, s.rows, s.slow, sorted(s.samples))
+                     for key, s in self._statements.items()]
+        result = []
+        for key, calls, total, longest, rows, slow, samples in items:
+            result.append({
+                'statement': key,
+                'calls': calls,
+                'total_ms': total * 1000,
+                'mean_ms': total * 1000 / calls,
+                'p50_ms': _percentile(samples, 50) * 1000,
+                'p95_ms': _percentile(samples, 95) * 1000,
+                'p99_ms': _percentile(samples, 99) * 1000,
+                'max_ms': longest * 1000,
+                'rows': rows,
+                'slow': slow,
+            })
+        result.sort(key=lambda row: row[sort], reverse=True)
+        return result
+
+    def to_dict(self, sort='total_ms'):
+        return {'since': self.since, 'slow_query_ms': self.slow_query_ms,
+                'slow_query_log': os.path.abspath(self.slow_query_log), 'statements': self.snapshot(sort)}
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._by_sql = {}
+            self.since = time.time()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that records each statement once its rows are all fetched or it moves on.
+
+    A SELECT is timed from execute to its last row, so the time includes
+    fetching; a statement whose rows are left unread is recorded when the
+    cursor runs its next statement, is closed or is garbage collected.
+    """
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        if self._pending is not None:
+            self._finish()
+        start = perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            self.connection.stats.record(sql, parameters, perf_counter() - start, 0)
+            raise
+        rowcount = self.rowcount
+        if rowcount >= 0:
+            # A write: nothing to fetch, so it is complete
+            self.connection.stats.record(sql, parameters, perf_counter() - start, rowcount, self.connection)
+        else:
+            self._pending = [sql, parameters, perf_counter() - start, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if self._pending is not None:
+            self._finish()
+        start = perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.stats.record(sql, None, perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def _finish(self, explain=True):
+        sql, parameters, seconds, rows = self._pending
+        self._pending = None
+        self.connection.stats.record(sql, parameters, seconds, rows, self.connection if explain else None)
+
+    def fetchone(self):
+        start = perf_counter()
+        row = super().fetchone()
+        pending = self._pending
+        if pending is not None:
+            pending[2] += perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        pending = self._pending
+        if pending is not None:
+            pending[2] += perf_counter() - start
+            pending[3] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = super().fetchall()
+        pending = self._pending
+        if pending is not None:
+            pending[2] += perf_counter() - start
+            pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self._pending is not None:
+                self._pending[2] += perf_counter() - start
+                self._finish()
+            raise
+        pending = self._pending
+        if pending is not None:
+            pending[2] += perf_counter() - start
+            pending[3] += 1
+        return row
+
+    def close(self):
+        if self._pending is not None:
+            self._finish()
+        super().close()
+
+    def __del__(self):
+        if self._pending is not None:
+            try:
+                # Garbage collection may run on any thread, where the
+                # connection cannot be used to EXPLAIN
+                self._finish(explain=False)
+            except Exception:
+                pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors report to self.stats, a QueryStats."""
+    stats = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def format_table(statements, limit=None, width=100):
+    """statements from QueryStats.snapshot as a plain text table."""
+    lines = [f"{'calls':>8} {'total ms':>10} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+             f"{'max':>8} {'rows':>9} {'slow':>5}  statement"]
+    for row in statements[:limit]:
+        statement = row['statement']
+        if width and len(statement) > width:
+            statement = statement[:width - 3] + "..."
+        lines.append(f"{row['calls']:>8} {row['total_ms']:>10.1f} {row['mean_ms']:>8.2f} {row['p50_ms']:>8.2f} "
+                     f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['max_ms']:>8.2f} {row['rows']:>9} "
+                     f"{row['slow']:>5}  {statement}")
+    return "\n".join(lines)
+
+
+def fetch(url, timeout=10):
+    """The stats of a running api_server.py."""
+    from urllib.request import urlopen
+    with urlopen(url.rstrip("/") + "/stats", timeout=timeout) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show per-statement database timings")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('file', nargs='?', help="stats saved from the diagnostics page")
+    source.add_argument('--url', help="a running api_server.py, e.g. http://127.0.0.1:8765")
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms')
+    parser.add_argument('--limit', type=int, default=30)
+    parser.add_argument('--width', type=int, default=100, help="truncate statements to this many characters (0: no limit)")
+    parser.add_argument('--json', action='store_true', help="print the raw JSON instead of a table")
+    args = parser.parse_args()
+
+    try:
+        if args.url:
+            stats = fetch(args.url)
+        else:
+            with open(args.file, encoding="utf-8") as f:
+                stats = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading stats: {str(e)}", file=sys.stderr)
+        return 1
+    statements = sorted(stats['statements'], key=lambda row: row[args.sort], reverse=True)
+    if args.json:
+        print(json.dumps(dict(stats, statements=statements[:args.limit]), indent=2))
+        return 0
+    since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stats['since']))
+    print(f"{len(statements)} statements since {since}; slower than {stats['slow_query_ms']:g} ms "
+          f"are logged to {stats['slow_query_log']}")
+    print(format_table(statements, args.limit, args.width))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Sales and purchase reports served from the rollup tables.
+
+    python reports.py sales-by-day --from 2025-03-01 --to 2025-03-31 [--db inventory.db]
+    python reports.py rebuild [--db inventory.db]
+
+Ranges are inclusive dates, in UTC like the ledgers' created_at. Whole
+calendar months inside a range are read from the *_monthly rollups and only
+the days at either end from the *_daily ones, so a report touches at most
+one row per product (and supplier) for each month it covers.
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+
+from database import Database
+from migrations import ROLLUPS, rebuild_rollups
+
+TOTALS = '''
+    SUM(quantity) AS quantity,
+    SUM(total_amount) - SUM(tax_amount) AS net_amount,
+    SUM(tax_amount) AS tax_amount,
+    SUM(total_amount) AS total_amount,
+    SUM(line_count) AS line_count
+'''
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def split_range(start, end):
+    """Split an inclusive date range into edge day ranges and the (first, last) whole months between them."""
+    start, end = _as_date(start), _as_date(end)
+    if end < start:
+        return [], None
+    first_month = start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    last_month_end = end if (end + timedelta(days=1)).day == 1 else end.replace(day=1) - timedelta(days=1)
+    if first_month > last_month_end:
+        return [(start, end)], None
+    days = []
+    if start < first_month:
+        days.append((start, first_month - timedelta(days=1)))
+    if last_month_end < end:
+        days.append((last_month_end + timedelta(days=1), end))
+    return days, (first_month.strftime('%Y-%m'), last_month_end.strftime('%Y-%m'))
+
+
+def rollup_source(rollup, start, end):
+    """Return (subquery, params) yielding the rollup rows that together cover start..end."""
+    daily, monthly = (table for table, _ in ROLLUPS[rollup][1])
+    days, months = split_range(start, end)
+    parts, params = [], []
+    for first, last in days:
+        parts.append(f"SELECT * FROM {daily} WHERE period BETWEEN ? AND ?")
+        params += [first.isoformat(), last.isoformat()]
+    if months:
+        parts.append(f"SELECT * FROM {monthly} WHERE period BETWEEN ? AND ?")
+        params += list(months)
+    if not parts:
+        parts.append(f"SELECT * FROM {daily} WHERE 0")
+    return "(" + " UNION ALL ".join(parts) + ")", params
+
+
+class Reports:
+    def __init__(self, db):
+        self.db = db
+
+    def sales_by_day(self, start, end):
+        try:
+            return self.db.execute_query(f'''
+                SELECT period AS day, {TOTALS}
+                FROM sales_daily
+                WHERE period BETWEEN ? AND ?
+                GROUP BY period
+                ORDER BY period
+            ''', (_as_date(start).isoformat(), _as_date(end).isoformat()))
+        except Exception as e:
+            raise Exception(f"Error getting sales by day: {str(e)}")
+
+    def sales_by_month(self, start, end):
+        try:
+            source, params = rollup_source('sales', start, end)
+            return self.db.execute_query(f'''
+                SELECT substr(period, 1, 7) AS month, {TOTALS}
+                FROM {source}
+                GROUP BY month
+                ORDER BY month
+            ''', params)
+        except Exception as e:
+            raise Exception(f"Error getting sales by month: {str(e)}")
+
+    def sales_by_category(self, start, end):
+        try:
+            source, params = rollup_source('sales', start, end)
+            return self.db.execute_query(f'''
+                SELECT c.id AS category_id, c.name AS category_name, {TOTALS}
+                FROM {source} r
+                JOIN products p ON p.id = r.product_id
+                JOIN categories c ON c.id = p.category_id
+                GROUP BY c.id
+                ORDER BY total_amount DESC
+            ''', params)
+        except Exception as e:
+            raise Exception(f"Error getting sales by category: {str(e)}")
+
+    def top_products(self, start, end, limit=10, by='total_amount'):
+        if by not in ('total_amount', 'quantity'):
+            raise Exception(f"Error getting top products: cannot rank by {by}")
+        try:
+            source, params = rollup_source('sales', start, end)
+            return self.db.execute_query(f'''
+                SELECT t.*, p.name AS product_name, p.sku_id
+                FROM (
+                    SELECT product_id, {TOTALS}
+                    FROM {source}
+                    GROUP BY product_id
+                    ORDER BY {by} DESC
+                    LIMIT ?
+                ) t
+                JOIN products p ON p.id = t.product_id
+                ORDER BY t.{by} DESC
+            ''', params + [limit])
+        except Exception as e:
+            raise Exception(f"Error getting top products: {str(e)}")
+
+    def purchases_by_supplier(self, start, end):
+        try:
+            source, params = rollup_source('purchases', start, end)
+            return self.db.execute_query(f'''
+                SELECT s.id AS supplier_id, s.name AS supplier_name, {TOTALS}
+                FROM {source} r
+                JOIN suppliers s ON s.id = r.supplier_id
+                GROUP BY s.id
+                ORDER BY total_amount DESC
+            ''', params)
+        except Exception as e:
+            raise Exception(f"Error getting purchases by supplier: {str(e)}")
+
+    def tax_by_period(self, start, end, period='month'):
+        """Tax collected on sales and paid on purchases per day or month."""
+        try:
+            if period == 'day':
+                first, last = _as_date(start).isoformat(), _as_date(end).isoformat()
+                sales = "(SELECT * FROM sales_daily WHERE period BETWEEN ? AND ?)"
+                purchases = "(SELECT * FROM purchases_daily WHERE period BETWEEN ? AND ?)"
+                params = [first, last, first, last]
+                width = 10
+            elif period == 'month':
+                sales, sales_params = rollup_source('sales', start, end)
+                purchases, purchase_params = rollup_source('purchases', start, end)
+                params = sales_params + purchase_params
+                width = 7
+            else:
+                raise Exception(f"unknown period {period}")
+            return self.db.execute_query(f'''
+                SELECT period, SUM(collected) AS tax_collected, SUM(paid) AS tax_paid,
+                       SUM(collected) - SUM(paid) AS net_tax
+                FROM (
+                    SELECT substr(period, 1, {width}) AS period, tax_amount AS collected, 0 AS paid FROM {sales}
+                    UNION ALL
+                    SELECT substr(period, 1, {width}), 0, tax_amount FROM {purchases}
+                )
+                GROUP BY period
+                ORDER BY period
+            ''', params)
+        except Exception as e:
+            raise Exception(f"Error getting tax by period: {str(e)}")
+
+    def rebuild(self):
+        """Recompute the rollup tables from the ledgers."""
+        try:
+            self.db.run_in_transaction(rebuild_rollups)
+        except Exception as e:
+            raise Exception(f"Error rebuilding report rollups: {str(e)}")
+
+
+# CLI name -> (Reports method, takes a limit)
+REPORTS = {
+    'sales-by-day': ('sales_by_day', False),
+    'sales-by-month': ('sales_by_month', False),
+    'sales-by-category': ('sales_by_category', False),
+    'top-products': ('top_products', True),
+    'purchases-by-supplier': ('purchases_by_supplier', False),
+    'tax-by-month': ('tax_by_period', False),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print sales and purchase reports")
+    parser.add_argument('report', choices=list(REPORTS) + ['rebuild'])
+    parser.add_argument('--from', dest='start', help="first day (default: start of the current UTC month)")
+    parser.add_argument('--to', dest='end', help="last day (default: today in UTC)")
+    parser.add_argument('--limit', type=int, default=10, help="rows for top-products (default: 10)")
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        reports = Reports(db)
+        if args.report == 'rebuild':
+            reports.rebuild()
+            print("Rebuilt report rollups.")
+            return 0
+        # The triggers bucket rows by SQLite's date() of the UTC created_at,
+        # so "today" is taken from SQLite too rather than the local clock
+        today, month_start = db.execute_query("SELECT date('now'), date('now', 'start of month')")[0]
+        method, takes_limit = REPORTS[args.report]
+        extra = (args.limit,) if takes_limit else ()
+        rows = getattr(reports, method)(args.start or month_start, args.end or today, *extra)
+        if rows:
+            print("\t".join(rows[0].keys()))
+        for row in rows:
+            print("\t".join(f"{value:.2f}" if isinstance(value, float) else str(value) for value in row))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
+                             QComboBox, QDateEdit, QPushButton, QMessageBox,
+                             QGroupBox, QTableWidget, QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import Qt, QDate
+from database import get_database
+from async_database import AsyncDatabase
+from reports import Reports
+
+
+class ReportsForm(QWidget):
+    # (label, Reports method, extra arguments)
+    REPORTS = [
+        ("Sales by Day", 'sales_by_day', ()),
+        ("Sales by Month", 'sales_by_month', ()),
+        ("Sales by Category", 'sales_by_category', ()),
+        ("Top Products", 'top_products', (20,)),
+        ("Purchases by Supplier", 'purchases_by_supplier', ()),
+        ("Tax by Month", 'tax_by_period', ('month',)),
+        ("Tax by Day", 'tax_by_period', ('day',)),
+    ]
+
+    def __init__(self, db=None, async_db=None):
+        super().__init__()
+        self.db = db if db is not None else get_database()
+        self.async_db = async_db if async_db is not None else AsyncDatabase(self.db, parent=self)
+        self.reports = Reports(self.db)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(20)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        # Report Selection Group
+        report_group = QGroupBox("Report")
+        report_layout = QFormLayout()
+        report_layout.setSpacing(15)
+
+        self.report_combo = QComboBox()
+        for label, _, _ in self.REPORTS:
+            self.report_combo.addItem(label)
+        report_layout.addRow("Report:", self.report_combo)
+
+        today = QDate.currentDate()
+        self.start_date = QDateEdit(QDate(today.year(), today.month(), 1))
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDisplayFormat("yyyy-MM-dd")
+        report_layout.addRow("From:", self.start_date)
+
+        self.end_date = QDateEdit(today)
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDisplayFormat("yyyy-MM-dd")
+        report_layout.addRow("To:", self.end_date)
+
+        button_layout = QHBoxLayout()
+        self.run_button = QPushButton("Run Report")
+        self.run_button.clicked.connect(self.run_report)
+        button_layout.addWidget(self.run_button)
+        report_layout.addRow("", button_layout)
+
+        report_group.setLayout(report_layout)
+        layout.addWidget(report_group)
+
+        # Results Group
+        results_group = QGroupBox("Results")
+        results_layout = QVBoxLayout()
+        self.results_table = QTableWidget()
+        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        results_layout.addWidget(self.results_table)
+        results_group.setLayout(results_layout)
+        layout.addWidget(results_group)
+
+    def run_report(self):
+        start = self.start_date.date().toString("yyyy-MM-dd")
+        end = self.end_date.date().toString("yyyy-MM-dd")
+        if end < start:
+            QMessageBox.warning(self, "Validation Error", "The end date is before the start date")
+            return
+        _, method, extra = self.REPORTS[self.report_combo.currentIndex()]
+        self.run_button.setEnabled(False)
+        self.async_db.submit(getattr(self.reports, method), start, end, *extra, key=(self, 'report'),
+                             on_result=self.show_report,
+                             on_error=self.report_failed)
+
+    def show_report(self, rows):
+        self.run_button.setEnabled(True)
+        self.results_table.clear()
+        columns = list(rows[0].keys()) if rows else []
+        self.results_table.setColumnCount(len(columns))
+        self.results_table.setHorizontalHeaderLabels([c.replace('_', ' ').title() for c in columns])
+        self.results_table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            for column_index, value in enumerate(row):
+                if isinstance(value, float):
+                    text = f"{value:.2f}"
+                else:
+                    text = "" if value is None else str(value)
+                item = QTableWidgetItem(text)
+                if isinstance(value, (int, float)):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.results_table.setItem(row_index, column_index, item)
+
+    def report_failed(self, error):
+        self.run_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to run report: {str(error)}")
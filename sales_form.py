@@ -2,42 +2,43 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,
                              QLineEdit, QComboBox, QDoubleSpinBox, QTextEdit,
                              QPushButton, QMessageBox, QGroupBox, QTableWidget,
                              QTableWidgetItem, QHeaderView)
-from PySide6.QtCore import Qt
-from database import Database
-
-class SalesForm(QWidget):
-    def __init__(self, user_id):
+from PySide6.QtCore import Qt, QTimer
+from database import get_database
+from async_database import AsyncDatabase
+from product_picker import ProductPicker
+from services import get_service
+from pricing import PER_LINE, price_invoice, price_line
+
+class SalesForm(QWidget, ProductPicker):
+    def __init__(self, user_id, db=None, async_db=None, service=None):
         super().__init__()
-        self.db = Database()
+        self.db = db if db is not None else get_database()
+        self.async_db = async_db if async_db is not None else AsyncDatabase(self.db, parent=self)
+        # Sales are priced and recorded by the service, locally or on the API server
+        self.service = service if service is not None else get_service(self.db)
         self.user_id = user_id
+        self.available_stock = None
+        self.pending_product = None
+        # The selected product's, kept rather than read back from the Tax Rate field
+        self.product_tax_rate = 0
+        # The rule of whoever records the invoice, so the cart shows what will be stored
+        self.rounding = PER_LINE
+        self.cart = []
         self.setup_ui()
+        # Loaded once the form is on screen, so its first paint does not wait
+        QTimer.singleShot(0, self.load_data)
+
+    def load_data(self):
         self.load_categories_subcategories()
         self.load_customers()
+        self.load_rounding()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setSpacing(20)
         layout.setContentsMargins(20, 20, 20, 20)
 
-        # Product Selection Group
-        product_group = QGroupBox("Product Selection")
-        product_layout = QFormLayout()
-        product_layout.setSpacing(15)
-
-        self.category_combo = QComboBox()
-        self.category_combo.currentIndexChanged.connect(self.filter_subcategories)
-        product_layout.addRow("Category:", self.category_combo)
-
-        self.subcategory_combo = QComboBox()
-        self.subcategory_combo.currentIndexChanged.connect(self.filter_products)
-        product_layout.addRow("Subcategory:", self.subcategory_combo)
-
-        self.product_combo = QComboBox()
-        self.product_combo.currentIndexChanged.connect(self.load_product_details)
-        product_layout.addRow("Product:", self.product_combo)
-
-        product_group.setLayout(product_layout)
-        layout.addWidget(product_group)
+        layout.addWidget(self.product_selection_group())
 
         # Customer Details Group
         customer_group = QGroupBox("Customer Details")
@@ -97,6 +98,10 @@ class SalesForm(QWidget):
         self.unit_input.setReadOnly(True)
         quantity_layout.addRow("Unit of Measurement:", self.unit_input)
 
+        self.stock_input = QLineEdit()
+        self.stock_input.setReadOnly(True)
+        quantity_layout.addRow("Available Stock:", self.stock_input)
+
         quantity_group.setLayout(quantity_layout)
         layout.addWidget(quantity_group)
 
@@ -104,105 +109,102 @@ class SalesForm(QWidget):
         button_layout = QHBoxLayout()
         self.sell_button = QPushButton("Sell Product")
         self.sell_button.clicked.connect(self.sell_product)
+        self.add_to_cart_button = QPushButton("Add to Cart")
+        self.add_to_cart_button.clicked.connect(self.add_to_cart)
         self.clear_button = QPushButton("Clear")
         self.clear_button.clicked.connect(self.clear_form)
         button_layout.addWidget(self.sell_button)
+        button_layout.addWidget(self.add_to_cart_button)
         button_layout.addWidget(self.clear_button)
         layout.addLayout(button_layout)
 
-    def load_categories_subcategories(self):
-        try:
-            # Load categories
-            categories = self.db.get_all_categories()
-            self.category_combo.clear()
-            self.category_combo.addItem("Select Category", None)
-            for category in categories:
-                self.category_combo.addItem(category[1], category[0])
-
-            # Load subcategories
-            self.filter_subcategories()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
+        # Cart Group
+        cart_group = QGroupBox("Cart")
+        cart_layout = QVBoxLayout()
+
+        self.cart_table = QTableWidget()
+        self.cart_table.setColumnCount(6)
+        self.cart_table.setHorizontalHeaderLabels([
+            "Product", "Quantity", "Unit", "Rate", "Tax Amount", "Total Amount"
+        ])
+        self.cart_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.cart_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.cart_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        cart_layout.addWidget(self.cart_table)
+
+        cart_buttons = QHBoxLayout()
+        self.cart_total = QLineEdit()
+        self.cart_total.setReadOnly(True)
+        self.cart_total.setPlaceholderText("Cart total")
+        self.remove_line_button = QPushButton("Remove Line")
+        self.remove_line_button.clicked.connect(self.remove_cart_line)
+        self.checkout_button = QPushButton("Checkout")
+        self.checkout_button.clicked.connect(self.checkout)
+        cart_buttons.addWidget(self.cart_total)
+        cart_buttons.addWidget(self.remove_line_button)
+        cart_buttons.addWidget(self.checkout_button)
+        cart_layout.addLayout(cart_buttons)
+
+        cart_group.setLayout(cart_layout)
+        layout.addWidget(cart_group)
 
-    def filter_subcategories(self):
-        try:
-            category_id = self.category_combo.currentData()
-            self.subcategory_combo.clear()
-            self.subcategory_combo.addItem("Select Subcategory", None)
-            
-            if category_id:
-                subcategories = self.db.get_subcategories_by_category(category_id)
-                for subcategory in subcategories:
-                    self.subcategory_combo.addItem(subcategory[1], subcategory[0])
-            
-            self.filter_products()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load subcategories: {str(e)}")
+    def load_customers(self):
+        self.async_db.submit('get_all_customers', key=(self, 'customers'),
+                             on_result=self.populate_customers,
+                             on_error=self.show_error("load customers"))
 
-    def filter_products(self):
-        try:
-            category_id = self.category_combo.currentData()
-            subcategory_id = self.subcategory_combo.currentData()
-            
-            self.product_combo.clear()
-            self.product_combo.addItem("Select Product", None)
-            
-            if category_id and subcategory_id:
-                products = self.db.get_products_by_category_subcategory(category_id, subcategory_id)
-                for product in products:
-                    self.product_combo.addItem(product[1], product[0])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
+    def populate_customers(self, customers):
+        self.customer_combo.clear()
+        self.customer_combo.addItem("Select Customer", None)
+        for customer in customers:
+            self.customer_combo.addItem(customer[1], customer[0])
 
-    def load_customers(self):
-        try:
-            customers = self.db.get_all_customers()
-            self.customer_combo.clear()
-            self.customer_combo.addItem("Select Customer", None)
-            for customer in customers:
-                self.customer_combo.addItem(customer[1], customer[0])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load customers: {str(e)}")
+    def load_rounding(self):
+        self.async_db.submit(self.service.tax_rounding, key=(self, 'rounding'),
+                             on_result=self.set_rounding,
+                             on_error=self.show_error("load the tax rounding rule"))
+
+    def set_rounding(self, rounding):
+        self.rounding = rounding
+        self.refresh_cart()
 
     def load_product_details(self):
-        try:
-            product_id = self.product_combo.currentData()
-            if product_id:
-                product = self.db.get_product_by_id(product_id)
-                if product:
-                    self.rate_input.setValue(product[7])  # Price
-                    self.tax_rate.setText(f"{product[8]}%")  # Tax Rate
-                    self.unit_input.setText(product[9] or "")  # Default Unit
-                    self.calculate_total()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load product details: {str(e)}")
+        product_id = self.product_combo.currentData()
+        self.available_stock = None
+        self.stock_input.clear()
+        if product_id:
+            self.async_db.submit(self.fetch_product_details, product_id, key=(self, 'product_details'),
+                                 on_result=self.show_product_details,
+                                 on_error=self.show_error("load product details"))
+        else:
+            self.async_db.cancel((self, 'product_details'))
+
+    def fetch_product_details(self, product_id):
+        # Runs on a worker thread
+        return self.db.catalog.get_product(product_id), self.db.get_stock(product_id)
+
+    def show_product_details(self, details):
+        product, stock = details
+        if product:
+            self.show_product_fields(product)
+            # Units already in the cart are no longer available
+            self.available_stock = stock - self.cart_quantity(product['id'])
+            self.stock_input.setText(f"{self.available_stock:g} {product['default_unit'] or ''}".strip())
 
     def load_customer_details(self):
-        try:
-            customer_id = self.customer_combo.currentData()
-            if customer_id:
-                customer = self.db.get_customer_by_id(customer_id)
-                if customer:
-                    self.customer_name.setText(customer[1])
-                    self.customer_phone.setText(customer[2])
-                    self.customer_email.setText(customer[3])
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load customer details: {str(e)}")
-
-    def calculate_total(self):
-        try:
-            quantity = self.quantity_input.value()
-            rate = self.rate_input.value()
-            tax_rate = float(self.tax_rate.text().strip('%'))
-            
-            subtotal = quantity * rate
-            tax_amount = (subtotal * tax_rate) / 100
-            total = subtotal + tax_amount
-            
-            self.tax_amount.setText(f"₹{tax_amount:.2f}")
-            self.total_amount.setText(f"₹{total:.2f}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to calculate total: {str(e)}")
+        customer_id = self.customer_combo.currentData()
+        if customer_id:
+            self.async_db.submit('get_customer_by_id', customer_id, key=(self, 'customer_details'),
+                                 on_result=self.show_customer_details,
+                                 on_error=self.show_error("load customer details"))
+        else:
+            self.async_db.cancel((self, 'customer_details'))
+
+    def show_customer_details(self, customer):
+        if customer:
+            self.customer_name.setText(customer[1])
+            self.customer_phone.setText(customer[2])
+            self.customer_email.setText(customer[3])
 
     def validate_form(self):
         if self.product_combo.currentData() is None:
@@ -212,10 +214,22 @@ class SalesForm(QWidget):
         if self.customer_combo.currentData() is None:
             QMessageBox.warning(self, "Validation Error", "Please select a customer")
             return False
-            
+
+        return self.validate_line()
+
+    def validate_line(self):
+        if self.product_combo.currentData() is None:
+            QMessageBox.warning(self, "Validation Error", "Please select a product")
+            return False
+
         if self.quantity_input.value() <= 0:
             QMessageBox.warning(self, "Validation Error", "Please enter a valid quantity")
             return False
+
+        if self.available_stock is not None and self.quantity_input.value() > self.available_stock:
+            QMessageBox.warning(self, "Validation Error",
+                                f"Only {self.available_stock:g} in stock for this product")
+            return False
             
         if self.rate_input.value() <= 0:
             QMessageBox.warning(self, "Validation Error", "Please enter a valid rate")
@@ -227,27 +241,109 @@ class SalesForm(QWidget):
         if not self.validate_form():
             return
             
+        sale_data = {
+            'product_id': self.product_combo.currentData(),
+            'customer_id': self.customer_combo.currentData(),
+            'user_id': self.user_id,
+            'quantity': self.quantity_input.value(),
+            'rate': self.rate_input.value()
+        }
+
+        self.sell_button.setEnabled(False)
+        self.async_db.submit(self.service.record_sale, sale_data,
+                             on_result=self.product_sold,
+                             on_error=self.sale_failed)
+
+    def product_sold(self, sale_id):
+        self.sell_button.setEnabled(True)
+        QMessageBox.information(self, "Success", "Product sold successfully!")
+        self.clear_form()
+
+    def sale_failed(self, error):
+        self.sell_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to sell product: {str(error)}")
+
+    def current_line(self):
+        line = {
+            'product_id': self.product_combo.currentData(),
+            'product_name': self.product_combo.currentText(),
+            'unit': self.unit_input.text(),
+            'quantity': self.quantity_input.value(),
+            'rate': self.rate_input.value(),
+            'tax_rate': self.product_tax_rate
+        }
+        line.update(price_line(line['quantity'], line['rate'], line['tax_rate']))
+        return line
+
+    def cart_quantity(self, product_id):
+        return sum(line['quantity'] for line in self.cart if line['product_id'] == product_id)
+
+    def add_to_cart(self):
+        if not self.validate_line():
+            return
+
         try:
-            sale_data = {
-                'product_id': self.product_combo.currentData(),
-                'customer_id': self.customer_combo.currentData(),
-                'user_id': self.user_id,
-                'quantity': self.quantity_input.value(),
-                'rate': self.rate_input.value(),
-                'tax_rate': float(self.tax_rate.text().strip('%')),
-                'tax_amount': float(self.tax_amount.text().strip('₹')),
-                'total_amount': float(self.total_amount.text().strip('₹'))
-            }
-            
-            self.db.add_sale(sale_data)
-            QMessageBox.information(self, "Success", "Product sold successfully!")
-            self.clear_form()
+            self.cart.append(self.current_line())
+            self.refresh_cart()
+            # Keep the customer so the next line can be added straight away
+            self.category_combo.setCurrentIndex(0)
+            self.quantity_input.setValue(1)
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to sell product: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to add to cart: {str(e)}")
+
+    def remove_cart_line(self):
+        row = self.cart_table.currentRow()
+        if 0 <= row < len(self.cart):
+            del self.cart[row]
+            self.refresh_cart()
+            self.load_product_details()
+
+    def refresh_cart(self):
+        # Priced as a whole, so the lines show the invoice's rounding
+        lines, totals = price_invoice(self.cart, self.rounding)
+        self.cart_table.setRowCount(len(lines))
+        for row, line in enumerate(lines):
+            self.cart_table.setItem(row, 0, QTableWidgetItem(line['product_name']))
+            self.cart_table.setItem(row, 1, QTableWidgetItem(f"{line['quantity']:g}"))
+            self.cart_table.setItem(row, 2, QTableWidgetItem(line['unit']))
+            self.cart_table.setItem(row, 3, QTableWidgetItem(f"₹{line['rate']:.2f}"))
+            self.cart_table.setItem(row, 4, QTableWidgetItem(f"₹{line['tax_amount']:.2f}"))
+            self.cart_table.setItem(row, 5, QTableWidgetItem(f"₹{line['total_amount']:.2f}"))
+        if self.cart:
+            self.cart_total.setText(f"{len(self.cart)} lines, ₹{totals['total_amount']:.2f}")
+        else:
+            self.cart_total.clear()
+
+    def checkout(self):
+        if not self.cart:
+            QMessageBox.warning(self, "Validation Error", "The cart is empty")
+            return
+
+        if self.customer_combo.currentData() is None:
+            QMessageBox.warning(self, "Validation Error", "Please select a customer")
+            return
+
+        self.checkout_button.setEnabled(False)
+        self.async_db.submit(self.service.checkout, {
+            'customer_id': self.customer_combo.currentData(),
+            'user_id': self.user_id
+        }, list(self.cart), on_result=self.checked_out, on_error=self.checkout_failed)
+
+    def checked_out(self, invoice_id):
+        self.checkout_button.setEnabled(True)
+        QMessageBox.information(self, "Success", f"Invoice #{invoice_id} recorded with {len(self.cart)} lines!")
+        self.cart = []
+        self.refresh_cart()
+        self.clear_form()
+
+    def checkout_failed(self, error):
+        self.checkout_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to check out: {str(error)}")
 
     def clear_form(self):
         self.category_combo.setCurrentIndex(0)
         self.customer_combo.setCurrentIndex(0)
+        self.product_tax_rate = 0
         self.quantity_input.setValue(1)
         self.rate_input.setValue(0)
         self.tax_rate.clear()
@@ -256,4 +352,6 @@ class SalesForm(QWidget):
         self.customer_name.clear()
         self.customer_phone.clear()
         self.customer_email.clear()
-        self.unit_input.clear() 
\ No newline at end of file
+        self.unit_input.clear()
+        self.stock_input.clear()
+        self.available_stock = None 
\ No newline at end of file
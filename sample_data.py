@@ -0,0 +1,350 @@
+"""Generate a realistic inventory database at any scale, reproducibly.
+
+    python sample_data.py demo.db --scale medium
+    python sample_data.py demo.db --products 200000 --years 3 --sales-per-day 2000 --seed 7
+
+Fills categories, subcategories, products (valid EAN-13 barcodes, GST
+tax slabs), suppliers, customers and --years of history up to
+--end-date: single-line sales, multi-line invoices, and goods received
+notes that keep every product in stock. The same seed and end date
+always produce the same data.
+
+Rows are written with executemany in one transaction. The search and
+rollup triggers are dropped for the load and recreated afterwards, and
+the search index, report rollups and stock levels are rebuilt once at
+the end, which is far quicker than maintaining them row by row.
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from database import Database
+from migrations import rebuild_rollups
+from pricing import invoice_totals, price_line
+
+# name: (categories, subcategories per category, products, suppliers, customers, years, sales per day)
+SCALES = {
+    'small': (10, 5, 5000, 20, 500, 1, 100),
+    'medium': (30, 8, 50000, 100, 5000, 2, 500),
+    'large': (60, 12, 1000000, 500, 50000, 3, 3000),
+}
+
+CATEGORY_NAMES = [
+    "Groceries", "Beverages", "Dairy", "Bakery", "Snacks", "Personal Care", "Household",
+    "Electronics", "Stationery", "Clothing", "Footwear", "Toys", "Kitchenware", "Pharmacy",
+    "Frozen Foods", "Spices", "Pet Supplies", "Hardware", "Sports", "Baby Care",
+]
+SUBCATEGORY_WORDS = ["Everyday", "Premium", "Organic", "Imported", "Value", "Family",
+                     "Classic", "Fresh", "Regional", "Essentials", "Seasonal", "Bulk"]
+BRANDS = ["Amrit", "Bharat", "Chetak", "Deccan", "Ganga", "Himalaya", "Kaveri", "Lotus",
+          "Malabar", "Narmada", "Orchid", "Sahyadri", "Tulsi", "Udaya", "Vindhya", "Yamuna"]
+ADJECTIVES = ["Classic", "Golden", "Royal", "Pure", "Natural", "Super", "Daily", "Smart",
+              "Crunchy", "Soft", "Spicy", "Sweet", "Fresh", "Rich", "Light", "Double"]
+NOUNS = ["Rice", "Atta", "Tea", "Coffee", "Biscuits", "Soap", "Shampoo", "Oil", "Ghee",
+         "Namkeen", "Juice", "Detergent", "Toothpaste", "Noodles", "Pickle", "Masala",
+         "Notebook", "Pen", "Charger", "Cable", "Towel", "Bottle", "Sandals", "Bucket"]
+SIZES = [("100 g", "pcs"), ("250 g", "pcs"), ("500 g", "pcs"), ("1 kg", "kg"), ("5 kg", "kg"),
+         ("200 ml", "pcs"), ("500 ml", "ltr"), ("1 l", "ltr"), ("Pack of 6", "pack"), ("", "pcs")]
+TAX_SLABS = [0.0, 5.0, 5.0, 12.0, 18.0, 18.0, 18.0, 28.0]
+FIRST_NAMES = ["Aarav", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Neha",
+               "Priya", "Rahul", "Rohan", "Sanya", "Tanvi", "Varun", "Vikram", "Zoya"]
+LAST_NAMES = ["Sharma", "Iyer", "Patel", "Reddy", "Nair", "Gupta", "Singh", "Das",
+              "Menon", "Joshi", "Kulkarni", "Bose", "Rao", "Khan", "Mehta", "Pillai"]
+SUPPLIER_SUFFIXES = ["Traders", "Distributors", "Wholesale", "Agencies", "Enterprises", "& Sons"]
+
+
+def ean13(digits12):
+    """digits12 plus its EAN-13 check digit."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits12))
+    return digits12 + str((10 - total % 10) % 10)
+
+
+class SampleDataGenerator:
+    def __init__(self, db_name, seed=1, categories=10, subcategories=5, products=5000,
+                 suppliers=20, customers=500, years=1, sales_per_day=100, end_date=None,
+                 progress=None):
+        self.db_name = db_name
+        self.seed = seed
+        self.categories = categories
+        self.subcategories = subcategories  # per category
+        self.products = products
+        self.suppliers = suppliers
+        self.customers = customers
+        self.years = years
+        self.sales_per_day = sales_per_day
+        self.end_date = end_date or date.today()
+        self.progress = progress or (lambda message: None)
+
+    @classmethod
+    def for_scale(cls, db_name, scale, **kwargs):
+        categories, subcategories, products, suppliers, customers, years, sales_per_day = SCALES[scale]
+        options = dict(categories=categories, subcategories=subcategories, products=products,
+                       suppliers=suppliers, customers=customers, years=years, sales_per_day=sales_per_day)
+        options.update(kwargs)
+        return cls(db_name, **options)
+
+    def generate(self):
+        """Fill the database and return the number of rows written per table."""
+        # Creates or upgrades the schema first
+        Database(self.db_name).close()
+        rng = random.Random(self.seed)
+        conn = sqlite3.connect(self.db_name)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA cache_size = -200000")
+            triggers = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND sql IS NOT NULL"
+            ).fetchall()
+            conn.execute("BEGIN")
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            counts = {}
+            counts.update(self._catalog(conn, rng))
+            counts.update(self._parties(conn, rng))
+            prices = [row for row in conn.execute("SELECT id, price, tax_rate FROM products ORDER BY id")]
+            counts.update(self._history(conn, rng, prices))
+            self._rebuild(conn, triggers)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise Exception(f"Error generating sample data: {str(e)}")
+        finally:
+            conn.close()
+        return counts
+
+    def _catalog(self, conn, rng):
+        self.progress(f"{self.categories} categories, {self.products} products")
+        names = [CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f"Category {i + 1}"
+                 for i in range(self.categories)]
+        first_category = self._next_id(conn, "categories")
+        conn.executemany("INSERT INTO categories (name) VALUES (?)", ((name,) for name in names))
+        groups = []
+        for c in range(self.categories):
+            for s in range(self.subcategories):
+                word = SUBCATEGORY_WORDS[s % len(SUBCATEGORY_WORDS)]
+                suffix = f" {s // len(SUBCATEGORY_WORDS) + 1}" if s >= len(SUBCATEGORY_WORDS) else ""
+                groups.append((first_category + c, f"{names[c]} {word}{suffix}"))
+        first_subcategory = self._next_id(conn, "subcategories")
+        conn.executemany("INSERT INTO subcategories (category_id, name) VALUES (?, ?)", groups)
+        groups = [(category_id, first_subcategory + i) for i, (category_id, _) in enumerate(groups)]
+        first_product = self._next_id(conn, "products")
+
+        def products():
+            for i in range(self.products):
+                category_id, subcategory_id = groups[rng.randrange(len(groups))]
+                size, unit = rng.choice(SIZES)
+                name = f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {size}".strip()
+                # Prices cluster low with a long tail, ending in .00 or .50
+                price = max(5.0, round(rng.lognormvariate(4.5, 1.0) * 2) / 2)
+                number = first_product + i
+                yield (ean13(f"890{number:09d}"), f"SKU-{category_id:03d}-{number:07d}", name,
+                       category_id, subcategory_id, f"{name}, {rng.choice(NOUNS).lower()} range",
+                       price, rng.choice(TAX_SLABS), unit)
+
+        conn.executemany('''
+            INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id,
+                                  description, price, tax_rate, default_unit)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', products())
+        return {'categories': self.categories, 'subcategories': len(groups), 'products': self.products}
+
+    def _parties(self, conn, rng):
+        def person():
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            return first, last, f"9{rng.randrange(10 ** 9):09d}"
+
+        def suppliers():
+            for i in range(self.suppliers):
+                _, last, phone = person()
+                name = f"{last} {rng.choice(SUPPLIER_SUFFIXES)} {i + 1}"
+                yield name, phone, f"orders{i + 1}@{last.lower()}-trade.example"
+
+        def customers():
+            for i in range(self.customers):
+                first, last, phone = person()
+                yield f"{first} {last}", phone, f"{first.lower()}.{last.lower()}{i + 1}@mail.example"
+
+        self.progress(f"{self.suppliers} suppliers, {self.customers} customers")
+        conn.executemany("INSERT INTO suppliers (name, phone, email) VALUES (?, ?, ?)", suppliers())
+        conn.executemany("INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)", customers())
+        return {'suppliers': self.suppliers, 'customers': self.customers}
+
+    def _history(self, conn, rng, prices):
+        days = 365 * self.years
+        start = datetime.combine(self.end_date - timedelta(days=days - 1), datetime.min.time())
+        self.progress(f"{days} days of history from {start.date()}, about {self.sales_per_day} sales a day")
+        first_supplier = self._next_id(conn, "suppliers") - self.suppliers
+        first_customer = self._next_id(conn, "customers") - self.customers
+        # A few products sell far more than the rest
+        weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(prices))]
+        rng.shuffle(weights)
+        cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        sold = {}
+        sales, invoices, lines = [], [], []
+        next_invoice = self._next_id(conn, "invoices")
+
+        def line(product, day_start):
+            product_id, price, tax_rate = product
+            quantity = rng.choice((1, 1, 1, 2, 2, 3, 5))
+            amounts = price_line(quantity, price, tax_rate)
+            sold[product_id] = sold.get(product_id, 0) + quantity
+            at = day_start + timedelta(seconds=rng.randrange(9 * 3600, 21 * 3600))
+            return product_id, quantity, price, tax_rate, amounts['tax_amount'], amounts['total_amount'], at
+
+        for day in range(days):
+            day_start = start + timedelta(days=day)
+            # Busier weekends, and +-30% from day to day
+            volume = self.sales_per_day * (1.3 if day_start.weekday() >= 5 else 1.0) * rng.uniform(0.7, 1.3)
+            for _ in range(int(volume)):
+                products = rng.choices(prices, cum_weights=cumulative, k=1 if rng.random() < 0.7 else rng.randint(2, 6))
+                customer_id = first_customer + rng.randrange(self.customers)
+                if len(products) == 1:
+                    product_id, quantity, rate, tax_rate, tax_amount, total_amount, at = line(products[0], day_start)
+                    sales.append((product_id, customer_id, 1, quantity, rate, tax_rate, tax_amount,
+                                  total_amount, at.strftime("%Y-%m-%d %H:%M:%S")))
+                    continue
+                priced = [line(product, day_start) for product in products]
+                at = max(item[6] for item in priced).strftime("%Y-%m-%d %H:%M:%S")
+                totals = invoice_totals([{'tax_amount': item[4], 'total_amount': item[5]} for item in priced])
+                invoices.append((next_invoice, customer_id, 1, len(priced), totals['subtotal'],
+                                 totals['tax_amount'], totals['total_amount'], at))
+                lines.extend((next_invoice, line_no, *item[:6]) for line_no, item in enumerate(priced, 1))
+                next_invoice += 1
+            if len(sales) + len(lines) > 200000 or day == days - 1:
+                self._write_sales(conn, sales, invoices, lines)
+                sales, invoices, lines = [], [], []
+
+        counts = self._receipts(conn, rng, start, days, sold, prices, first_supplier)
+        counts.update(sales=conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0],
+                      invoices=conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0],
+                      invoice_lines=conn.execute("SELECT COUNT(*) FROM invoice_lines").fetchone()[0])
+        return counts
+
+    def _write_sales(self, conn, sales, invoices, lines):
+        conn.executemany('''
+            INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate,
+                               tax_amount, total_amount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', sales)
+        conn.executemany('''
+            INSERT INTO invoices (id, customer_id, user_id, line_count, subtotal, tax_amount,
+                                  total_amount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', invoices)
+        conn.executemany('''
+            INSERT INTO invoice_lines (invoice_id, line_no, product_id, quantity, rate, tax_rate,
+                                       tax_amount, total_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', lines)
+
+    def _receipts(self, conn, rng, start, days, sold, prices, first_supplier):
+        # Restock each product in a few deliveries over the period: what it
+        # sold plus a margin, so no product ever runs out
+        self.progress("goods received notes")
+        deliveries = {}
+        for product_id, price, tax_rate in prices:
+            needed = sold.get(product_id, 0) + rng.randint(20, 200)
+            count = max(1, min(12, needed // 50))
+            for part in range(count):
+                day = 0 if part == 0 else rng.randrange(days)
+                quantity = needed // count + (needed % count if part == 0 else 0)
+                supplier_id = first_supplier + product_id % self.suppliers
+                deliveries.setdefault((day, supplier_id), []).append((product_id, quantity, price, tax_rate))
+
+        next_grn = self._next_id(conn, "goods_receipt_notes")
+        notes, receipts = [], []
+        for (day, supplier_id), items in sorted(deliveries.items()):
+            at = (start + timedelta(days=day, hours=8)).strftime("%Y-%m-%d %H:%M:%S")
+            priced = []
+            for product_id, quantity, price, tax_rate in items:
+                rate = round(price * 0.7, 2)  # bought at 70% of the selling price
+                amounts = price_line(quantity, rate, tax_rate)
+                receipts.append((next_grn, product_id, supplier_id, 1, quantity, rate, tax_rate,
+                                 amounts['tax_amount'], amounts['total_amount'], at))
+                priced.append(amounts)
+            totals = invoice_totals(priced)
+            notes.append((next_grn, supplier_id, 1, f"INV-{next_grn:06d}", len(items),
+                          totals['subtotal'], totals['tax_amount'], totals['total_amount'], at))
+            next_grn += 1
+        conn.executemany('''
+            INSERT INTO goods_receipt_notes (id, supplier_id, user_id, reference, line_count, subtotal,
+                                             tax_amount, total_amount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', notes)
+        conn.executemany('''
+            INSERT INTO goods_receiving (grn_id, product_id, supplier_id, user_id, quantity, rate,
+                                         tax_rate, tax_amount, total_amount, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', receipts)
+        return {'goods_receipt_notes': len(notes), 'goods_receiving': len(receipts)}
+
+    def _rebuild(self, conn, triggers):
+        self.progress("search index, report rollups and stock levels")
+        cursor = conn.cursor()
+        if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone():
+            cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+        rebuild_rollups(cursor)
+        cursor.execute("DELETE FROM stock_levels")
+        cursor.execute('''
+            INSERT INTO stock_levels (product_id, quantity)
+            SELECT product_id, SUM(quantity) FROM (
+                SELECT product_id, quantity FROM goods_receiving
+                UNION ALL
+                SELECT product_id, -quantity FROM sales
+                UNION ALL
+                SELECT product_id, -quantity FROM invoice_lines
+            )
+            GROUP BY product_id
+        ''')
+        for _, sql in triggers:
+            cursor.execute(sql)
+        cursor.execute("ANALYZE")
+
+    def _next_id(self, conn, table):
+        return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with generated inventory data")
+    parser.add_argument('db', help="database file to fill (created if missing)")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help="preset sizes, overridden by the options below (default: small)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--categories', type=int)
+    parser.add_argument('--subcategories', type=int, help="per category")
+    parser.add_argument('--products', type=int)
+    parser.add_argument('--suppliers', type=int)
+    parser.add_argument('--customers', type=int)
+    parser.add_argument('--years', type=int)
+    parser.add_argument('--sales-per-day', type=int)
+    parser.add_argument('--end-date', type=date.fromisoformat, help="last day of history (default: today)")
+    args = parser.parse_args()
+
+    if args.db == "inventory.db":
+        print("Refusing to fill inventory.db; pass another file name.", file=sys.stderr)
+        return 1
+    options = {name: getattr(args, name) for name in
+               ('categories', 'subcategories', 'products', 'suppliers', 'customers', 'years',
+                'sales_per_day', 'end_date') if getattr(args, name) is not None}
+    generator = SampleDataGenerator.for_scale(args.db, args.scale, seed=args.seed,
+                                              progress=lambda message: print(f"  {message}"), **options)
+    start = time.perf_counter()
+    counts = generator.generate()
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(f"Wrote {rows} rows to {args.db} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s):")
+    for table, count in counts.items():
+        print(f"  {table:<20} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
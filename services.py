@@ -0,0 +1,179 @@
+"""Business rules for products, stock, sales and receiving, without any GUI.
+
+The forms, api_server.py and scripts all record sales and receipts through
+InventoryService, so a line is validated and priced the same way whichever
+of them writes it: the tax rate always comes from the product, and the tax
+and total are worked out here, with pricing.py, rather than read back from
+a form. Results are plain dicts and lists, ready to be sent as JSON.
+"""
+import os
+
+from database import LineValidationError
+from pricing import price_line
+
+# Methods api_server.py exposes; writes are serialized on its writer thread
+READ_METHODS = (
+    'categories', 'subcategories', 'products', 'product', 'find_product',
+    'search_products', 'stock', 'suppliers', 'customers', 'quote_line', 'tax_rounding',
+)
+WRITE_METHODS = (
+    'add_product', 'record_sale', 'checkout', 'receive_goods', 'post_grn',
+)
+
+
+class ValidationError(Exception):
+    """Raised when a request is incomplete or breaks a business rule; nothing is written."""
+
+
+def get_service(db, url=None):
+    """The service the forms should use: an ApiClient when a server is configured, else local.
+
+    url defaults to the IMS_API_URL environment variable.
+    """
+    url = url or os.environ.get("IMS_API_URL")
+    if url:
+        from api_client import ApiClient
+        return ApiClient(url)
+    return InventoryService(db)
+
+
+def _record(row):
+    return dict(row) if row is not None else None
+
+
+def _records(rows):
+    return [dict(row) for row in rows]
+
+
+class InventoryService:
+    def __init__(self, db, write_queue=None):
+        self.db = db
+        # A WriteQueue to group-commit writes through, as api_server.py does
+        self.write_queue = write_queue
+
+    def _write(self, method, *args):
+        if self.write_queue is not None:
+            return getattr(self.write_queue, method)(*args).result()
+        return getattr(self.db, method)(*args)
+
+    # Catalog
+    def categories(self):
+        return _records(self.db.catalog.get_categories())
+
+    def subcategories(self, category_id):
+        return _records(self.db.catalog.get_subcategories(category_id))
+
+    def products(self, category_id, subcategory_id):
+        return _records(self.db.catalog.get_products(category_id, subcategory_id))
+
+    def product(self, product_id):
+        return _record(self.db.catalog.get_product_row(product_id))
+
+    def find_product(self, code):
+        """The product with this barcode, SKU or shelf label QR code, or None."""
+        code = (code or "").strip()
+        return _record(self.db.catalog.find_product_by_code(code)) if code else None
+
+    def search_products(self, query, limit=20):
+        return _records(self.db.search_products(query, limit))
+
+    def stock(self, product_id):
+        return self.db.get_stock(product_id)
+
+    def suppliers(self):
+        return _records(self.db.get_all_suppliers())
+
+    def customers(self):
+        return _records(self.db.get_all_customers())
+
+    def add_product(self, product):
+        if not (product.get('name') or "").strip():
+            raise ValidationError("Product name is required")
+        if not product.get('category_id') or not product.get('subcategory_id'):
+            raise ValidationError("Please select a category and subcategory")
+        if product.get('price') is None or product['price'] < 0:
+            raise ValidationError("Price must not be negative")
+        product = dict(product, name=product['name'].strip(),
+                       description=product.get('description') or "",
+                       tax_rate=product.get('tax_rate') or 0)
+        return self._write('add_product', product)
+
+    # Pricing
+    def tax_rounding(self):
+        """The pricing.py rule invoices are rounded with where they are recorded."""
+        return self.db.rounding
+
+    def quote_line(self, product_id, quantity, rate=None):
+        """A priced line for quantity of product_id, at rate or else the product's price."""
+        line, error = self._price_line({'product_id': product_id, 'quantity': quantity, 'rate': rate})
+        if error:
+            raise ValidationError(error)
+        return line
+
+    def _price_line(self, line):
+        """Return (priced line, None), or (None, message) when the line is invalid."""
+        product_id = line.get('product_id')
+        if not product_id:
+            return None, "No product selected"
+        product = self.db.catalog.get_product(product_id)
+        if product is None:
+            return None, f"Product {product_id} does not exist"
+        quantity = line.get('quantity')
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return None, "Quantity must be greater than zero"
+        rate = line.get('rate')
+        if rate is None:
+            rate = product['price']
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            return None, "Rate must be greater than zero"
+        tax_rate = product['tax_rate'] or 0
+        priced = {'product_id': product['id'], 'quantity': quantity, 'rate': rate, 'tax_rate': tax_rate}
+        priced.update(price_line(quantity, rate, tax_rate))
+        return priced, None
+
+    def _price_lines(self, lines):
+        if not lines:
+            raise LineValidationError([(0, "There are no lines")])
+        priced, errors = [], []
+        for line_no, line in enumerate(lines, 1):
+            line, error = self._price_line(line)
+            if error:
+                errors.append((line_no, error))
+            priced.append(line)
+        if errors:
+            raise LineValidationError(errors)
+        return priced
+
+    # Sales
+    def record_sale(self, sale):
+        """Sell one line to sale['customer_id']; returns the sale id."""
+        if not sale.get('customer_id'):
+            raise ValidationError("Please select a customer")
+        line = self.quote_line(sale.get('product_id'), sale.get('quantity'), sale.get('rate'))
+        return self._write('add_sale', dict(line, customer_id=sale['customer_id'], user_id=sale['user_id']))
+
+    def checkout(self, invoice, lines):
+        """Record a cart as one invoice; returns the invoice id."""
+        if not invoice.get('customer_id'):
+            raise ValidationError("Please select a customer")
+        return self._write('add_invoice', {'customer_id': invoice['customer_id'], 'user_id': invoice['user_id']},
+                           self._price_lines(lines))
+
+    # Receiving
+    def receive_goods(self, receipt):
+        """Receive one line from receipt['supplier_id']; returns the receipt id."""
+        if not receipt.get('supplier_id'):
+            raise ValidationError("Please select a supplier")
+        line = self.quote_line(receipt.get('product_id'), receipt.get('quantity'), receipt.get('rate'))
+        return self._write('add_goods_receiving', dict(line, supplier_id=receipt['supplier_id'],
+                                                       user_id=receipt['user_id']))
+
+    def post_grn(self, grn, lines):
+        """Post a goods received note of several lines; returns the GRN id."""
+        if not grn.get('supplier_id'):
+            raise ValidationError("Please select a supplier")
+        return self._write('add_goods_receiving_bulk', {
+            'supplier_id': grn['supplier_id'],
+            'user_id': grn['user_id'],
+            'reference': grn.get('reference')
+        }, self._price_lines(lines))
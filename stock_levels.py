@@ -0,0 +1,37 @@
+"""Rebuild or verify the materialized stock_levels table.
+
+    python stock_levels.py verify [--db inventory.db]
+    python stock_levels.py rebuild [--db inventory.db]
+
+verify exits with status 1 when any product's stock differs from its ledgers.
+"""
+import argparse
+import sys
+
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify on-hand stock levels")
+    parser.add_argument('command', choices=['verify', 'rebuild'])
+    parser.add_argument('--db', default="inventory.db", help="database file (default: inventory.db)")
+    args = parser.parse_args()
+
+    with Database(args.db) as db:
+        if args.command == 'rebuild':
+            count = db.rebuild_stock_levels()
+            print(f"Rebuilt stock levels for {count} products.")
+            return 0
+
+        mismatches = db.verify_stock_levels()
+        for row in mismatches:
+            print(f"product {row['product_id']}: recorded {row['recorded']:g}, ledgers say {row['expected']:g}")
+        if mismatches:
+            print(f"{len(mismatches)} products out of step. Run 'python stock_levels.py rebuild' to fix.")
+            return 1
+        print("Stock levels match the ledgers.")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "inventory.db"))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def add_product(db):
+    """Add a product to Fruit / Fresh, or to the category_id and subcategory_id given; returns its id."""
+    category_id = db.add_category("Fruit")
+    subcategory_id = db.add_subcategory(category_id, "Fresh")
+
+    def add(name="Apple", **fields):
+        product = dict(barcode=None, sku_id=None, name=name, category_id=category_id,
+                       subcategory_id=subcategory_id, description="", price=10.0, tax_rate=5.0,
+                       default_unit="kg", image_path=None)
+        product.update(fields)
+        return db.add_product(product)
+    return add
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait_until(qapp):
+    """Process Qt events until condition() is true, failing after timeout seconds."""
+    from PySide6.QtTest import QTest
+
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("timed out waiting for the form")
+            QTest.qWait(10)
+    return wait
+
+
+@pytest.fixture
+def messages(qapp, monkeypatch):
+    """The (kind, text) of every message box shown, recorded instead of blocking on them."""
+    from PySide6.QtWidgets import QMessageBox
+    shown = []
+    for kind in ('information', 'warning', 'critical'):
+        monkeypatch.setattr(QMessageBox, kind, staticmethod(
+            lambda parent, title, text, *args, kind=kind: shown.append((kind, text))))
+    return shown
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from async_database import AsyncDatabase
+
+
+@pytest.fixture
+def async_db(qapp, db):
+    async_db = AsyncDatabase(db, max_threads=1)
+    yield async_db
+    async_db.wait()
+
+
+def test_results_and_errors_come_back_on_the_gui_thread(async_db, wait_until, add_product):
+    apple = add_product("Apple")
+    results, errors = [], []
+    async_db.submit('get_product_by_id', apple,
+                    on_result=lambda product: results.append((product['name'], threading.get_ident())))
+    async_db.submit(lambda: 1 / 0, on_error=lambda error: errors.append((type(error), threading.get_ident())))
+    wait_until(lambda: results and errors)
+    assert results == [("Apple", threading.get_ident())]
+    assert errors == [(ZeroDivisionError, threading.get_ident())]
+
+
+def test_a_newer_call_with_the_same_key_supersedes_the_older(async_db, wait_until):
+    release = threading.Event()
+    ran, delivered = [], []
+
+    def call(name, block=False):
+        def run():
+            if block:
+                release.wait(5)
+            ran.append(name)
+            return name
+        return run
+
+    async_db.submit(call("running", block=True), key='combo', on_result=delivered.append)
+    # The pool has one thread, so these two queue behind the running call
+    async_db.submit(call("queued"), key='combo', on_result=delivered.append)
+    async_db.submit(call("latest"), key='combo', on_result=delivered.append)
+    async_db.submit(call("other key"), key='other', on_result=delivered.append)
+    release.set()
+    wait_until(lambda: len(ran) == 3 and len(delivered) == 2)
+
+    # The running call finished but its result was dropped; the queued one never ran
+    assert ran == ["running", "latest", "other key"]
+    assert delivered == ["latest", "other key"]
+
+
+def test_cancel_drops_the_result(async_db, wait_until):
+    release = threading.Event()
+    delivered = []
+    async_db.submit(lambda: release.wait(5), key='combo', on_result=delivered.append)
+    async_db.cancel('combo')
+    release.set()
+    async_db.wait()
+    async_db.submit(lambda: "after", on_result=delivered.append)
+    wait_until(lambda: delivered)
+    assert delivered == ["after"]
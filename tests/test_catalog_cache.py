@@ -0,0 +1,78 @@
+from database import Database
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_writes_through_the_database_show_up_at_once(db, add_product):
+    catalog = db.catalog
+    catalog.check_interval = 3600
+    fruit = catalog.get_categories()[0]['id']
+    fresh = catalog.get_subcategories(fruit)[0]['id']
+    assert catalog.get_products(fruit, fresh) == []
+
+    add_product("Pear")
+    add_product("Apple")
+    dairy = db.add_category("Dairy")
+    db.add_subcategory(dairy, "Milk")
+    assert names(catalog.get_products(fruit, fresh)) == ["Apple", "Pear"]
+    assert names(catalog.get_categories()) == ["Dairy", "Fruit"]
+    assert names(catalog.get_subcategories(dairy)) == ["Milk"]
+
+
+def test_commits_from_another_connection_show_up_after_the_check_interval(db, add_product):
+    add_product("Apple")
+    catalog = db.catalog
+    catalog.check_interval = 3600
+    fruit = catalog.get_categories()[0]['id']
+    fresh = catalog.get_subcategories(fruit)[0]['id']
+    assert names(catalog.get_products(fruit, fresh)) == ["Apple"]
+
+    # Another terminal: a Database of its own, so none of this one's invalidation
+    other = Database(db.db_name)
+    other.add_product(dict(barcode="8902", sku_id="PER-1", name="Pear", category_id=fruit,
+                           subcategory_id=fresh, description="", price=12.0, tax_rate=5.0))
+    other.close()
+    assert names(catalog.get_products(fruit, fresh)) == ["Apple"]
+
+    catalog.check_interval = 0
+    assert names(catalog.get_products(fruit, fresh)) == ["Apple", "Pear"]
+
+
+def test_scanned_codes_are_found_by_barcode_or_sku(db, add_product):
+    apple = add_product("Apple", barcode="8901", sku_id="APL-1")
+    catalog = db.catalog
+    catalog.check_interval = 3600
+    assert catalog.find_product_by_code("8901")['id'] == apple
+    assert catalog.find_product_by_code("APL-1")['id'] == apple
+    assert catalog.find_product_by_code("8902") is None
+
+    fruit = catalog.get_categories()[0]['id']
+    other = Database(db.db_name)
+    pear = other.add_product(dict(barcode="8902", sku_id="PER-1", name="Pear", category_id=fruit,
+                                  subcategory_id=catalog.get_subcategories(fruit)[0]['id'], description="",
+                                  price=12.0, tax_rate=5.0))
+    other.close()
+    catalog.check_interval = 0
+    assert catalog.find_product_by_code("8902")['id'] == pear
+    assert catalog.find_product_by_code("PER-1")['id'] == pear
+
+
+def test_loaded_products_are_served_without_a_query(db, add_product, monkeypatch):
+    apple = add_product("Apple", barcode="8901", sku_id="APL-1", price=12.5, default_unit="kg")
+    catalog = db.catalog
+    catalog.check_interval = 3600
+    catalog.preload()
+
+    def no_query(*args):
+        raise AssertionError("queried the database")
+    monkeypatch.setattr(db, "execute_query", no_query)
+    for product in (catalog.get_product(apple), catalog.find_product_by_code("8901"),
+                    catalog.find_product_by_code("APL-1")):
+        assert (product['id'], product['price'], product['tax_rate'], product['default_unit']) == \
+            (apple, 12.5, 5.0, "kg")
+    monkeypatch.undo()
+
+    row = catalog.get_product_row(apple)
+    assert (row['name'], row['category_name'], row['subcategory_name']) == ("Apple", "Fruit", "Fresh")
@@ -0,0 +1,285 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import database
+from database import Database, DatabaseConfig, LineValidationError, get_database
+
+
+def test_each_thread_reuses_its_own_connection(db):
+    conn = db.connect()
+    assert db.connect() is conn
+    db.get_all_categories()
+    assert db.connect() is conn
+
+    others = []
+    thread = threading.Thread(target=lambda: others.append(db.connect()))
+    thread.start()
+    thread.join()
+    assert others[0] is not conn
+
+    db.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert db.get_all_categories() == []
+
+
+def test_get_database_is_shared_by_the_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "_shared_database", None)
+    shared = get_database(str(tmp_path / "inventory.db"))
+    try:
+        assert get_database() is shared
+        assert get_database(str(tmp_path / "other.db")) is shared
+    finally:
+        shared.close()
+
+
+def test_schema_is_checked_once_per_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "inventory.db")
+    Database(path).close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] > 0
+
+    def connect(self):
+        raise AssertionError("the schema was checked again")
+    monkeypatch.setattr(Database, "connect", connect)
+    Database(path)
+
+
+def test_config_from_environment():
+    config = DatabaseConfig.from_env({'IMS_DB_JOURNAL_MODE': 'DELETE', 'IMS_DB_BUSY_TIMEOUT': '0.5',
+                                      'IMS_DB_MAX_RETRIES': '2', 'IMS_DB_CACHE_SIZE': ''})
+    assert (config.journal_mode, config.busy_timeout, config.max_retries) == ('DELETE', 0.5, 2)
+    assert config.cache_size == DatabaseConfig().cache_size
+
+
+def test_every_connection_gets_the_pragmas(tmp_path):
+    config = DatabaseConfig(synchronous="FULL", cache_size=-1000, busy_timeout=1.5)
+    db = Database(str(tmp_path / "inventory.db"), config)
+    conn = db.connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -1000
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1500
+    db.close()
+
+
+def test_a_locked_write_is_retried(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    db = Database(path, DatabaseConfig(busy_timeout=0.05, max_retries=8, retry_backoff=0.05))
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    releaser = threading.Timer(0.2, other.rollback)
+    releaser.start()
+    started = time.monotonic()
+    try:
+        assert db.add_category("Fruit")
+    finally:
+        releaser.join()
+        other.close()
+        db.close()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_a_write_gives_up_once_the_retries_run_out(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    db = Database(path, DatabaseConfig(busy_timeout=0.01, max_retries=1, retry_backoff=0.01))
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(Exception, match="locked"):
+            db.add_category("Fruit")
+    finally:
+        other.rollback()
+        other.close()
+        db.close()
+
+
+def receive(db, product_id, quantity):
+    return db.add_goods_receiving(dict(product_id=product_id, supplier_id=1, user_id=1, quantity=quantity,
+                                       rate=1, tax_rate=0, tax_amount=0, total_amount=quantity))
+
+
+def sell(db, product_id, quantity):
+    return db.add_sale(dict(product_id=product_id, customer_id=1, user_id=1, quantity=quantity,
+                            rate=1, tax_rate=0, tax_amount=0, total_amount=quantity))
+
+
+def test_stock_follows_receipts_and_sales(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    assert db.get_stock(apple) == 0
+    receive(db, apple, 10)
+    receive(db, apple, 5)
+    receive(db, pear, 2)
+    sell(db, apple, 4)
+    assert (db.get_stock(apple), db.get_stock(pear)) == (11, 2)
+    assert db.verify_stock_levels() == []
+
+
+def test_a_sale_beyond_the_stock_is_refused_and_rolled_back(db, add_product):
+    apple = add_product()
+    receive(db, apple, 3)
+    with pytest.raises(Exception, match="Insufficient stock"):
+        sell(db, apple, 4)
+    assert db.get_stock(apple) == 3
+    assert db.execute_query("SELECT COUNT(*) FROM sales")[0][0] == 0
+
+
+def test_concurrent_sales_never_oversell(db, add_product):
+    apple = add_product()
+    receive(db, apple, 10)
+    start = threading.Barrier(8)
+    sold, refused = [], []
+
+    def terminal():
+        start.wait()
+        try:
+            sold.append(sell(db, apple, 3))
+        except Exception as e:
+            refused.append(str(e))
+    threads = [threading.Thread(target=terminal) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 3
+    assert len(refused) == 5 and all("Insufficient stock" in message for message in refused)
+    assert db.get_stock(apple) == 1
+    assert db.verify_stock_levels() == []
+
+
+def test_rebuild_stock_levels_repairs_a_drifted_table(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    receive(db, apple, 10)
+    receive(db, pear, 4)
+    sell(db, apple, 3)
+    db.execute_query("UPDATE stock_levels SET quantity = 99 WHERE product_id = ?", (apple,))
+    db.execute_query("DELETE FROM stock_levels WHERE product_id = ?", (pear,))
+    assert sorted(tuple(row) for row in db.verify_stock_levels()) == [(apple, 99, 7), (pear, 0, 4)]
+
+    assert db.rebuild_stock_levels() == 2
+    assert db.verify_stock_levels() == []
+    assert (db.get_stock(apple), db.get_stock(pear)) == (7, 4)
+
+
+def invoice_line(product_id, quantity, rate=10, tax_rate=5):
+    tax = round(quantity * rate * tax_rate / 100, 2)
+    return dict(product_id=product_id, quantity=quantity, rate=rate, tax_rate=tax_rate,
+                tax_amount=tax, total_amount=round(quantity * rate + tax, 2))
+
+
+def test_an_invoice_records_its_lines_and_stock_together(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    receive(db, apple, 10)
+    receive(db, pear, 10)
+    invoice_id = db.add_invoice({'customer_id': 1, 'user_id': 1},
+                                [invoice_line(apple, 2), invoice_line(pear, 1), invoice_line(apple, 3)])
+
+    invoice = db.execute_query("SELECT * FROM invoices WHERE id = ?", (invoice_id,))[0]
+    assert (invoice['line_count'], invoice['subtotal'], invoice['tax_amount'], invoice['total_amount']) == \
+        (3, 60.0, 3.0, 63.0)
+    lines = db.execute_query("SELECT line_no, product_id, quantity FROM invoice_lines ORDER BY line_no")
+    assert [tuple(line) for line in lines] == [(1, apple, 2), (2, pear, 1), (3, apple, 3)]
+    assert (db.get_stock(apple), db.get_stock(pear)) == (5, 9)
+    assert db.verify_stock_levels() == []
+
+
+def test_an_invoice_over_the_stock_writes_nothing(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    receive(db, apple, 10)
+    receive(db, pear, 1)
+    # Each line fits on its own, the two pear lines together do not
+    with pytest.raises(Exception, match=f"Insufficient stock for product {pear}"):
+        db.add_invoice({'customer_id': 1, 'user_id': 1},
+                       [invoice_line(apple, 2), invoice_line(pear, 1), invoice_line(pear, 1)])
+    assert db.execute_query("SELECT COUNT(*) FROM invoices")[0][0] == 0
+    assert db.execute_query("SELECT COUNT(*) FROM invoice_lines")[0][0] == 0
+    assert (db.get_stock(apple), db.get_stock(pear)) == (10, 1)
+
+
+def test_an_invoice_failing_after_its_lines_is_rolled_back(db, add_product, monkeypatch):
+    apple = add_product()
+    receive(db, apple, 10)
+
+    def fail(cursor, deltas):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr(db, "_adjust_stock_many", fail)
+    with pytest.raises(Exception, match="disk I/O error"):
+        db.add_invoice({'customer_id': 1, 'user_id': 1}, [invoice_line(apple, 2), invoice_line(apple, 1)])
+    monkeypatch.undo()
+
+    assert db.execute_query("SELECT COUNT(*) FROM invoices")[0][0] == 0
+    assert db.execute_query("SELECT COUNT(*) FROM invoice_lines")[0][0] == 0
+    assert db.get_stock(apple) == 10
+
+
+def test_a_goods_received_note_records_its_lines_and_stock_together(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    grn_id = db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1, 'reference': "INV-7"},
+                                         [invoice_line(apple, 4), invoice_line(pear, 2), invoice_line(apple, 1)])
+
+    note = db.execute_query("SELECT * FROM goods_receipt_notes WHERE id = ?", (grn_id,))[0]
+    assert (note['reference'], note['line_count'], note['subtotal'], note['total_amount']) == ("INV-7", 3, 70.0, 73.5)
+    lines = db.execute_query("SELECT product_id, quantity FROM goods_receiving WHERE grn_id = ? ORDER BY id", (grn_id,))
+    assert [tuple(line) for line in lines] == [(apple, 4), (pear, 2), (apple, 1)]
+    assert (db.get_stock(apple), db.get_stock(pear)) == (5, 2)
+
+    sell(db, apple, 1)
+    db.add_invoice({'customer_id': 1, 'user_id': 1}, [invoice_line(apple, 2), invoice_line(pear, 2)])
+    receive(db, pear, 3)
+    assert (db.get_stock(apple), db.get_stock(pear)) == (2, 3)
+    assert db.verify_stock_levels() == []
+
+
+def test_a_goods_received_note_with_bad_lines_writes_nothing(db, add_product):
+    apple = add_product()
+    with pytest.raises(LineValidationError) as raised:
+        db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1}, [
+            invoice_line(apple, 1),
+            dict(invoice_line(apple, 0), rate=0),
+            dict(invoice_line(apple, 1), product_id=None),
+        ])
+    assert raised.value.errors == [(2, "Quantity must be greater than zero"), (2, "Rate must be greater than zero"),
+                                   (3, "No product selected")]
+
+    with pytest.raises(LineValidationError) as raised:
+        db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1}, [invoice_line(apple, 1), invoice_line(999, 1)])
+    assert raised.value.errors == [(2, "Product 999 does not exist")]
+
+    assert db.execute_query("SELECT COUNT(*) FROM goods_receipt_notes")[0][0] == 0
+    assert db.execute_query("SELECT COUNT(*) FROM goods_receiving")[0][0] == 0
+    assert db.get_stock(apple) == 0
+
+
+def test_the_database_prices_invoice_and_note_lines(db, add_product):
+    apple = add_product()
+    receive(db, apple, 10)
+    # Whatever tax and total the caller passes, the lines are priced under db.rounding
+    wrong = dict(invoice_line(apple, 1, rate=0.1), tax_amount=5, total_amount=99)
+    for rounding, taxes in (('line', [0.01, 0.01, 0.01]), ('invoice', [0.01, 0.01, 0.0])):
+        db.rounding = rounding
+        invoice_id = db.add_invoice({'customer_id': 1, 'user_id': 1}, [wrong] * 3)
+        grn_id = db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1}, [wrong] * 3)
+        lines = db.execute_query("SELECT tax_amount, total_amount FROM invoice_lines WHERE invoice_id = ? "
+                                 "ORDER BY line_no", (invoice_id,))
+        assert [tuple(line) for line in lines] == [(tax, round(0.1 + tax, 2)) for tax in taxes]
+        for table, key in (('invoices', invoice_id), ('goods_receipt_notes', grn_id)):
+            header = db.execute_query(f"SELECT tax_amount, total_amount FROM {table} WHERE id = ?", (key,))[0]
+            assert tuple(header) == (round(sum(taxes), 2), round(0.3 + sum(taxes), 2))
+
+
+def test_unknown_products_are_reported_with_the_other_line_errors(db, add_product):
+    apple = add_product()
+    with pytest.raises(LineValidationError) as raised:
+        db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1}, [
+            invoice_line(998, 1),
+            invoice_line(apple, 1),
+            invoice_line(apple, 0),
+            invoice_line(999, 2),
+        ])
+    assert raised.value.errors == [(1, "Product 998 does not exist"), (3, "Quantity must be greater than zero"),
+                                   (4, "Product 999 does not exist")]
+    assert db.execute_query("SELECT COUNT(*) FROM goods_receipt_notes")[0][0] == 0
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+
+import pytest
+
+from exporters import export, export_to_path
+from test_database import receive, sell
+
+
+@pytest.fixture
+def sales(db, add_product):
+    apple = add_product("Apple", sku_id="APL-1")
+    receive(db, apple, 10)
+    for at in ("2025-02-28 23:59:59", "2025-03-01 00:00:00", "2025-03-31 12:00:00", "2025-04-01 00:00:00"):
+        sale_id = sell(db, apple, 1)
+        db.execute_query("UPDATE sales SET created_at = ? WHERE id = ?", (at, sale_id))
+    return db
+
+
+def test_products_are_written_as_csv(db, add_product):
+    add_product("Apple", barcode="8901", sku_id="APL-1", description='Red, "crisp"')
+    add_product("Pear", price=12.5)
+    out = io.StringIO()
+    assert export(db, 'products', out) == 2
+
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows[0] == ['id', 'barcode', 'sku_id', 'name', 'category', 'subcategory', 'description',
+                       'price', 'tax_rate', 'default_unit', 'created_at']
+    assert [row[:10] for row in rows[1:]] == [
+        ['1', '8901', 'APL-1', 'Apple', 'Fruit', 'Fresh', 'Red, "crisp"', '10.0', '5.0', 'kg'],
+        ['2', '', '', 'Pear', 'Fruit', 'Fresh', '', '12.5', '5.0', 'kg'],
+    ]
+
+
+def test_a_date_range_includes_both_end_days(sales):
+    out = io.StringIO()
+    assert export(sales, 'sales', out, 'jsonl', "2025-03-01", "2025-03-31") == 2
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line['created_at'] for line in lines] == ["2025-03-01 00:00:00", "2025-03-31 12:00:00"]
+    assert lines[0]['sku_id'] == "APL-1" and lines[0]['quantity'] == 1
+
+    out = io.StringIO()
+    assert export(sales, 'sales', out, 'jsonl', start="2025-03-02") == 2
+    assert export(sales, 'sales', io.StringIO(), 'jsonl', end="2025-02-28") == 1
+
+
+def test_the_format_follows_the_file_extension(sales, tmp_path):
+    assert export_to_path(sales, 'sales', str(tmp_path / "sales.jsonl")) == 4
+    assert json.loads((tmp_path / "sales.jsonl").read_text().splitlines()[0])['product_name'] == "Apple"
+    assert export_to_path(sales, 'sales', str(tmp_path / "sales.csv")) == 4
+    assert (tmp_path / "sales.csv").read_text().startswith("id,created_at,product_id,sku_id,")
+
+
+def test_unknown_exports_are_refused(db):
+    with pytest.raises(Exception, match="unknown export"):
+        export(db, 'users', io.StringIO())
+    with pytest.raises(Exception, match="unknown format xml"):
+        export(db, 'sales', io.StringIO(), 'xml')
+
+
+def test_stream_query_yields_every_row_in_batches(db, add_product):
+    for n in range(5):
+        add_product(f"Product {n}")
+    rows = db.stream_query("SELECT name FROM products ORDER BY id", batch_size=2)
+    assert [row[0] for row in rows] == [f"Product {n}" for n in range(5)]
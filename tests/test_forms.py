@@ -0,0 +1,96 @@
+import pytest
+
+from goods_receiving_form import GoodsReceivingForm
+from image_store import ImageStore
+from product_master_form import ProductMasterForm
+from product_picker import ProductPicker
+from sales_form import SalesForm
+
+
+@pytest.fixture
+def catalog(db, add_product):
+    """Two products in Fruit / Fresh, a supplier and a customer; returns the product ids."""
+    db.add_supplier(dict(name="Orchard", phone="", email=""))
+    db.add_customer(dict(name="Walk-in", phone="", email=""))
+    return add_product("Apple", barcode="8901", sku_id="APL-1", price=12.5), \
+        add_product("Pear", barcode="8902", sku_id="PER-1", price=20.0)
+
+
+@pytest.mark.parametrize("form_class", [SalesForm, GoodsReceivingForm])
+def test_scanning_a_code_selects_the_product(messages, wait_until, db, catalog, form_class):
+    apple, pear = catalog
+    form = form_class(1, db)
+    for code, product_id, price in (("8902", pear, 20.0), ("APL-1", apple, 12.5)):
+        form.scan_input.setText(code)
+        form.scan_product()
+        wait_until(lambda: form.product_combo.currentData() == product_id)
+        assert form.category_combo.currentText() == "Fruit"
+        assert form.subcategory_combo.currentText() == "Fresh"
+        wait_until(lambda: form.rate_input.value() == price)
+        assert form.scan_input.text() == ""
+    form.deleteLater()
+
+
+@pytest.mark.parametrize("form_class", [SalesForm, GoodsReceivingForm])
+def test_a_product_in_a_new_category_is_selected_and_priced(messages, wait_until, db, catalog, form_class):
+    assert issubclass(form_class, ProductPicker)
+    form = form_class(1, db)
+    wait_until(lambda: form.category_combo.count() == 2)
+    # Added after the combos were filled
+    category_id = db.add_category("Dairy")
+    subcategory_id = db.add_subcategory(category_id, "Milk")
+    milk = db.add_product(dict(barcode=None, sku_id="MLK-1", name="Milk", category_id=category_id,
+                               subcategory_id=subcategory_id, description="", price=30.0, tax_rate=12.0,
+                               default_unit="l", image_path=None))
+    form.searched(db.catalog.get_product(milk))
+    wait_until(lambda: form.product_combo.currentData() == milk)
+    assert (form.category_combo.currentText(), form.subcategory_combo.currentText()) == ("Dairy", "Milk")
+    wait_until(lambda: form.rate_input.value() == 30.0)
+    form.quantity_input.setValue(2)
+    assert (form.tax_rate.text(), form.tax_amount.text(), form.total_amount.text()) == ("12.0%", "₹7.20", "₹67.20")
+    form.deleteLater()
+
+
+def test_an_unknown_code_marks_the_scan_field(messages, wait_until, db, catalog):
+    form = SalesForm(1, db)
+    form.scan_input.setText("0000")
+    form.scan_product()
+    wait_until(lambda: form.scan_input.toolTip() != "")
+    assert "0000" in form.scan_input.toolTip()
+    assert form.scan_input.text() == "0000"
+    assert form.product_combo.currentData() is None
+    form.deleteLater()
+
+
+def test_the_cart_is_priced_under_the_recording_service_rule(messages, wait_until, db, catalog):
+    apple, pear = catalog
+    db.rounding = 'invoice'
+    form = SalesForm(1, db)
+    form.cart = [dict(product_id=apple, product_name="Apple", unit="kg", quantity=1, rate=0.1, tax_rate=5)] * 3
+    wait_until(lambda: form.rounding == 'invoice')
+    # 1.5 paise of tax on the invoice rounds to 2, where three lines would round to 3
+    assert form.cart_total.text() == "3 lines, ₹0.32"
+    form.deleteLater()
+
+
+def test_the_product_master_closes_its_images_on_quit(qapp, messages, wait_until, db, tmp_path, monkeypatch):
+    own = ProductMasterForm(db)
+    shared = ImageStore(str(tmp_path / "shared"))
+    closed = []
+    monkeypatch.setattr(shared, "close", lambda: closed.append(shared))
+    given = ProductMasterForm(db, image_store=shared)
+    failed = []
+    for form in (own, given):
+        form.thumbnails.failed.connect(lambda digest, error: failed.append(digest))
+        form.thumbnails.pixmap("0" * 64)
+    wait_until(lambda: len(failed) == 2)
+    assert own.thumbnails._loader is not None and own.image_store._pool is not None
+
+    qapp.aboutToQuit.emit()
+    assert own.thumbnails._loader is None and given.thumbnails._loader is None
+    assert own.image_store._pool is None
+    # A store the caller passed in is left for the caller to close
+    assert closed == []
+    ImageStore.close(shared)
+    own.deleteLater()
+    given.deleteLater()
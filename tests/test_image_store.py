@@ -0,0 +1,103 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from image_store import ImageStore, backfill, make_thumbnail
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ImageStore(str(tmp_path / "images"), max_workers=1)
+    yield store
+    store.close()
+
+
+def photo(path, size=(400, 200), colour=(200, 30, 30)):
+    Image.new('RGB', size, colour).save(path)
+    return str(path)
+
+
+def test_the_same_image_is_stored_once(store, tmp_path):
+    first = store.ingest(photo(tmp_path / "apple.jpg"))
+    again = store.ingest(photo(tmp_path / "copy.jpg"))
+    other = store.ingest(photo(tmp_path / "pear.png", colour=(30, 200, 30)))
+
+    assert first == again != other
+    assert len(first) == 64
+    with open(tmp_path / "apple.jpg", 'rb') as original, open(store.original_path(first), 'rb') as stored:
+        assert stored.read() == original.read()
+    assert sorted(os.listdir(tmp_path / "images" / "originals" / first[:2])) == [first]
+
+    (tmp_path / "notes.txt").write_text("not an image")
+    with pytest.raises(Exception, match="not a PNG, JPEG or BMP file"):
+        store.ingest(str(tmp_path / "notes.txt"))
+
+
+def test_thumbnails_are_padded_to_their_size(tmp_path):
+    target = str(tmp_path / "thumbs" / "apple.png")
+    make_thumbnail(photo(tmp_path / "apple.jpg"), target, (48, 48))
+    with Image.open(target) as thumbnail:
+        assert (thumbnail.format, thumbnail.size) == ("PNG", (48, 48))
+        # Scaled to 48x24 and centred: transparent above, the photo in the middle
+        assert thumbnail.getpixel((24, 5))[3] == 0
+        assert thumbnail.getpixel((24, 24))[3] == 255
+
+
+def test_backfill_stores_product_images_and_renders_thumbnails(db, add_product, store, tmp_path):
+    apple = add_product("Apple", image_path=photo(tmp_path / "apple.jpg"))
+    add_product("Pear", image_path=str(tmp_path / "gone.jpg"))
+    add_product("Kiwi")
+
+    assert backfill(db, store) == (1, 1)
+    digest = db.execute_query("SELECT image_hash FROM products WHERE id = ?", (apple,))[0][0]
+    assert os.path.exists(store.original_path(digest))
+    assert store.has_thumbnail(digest)
+    # Done once: a second run finds nothing left to store
+    assert backfill(db, store) == (0, 1)
+
+
+def test_thumbnails_are_read_off_the_gui_thread(store, tmp_path, wait_until, monkeypatch):
+    from thumbnail_cache import ThumbnailCache
+    digest = store.ingest(photo(tmp_path / "apple.jpg"))
+    checked = []
+    has_thumbnail = store.has_thumbnail
+    monkeypatch.setattr(store, "has_thumbnail",
+                        lambda digest: checked.append(threading.current_thread()) or has_thumbnail(digest))
+    cache = ThumbnailCache(store)
+    ready, failed = [], []
+    cache.ready.connect(ready.append)
+    cache.failed.connect(lambda digest, error: failed.append(digest))
+    try:
+        # Rendered by the store, then read by a loader thread
+        assert cache.pixmap(digest) is None
+        assert cache.pixmap("0" * 64) is None
+        wait_until(lambda: ready and failed)
+        assert (ready, failed) == ([digest], ["0" * 64])
+        assert cache.pixmap(digest).size().toTuple() == (48, 48)
+        assert cache.pixmap("0" * 64) is None
+        assert checked and threading.main_thread() not in checked
+    finally:
+        cache.close()
+
+
+def test_threads_submitting_at_once_share_one_pool(store, tmp_path, monkeypatch):
+    digest = store.ingest(photo(tmp_path / "apple.jpg"))
+    pools = []
+
+    class SlowPool(concurrent.futures.ThreadPoolExecutor):
+        # Slow to start, like a spawned process pool; threads keep the test quick
+        def __init__(self, max_workers, mp_context=None):
+            time.sleep(0.05)
+            super().__init__(max_workers)
+            pools.append(self)
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", SlowPool)
+    with concurrent.futures.ThreadPoolExecutor(4) as callers:
+        futures = list(callers.map(lambda _: store.submit_thumbnail(digest), range(4)))
+    assert [future.result(timeout=10) for future in futures] == [store.thumbnail_path(digest)] * 4
+    assert len(pools) == 1
+    store.close()
+    assert store._pool is None and pools[0]._shutdown
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from PIL import Image
+
+from label_generator import LAYOUTS, LabelGenerator, code128_symbols, code128_widths
+from label_payload import label_payload, product_id_from_payload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_code128_packs_digit_runs_in_code_set_c():
+    assert code128_symbols("ABC") == [104, 33, 34, 35, 1]
+    assert code128_symbols("1234") == [105, 12, 34, 82]
+    # An odd leading digit goes in code set B before switching to C
+    assert code128_symbols("12345") == [104, 17, 99, 23, 45, 53]
+    assert code128_symbols("123") == [104, 17, 18, 19, 8]
+    with pytest.raises(ValueError):
+        code128_symbols("café")
+
+
+def test_code128_widths_end_with_the_stop_pattern():
+    widths = code128_widths("1234")
+    assert widths.startswith("211232") and widths.endswith("2331112")
+    # Every symbol is 11 modules wide, the stop pattern 13
+    assert sum(int(width) for width in widths) == 11 * 4 + 13
+
+
+def test_every_label_on_a_sheet_fits_the_page():
+    for layout in LAYOUTS.values():
+        width, height = layout.page_size
+        label_width, label_height = layout.label_size
+        left, top = layout.position(layout.labels_per_sheet - 1)
+        assert 0 < left + label_width <= width and 0 < top + label_height <= height
+
+
+@pytest.fixture
+def products(db, add_product):
+    for n in range(22):
+        add_product(f"Product {n:02d}", sku_id=f"SKU-{n:02d}", barcode=f"8901{n:04d}" if n % 2 else None)
+    return db
+
+
+def test_a_qr_label_scans_back_to_its_product(products):
+    generator = LabelGenerator(products)
+    product = next(generator.products(ids=[3]))
+    style, payload, name, sku, price = generator.label(product)
+    assert (style, name, sku, price) == ('qr', "Product 02", "SKU-02", "₹10.00")
+    assert products.catalog.find_product_by_code(payload)['id'] == 3
+
+
+def test_scanned_labels_are_read_without_the_label_printing_code():
+    assert product_id_from_payload(label_payload(dict(id=42, sku_id=None, price=9.5))) == 42
+    assert product_id_from_payload("IMS;sku=A1;id=x") is None
+    assert product_id_from_payload("8901234567890") is None
+    script = "import sys, database, catalog_cache; print('label_generator' in sys.modules)"
+    loaded = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "False"
+
+
+def test_barcode_labels_fall_back_to_the_sku_then_qr(products):
+    generator = LabelGenerator(products, style='barcode')
+    labels = [generator.label(product) for product in generator.products(ids=[2, 1])]
+    assert [label[:2] for label in labels] == [('barcode', "89010001"), ('barcode', "SKU-00")]
+    assert generator.label(dict(id=99, name="Loose", sku_id=None, barcode=None, price=1.0))[0] == 'qr'
+
+
+def test_products_are_selected_by_ids_in_order_or_by_filters(products):
+    generator = LabelGenerator(products)
+    assert [row['id'] for row in generator.products(ids=[5, 999, 2])] == [5, 2]
+    assert len(list(generator.products(category_id=1))) == 22
+    assert list(generator.products(category_id=2)) == []
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_a_pdf_gets_one_page_per_sheet(products, tmp_path, workers):
+    path = str(tmp_path / "labels.pdf")
+    progress = []
+    generator = LabelGenerator(products, workers=workers)
+    assert generator.render(generator.products(), path, copies=2,
+                            progress=lambda labels, sheets: progress.append(labels)) == (44, 3)
+    assert progress == [21, 42, 44]
+    with open(path, 'rb') as handle:
+        pdf = handle.read()
+    assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+    assert pdf.count(b"/Type /Page ") == 3 and b"/Count 3" in pdf
+
+
+def test_png_output_writes_a_file_per_sheet(products, tmp_path):
+    generator = LabelGenerator(products, layout='a4-40', workers=0)
+    (tmp_path / "out").mkdir()
+    assert generator.render(generator.products(), str(tmp_path / "out" / "sheet.png")) == (22, 1)
+    assert os.listdir(tmp_path / "out") == ["sheet-001.png"]
+    with Image.open(tmp_path / "out" / "sheet-001.png") as sheet:
+        assert sheet.size == LAYOUTS['a4-40'].page_size
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_the_main_window_leaves_the_forms_unloaded():
+    heavy = ('product_master_form', 'goods_receiving_form', 'sales_form', 'reports_form', 'PIL', 'qrcode')
+    script = f"import sys, main_window; print([name for name in {heavy!r} if name in sys.modules])"
+    loaded = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "[]"
+
+
+
+def test_the_product_master_loads_its_tools_when_used():
+    heavy = ('product_import', 'label_generator', 'image_store', 'thumbnail_cache')
+    script = f"import sys, product_master_form; print([name for name in {heavy!r} if name in sys.modules])"
+    loaded = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "[]"
+    script = "import sys, label_generator; print('multiprocessing' in sys.modules)"
+    loaded = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "False"
+
+@pytest.fixture
+def window(messages, db):
+    from main_window import MainWindow
+    window = MainWindow(1, db)
+    yield window
+    window.async_db.wait()
+    window.close()
+
+
+def test_forms_are_built_when_first_shown(add_product, window, wait_until):
+    from sales_form import SalesForm
+
+    assert window.stacked_widget.count() == 1
+    product_master = window.stacked_widget.currentWidget()
+    assert product_master is window.product_master_form
+    # Its combos are filled once the window is up, not while it is built
+    assert product_master.category_combo.count() == 0
+    wait_until(lambda: product_master.category_combo.count() == 2)
+    assert not window.db.catalog._products_loaded
+
+    window.show_form(2)
+    assert isinstance(window.stacked_widget.currentWidget(), SalesForm)
+    assert window.stacked_widget.count() == 2
+    window.show_form(0)
+    window.show_form(2)
+    assert window.stacked_widget.count() == 2
+    assert window.stacked_widget.currentWidget() is window.sales_form
+    wait_until(lambda: window.sales_form.category_combo.count() == 2)
@@ -0,0 +1,132 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from database import Database
+from migrations import SCHEMA_VERSION, current_version, migrate
+
+# The tables inventory.db had before the migrations, without user_version
+BASELINE_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE subcategories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, category_id INTEGER NOT NULL, name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories (id), UNIQUE (category_id, name)
+    );
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, barcode TEXT, sku_id TEXT, name TEXT NOT NULL,
+        category_id INTEGER NOT NULL, subcategory_id INTEGER NOT NULL, description TEXT,
+        price REAL NOT NULL, tax_rate REAL NOT NULL, default_unit TEXT, image_path TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories (id),
+        FOREIGN KEY (subcategory_id) REFERENCES subcategories (id)
+    );
+    CREATE TABLE suppliers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, phone TEXT, email TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, phone TEXT, email TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE goods_receiving (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER NOT NULL, supplier_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL, quantity INTEGER NOT NULL, rate REAL NOT NULL, tax_rate REAL NOT NULL,
+        tax_amount REAL NOT NULL, total_amount REAL NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (product_id) REFERENCES products (id), FOREIGN KEY (supplier_id) REFERENCES suppliers (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    CREATE TABLE sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER NOT NULL, customer_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL, quantity INTEGER NOT NULL, rate REAL NOT NULL, tax_rate REAL NOT NULL,
+        tax_amount REAL NOT NULL, total_amount REAL NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (product_id) REFERENCES products (id), FOREIGN KEY (customer_id) REFERENCES customers (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
+    INSERT INTO users (username, password) VALUES ('admin', 'admin');
+    INSERT INTO categories (name) VALUES ('Fruit');
+    INSERT INTO subcategories (category_id, name) VALUES (1, 'Fresh');
+    INSERT INTO products (barcode, sku_id, name, category_id, subcategory_id, description, price, tax_rate)
+        VALUES ('8901', 'APL-1', 'Apple', 1, 1, 'Red apples', 10, 5);
+    INSERT INTO suppliers (name) VALUES ('Orchard');
+    INSERT INTO customers (name) VALUES ('Walk-in');
+    INSERT INTO goods_receiving (product_id, supplier_id, user_id, quantity, rate, tax_rate, tax_amount,
+                                 total_amount, created_at)
+        VALUES (1, 1, 1, 10, 8, 5, 4, 84, '2025-03-01 10:00:00');
+    INSERT INTO sales (product_id, customer_id, user_id, quantity, rate, tax_rate, tax_amount,
+                       total_amount, created_at)
+        VALUES (1, 1, 1, 3, 10, 5, 1.5, 31.5, '2025-03-02 11:00:00');
+'''
+
+
+def baseline_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+
+
+def test_baseline_database_is_upgraded_in_place(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    baseline_database(path)
+
+    Database(path).close()
+
+    conn = sqlite3.connect(path)
+    assert current_version(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT barcode, sku_id, name FROM products").fetchall() == [('8901', 'APL-1', 'Apple')]
+    assert conn.execute("SELECT quantity FROM goods_receiving").fetchall() == [(10,)]
+    assert conn.execute("SELECT quantity FROM sales").fetchall() == [(3,)]
+    assert conn.execute("SELECT username FROM users").fetchall() == [('admin',)]
+    conn.close()
+
+
+def test_each_migration_is_applied_once(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "inventory.db"))
+    assert migrate(conn, target=1) == [1]
+    assert current_version(conn) == 1
+    assert migrate(conn) == list(range(2, SCHEMA_VERSION + 1))
+    assert migrate(conn) == []
+    assert current_version(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+def test_a_failing_migration_is_rolled_back(tmp_path, monkeypatch):
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER)")
+        cursor.execute("SELECT * FROM no_such_table")
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:1] + [(2, "broken", broken)])
+
+    conn = sqlite3.connect(str(tmp_path / "inventory.db"))
+    with pytest.raises(Exception, match="Error applying migration 2 \\(broken\\)"):
+        migrate(conn)
+    assert current_version(conn) == 1
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchall()
+    conn.close()
+
+
+@pytest.mark.parametrize("query, index", [
+    ("SELECT * FROM products WHERE barcode = ?", "idx_products_barcode"),
+    ("SELECT * FROM products WHERE sku_id = ?", "idx_products_sku_id"),
+    ("SELECT * FROM sales WHERE product_id = ? AND created_at >= ?", "idx_sales_product_created"),
+    ("SELECT * FROM goods_receiving WHERE created_at >= ?", "idx_goods_receiving_created"),
+])
+def test_hot_lookups_use_their_index(db, query, index):
+    plan = db.execute_query("EXPLAIN QUERY PLAN " + query, (1,) * query.count("?"))
+    assert index in " ".join(row[3] for row in plan)
+
+
+def test_stock_levels_are_filled_from_the_ledgers(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    baseline_database(path)
+    db = Database(path)
+    assert db.get_stock(1) == 7
+    assert db.verify_stock_levels() == []
+    db.close()
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from database import Database
+from pricing import PER_INVOICE, PER_LINE, _share_invoice_tax, audit, price_invoice
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def line(rate, tax_rate=5, quantity=1):
+    return {'quantity': quantity, 'rate': rate, 'tax_rate': tax_rate}
+
+
+def taxes(priced):
+    return [round(line['tax_amount'] * 100) for line in priced]
+
+
+def test_per_line_rounds_each_line():
+    priced, totals = price_invoice([line(0.10), line(0.10), line(0.10)], PER_LINE)
+    # 0.5 paise of tax each, rounded up on every line
+    assert taxes(priced) == [1, 1, 1]
+    assert totals['tax_amount'] == 0.03
+
+
+def test_per_invoice_rounds_once_and_breaks_ties_by_line_order():
+    priced, totals = price_invoice([line(0.10), line(0.10), line(0.10)], PER_INVOICE)
+    # 1.5 paise on the invoice rounds to 2; the remainders tie, so the first lines get them
+    assert taxes(priced) == [1, 1, 0]
+    assert totals['tax_amount'] == 0.02
+
+
+def test_per_invoice_gives_left_over_paise_to_largest_remainders():
+    # 0.60, 0.85 and 0.55 paise: 2 paise on the invoice, none after rounding down
+    priced, totals = price_invoice([line(0.12), line(0.17), line(0.11)], PER_INVOICE)
+    assert taxes(priced) == [1, 1, 0]
+    assert totals == {'subtotal': 0.4, 'tax_amount': 0.02, 'total_amount': 0.42}
+
+
+def test_share_invoice_tax_rounds_each_tax_rate_separately():
+    # Three 5% lines of 0.5 paise and two 12% lines of 1.2 paise
+    shared = _share_invoice_tax([10, 10, 10, 10, 10], [500, 1200, 500, 1200, 500])
+    assert shared == [1, 1, 1, 1, 0]
+
+
+def test_lines_add_up_to_the_invoice():
+    lines = [line(99.99, 18, 3), line(0.33, 5, 7), line(12.5, 12, 0.25), line(1.01, 28), line(7, 0)]
+    for rounding in (PER_LINE, PER_INVOICE):
+        priced, totals = price_invoice(lines, rounding)
+        assert round(sum(line['tax_amount'] for line in priced), 2) == totals['tax_amount']
+        assert round(sum(line['total_amount'] for line in priced), 2) == totals['total_amount']
+        for priced_line in priced:
+            assert round(priced_line['subtotal'] + priced_line['tax_amount'], 2) == priced_line['total_amount']
+
+
+def test_lines_are_copied():
+    lines = [line(1.0)]
+    price_invoice(lines, PER_INVOICE)
+    assert lines == [line(1.0)]
+
+
+def test_unknown_rounding_rule():
+    with pytest.raises(ValueError):
+        price_invoice([line(1.0)], 'nearest')
+
+
+def test_audit_prices_each_document_under_its_own_rule(tmp_path):
+    db = Database(str(tmp_path / "inventory.db"))
+    category_id = db.add_category("Fruit")
+    subcategory_id = db.add_subcategory(category_id, "Fresh")
+    product_id = db.add_product(dict(barcode="1", sku_id="A1", name="Apple", category_id=category_id,
+                                     subcategory_id=subcategory_id, description="", price=0.1, tax_rate=5))
+    supplier_id = db.add_supplier(dict(name="Supplier", phone="", email=""))
+    customer_id = db.add_customer(dict(name="Customer", phone="", email=""))
+    lines = [line(0.10)] * 3
+    for rounding in (PER_INVOICE, PER_LINE):
+        db.rounding = rounding
+        db.add_goods_receiving_bulk({'supplier_id': supplier_id, 'user_id': 1},
+                                    [dict(item, product_id=product_id) for item in lines])
+        db.add_invoice({'customer_id': customer_id, 'user_id': 1},
+                       [dict(item, product_id=product_id) for item in lines])
+    conn = sqlite3.connect(db.db_name)
+    assert conn.execute("SELECT rounding FROM invoices ORDER BY id").fetchall() == [('invoice',), ('line',)]
+    for table in ('invoice_lines', 'goods_receiving'):
+        assert audit(conn, table, use_numpy=False)['mismatched'] == 0
+        # Priced under one rule for all, the documents recorded under the other differ
+        assert audit(conn, table, PER_LINE, use_numpy=False)['mismatched'] == 1
+        assert audit(conn, table, PER_INVOICE, use_numpy=False)['mismatched'] == 1
+    conn.close()
+    db.close()
+
+
+def test_audit_regroups_invoices_split_across_batches(tmp_path):
+    db = Database(str(tmp_path / "inventory.db"))
+    db.rounding = PER_INVOICE
+    category_id = db.add_category("Fruit")
+    subcategory_id = db.add_subcategory(category_id, "Fresh")
+    product_id = db.add_product(dict(barcode="1", sku_id="A1", name="Apple", category_id=category_id,
+                                     subcategory_id=subcategory_id, description="", price=0.1, tax_rate=5))
+    supplier_id = db.add_supplier(dict(name="Supplier", phone="", email=""))
+    customer_id = db.add_customer(dict(name="Customer", phone="", email=""))
+    # A receipt not on a note, then two notes and two invoices of three lines
+    db.add_goods_receiving({'product_id': product_id, 'supplier_id': supplier_id, 'user_id': 1,
+                            'quantity': 1, 'rate': 0.1, 'tax_rate': 5})
+    lines, _ = price_invoice([dict(line(0.10), product_id=product_id)] * 3, PER_INVOICE)
+    for _ in range(2):
+        db.add_goods_receiving_bulk({'supplier_id': supplier_id, 'user_id': 1}, lines)
+        db.add_invoice({'customer_id': customer_id, 'user_id': 1}, lines)
+    conn = sqlite3.connect(db.db_name)
+    for table in ('invoice_lines', 'goods_receiving'):
+        result = audit(conn, table, PER_INVOICE, batch_size=2, use_numpy=False)
+        assert (result['rows'], result['mismatched']) == ((6, 0) if table == 'invoice_lines' else (7, 0))
+        # The third line of each carries no tax when the invoice is rounded once
+        assert audit(conn, table, PER_LINE, use_numpy=False)['mismatched'] == 2
+    conn.close()
+    db.close()
+
+
+def test_numpy_is_not_loaded_with_the_database():
+    script = "import sys, database; print('numpy' in sys.modules)"
+    loaded = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "False"
@@ -0,0 +1,111 @@
+import pytest
+
+from product_import import ProductImporter
+from test_database import invoice_line, receive, sell
+
+CSV = '''\
+Name,Category,Subcategory,Price,SKU,barcode,tax,unit
+Apple,Fruit,Fresh,10,APL-1,8901,5,kg
+Pear,fruit,FRESH,12.5,PER-1,8902,,kg
+Milk,Dairy,Milk,3,MLK-1,,,l
+Bad price,Fruit,Fresh,abc,BAD-1,,,
+Second apple,Fruit,Fresh,11,APL-1,,,
+
+Cheese,Dairy,Hard,8,,8901,5,
+Butter,Dairy,,4,,,,
+Yoghurt,Dairy,Milk,2,YOG-1,,101,
+'''
+
+
+def catalog(db):
+    return [tuple(row) for row in db.execute_query('''
+        SELECT p.name, c.name, s.name, p.price, p.tax_rate, p.sku_id, p.barcode, p.default_unit
+        FROM products p
+        JOIN categories c ON c.id = p.category_id
+        JOIN subcategories s ON s.id = p.subcategory_id
+        ORDER BY p.id
+    ''')]
+
+
+def test_rows_are_imported_in_chunks_and_bad_rows_skipped(db):
+    db.add_category("Fruit")
+    reports = []
+    importer = ProductImporter(db, chunk_size=2, progress=lambda done, total, result: reports.append(result.imported))
+    result = importer.import_lines(CSV.splitlines(keepends=True))
+
+    assert catalog(db) == [
+        ("Apple", "Fruit", "Fresh", 10.0, 5.0, "APL-1", "8901", "kg"),
+        ("Pear", "Fruit", "Fresh", 12.5, 0.0, "PER-1", "8902", "kg"),
+        ("Milk", "Dairy", "Milk", 3.0, 0.0, "MLK-1", None, "l"),
+    ]
+    assert (result.rows_read, result.imported, result.skipped) == (8, 3, 5)
+    assert sorted(result.errors) == [
+        (5, "price 'abc' is not a number"),
+        (6, "SKU APL-1 already exists"),
+        (8, "barcode 8901 already exists"),
+        (9, "subcategory is empty"),
+        (10, "tax_rate must be between 0 and 100"),
+    ]
+    assert reports[-1] == 3 and len(reports) > 1
+    assert [row['name'] for row in db.get_all_categories()] == ["Dairy", "Fruit"]
+
+
+def test_missing_categories_can_be_refused(db):
+    db.add_subcategory(db.add_category("Fruit"), "Fresh")
+    result = ProductImporter(db, create_missing=False).import_lines(CSV.splitlines(keepends=True))
+    assert [row[0] for row in catalog(db)] == ["Apple", "Pear"]
+    assert (4, "unknown category 'Dairy'") in result.errors
+    assert [row['name'] for row in db.get_all_categories()] == ["Fruit"]
+
+
+def test_a_file_without_the_required_columns_is_refused(db):
+    with pytest.raises(Exception, match="missing column\\(s\\) category, price"):
+        ProductImporter(db).import_lines(["name,subcategory\n", "Apple,Fresh\n"])
+    with pytest.raises(Exception, match="the file is empty"):
+        ProductImporter(db).import_lines([])
+
+
+def test_a_file_is_streamed_and_can_be_cancelled(db, tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("\ufeffname,category,subcategory,price\n"
+                    + "".join(f"Product {n},Fruit,Fresh,{n + 1}\n" for n in range(10)), encoding="utf-8")
+    progress = []
+
+    def report(bytes_read, total_bytes, result):
+        progress.append((bytes_read, total_bytes))
+        if result.imported == 4:
+            importer.cancel()
+    importer = ProductImporter(db, chunk_size=2, progress=report)
+    result = importer.import_file(str(path))
+
+    assert result.cancelled and result.imported == 4
+    assert db.execute_query("SELECT COUNT(*) FROM products")[0][0] == 4
+    assert progress[-1][1] == path.stat().st_size
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+def test_stock_stays_consistent_across_sales_receipts_and_imports(db, add_product):
+    apple = add_product("Apple", sku_id="APL-1")
+    receive(db, apple, 10)
+    sell(db, apple, 2)
+    ProductImporter(db).import_lines(["name,category,subcategory,price,sku\n", "Pear,Fruit,Fresh,12,PER-1\n",
+                                      "Apple again,Fruit,Fresh,10,APL-1\n"])
+    pear = db.execute_query("SELECT id FROM products WHERE sku_id = 'PER-1'")[0][0]
+    db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1}, [invoice_line(pear, 5), invoice_line(apple, 1)])
+    db.add_invoice({'customer_id': 1, 'user_id': 1}, [invoice_line(pear, 2), invoice_line(apple, 4)])
+    assert (db.get_stock(apple), db.get_stock(pear)) == (5, 3)
+    assert db.verify_stock_levels() == []
+
+
+def test_the_catalog_sees_imported_products_at_once(db, add_product):
+    add_product("Apple", sku_id="APL-1")
+    catalog = db.catalog
+    catalog.check_interval = 3600
+    catalog.preload()
+    assert catalog.find_product_by_code("PER-1") is None
+
+    ProductImporter(db).import_lines(["name,category,subcategory,price,sku\n", "Pear,Fruit,Fresh,12,PER-1\n"])
+    assert catalog.find_product_by_code("PER-1")['price'] == 12.0
+    fruit = catalog.get_categories()[0][0]
+    fresh = catalog.get_subcategories(fruit)[0]['id']
+    assert [product['name'] for product in catalog.get_products(fruit, fresh)] == ["Apple", "Pear"]
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from product_index import ProductIndex
+
+
+def product(product_id, category_id, subcategory_id, name, barcode=None, sku_id=None):
+    return (product_id, barcode, sku_id, name, 1.0, 5.0, 'pcs', category_id, subcategory_id)
+
+
+def random_products(count, seed=7):
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        barcode = str(rng.randrange(50)) if rng.random() < 0.8 else None
+        sku_id = f"S{rng.randrange(50)}" if rng.random() < 0.8 else None
+        products.append(product(product_id, rng.randrange(1, 4), rng.randrange(1, 4),
+                                rng.choice("ABCDE") * rng.randrange(1, 3), barcode, sku_id))
+    return products
+
+
+def group_order(index):
+    return [index.ids[position] for position in index._by_group]
+
+
+def test_extend_merges_into_the_same_order_as_a_full_build():
+    products = random_products(300)
+    built = ProductIndex.build(products)
+    merged = ProductIndex()
+    for start in range(0, len(products), 37):
+        merged.extend(products[start:start + 37])
+    for order in ('_by_barcode', '_by_sku', '_by_group'):
+        assert list(getattr(merged, order)) == list(getattr(built, order))
+
+
+def test_equal_codes_keep_the_first_product():
+    index = ProductIndex.build([product(1, 1, 1, "A", barcode="111", sku_id="S1")])
+    index.extend([product(2, 1, 1, "B", barcode="111", sku_id="S1")])
+    assert index.id_by_barcode("111") == 1
+    assert index.id_by_sku("S1") == 1
+
+
+def test_products_without_codes_are_left_out_of_the_code_orders():
+    index = ProductIndex.build([product(1, 1, 1, "A", barcode="1"), product(2, 1, 1, "B")])
+    index.extend([product(3, 1, 1, "C"), product(4, 1, 1, "D", barcode="4")])
+    assert len(index._by_barcode) == 2
+    assert index.id_by_barcode("4") == 4
+    assert index.id_by_sku("S4") is None
+
+
+def test_group_range_covers_a_category_or_a_subcategory():
+    index = ProductIndex.build([
+        product(1, 2, 1, "Pear"),
+        product(2, 1, 2, "Kiwi"),
+        product(3, 2, 2, "Fig"),
+        product(4, 2, 1, "Apple"),
+        product(5, 3, 1, "Leek"),
+    ])
+    index.extend([product(6, 2, 2, "Date"), product(7, 1, 1, "Plum")])
+    assert group_order(index) == [7, 2, 4, 1, 6, 3, 5]
+    assert index._group_range(2) == (2, 6)
+    assert index._group_range(2, 2) == (4, 6)
+    assert [record['name'] for record in index.scan(2)] == ["Apple", "Pear", "Date", "Fig"]
+    assert [record['name'] for record in index.scan(1, 2)] == ["Kiwi"]
+    assert index.count_in(3) == 1
+    assert index.count_in(2, 3) == 0
+    assert index.count_in(4) == 0
+    assert index.scan(0) == []
+
+
+def test_extend_rejects_ids_out_of_order():
+    index = ProductIndex.build([product(5, 1, 1, "A")])
+    with pytest.raises(ValueError):
+        index.extend([product(3, 1, 1, "B")])
+    assert len(index) == 1
@@ -0,0 +1,95 @@
+from PySide6.QtCore import QObject, Qt, Signal
+
+from product_table_model import ProductTableModel
+
+
+def loaded_names(model):
+    return [model.product_at(row)['name'] for row in range(model.rowCount())]
+
+
+def test_products_load_a_page_at_a_time_in_name_order(qapp, db, add_product):
+    for name in ("Pear", "Apple", "Fig", "Apple", "Kiwi"):
+        add_product(name)
+    model = ProductTableModel(db, page_size=2)
+    assert model.rowCount() == 0 and model.canFetchMore()
+
+    model.fetchMore()
+    assert loaded_names(model) == ["Apple", "Apple"]
+    model.fetchMore()
+    model.fetchMore()
+    assert loaded_names(model) == ["Apple", "Apple", "Fig", "Kiwi", "Pear"]
+    assert not model.canFetchMore()
+    assert model.data(model.index(0, 7)) == "₹10.00"
+    assert model.data(model.index(0, 8), Qt.DisplayRole) == "5.0%"
+
+    model.reload()
+    assert model.rowCount() == 0 and model.canFetchMore()
+
+
+def test_an_added_product_is_inserted_at_its_sorted_position(qapp, db, add_product):
+    for name in ("Apple", "Fig", "Kiwi", "Pear"):
+        add_product(name)
+    model = ProductTableModel(db, page_size=2)
+    model.fetchMore()
+    assert loaded_names(model) == ["Apple", "Fig"]
+
+    banana = add_product("Banana")
+    model.add_product(db.get_products_page(("Apple", 1), 1)[0])
+    assert loaded_names(model) == ["Apple", "Banana", "Fig"]
+    assert model.product_at(1)['id'] == banana
+
+    # Beyond the loaded pages: left for fetchMore, which brings it in once
+    add_product("Plum")
+    model.add_product(db.get_products_page(("Pear", 4), 1)[0])
+    assert model.rowCount() == 3
+    while model.canFetchMore():
+        model.fetchMore()
+    assert loaded_names(model) == ["Apple", "Banana", "Fig", "Kiwi", "Pear", "Plum"]
+
+
+class Thumbnails(QObject):
+    ready = Signal(str)
+
+    def pixmap(self, digest):
+        return None
+
+
+def test_a_ready_thumbnail_repaints_only_the_rows_showing_it(qapp, db, add_product):
+    for name, digest in (("Apple", "a" * 64), ("Fig", None), ("Kiwi", "a" * 64), ("Pear", "b" * 64)):
+        add_product(name, image_hash=digest)
+    thumbnails = Thumbnails()
+    model = ProductTableModel(db, page_size=10, thumbnails=thumbnails)
+    model.fetchMore()
+    add_product("Banana", image_hash="b" * 64)
+    model.add_product(db.get_products_page(("Apple", 1), 1)[0])
+
+    repainted = []
+    model.dataChanged.connect(lambda first, last, roles: repainted.append((first.row(), first.column())))
+    thumbnails.ready.emit("a" * 64)
+    thumbnails.ready.emit("b" * 64)
+    # Apple, Banana, Fig, Kiwi, Pear
+    assert repainted == [(0, 9), (3, 9), (1, 9), (4, 9)]
+
+
+def test_a_failed_fetch_stops_fetching_until_reload(qapp, db, add_product, monkeypatch):
+    add_product("Apple")
+    model = ProductTableModel(db, page_size=2)
+    errors = []
+    model.load_failed.connect(errors.append)
+    calls = []
+
+    def locked(*args):
+        calls.append(args)
+        raise Exception("Error fetching products: database is locked")
+    monkeypatch.setattr(db, "get_products_page", locked)
+    model.fetchMore()
+    assert errors == ["Error fetching products: database is locked"]
+    assert not model.canFetchMore()
+    model.fetchMore()
+    assert len(calls) == 1
+
+    monkeypatch.undo()
+    model.reload()
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert loaded_names(model) == ["Apple"]
@@ -0,0 +1,88 @@
+import pytest
+
+from database import Database, DatabaseConfig
+from query_stats import QueryStats, normalize
+
+
+def statement(stats, prefix):
+    matches = [row for row in stats.snapshot() if row['statement'].startswith(prefix)]
+    assert len(matches) == 1, matches
+    return matches[0]
+
+
+def test_statements_are_normalized():
+    assert normalize("SELECT *\n   FROM products\tWHERE id = ?") == "SELECT * FROM products WHERE id = ?"
+    assert normalize("SELECT * FROM products WHERE id IN (?,?, ?)") == "SELECT * FROM products WHERE id IN (?, ...)"
+    assert normalize("SELECT * FROM products WHERE id IN (?)") == "SELECT * FROM products WHERE id IN (?)"
+
+
+def test_calls_latency_and_rows_are_summed_per_statement():
+    stats = QueryStats(slow_query_ms=0)
+    for ms in range(1, 101):
+        stats.record("SELECT * FROM sales WHERE product_id = ?", (1,), ms / 1000, 2)
+    stats.record("SELECT * FROM products", (), 0.5, 10)
+
+    sales = statement(stats, "SELECT * FROM sales")
+    assert (sales['calls'], sales['rows'], sales['slow']) == (100, 200, 0)
+    assert sales['total_ms'] == pytest.approx(5050)
+    assert (sales['p50_ms'], sales['p99_ms'], sales['max_ms']) == pytest.approx((51, 99, 100))
+    assert [row['statement'] for row in stats.snapshot('calls')][0].startswith("SELECT * FROM sales")
+    assert [row['statement'] for row in stats.snapshot('max_ms')][0] == "SELECT * FROM products"
+
+    stats.reset()
+    assert stats.snapshot() == []
+
+
+def test_the_database_times_its_statements(db, add_product):
+    for _ in range(3):
+        add_product()
+    db.query_stats.reset()
+    db.execute_query("SELECT name FROM products WHERE id IN (?, ?)", (1, 2))
+    db.execute_query("SELECT name FROM products WHERE id IN (?, ?, ?)", (1, 2, 3))
+    list(db.stream_query("SELECT id FROM products"))
+    db.add_category("Dairy")
+
+    assert statement(db.query_stats, "SELECT name FROM products WHERE id IN")['calls'] == 2
+    assert statement(db.query_stats, "SELECT name FROM products WHERE id IN")['rows'] == 5
+    assert statement(db.query_stats, "SELECT id FROM products")['rows'] == 3
+    assert statement(db.query_stats, "INSERT INTO categories")['rows'] == 1
+
+
+def test_slow_statements_are_logged_with_their_plan(tmp_path):
+    log = tmp_path / "slow.log"
+    db = Database(str(tmp_path / "inventory.db"), DatabaseConfig(slow_query_ms=1e-6, slow_query_log=str(log)))
+    try:
+        db.execute_query("SELECT name FROM products WHERE id = ?", (1,))
+        assert statement(db.query_stats, "SELECT name FROM products WHERE id = ?")['slow'] == 1
+    finally:
+        db.close()
+    text = log.read_text()
+    assert "SELECT name FROM products WHERE id = ?" in text
+    assert "SEARCH products USING INTEGER PRIMARY KEY" in text
+
+
+def test_stats_can_be_turned_off(tmp_path):
+    db = Database(str(tmp_path / "inventory.db"), DatabaseConfig(query_stats=False))
+    assert db.query_stats is None
+    assert db.add_category("Fruit")
+    db.close()
+    assert DatabaseConfig.from_env({'IMS_DB_QUERY_STATS': '0'}).query_stats is False
+
+
+def test_the_slow_log_shows_parameter_types_unless_asked_for_values(tmp_path):
+    for log_params in (False, True):
+        log = tmp_path / f"slow-{log_params}.log"
+        db = Database(str(tmp_path / f"{log_params}.db"),
+                      DatabaseConfig(slow_query_ms=1e-6, slow_query_log=str(log), slow_query_log_params=log_params))
+        try:
+            db.execute_query("SELECT id FROM users WHERE username = ? AND password = ?", ("admin", "hunter2"))
+            db.execute_query("UPDATE products SET price = ? WHERE id = ?", (1.5, 1))
+        finally:
+            db.close()
+        text = log.read_text()
+        assert ("hunter2" in text) is log_params
+        assert ("params: 2 (str, str)" in text) is not log_params
+        # A write is explained too
+        update = text[text.index("UPDATE products"):]
+        assert "SEARCH products USING INTEGER PRIMARY KEY" in update
+    assert DatabaseConfig.from_env({'IMS_DB_SLOW_QUERY_LOG_PARAMS': '1'}).slow_query_log_params is True
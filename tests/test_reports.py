@@ -0,0 +1,144 @@
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+
+import reports
+from reports import Reports, split_range
+from test_database import invoice_line, receive
+
+
+def test_days_inside_one_month():
+    assert split_range("2025-03-05", "2025-03-20") == ([(date(2025, 3, 5), date(2025, 3, 20))], None)
+
+
+def test_one_whole_month():
+    assert split_range("2025-03-01", "2025-03-31") == ([], ("2025-03", "2025-03"))
+
+
+def test_edge_days_on_both_sides():
+    assert split_range("2025-01-30", "2025-04-02") == (
+        [(date(2025, 1, 30), date(2025, 1, 31)), (date(2025, 4, 1), date(2025, 4, 2))],
+        ("2025-02", "2025-03"))
+
+
+def test_starting_on_the_first_or_ending_on_the_last():
+    assert split_range("2025-03-01", "2025-04-10") == ([(date(2025, 4, 1), date(2025, 4, 10))], ("2025-03", "2025-03"))
+    assert split_range("2025-02-15", "2025-03-31") == ([(date(2025, 2, 15), date(2025, 2, 28))], ("2025-03", "2025-03"))
+
+
+def test_across_a_month_boundary_without_a_whole_month():
+    assert split_range("2025-01-31", "2025-02-01") == ([(date(2025, 1, 31), date(2025, 2, 1))], None)
+
+
+def test_february_in_a_leap_year():
+    assert split_range("2024-02-01", "2024-02-29") == ([], ("2024-02", "2024-02"))
+    assert split_range("2024-02-01", "2024-02-28") == ([(date(2024, 2, 1), date(2024, 2, 28))], None)
+
+
+def test_across_the_year_end():
+    assert split_range(date(2024, 12, 31), date(2025, 2, 1)) == (
+        [(date(2024, 12, 31), date(2024, 12, 31)), (date(2025, 2, 1), date(2025, 2, 1))],
+        ("2025-01", "2025-01"))
+
+
+def test_single_day_and_empty_range():
+    assert split_range("2025-03-31", "2025-03-31") == ([(date(2025, 3, 31), date(2025, 3, 31))], None)
+    assert split_range("2025-03-02", "2025-03-01") == ([], None)
+
+
+RAW_SALES = '''
+    SELECT created_at, quantity, tax_amount, total_amount FROM sales
+    UNION ALL
+    SELECT i.created_at, l.quantity, l.tax_amount, l.total_amount
+    FROM invoice_lines l JOIN invoices i ON i.id = l.invoice_id
+'''
+
+
+def rows(result):
+    return [tuple(row) for row in result]
+
+
+def raw_sales(db, period, start, end):
+    return rows(db.execute_query(f'''
+        SELECT {period}, SUM(quantity), SUM(total_amount) - SUM(tax_amount), SUM(tax_amount),
+               SUM(total_amount), COUNT(*)
+        FROM ({RAW_SALES})
+        WHERE date(created_at) BETWEEN ? AND ?
+        GROUP BY 1 ORDER BY 1
+    ''', (start, end)))
+
+
+def raw_tax(db, period, start, end):
+    return rows(db.execute_query(f'''
+        SELECT {period}, SUM(collected), SUM(paid), SUM(collected) - SUM(paid)
+        FROM (
+            SELECT created_at, tax_amount AS collected, 0 AS paid FROM ({RAW_SALES})
+            UNION ALL
+            SELECT created_at, 0, tax_amount FROM goods_receiving
+        )
+        WHERE date(created_at) BETWEEN ? AND ?
+        GROUP BY 1 ORDER BY 1
+    ''', (start, end)))
+
+
+@pytest.fixture
+def ledgers(db, add_product):
+    apple, pear = add_product("Apple"), add_product("Pear")
+    receive(db, apple, 50)
+    receive(db, pear, 50)
+    for at, product_id, quantity in [("2025-01-31 10:00:00", apple, 2), ("2025-02-01 00:00:00", pear, 1),
+                                     ("2025-02-15 12:30:00", apple, 4), ("2025-03-31 23:59:59", pear, 3),
+                                     ("2025-04-01 08:00:00", apple, 1)]:
+        sale_id = db.add_sale(dict(product_id=product_id, customer_id=1, user_id=1, quantity=quantity, rate=10,
+                                   tax_rate=5, tax_amount=quantity * 0.5, total_amount=quantity * 10.5))
+        db.execute_query("UPDATE sales SET created_at = ? WHERE id = ?", (at, sale_id))
+    grn_id = db.add_goods_receiving_bulk({'supplier_id': 1, 'user_id': 1},
+                                         [invoice_line(apple, 4), invoice_line(pear, 2)])
+    db.execute_query("UPDATE goods_receiving SET created_at = '2025-02-10 09:00:00' WHERE grn_id = ?", (grn_id,))
+    # Invoices are dated when they are recorded
+    db.add_invoice({'customer_id': 1, 'user_id': 1}, [invoice_line(apple, 2), invoice_line(pear, 1)])
+    return db
+
+
+@pytest.mark.parametrize("start", ["2025-01-01", "2025-01-31", "2025-02-01", "2025-02-16", "2025-04-01"])
+def test_reports_match_the_ledgers(ledgers, start):
+    db, reports = ledgers, Reports(ledgers)
+    today = db.execute_query("SELECT date('now')")[0][0]
+    for end in ("2025-02-28", "2025-03-31", today):
+        assert rows(reports.sales_by_day(start, end)) == raw_sales(db, "date(created_at)", start, end)
+        assert rows(reports.sales_by_month(start, end)) == raw_sales(db, "strftime('%Y-%m', created_at)", start, end)
+        assert rows(reports.tax_by_period(start, end, 'day')) == raw_tax(db, "date(created_at)", start, end)
+        assert rows(reports.tax_by_period(start, end)) == raw_tax(db, "strftime('%Y-%m', created_at)", start, end)
+
+
+def test_rebuild_repairs_the_rollups(ledgers):
+    db, reports = ledgers, Reports(ledgers)
+    today = db.execute_query("SELECT date('now')")[0][0]
+    expected = (rows(reports.sales_by_day("2025-01-01", today)), rows(reports.sales_by_month("2025-01-15", today)),
+                rows(reports.tax_by_period("2025-01-15", today)))
+    db.execute_query("DELETE FROM sales_daily WHERE period = '2025-02-15'")
+    db.execute_query("UPDATE sales_monthly SET quantity = 0")
+    db.execute_query("DELETE FROM purchases_monthly")
+    assert rows(reports.sales_by_month("2025-01-15", today)) != expected[1]
+
+    reports.rebuild()
+    assert (rows(reports.sales_by_day("2025-01-01", today)), rows(reports.sales_by_month("2025-01-15", today)),
+            rows(reports.tax_by_period("2025-01-15", today))) == expected
+    assert expected[0] == raw_sales(db, "date(created_at)", "2025-01-01", today)
+
+
+def test_the_cli_defaults_to_the_utc_month(db, monkeypatch):
+    class LocalDate(date):
+        @classmethod
+        def today(cls):
+            # A local clock a day ahead of UTC, or any other
+            return cls(1999, 12, 31)
+    monkeypatch.setattr(reports, "date", LocalDate)
+    asked = []
+    monkeypatch.setattr(Reports, "sales_by_day", lambda self, start, end: asked.append((start, end)) or [])
+    for argv in ([], ["--from", "2024-01-01"]):
+        monkeypatch.setattr(sys, "argv", ["reports.py", "sales-by-day", "--db", db.db_name] + argv)
+        assert reports.main() == 0
+    today = datetime.now(timezone.utc).date()
+    assert asked == [(today.replace(day=1).isoformat(), today.isoformat()), ("2024-01-01", today.isoformat())]
@@ -0,0 +1,67 @@
+import sqlite3
+from datetime import date
+
+from database import Database
+from reports import Reports
+from sample_data import SampleDataGenerator, ean13
+
+CATALOG = ('categories', 'subcategories', 'products', 'suppliers', 'customers')
+LEDGERS = ('sales', 'invoices', 'invoice_lines', 'goods_receipt_notes', 'goods_receiving')
+
+
+def generate(path, seed=1):
+    return SampleDataGenerator(str(path), seed=seed, categories=3, subcategories=2, products=40, suppliers=3,
+                               customers=10, years=1, sales_per_day=4, end_date=date(2025, 3, 31)).generate()
+
+
+def dump(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        # The catalog rows are dated when they are generated, the ledgers by end_date
+        tables = {table: conn.execute(f"SELECT id, name FROM {table} ORDER BY id").fetchall() for table in CATALOG}
+        tables.update({table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall() for table in LEDGERS})
+        return tables
+    finally:
+        conn.close()
+
+
+def test_ean13_check_digit():
+    assert ean13("400638133393") == "4006381333931"
+    assert ean13("890123456789") == "8901234567890"
+
+
+def test_the_same_seed_gives_the_same_data(tmp_path):
+    counts = generate(tmp_path / "a.db")
+    assert counts['products'] == 40 and counts['customers'] == 10
+    generate(tmp_path / "b.db")
+    generate(tmp_path / "c.db", seed=2)
+    assert dump(tmp_path / "a.db") == dump(tmp_path / "b.db")
+    assert dump(tmp_path / "a.db")['sales'] != dump(tmp_path / "c.db")['sales']
+
+
+def test_generated_data_is_consistent(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    generate(path)
+    db = Database(path)
+    try:
+        assert db.verify_stock_levels() == []
+        assert db.execute_query("SELECT COUNT(*) FROM stock_levels WHERE quantity < 0")[0][0] == 0
+        assert db.execute_query("SELECT MIN(created_at), MAX(created_at) FROM sales")[0][1] < "2025-04-01"
+        barcodes = [row[0] for row in db.execute_query("SELECT barcode FROM products")]
+        assert all(ean13(code[:12]) == code for code in barcodes)
+
+        # The rollups and search index match what the triggers would have built
+        reports = Reports(db)
+        before = [tuple(row) for row in reports.sales_by_month("2024-01-01", "2025-03-31")]
+        reports.rebuild()
+        assert [tuple(row) for row in reports.sales_by_month("2024-01-01", "2025-03-31")] == before
+        name = db.execute_query("SELECT name FROM products WHERE id = 1")[0][0]
+        assert 1 in [row['id'] for row in db.search_products(name, limit=50)]
+
+        # and the triggers are back for the writes that follow
+        fresh = Database(str(tmp_path / "fresh.db"))
+        triggers = "SELECT name FROM sqlite_master WHERE type = 'trigger' ORDER BY name"
+        assert [row[0] for row in db.execute_query(triggers)] == [row[0] for row in fresh.execute_query(triggers)]
+        fresh.close()
+    finally:
+        db.close()
@@ -0,0 +1,50 @@
+from database import Database
+from test_migrations import baseline_database
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_names_starting_with_the_term_rank_first(db, add_product):
+    add_product("Toffee", description="Apple flavoured")
+    add_product("Green Apple")
+    add_product("Apple Pie")
+    add_product("Apple")
+    add_product("Pineapple")
+    assert names(db.search_products("apple")) == ["Apple", "Apple Pie", "Green Apple", "Toffee"]
+    assert names(db.search_products("APP")) == ["Apple", "Apple Pie", "Green Apple", "Toffee"]
+    assert names(db.search_products("gre app")) == ["Green Apple"]
+    assert names(db.search_products("apple", limit=2)) == ["Apple", "Apple Pie"]
+    assert db.search_products("   ") == []
+
+
+def test_codes_are_matched_by_prefix(db, add_product):
+    add_product("Apple", barcode="890100", sku_id="APL-0042")
+    add_product("Pear", barcode="890200", sku_id="PER-0042")
+    add_product("Vitamin 8901 Plus")
+    add_product("Vitamin B12")
+
+    # A code prefix is answered from the barcode and SKU indexes alone,
+    # so the name holding the same digits is not a hit
+    assert names(db.search_products("8901")) == ["Apple"]
+    assert names(db.search_products("890")) == ["Apple", "Pear"]
+    assert names(db.search_products("apl-00")) == ["Apple"]
+    assert names(db.search_products("PER-0042")) == ["Pear"]
+    # No code starts with it, so it is searched as a word
+    assert names(db.search_products("b12")) == ["Vitamin B12"]
+
+
+def test_new_products_are_searchable_at_once(db, add_product):
+    assert db.search_products("kiwi") == []
+    kiwi = add_product("Kiwi", description="Golden")
+    assert [row['id'] for row in db.search_products("gold")] == [kiwi]
+
+
+def test_products_from_before_the_index_are_searchable(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    baseline_database(path)
+    db = Database(path)
+    assert names(db.search_products("red")) == ["Apple"]
+    assert names(db.search_products("apl")) == ["Apple"]
+    db.close()
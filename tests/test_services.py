@@ -0,0 +1,139 @@
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+from api_client import ApiClient
+from api_server import ApiServer
+from database import LineValidationError
+from services import InventoryService, ValidationError
+
+
+@pytest.fixture
+def catalog(db, add_product):
+    """Apple (price 10, tax 5%) with 10 in stock, a supplier and a customer; returns the product id."""
+    supplier = db.add_supplier(dict(name="Orchard", phone="", email=""))
+    db.add_customer(dict(name="Walk-in", phone="", email=""))
+    apple = add_product("Apple", barcode="8901", sku_id="APL-1")
+    InventoryService(db).receive_goods({'product_id': apple, 'supplier_id': supplier, 'user_id': 1,
+                                        'quantity': 10})
+    return apple
+
+
+@pytest.fixture
+def server(db):
+    """An ApiServer on a free port, served from a background event loop."""
+    loop = asyncio.new_event_loop()
+    server = asyncio.run_coroutine_threadsafe(ApiServer(InventoryService(db), port=0).start(), loop)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = server.result(timeout=5)
+    yield server
+
+    async def shutdown():
+        server.close()
+        # Connections the clients kept alive
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+@pytest.fixture
+def client(server):
+    client = ApiClient(f"http://127.0.0.1:{server.port}")
+    yield client
+    client.close()
+
+
+def request(server, verb, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        conn.request(verb, path, body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_the_tax_comes_from_the_product_not_the_caller(db, catalog):
+    service = InventoryService(db)
+    sale_id = service.record_sale({'product_id': catalog, 'customer_id': 1, 'user_id': 1, 'quantity': 2,
+                                   'tax_rate': 0, 'tax_amount': 0, 'total_amount': 1})
+    sale = db.execute_query("SELECT quantity, rate, tax_rate, tax_amount, total_amount FROM sales WHERE id = ?",
+                            (sale_id,))[0]
+    assert tuple(sale) == (2, 10.0, 5.0, 1.0, 21.0)
+    assert service.stock(catalog) == 8
+
+    with pytest.raises(ValidationError, match="Please select a customer"):
+        service.record_sale({'product_id': catalog, 'user_id': 1, 'quantity': 1})
+    with pytest.raises(ValidationError, match="Quantity must be greater than zero"):
+        service.quote_line(catalog, 0)
+
+
+def test_calls_round_trip_through_the_server(client, catalog):
+    assert client.find_product("APL-1")['id'] == catalog
+    assert client.find_product("0000") is None
+    assert [customer['name'] for customer in client.customers()] == ["Walk-in"]
+
+    sale_id = client.record_sale({'product_id': catalog, 'customer_id': 1, 'user_id': 1, 'quantity': 3})
+    assert isinstance(sale_id, int)
+    assert client.stock(catalog) == 7
+    with pytest.raises(ValidationError, match="Please select a customer"):
+        client.record_sale({'product_id': catalog, 'user_id': 1, 'quantity': 1})
+
+
+def test_line_errors_round_trip_with_their_line_numbers(db, client, catalog):
+    with pytest.raises(LineValidationError) as raised:
+        client.checkout({'customer_id': 1, 'user_id': 1}, [
+            {'product_id': catalog, 'quantity': 1},
+            {'product_id': catalog, 'quantity': 0},
+            {'product_id': 999, 'quantity': 1},
+        ])
+    assert raised.value.errors == [(2, "Quantity must be greater than zero"), (3, "Product 999 does not exist")]
+    assert db.execute_query("SELECT COUNT(*) FROM invoices")[0][0] == 0
+
+    invoice_id = client.checkout({'customer_id': 1, 'user_id': 1}, [{'product_id': catalog, 'quantity': 4}])
+    assert isinstance(invoice_id, int)
+    assert client.stock(catalog) == 6
+
+
+def test_a_batch_reports_each_failure_in_place(client, catalog):
+    product, missing, stock, refused, grn = client.batch([
+        ('find_product', "8901"),
+        ('no_such_method',),
+        ('stock', catalog),
+        ('quote_line', catalog, -1),
+        ('post_grn', {'supplier_id': 1, 'user_id': 1}, [{'product_id': None, 'quantity': 1}]),
+    ])
+    assert product['name'] == "Apple"
+    assert isinstance(missing, Exception) and "Unknown method no_such_method" in str(missing)
+    assert stock == 10
+    assert isinstance(refused, ValidationError)
+    assert isinstance(grn, LineValidationError) and grn.errors == [(1, "No product selected")]
+
+
+def test_keyword_params_and_http_errors(server, catalog):
+    status, answer = request(server, "POST", "/call",
+                             json.dumps({'method': 'quote_line', 'params': {'product_id': catalog, 'quantity': 2}}))
+    assert status == 200
+    assert (answer['result']['tax_amount'], answer['result']['total_amount']) == (1.0, 21.0)
+
+    assert request(server, "GET", "/health") == (200, {'status': 'ok'})
+    assert request(server, "GET", "/call")[0] == 405
+    assert request(server, "POST", "/nowhere", "{}")[0] == 404
+    status, answer = request(server, "POST", "/call", "{not json")
+    assert status == 400 and "Invalid JSON" in answer['error']['message']
+    assert request(server, "POST", "/batch", json.dumps({'method': 'stock'}))[0] == 400
+
+
+def test_the_rounding_rule_is_the_recording_database_one(db, client):
+    assert client.tax_rounding() == 'line'
+    db.rounding = 'invoice'
+    assert client.tax_rounding() == 'invoice'
@@ -0,0 +1,94 @@
+import pytest
+
+import ui_profiler
+from ui_profiler import DEFAULT_OUTPUT, UiProfiler, output_path, strip_args
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A perf_counter that only moves when the test advances it, in milliseconds."""
+    now = [0.0]
+    monkeypatch.setattr(ui_profiler.time, "perf_counter", lambda: now[0])
+
+    def advance(ms):
+        now[0] += ms / 1000
+    return advance
+
+
+def test_output_path_from_the_command_line_or_environment():
+    assert output_path(["main.py"], {}) is None
+    assert output_path(["main.py", "--profile-ui"], {}) == DEFAULT_OUTPUT
+    assert output_path(["main.py", "--profile-ui", "/tmp/sales.folded"], {}) == "/tmp/sales.folded"
+    assert output_path(["main.py", "--profile-ui", "-style", "fusion"], {}) == DEFAULT_OUTPUT
+    assert output_path(["main.py"], {'IMS_PROFILE_UI': "1"}) == DEFAULT_OUTPUT
+    assert output_path(["main.py"], {'IMS_PROFILE_UI': "off"}) is None
+    assert output_path(["main.py"], {'IMS_PROFILE_UI': "run.folded"}) == "run.folded"
+
+
+def test_strip_args_leaves_the_rest_for_qt():
+    assert strip_args(["main.py", "--profile-ui", "out.folded", "-style", "fusion"]) == ["main.py", "-style", "fusion"]
+    assert strip_args(["main.py", "--profile-ui", "-style", "fusion"]) == ["main.py", "-style", "fusion"]
+    assert strip_args(["main.py"]) == ["main.py"]
+
+
+def test_time_is_split_between_handlers_and_the_database(clock):
+    profiler = UiProfiler(stall_ms=16)
+    profiler.enter("MouseButtonRelease@QPushButton", 'event')
+    clock(2)
+    profiler.enter("SalesForm.add_to_cart")
+    clock(3)
+    profiler.enter("db:Database.add_sale", 'db')
+    clock(4)
+    # A database call made by another one counts as part of the outer call
+    profiler.enter("db:Database.execute_query", 'db')
+    clock(5)
+    assert profiler.leave() == pytest.approx((0.005, 0.005))
+    assert profiler.leave() == pytest.approx((0.009, 0.009))
+    clock(1)
+    assert profiler.leave() == pytest.approx((0.013, 0.009))
+    assert profiler.leave() == pytest.approx((0.015, 0.009))
+
+    stack = "MouseButtonRelease@QPushButton;SalesForm.add_to_cart"
+    assert profiler.folded == pytest.approx({
+        "MouseButtonRelease@QPushButton": 0.002,
+        stack: 0.004,
+        stack + ";db:Database.add_sale": 0.004,
+        stack + ";db:Database.add_sale;db:Database.execute_query": 0.005,
+    })
+    assert set(profiler.handlers) == {"SalesForm.add_to_cart", "db:Database.add_sale"}
+
+
+def test_slow_events_are_recorded_as_stalls(qapp, clock, tmp_path):
+    profiler = UiProfiler(str(tmp_path / "profile.folded"), stall_ms=16)
+    for ms in (5, 40):
+        profiler.begin_event("Timer@SalesForm")
+        profiler.enter("SalesForm.refresh_cart")
+        clock(ms)
+        profiler.leave()
+        profiler.end_event()
+
+    assert profiler.events == 2
+    stalls = [(name, called) for _, _, name, called in profiler.stalls]
+    assert stalls == [("Timer@SalesForm", ["SalesForm.refresh_cart"])]
+    profiler.write()
+    assert (tmp_path / "profile.folded").read_text() == "Timer@SalesForm;SalesForm.refresh_cart 45000\n"
+    summary = (tmp_path / "profile.txt").read_text()
+    assert "SalesForm.refresh_cart" in summary and "1 stalls over 16 ms" in summary
+
+
+def test_wrapped_slots_get_the_arguments_qt_would_pass(clock):
+    profiler = UiProfiler()
+
+    class Form:
+        def load_data(self):
+            return "loaded"
+
+        def on_changed(self, index, *rest):
+            return (index,) + rest
+
+    load_data = profiler._wrap(Form.load_data, "Form.load_data", 'slot')
+    on_changed = profiler._wrap(Form.on_changed, "Form.on_changed", 'slot')
+    # clicked(bool) connected to a slot taking no arguments
+    assert load_data(Form(), True) == "loaded"
+    assert on_changed(Form(), 1, 2) == (1, 2)
+    assert [len(profiler.handlers[name]) for name in ("Form.load_data", "Form.on_changed")] == [1, 1]
@@ -0,0 +1,38 @@
+import pytest
+
+from database import Database
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "inventory.db"))
+    yield db
+    db.close()
+
+
+def sale(product_id, quantity):
+    return dict(product_id=product_id, customer_id=1, user_id=1, quantity=quantity,
+                rate=1, tax_rate=0, tax_amount=0, total_amount=quantity)
+
+
+def test_a_failing_write_is_rolled_back_alone(db):
+    category_id = db.add_category("Fruit")
+    subcategory_id = db.add_subcategory(category_id, "Fresh")
+    product_id = db.add_product(dict(barcode="1", sku_id="A1", name="Apple", category_id=category_id,
+                                     subcategory_id=subcategory_id, description="", price=1, tax_rate=0))
+    db.add_goods_receiving(dict(product_id=product_id, supplier_id=1, user_id=1, quantity=5,
+                                rate=1, tax_rate=0, tax_amount=0, total_amount=5))
+
+    queue = WriteQueue(db, max_delay=0.2)
+    futures = [queue.add_sale(sale(product_id, 2)), queue.add_sale(sale(product_id, 10)),
+               queue.add_sale(sale(product_id, 3))]
+    queue.close()
+
+    assert queue.commits == 1
+    assert queue.writes == 2
+    assert futures[0].result() and futures[2].result()
+    with pytest.raises(Exception, match="Error adding sale"):
+        futures[1].result()
+    assert db.get_stock(product_id) == 0
+    assert [row[0] for row in db.execute_query("SELECT quantity FROM sales ORDER BY id")] == [2, 3]
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+
+class ThumbnailCache(QObject):
+    """Least-recently-used QPixmaps of ImageStore thumbnails, keyed by image hash.
+
+    pixmap() only answers from memory, so painting never touches the disk.
+    On a miss it returns None and a loader thread reads the small thumbnail
+    file, first having the store's process pool render it if it does not
+    exist yet; an original is never decoded on the GUI thread. ready is
+    emitted with the hash once it can be drawn, failed if it cannot.
+    """
+
+    ready = Signal(str)
+    failed = Signal(str, str)
+    # Emitted from a loader thread, delivered on the GUI thread
+    _loaded = Signal(str, QImage, str)
+
+    def __init__(self, store, capacity=1000, parent=None, loader_threads=2):
+        super().__init__(parent)
+        self.store = store
+        self.capacity = capacity
+        self.loader_threads = loader_threads
+        self._loader = None
+        self._pixmaps = OrderedDict()
+        self._pending = set()
+        self._failed = set()
+        self._loaded.connect(self._on_loaded)
+
+    def pixmap(self, digest):
+        if not digest or digest in self._failed:
+            return None
+        pixmap = self._pixmaps.get(digest)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(digest)
+            return pixmap
+        if digest not in self._pending:
+            self._load(digest)
+        return None
+
+    def _remember(self, digest, pixmap):
+        self._pixmaps[digest] = pixmap
+        while len(self._pixmaps) > self.capacity:
+            self._pixmaps.popitem(last=False)
+
+    def _load(self, digest):
+        self._pending.add(digest)
+        if self._loader is None:
+            self._loader = ThreadPoolExecutor(self.loader_threads, thread_name_prefix="thumbnails")
+        self._loader.submit(self._read, digest)
+
+    def _read(self, digest):
+        # Runs on a loader thread; QImage, unlike QPixmap, may be used off the GUI thread
+        try:
+            path = self.store.thumbnail_path(digest)
+            if not self.store.has_thumbnail(digest):
+                path = self.store.submit_thumbnail(digest).result()
+            image = QImage(path)
+            if image.isNull():
+                raise Exception(f"Error reading thumbnail {path}")
+            self._loaded.emit(digest, image, "")
+        except Exception as e:
+            self._loaded.emit(digest, QImage(), str(e))
+
+    def _on_loaded(self, digest, image, error):
+        self._pending.discard(digest)
+        if error:
+            self._failed.add(digest)
+            self.failed.emit(digest, error)
+        else:
+            self._remember(digest, QPixmap.fromImage(image))
+            self.ready.emit(digest)
+
+    def close(self):
+        if self._loader is not None:
+            self._loader.shutdown(cancel_futures=True)
+            self._loader = None
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._failed.clear()
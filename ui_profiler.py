@@ -0,0 +1,293 @@
+"""Opt-in profiler for UI responsiveness: what blocks the Qt event loop, and for how long.
+
+    IMS_PROFILE_UI=1 python main.py                  # writes ui_profile.folded and ui_profile.txt
+    python main.py --profile-ui /tmp/sales.folded    # or choose the file
+
+While it is on, every event the application dispatches is timed, and so is
+every method of the forms (the slots behind combos, buttons and database
+callbacks, e.g. SalesForm.refresh_cart or ProductPicker.filter_products)
+and every Database and CatalogCache call made on the GUI thread.
+Profiling stops when the app quits, leaving two files:
+
+    ui_profile.folded  one "event;Form.slot;db:Database.method microseconds"
+                       line per call stack, in the folded format of
+                       flamegraph.pl, speedscope and similar viewers
+    ui_profile.txt     per-handler calls, p50/p95/max and the database
+                       time inside each, and every stall: an event that
+                       kept the loop busy for more than 16 ms
+                       (IMS_PROFILE_UI_STALL_MS)
+
+While a modal dialog is open in a handler, the handler is not counted as
+busy; the dialog's own events are profiled as events of their own.
+"""
+import atexit
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from importlib import import_module
+
+from PySide6.QtCore import QThread
+from PySide6.QtWidgets import QApplication
+
+DEFAULT_OUTPUT = "ui_profile.folded"
+DEFAULT_STALL_MS = 16.0
+# Classes whose methods are timed: (module, class, frame prefix)
+PROFILED_CLASSES = [
+    ('login_window', 'LoginWindow', ''),
+    ('main_window', 'MainWindow', ''),
+    ('product_master_form', 'ProductMasterForm', ''),
+    ('goods_receiving_form', 'GoodsReceivingForm', ''),
+    ('sales_form', 'SalesForm', ''),
+    ('reports_form', 'ReportsForm', ''),
+    ('diagnostics_form', 'DiagnosticsForm', ''),
+    ('product_picker', 'ProductPicker', ''),
+    ('product_search', 'ProductSearchBox', ''),
+    ('database', 'Database', 'db:'),
+    ('catalog_cache', 'CatalogCache', 'db:'),
+]
+# Called for every cell painted, or the profiler's own hooks
+SKIPPED_METHODS = {'showEvent', 'event', 'eventFilter', 'paintEvent'}
+STALLS_LISTED = 50
+
+
+def output_path(argv=None, environ=None):
+    """The file to profile into, from --profile-ui [FILE] or IMS_PROFILE_UI, or None when off."""
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    if "--profile-ui" in argv:
+        index = argv.index("--profile-ui")
+        value = argv[index + 1] if index + 1 < len(argv) and not argv[index + 1].startswith("-") else ""
+        return value or DEFAULT_OUTPUT
+    value = environ.get("IMS_PROFILE_UI", "").strip()
+    if not value or value.lower() in ("0", "false", "no", "off"):
+        return None
+    return DEFAULT_OUTPUT if value.lower() in ("1", "true", "yes", "on") else value
+
+
+def strip_args(argv):
+    """argv without --profile-ui and its file, to hand the rest to Qt."""
+    if "--profile-ui" not in argv:
+        return list(argv)
+    index = argv.index("--profile-ui")
+    end = index + 2 if index + 1 < len(argv) and not argv[index + 1].startswith("-") else index + 1
+    return argv[:index] + argv[end:]
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class _Frame:
+    __slots__ = ('name', 'kind', 'start', 'children', 'db', 'excluded')
+
+    def __init__(self, name, kind, start):
+        self.name = name
+        self.kind = kind  # 'event', 'slot' or 'db'
+        self.start = start
+        self.children = 0.0  # time in frames called from this one
+        self.db = 0.0  # database time inside this frame
+        self.excluded = 0.0  # time in modal dialogs opened from this frame
+
+
+class _Context:
+    """The open frames of one event dispatch; a nested event loop starts another."""
+    __slots__ = ('frames', 'called', 'level', 'nested_start', 'nested_end')
+
+    def __init__(self, level=0):
+        self.frames = []
+        self.level = level  # event loop nesting its frames run at
+        self.called = []  # handlers the event called directly
+        self.nested_start = None
+        self.nested_end = None
+
+
+class UiProfiler:
+    def __init__(self, output=DEFAULT_OUTPUT, stall_ms=DEFAULT_STALL_MS):
+        self.output = output
+        self.stall_seconds = stall_ms / 1000
+        self.folded = {}  # "frame;frame" -> self time in seconds
+        self.handlers = {}  # name -> [(busy seconds, db seconds)]
+        self.stalls = []  # (busy seconds, db seconds, event name, handlers called)
+        self.events = 0
+        self.started = time.perf_counter()
+        self._contexts = [_Context()]
+        self._thread = threading.get_ident()
+        self._patched = []
+        self._written = False
+
+    # Installing
+    def install(self):
+        """Wrap the methods of PROFILED_CLASSES; call before any form is created."""
+        for module_name, class_name, prefix in PROFILED_CLASSES:
+            cls = getattr(import_module(module_name), class_name)
+            kind = 'db' if prefix else 'slot'
+            for name, member in list(vars(cls).items()):
+                if name.startswith("__") or name in SKIPPED_METHODS or not inspect.isfunction(member):
+                    continue
+                setattr(cls, name, self._wrap(member, f"{prefix}{class_name}.{name}", kind))
+                self._patched.append((cls, name, member))
+        atexit.register(self.write)
+        return self
+
+    def uninstall(self):
+        for cls, name, member in reversed(self._patched):
+            setattr(cls, name, member)
+        self._patched = []
+
+    def _wrap(self, func, name, kind):
+        profiler = self
+        # Qt passes a slot only as many signal arguments as it takes, so
+        # the wrapper must drop the rest as Qt would have
+        parameters = inspect.signature(func).parameters.values()
+        if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+            accepted = None
+        else:
+            accepted = sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if accepted is not None and len(args) > accepted:
+                args = args[:accepted]
+            # Only the GUI thread blocks the event loop
+            if threading.get_ident() != profiler._thread:
+                return func(*args, **kwargs)
+            profiler.enter(name, kind)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.leave()
+        return wrapper
+
+    # Recording
+    def enter(self, name, kind='slot'):
+        context = self._contexts[-1]
+        if context.nested_start is not None:
+            self._close_nested(context)
+        context.frames.append(_Frame(name, kind, time.perf_counter()))
+
+    def leave(self):
+        """Close the innermost frame; returns its (busy, db) seconds."""
+        now = time.perf_counter()
+        context = self._contexts[-1]
+        if context.nested_start is not None:
+            self._close_nested(context)
+        frames = context.frames
+        frame = frames.pop()
+        busy = now - frame.start - frame.excluded
+        db = busy if frame.kind == 'db' else frame.db
+        stack = ";".join([f.name for f in frames] + [frame.name])
+        self.folded[stack] = self.folded.get(stack, 0.0) + max(busy - frame.children, 0.0)
+        parent = frames[-1] if frames else None
+        if parent is not None:
+            parent.children += busy
+            if parent.kind != 'db':
+                parent.db += db
+            if parent.kind == 'event':
+                context.called.append(frame.name)
+        # A database call made by another one is part of the outer call
+        if frame.kind == 'slot' or (frame.kind == 'db' and (parent is None or parent.kind != 'db')):
+            self.handlers.setdefault(frame.name, []).append((busy, db))
+        return busy, db
+
+    def _close_nested(self, context):
+        # Code resumed after a modal dialog: its time is not this frame's
+        span = (context.nested_end or time.perf_counter()) - context.nested_start
+        for frame in context.frames:
+            frame.excluded += span
+        context.nested_start = context.nested_end = None
+
+    def begin_event(self, name):
+        context = self._contexts[-1]
+        level = QThread.currentThread().loopLevel()
+        if not context.frames:
+            context.level = level
+        elif level > context.level:
+            # Dispatched by an event loop nested in a handler, e.g. a modal
+            # dialog's; an event sent directly from a handler is its child
+            if context.nested_start is None:
+                context.nested_start = time.perf_counter()
+            self._contexts.append(_Context(level))
+        self.events += 1
+        self.enter(name, 'event')
+
+    def end_event(self):
+        context = self._contexts[-1]
+        name = context.frames[-1].name
+        busy, db = self.leave()
+        if context.frames:
+            return
+        if busy >= self.stall_seconds:
+            self.stalls.append((busy, db, name, context.called))
+        context.called = []
+        if len(self._contexts) > 1:
+            self._contexts.pop()
+            self._contexts[-1].nested_end = time.perf_counter()
+
+    # Reporting
+    def summary(self):
+        lines = [f"UI profile: {self.events} events in {time.perf_counter() - self.started:.1f}s, "
+                 f"{len(self.stalls)} stalls over {self.stall_seconds * 1000:g} ms", ""]
+        lines.append(f"{'handler':<52} {'calls':>7} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8} "
+                     f"{'max ms':>8} {'db ms':>9}")
+        rows = []
+        for name, samples in self.handlers.items():
+            durations = sorted(busy for busy, _ in samples)
+            rows.append((sum(durations), name, len(samples), durations, sum(db for _, db in samples)))
+        for total, name, calls, durations, db in sorted(rows, reverse=True):
+            lines.append(f"{name:<52} {calls:>7} {total * 1000:>10.1f} {_percentile(durations, 50) * 1000:>8.2f} "
+                         f"{_percentile(durations, 95) * 1000:>8.2f} {durations[-1] * 1000:>8.2f} {db * 1000:>9.1f}")
+        lines.append("")
+        lines.append(f"stalls, slowest first (at most {STALLS_LISTED}):")
+        for busy, db, name, called in sorted(self.stalls, key=lambda stall: stall[0], reverse=True)[:STALLS_LISTED]:
+            lines.append(f"  {busy * 1000:8.1f} ms (db {db * 1000:.1f} ms)  {name}"
+                         + (f" -> {', '.join(called)}" if called else ""))
+        return "\n".join(lines)
+
+    def write(self):
+        """Write the folded stacks and the summary; called once, when the app quits."""
+        if self._written:
+            return
+        self._written = True
+        try:
+            with open(self.output, "w", encoding="utf-8") as f:
+                for stack, seconds in sorted(self.folded.items()):
+                    micros = int(seconds * 1e6)
+                    if micros:
+                        f.write(f"{stack} {micros}\n")
+            summary_path = os.path.splitext(self.output)[0] + ".txt"
+            with open(summary_path, "w", encoding="utf-8") as f:
+                f.write(self.summary() + "\n")
+            print(f"UI profile written to {self.output} and {summary_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Error writing UI profile: {str(e)}", file=sys.stderr)
+
+
+class ProfilingApplication(QApplication):
+    """QApplication timing every event it dispatches into a UiProfiler."""
+
+    def __init__(self, argv, profiler):
+        super().__init__(argv)
+        self.profiler = profiler
+        self.aboutToQuit.connect(profiler.write)
+
+    def notify(self, receiver, event):
+        if threading.get_ident() != self.profiler._thread:
+            return super().notify(receiver, event)
+        self.profiler.begin_event(f"{event.type().name}@{type(receiver).__name__}")
+        try:
+            return super().notify(receiver, event)
+        finally:
+            self.profiler.end_event()
+
+
+def start(argv, output, stall_ms=None):
+    """Install a UiProfiler writing to output and return the ProfilingApplication to run."""
+    if stall_ms is None:
+        stall_ms = float(os.environ.get("IMS_PROFILE_UI_STALL_MS") or DEFAULT_STALL_MS)
+    profiler = UiProfiler(output, stall_ms).install()
+    return ProfilingApplication(argv, profiler)
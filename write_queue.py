@@ -0,0 +1,156 @@
+"""One writer thread that records products, sales and receipts with group commit.
+
+Every Database write is its own transaction, and each commit costs a WAL
+append and a round on the write lock (plus an fsync under
+synchronous=FULL), so many terminals writing at once spend their time
+committing and waiting for each other. WriteQueue owns the only write
+connection instead: callers queue their writes and get a Future back,
+and the writer thread commits whatever has accumulated in one
+transaction: every write queued while the previous commit ran, up to
+max_batch. A max_delay above zero also waits that long after the first
+write for more to arrive, which only pays when a commit is slow (an fsync
+on a spinning disk); otherwise it just adds latency.
+
+Each write runs in a SAVEPOINT of its own, so one that fails (short of
+stock, unknown product, ...) is rolled back and its Future gets the
+error while the rest of the batch still commits. A Future's result is set
+only after the commit, so a row id handed out is durable.
+
+    queue = WriteQueue(db)
+    sale_id = queue.add_sale(sale_data).result()
+    queue.close()
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import LineValidationError, is_lock_error
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, db, max_batch=100, max_delay=0.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0  # transactions committed, for benchmarks
+        self.writes = 0  # writes that succeeded
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, work, *args, error="Error writing to the database", catalog=False):
+        """Queue work(cursor, *args) and return a Future of its result.
+
+        error prefixes the message of a failure, like the Database method
+        it stands in for; catalog=True invalidates the catalog cache after
+        the commit.
+        """
+        if self._closed:
+            raise Exception("Write queue is closed")
+        future = Future()
+        self._queue.put((work, args, error, catalog, future))
+        return future
+
+    def add_product(self, product_data):
+        return self.submit(self.db._insert_product, product_data, error="Error adding product", catalog=True)
+
+    def add_sale(self, sale_data):
+        return self.submit(self.db._insert_sale, sale_data, error="Error adding sale")
+
+    def add_invoice(self, invoice_data, lines):
+        return self.submit(self.db._insert_invoice, invoice_data, lines, error="Error adding invoice")
+
+    def add_goods_receiving(self, goods_data):
+        return self.submit(self.db._insert_goods_receiving, goods_data, error="Error adding goods receiving")
+
+    def add_goods_receiving_bulk(self, grn_data, lines):
+        future = Future()
+        try:
+            self.db._check_grn_lines(lines)
+        except LineValidationError as e:
+            future.set_exception(e)
+            return future
+        return self.submit(self.db._insert_goods_receipt_note, grn_data, lines,
+                           error="Error posting goods received note")
+
+    def close(self):
+        """Commit everything queued so far and stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            batch = [item for item in batch if item[-1].set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        conn = self.db.connect()
+
+        def run():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.cursor()
+                outcomes = []
+                for work, args, _, _, _ in batch:
+                    cursor.execute("SAVEPOINT write")
+                    try:
+                        outcomes.append((True, work(cursor, *args)))
+                    except Exception as e:
+                        # A locked database fails the whole batch, to be retried
+                        if is_lock_error(e):
+                            raise
+                        cursor.execute("ROLLBACK TO write")
+                        outcomes.append((False, e))
+                    cursor.execute("RELEASE write")
+                conn.commit()
+                return outcomes
+            except BaseException:
+                conn.rollback()
+                raise
+
+        try:
+            outcomes = self.db._retry(run)
+        except Exception as e:
+            for _, _, error, _, future in batch:
+                future.set_exception(Exception(f"{error}: {str(e)}"))
+            return
+        self.commits += 1
+        if any(ok and catalog for (ok, _), (_, _, _, catalog, _) in zip(outcomes, batch)):
+            self.db._catalog_changed()
+        for (ok, result), (_, _, error, _, future) in zip(outcomes, batch):
+            if ok:
+                self.writes += 1
+                future.set_result(result)
+            elif isinstance(result, LineValidationError):
+                future.set_exception(result)
+            else:
+                future.set_exception(Exception(f"{error}: {str(result)}"))